@@ -13,7 +13,7 @@ from models.team import (
 )
 from services.team_service import TeamService
 from middleware.auth import require_auth, get_current_user
-from utils.pagination import PaginationParams
+from utils.pagination import InvalidCursorError, PaginationParams
 from utils.exceptions import NotFoundError, ConflictError, ForbiddenError
 import logging
 
@@ -43,19 +43,28 @@ async def create_team(
 async def get_user_teams(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; overrides page"),
     current_user: dict = Depends(get_current_user)
 ):
     """Get all teams for the current user with pagination."""
     try:
         pagination = PaginationParams(page=page, per_page=per_page)
-        teams, total = await TeamService.get_user_teams(current_user["id"], pagination)
+        result = await TeamService.get_user_teams_page(
+            current_user["id"], limit=pagination.limit, cursor=cursor, offset=pagination.offset
+        )
         
         return TeamListResponse(
-            items=teams,
-            total=total,
+            items=result.items,
+            total=result.total,
             page=page,
             per_page=per_page,
-            pages=(total + per_page - 1) // per_page
+            pages=(result.total + per_page - 1) // per_page,
+            next_cursor=result.next_cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     except Exception as e:
         logger.error(f"Failed to get user teams: {e}")
@@ -6,7 +6,7 @@ Implements 3-tier caching architecture to achieve PRD performance targets:
 - 10,000+ concurrent user support
 
 Architecture:
-- L1 Memory Cache: <5ms access, LRU eviction, thread-safe
+- L1 Memory Cache: <5ms access, sharded segmented-LRU/TinyLFU eviction, thread-safe
 - L2 Redis Cache: <20ms access, distributed, async operations
 - L3 Database: Materialized views, <100ms analytical queries
 
@@ -19,9 +19,11 @@ Security Features:
 
 import asyncio
 import hashlib
+import heapq
 import json
 import logging
 import pickle
+import sys
 import threading
 import time
 import weakref
@@ -188,232 +190,436 @@ class SecureCacheKeyManager:
         return f"res:{key_hash}"
 
 
-class L1MemoryCache:
+L1_SIZE_SAMPLE = 32
+_SCALAR_TYPES = (bool, int, float, type(None))
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
     """
-    High-performance L1 in-memory cache with thread-safe LRU eviction.
-    Target: <5ms access times, >95% hit rate for hot authorization data.
+    Cheap approximate in-memory size of a cached value.
+    Walks at most three levels deep and samples large containers instead of
+    serializing, so sizing stays far cheaper than the lookup it protects.
     """
+    value_type = type(value)
+    if value_type is str or value_type is bytes or value_type is bytearray:
+        return 49 + len(value)
+    if value_type in _SCALAR_TYPES:
+        return 28
+    if _depth >= 3:
+        return 64
     
-    def __init__(self, max_size_mb: int = 200, eviction_policy: EvictionPolicy = EvictionPolicy.HYBRID):
-        self.max_size_bytes = max_size_mb * 1024 * 1024
+    if isinstance(value, dict):
+        count = len(value)
+        items = value.items() if count <= L1_SIZE_SAMPLE else list(value.items())[:L1_SIZE_SAMPLE]
+        sampled = 0
+        for item_key, item in items:
+            sampled += 49 + len(item_key) if type(item_key) is str else estimate_size(item_key, _depth + 1)
+            item_type = type(item)
+            if item_type is str:
+                sampled += 49 + len(item)
+            elif item_type in _SCALAR_TYPES:
+                sampled += 28
+            else:
+                sampled += estimate_size(item, _depth + 1)
+        return 64 + 40 * count + (sampled * count // L1_SIZE_SAMPLE if count > L1_SIZE_SAMPLE else sampled)
+    
+    if isinstance(value, (list, tuple, set, frozenset)):
+        count = len(value)
+        items = value if count <= L1_SIZE_SAMPLE else list(value)[:L1_SIZE_SAMPLE]
+        sampled = 0
+        for item in items:
+            item_type = type(item)
+            if item_type is str:
+                sampled += 49 + len(item)
+            elif item_type in _SCALAR_TYPES:
+                sampled += 28
+            else:
+                sampled += estimate_size(item, _depth + 1)
+        return 56 + 8 * count + (sampled * count // L1_SIZE_SAMPLE if count > L1_SIZE_SAMPLE else sampled)
+    
+    if hasattr(value, '__dict__'):
+        return 64 + estimate_size(vars(value), _depth + 1)
+    return sys.getsizeof(value, 64)
+
+
+class _FrequencySketch:
+    """
+    Count-min sketch with periodic halving, used as the TinyLFU admission filter.
+    Estimates how often a key was requested recently in O(1) and fixed memory.
+    """
+    
+    __slots__ = ('mask', 'table', 'width', 'additions', 'sample_size')
+    
+    MAX_WIDTH = 1 << 16  # four 16-bit slices of one mixed hash index the rows
+    
+    def __init__(self, capacity_hint: int):
+        width = 64
+        while width < min(capacity_hint, self.MAX_WIDTH):
+            width <<= 1
+        self.width = width
+        self.mask = width - 1
+        self.table = bytearray(width * 4)
+        self.additions = 0
+        self.sample_size = width * 10
+    
+    def increment(self, key_hash: int):
+        h = (key_hash * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        mask, width, table = self.mask, self.width, self.table
+        for index in (h & mask, width + ((h >> 16) & mask),
+                      2 * width + ((h >> 32) & mask), 3 * width + ((h >> 48) & mask)):
+            if table[index] < 15:
+                table[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+    
+    def frequency(self, key_hash: int) -> int:
+        h = (key_hash * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        mask, width, table = self.mask, self.width, self.table
+        return min(table[h & mask], table[width + ((h >> 16) & mask)],
+                   table[2 * width + ((h >> 32) & mask)], table[3 * width + ((h >> 48) & mask)])
+    
+    def _age(self):
+        """Halve every counter so old popularity decays."""
+        self.table = self.table.translate(_HALVE_TABLE)
+        self.additions //= 2
+
+
+_HALVE_TABLE = bytes(count >> 1 for count in range(256))
+
+
+class _L1Entry:
+    """Slot-based cache entry; cheaper to allocate than a dataclass."""
+    
+    __slots__ = ('value', 'expires_at', 'size_bytes', 'priority', 'tags', 'protected')
+    
+    def __init__(self, value: Any, expires_at: Optional[float], size_bytes: int,
+                 priority: int, tags: Set[str]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size_bytes = size_bytes
+        self.priority = priority
+        self.tags = tags
+        self.protected = False
+
+
+class _L1Shard:
+    """
+    One lock-striped segment of the L1 cache.
+    
+    Entries live in two LRU-ordered segments: probation (seen once) and
+    protected (hit at least once since insertion). Victims are always taken
+    from the head of probation, so selection is O(1) for every policy.
+    """
+    
+    PROTECTED_RATIO = 0.8
+    # TTL policy: the expiry heap is rebuilt once stale entries (overwritten or
+    # removed keys) outnumber live ones, keeping it O(live entries)
+    EXPIRY_HEAP_MIN_REBUILD = 64
+    
+    def __init__(self, max_size_bytes: int, eviction_policy: EvictionPolicy, sketch_capacity: int):
+        self.max_size_bytes = max_size_bytes
+        self.protected_max_bytes = int(max_size_bytes * self.PROTECTED_RATIO)
         self.eviction_policy = eviction_policy
+        self.segmented = eviction_policy in (EvictionPolicy.LFU, EvictionPolicy.HYBRID)
+        self.admission = _FrequencySketch(sketch_capacity) if self.segmented else None
+        
+        self.lock = threading.Lock()
+        self.probation: "OrderedDict[str, _L1Entry]" = OrderedDict()
+        self.protected: "OrderedDict[str, _L1Entry]" = OrderedDict()
+        self.expiry_heap: List[Tuple[float, str]] = []
         
-        # Thread-safe storage
-        self.cache: Dict[str, CacheEntry] = {}
-        self.lru_order: OrderedDict[str, None] = OrderedDict()
-        self.access_counts: Dict[str, int] = defaultdict(int)
+        self.size_bytes = 0
+        self.protected_bytes = 0
+        self.metrics = CacheMetrics()
+    
+    # All methods below expect self.lock to be held by the caller.
+    
+    def lookup(self, key: str, now: float) -> Optional[_L1Entry]:
+        entry = self.probation.get(key)
+        if entry is None:
+            entry = self.protected.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and now >= entry.expires_at:
+            self.remove(key)
+            return None
         
-        # Thread safety
-        self.lock = threading.RLock()
+        if entry.protected:
+            self.protected.move_to_end(key)
+        elif self.segmented:
+            # Promote on second touch; demote protected overflow back to probation
+            del self.probation[key]
+            entry.protected = True
+            self.protected[key] = entry
+            self.protected_bytes += entry.size_bytes
+            while self.protected_bytes > self.protected_max_bytes and len(self.protected) > 1:
+                demoted_key, demoted = self.protected.popitem(last=False)
+                demoted.protected = False
+                self.protected_bytes -= demoted.size_bytes
+                self.probation[demoted_key] = demoted
+        else:
+            self.probation.move_to_end(key)
+        return entry
+    
+    def insert(self, key: str, entry: _L1Entry, key_hash: int) -> bool:
+        # The old value goes either way; a failed overwrite must not leave it readable
+        updating = self.remove(key)
+        if entry.size_bytes > self.max_size_bytes:
+            return False
         
-        # Metrics
+        if self.size_bytes + entry.size_bytes > self.max_size_bytes:
+            # Updates of resident keys bypass admission; only new keys compete
+            # for space. Admission is decided against the first victim, before
+            # anything is evicted, so a rejected candidate costs nothing.
+            if not updating and self.admission is not None and entry.priority <= 1:
+                victim_key = self.select_victim()
+                victim = self.probation.get(victim_key) or self.protected.get(victim_key)
+                # TinyLFU: only displace a victim that has been requested less often
+                if victim is not None and victim.priority <= 1 and \
+                        self.admission.frequency(key_hash) < self.admission.frequency(hash(victim_key)):
+                    return False
+            while self.size_bytes + entry.size_bytes > self.max_size_bytes:
+                victim_key = self.select_victim()
+                if victim_key is None:
+                    return False
+                self.remove(victim_key)
+                self.metrics.evictions += 1
+        
+        if entry.priority > 1 and self.segmented:
+            entry.protected = True
+            self.protected[key] = entry
+            self.protected_bytes += entry.size_bytes
+        else:
+            self.probation[key] = entry
+        self.size_bytes += entry.size_bytes
+        if entry.expires_at is not None and self.eviction_policy == EvictionPolicy.TTL:
+            heapq.heappush(self.expiry_heap, (entry.expires_at, key))
+        return True
+    
+    def select_victim(self) -> Optional[str]:
+        if self.eviction_policy == EvictionPolicy.TTL:
+            while self.expiry_heap:
+                expires_at, key = self.expiry_heap[0]
+                entry = self.probation.get(key) or self.protected.get(key)
+                if entry is not None and entry.expires_at == expires_at:
+                    return key
+                heapq.heappop(self.expiry_heap)  # stale
+        if self.probation:
+            return next(iter(self.probation))
+        if self.protected:
+            return next(iter(self.protected))
+        return None
+    
+    def remove(self, key: str) -> bool:
+        entry = self.probation.pop(key, None)
+        if entry is None:
+            entry = self.protected.pop(key, None)
+            if entry is None:
+                return False
+            self.protected_bytes -= entry.size_bytes
+        self.size_bytes -= entry.size_bytes
+        if entry.expires_at is not None and self.eviction_policy == EvictionPolicy.TTL:
+            self._maybe_rebuild_expiry_heap()
+        return True
+    
+    def _maybe_rebuild_expiry_heap(self):
+        live = len(self.probation) + len(self.protected)
+        if len(self.expiry_heap) > max(2 * live, self.EXPIRY_HEAP_MIN_REBUILD):
+            self.expiry_heap = [
+                (entry.expires_at, key)
+                for segment in (self.probation, self.protected)
+                for key, entry in segment.items()
+                if entry.expires_at is not None
+            ]
+            heapq.heapify(self.expiry_heap)
+    
+    def keys(self) -> List[str]:
+        return list(self.probation.keys()) + list(self.protected.keys())
+    
+    def expired_keys(self, now: float) -> List[str]:
+        return [
+            key for segment in (self.probation, self.protected)
+            for key, entry in segment.items()
+            if entry.expires_at is not None and now >= entry.expires_at
+        ]
+    
+    def clear(self):
+        self.probation.clear()
+        self.protected.clear()
+        self.expiry_heap.clear()
+        self.size_bytes = 0
+        self.protected_bytes = 0
         self.metrics = CacheMetrics()
-        self.current_size_bytes = 0
+
+
+class L1MemoryCache:
+    """
+    High-performance L1 in-memory cache with lock-striped segmented-LRU eviction.
+    Target: <5ms access times, >95% hit rate for hot authorization data.
+    
+    Keys are hashed onto independent shards, each with its own lock, so
+    concurrent request threads rarely contend. Sizes are estimated cheaply
+    (or supplied by the caller) instead of pickling values. LFU and HYBRID
+    policies use segmented LRU with TinyLFU admission; LRU and TTL use a
+    single segment. Victim selection is O(1) under every policy.
+    """
+    
+    def __init__(self, max_size_mb: int = 200, eviction_policy: EvictionPolicy = EvictionPolicy.HYBRID,
+                 shard_count: int = 16):
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.eviction_policy = eviction_policy
+        
+        # Shard count is rounded to a power of two so shard selection is a mask
+        shards = 1
+        while shards < max(1, shard_count):
+            shards <<= 1
+        self._shard_mask = shards - 1
+        shard_bytes = self.max_size_bytes // shards
+        sketch_capacity = max(shard_bytes // 1024, 64)  # assume ~1KB average entry
+        self._shards = [_L1Shard(shard_bytes, eviction_policy, sketch_capacity) for _ in range(shards)]
+        # Max 10% of cache, and never more than the shard it has to fit in
+        self._max_entry_bytes = min(self.max_size_bytes * 0.1, shard_bytes)
         
         # Cleanup tracking
         self.last_cleanup = time.time()
         self.cleanup_interval = 60  # seconds
     
+    def _shard_for(self, key_hash: int) -> _L1Shard:
+        return self._shards[key_hash & self._shard_mask]
+    
     def get(self, key: str, default: Any = None) -> Any:
         """Thread-safe get operation with performance tracking."""
-        start_time = time.time()
+        start_time = time.perf_counter()
+        key_hash = hash(key)
+        shard = self._shard_for(key_hash)
         
-        try:
-            with self.lock:
-                entry = self.cache.get(key)
-                
-                if entry and not entry.is_expired():
-                    entry.access()
-                    self.lru_order.move_to_end(key)
-                    self.access_counts[key] += 1
-                    
-                    response_time_ms = (time.time() - start_time) * 1000
-                    self.metrics.update(CacheOperation.GET, True, response_time_ms)
-                    
-                    return entry.value
-                elif entry:
-                    # Expired entry cleanup
-                    self._remove_entry_unsafe(key)
-                
-                # Cache miss
-                response_time_ms = (time.time() - start_time) * 1000
-                self.metrics.update(CacheOperation.GET, False, response_time_ms)
-                return default
-                
-        except Exception as e:
-            logger.error(f"L1 cache get error for key {key}: {e}")
-            response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update(CacheOperation.GET, False, response_time_ms)
-            return default
+        with shard.lock:
+            if shard.admission is not None:
+                shard.admission.increment(key_hash)
+            entry = shard.lookup(key, time.time())
+            shard.metrics.update(CacheOperation.GET, entry is not None,
+                                 (time.perf_counter() - start_time) * 1000)
+        
+        return entry.value if entry is not None else default
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None, priority: int = 1, 
-            tags: Optional[Set[str]] = None) -> bool:
-        """Thread-safe set operation with intelligent eviction."""
-        start_time = time.time()
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, priority: int = 1,
+            tags: Optional[Set[str]] = None, size_bytes: Optional[int] = None) -> bool:
+        """
+        Thread-safe set operation with admission-controlled eviction.
+        
+        Args:
+            size_bytes: Optional caller-known size; estimated when omitted
+        """
+        start_time = time.perf_counter()
         
         try:
-            with self.lock:
-                # Serialize and calculate size
-                serialized_value = self._serialize_value(value)
-                entry_size = len(serialized_value)
-                
-                # Reject oversized entries
-                if entry_size > self.max_size_bytes * 0.1:  # Max 10% of cache
-                    logger.warning(f"L1 cache entry too large: {entry_size} bytes")
-                    return False
-                
-                # Remove existing entry
-                if key in self.cache:
-                    self._remove_entry_unsafe(key)
-                
-                # Ensure sufficient space
-                self._ensure_space_unsafe(entry_size)
-                
-                # Create and store entry
-                expires_at = time.time() + ttl if ttl else None
-                entry = CacheEntry(
-                    key=key,
-                    value=value,
-                    created_at=time.time(),
-                    expires_at=expires_at,
-                    size_bytes=entry_size,
-                    priority=priority,
-                    tags=tags or set()
-                )
-                
-                self.cache[key] = entry
-                self.lru_order[key] = None
-                self.current_size_bytes += entry_size
-                
-                # Update metrics
-                response_time_ms = (time.time() - start_time) * 1000
-                self.metrics.update(CacheOperation.SET, True, response_time_ms)
-                self.metrics.cache_size_bytes = self.current_size_bytes
-                self.metrics.entries_count = len(self.cache)
-                
-                return True
-                
+            entry_size = size_bytes if size_bytes is not None else estimate_size(value)
         except Exception as e:
-            logger.error(f"L1 cache set error for key {key}: {e}")
-            response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update(CacheOperation.SET, False, response_time_ms)
+            logger.error(f"L1 cache size estimation error for key {key}: {e}")
             return False
+        
+        # Reject oversized entries
+        if entry_size > self._max_entry_bytes:
+            logger.warning(f"L1 cache entry too large: {entry_size} bytes")
+            return False
+        
+        now = time.time()
+        entry = _L1Entry(value, now + ttl if ttl else None, entry_size, priority, tags or set())
+        key_hash = hash(key)
+        shard = self._shard_for(key_hash)
+        
+        with shard.lock:
+            stored = shard.insert(key, entry, key_hash)
+            shard.metrics.update(CacheOperation.SET, stored, (time.perf_counter() - start_time) * 1000)
+        return stored
     
     def delete(self, key: str) -> bool:
         """Thread-safe delete operation."""
-        start_time = time.time()
+        start_time = time.perf_counter()
+        shard = self._shard_for(hash(key))
         
-        try:
-            with self.lock:
-                success = self._remove_entry_unsafe(key)
-                
-                response_time_ms = (time.time() - start_time) * 1000
-                self.metrics.update(CacheOperation.DELETE, success, response_time_ms)
-                return success
-                
-        except Exception as e:
-            logger.error(f"L1 cache delete error for key {key}: {e}")
-            response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update(CacheOperation.DELETE, False, response_time_ms)
-            return False
+        with shard.lock:
+            success = shard.remove(key)
+            shard.metrics.update(CacheOperation.DELETE, success, (time.perf_counter() - start_time) * 1000)
+        return success
     
-    def _serialize_value(self, value: Any) -> bytes:
-        """Serialize value with compression for large objects."""
-        try:
-            serialized = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
-            
-            # Compress if beneficial
-            if len(serialized) > 1024:  # 1KB threshold
-                compressed = gzip.compress(serialized)
-                if len(compressed) < len(serialized) * 0.8:
-                    return compressed
-            
-            return serialized
-        except Exception as e:
-            logger.error(f"L1 cache serialization error: {e}")
-            raise
+    def keys(self) -> List[str]:
+        """Snapshot of current keys (one shard locked at a time)."""
+        keys: List[str] = []
+        for shard in self._shards:
+            with shard.lock:
+                keys.extend(shard.keys())
+        return keys
     
-    def _remove_entry_unsafe(self, key: str) -> bool:
-        """Remove entry without lock (internal use only)."""
-        if key in self.cache:
-            entry = self.cache.pop(key)
-            self.lru_order.pop(key, None)
-            self.access_counts.pop(key, None)
-            self.current_size_bytes -= entry.size_bytes
-            self.metrics.entries_count = len(self.cache)
-            return True
-        return False
-    
-    def _ensure_space_unsafe(self, required_bytes: int):
-        """Ensure sufficient space using eviction policy."""
-        while (self.current_size_bytes + required_bytes) > self.max_size_bytes and self.cache:
-            victim_key = self._select_eviction_victim_unsafe()
-            if victim_key:
-                self._remove_entry_unsafe(victim_key)
-                self.metrics.evictions += 1
-            else:
-                break
+    def __len__(self) -> int:
+        return sum(len(shard.probation) + len(shard.protected) for shard in self._shards)
     
-    def _select_eviction_victim_unsafe(self) -> Optional[str]:
-        """Select victim for eviction based on policy."""
-        if not self.cache:
-            return None
-        
-        if self.eviction_policy == EvictionPolicy.LRU:
-            return next(iter(self.lru_order))
-        elif self.eviction_policy == EvictionPolicy.LFU:
-            return min(self.cache.keys(), key=lambda k: self.access_counts.get(k, 0))
-        elif self.eviction_policy == EvictionPolicy.TTL:
-            expiring_keys = [
-                (k, v) for k, v in self.cache.items()
-                if v.expires_at is not None
-            ]
-            if expiring_keys:
-                return min(expiring_keys, key=lambda x: x[1].expires_at or float('inf'))[0]
-            return next(iter(self.cache))
-        else:  # HYBRID
-            return min(self.cache.keys(), key=lambda k: self.cache[k].calculate_eviction_score())
+    @property
+    def current_size_bytes(self) -> int:
+        return sum(shard.size_bytes for shard in self._shards)
+    
+    @property
+    def metrics(self) -> CacheMetrics:
+        """Aggregate metrics across shards."""
+        total = CacheMetrics()
+        weighted_time = 0.0
+        for shard in self._shards:
+            m = shard.metrics
+            total.hits += m.hits
+            total.misses += m.misses
+            total.sets += m.sets
+            total.deletes += m.deletes
+            total.evictions += m.evictions
+            total.errors += m.errors
+            total.total_operations += m.total_operations
+            weighted_time += m.avg_response_time_ms * m.total_operations
+        if total.total_operations:
+            total.avg_response_time_ms = weighted_time / total.total_operations
+        requests = total.hits + total.misses
+        if requests:
+            total.hit_rate_percent = total.hits / requests * 100
+        total.cache_size_bytes = self.current_size_bytes
+        total.entries_count = len(self)
+        return total
     
     def cleanup_expired(self) -> int:
         """Clean up expired entries."""
         if time.time() - self.last_cleanup < self.cleanup_interval:
             return 0
         
-        expired_keys = []
-        with self.lock:
-            for key, entry in self.cache.items():
-                if entry.is_expired():
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                self._remove_entry_unsafe(key)
+        removed = 0
+        now = time.time()
+        for shard in self._shards:
+            with shard.lock:
+                for key in shard.expired_keys(now):
+                    shard.remove(key)
+                    removed += 1
         
         self.last_cleanup = time.time()
-        return len(expired_keys)
+        return removed
     
     def get_metrics(self) -> Dict[str, Any]:
         """Get comprehensive L1 cache metrics."""
-        with self.lock:
-            utilization = (self.current_size_bytes / self.max_size_bytes) * 100
-            
-            return {
-                'level': 'L1_MEMORY',
-                'metrics': asdict(self.metrics),
-                'utilization_percent': utilization,
-                'current_size_mb': self.current_size_bytes / (1024 * 1024),
-                'max_size_mb': self.max_size_bytes / (1024 * 1024),
-                'eviction_policy': self.eviction_policy.value,
-                'performance_target_ms': 5
-            }
+        metrics = self.metrics
+        utilization = (metrics.cache_size_bytes / self.max_size_bytes) * 100
+        
+        return {
+            'level': 'L1_MEMORY',
+            'metrics': asdict(metrics),
+            'utilization_percent': utilization,
+            'current_size_mb': metrics.cache_size_bytes / (1024 * 1024),
+            'max_size_mb': self.max_size_bytes / (1024 * 1024),
+            'eviction_policy': self.eviction_policy.value,
+            'shards': len(self._shards),
+            'performance_target_ms': 5
+        }
     
     def clear(self):
         """Clear all cache entries."""
-        with self.lock:
-            self.cache.clear()
-            self.lru_order.clear()
-            self.access_counts.clear()
-            self.current_size_bytes = 0
-            self.metrics = CacheMetrics()
+        for shard in self._shards:
+            with shard.lock:
+                shard.clear()
 
 
 class L2RedisCache:
@@ -917,11 +1123,7 @@ class MultiLayerCache:
         try:
             # L1 pattern invalidation
             l1_count = 0
-            keys_to_remove = []
-            with self.l1_cache.lock:
-                for key in self.l1_cache.cache.keys():
-                    if user_id in key:  # Simple contains check
-                        keys_to_remove.append(key)
+            keys_to_remove = [key for key in self.l1_cache.keys() if user_id in key]  # Simple contains check
             
             for key in keys_to_remove:
                 if self.l1_cache.delete(key):
@@ -44,6 +44,7 @@ from database import get_database
 from monitoring.performance import performance_tracker, PerformanceTarget
 from monitoring.metrics import metrics_collector
 from config import settings
+from utils.request_timing import record_span
 
 logger = logging.getLogger(__name__)
 
@@ -515,21 +516,21 @@ class L2RedisCache:
                 value = self._deserialize_value(data)
                 
                 response_time_ms = (time.time() - start_time) * 1000
-                self.metrics.update_metrics(CacheOperation.GET, True, response_time_ms)
+                self._record_metrics(CacheOperation.GET, True, response_time_ms)
                 self._reset_circuit_breaker()
                 
                 return value
             
             # Cache miss
             response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update_metrics(CacheOperation.GET, False, response_time_ms)
+            self._record_metrics(CacheOperation.GET, False, response_time_ms)
             return default
             
         except RedisError as e:
             logger.warning(f"L2 Redis get error for key {key}: {e}")
             self._handle_circuit_failure()
             response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update_metrics(CacheOperation.GET, False, response_time_ms)
+            self._record_metrics(CacheOperation.GET, False, response_time_ms)
             return default
     
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
@@ -549,7 +550,7 @@ class L2RedisCache:
                 success = await self.redis_client.set(full_key, serialized_data)
             
             response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update_metrics(CacheOperation.SET, bool(success), response_time_ms, len(serialized_data))
+            self._record_metrics(CacheOperation.SET, bool(success), response_time_ms, len(serialized_data))
             
             if success:
                 self._reset_circuit_breaker()
@@ -560,9 +561,74 @@ class L2RedisCache:
             logger.warning(f"L2 Redis set error for key {key}: {e}")
             self._handle_circuit_failure()
             response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update_metrics(CacheOperation.SET, False, response_time_ms)
+            self._record_metrics(CacheOperation.SET, False, response_time_ms)
             return False
-    
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get several values with a single MGET. Missing keys are omitted."""
+        if not keys or not self._check_circuit_breaker() or not self.redis_client:
+            return {}
+
+        start_time = time.time()
+
+        try:
+            raw_values = await self.redis_client.mget([self._make_key(key) for key in keys])
+
+            found = {}
+            for key, data in zip(keys, raw_values):
+                if data is not None:
+                    try:
+                        found[key] = self._deserialize_value(data)
+                    except Exception:
+                        continue  # Treat undecodable entries as misses
+
+            response_time_ms = (time.time() - start_time) * 1000
+            self._record_metrics(CacheOperation.GET, bool(found), response_time_ms)
+            self._reset_circuit_breaker()
+            return found
+
+        except RedisError as e:
+            logger.warning(f"L2 Redis mget error for {len(keys)} keys: {e}")
+            self._handle_circuit_failure()
+            response_time_ms = (time.time() - start_time) * 1000
+            self._record_metrics(CacheOperation.GET, False, response_time_ms)
+            return {}
+
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Set several values in one pipelined round trip."""
+        if not items or not self._check_circuit_breaker() or not self.redis_client:
+            return False
+
+        start_time = time.time()
+
+        try:
+            total_bytes = 0
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    serialized_data = self._serialize_value(value)
+                    total_bytes += len(serialized_data)
+                    if ttl:
+                        pipe.setex(self._make_key(key), ttl, serialized_data)
+                    else:
+                        pipe.set(self._make_key(key), serialized_data)
+                results = await pipe.execute()
+
+            success = all(results)
+            response_time_ms = (time.time() - start_time) * 1000
+            self._record_metrics(CacheOperation.SET, success, response_time_ms, total_bytes)
+
+            if success:
+                self._reset_circuit_breaker()
+
+            return success
+
+        except RedisError as e:
+            logger.warning(f"L2 Redis pipelined set error for {len(items)} keys: {e}")
+            self._handle_circuit_failure()
+            response_time_ms = (time.time() - start_time) * 1000
+            self._record_metrics(CacheOperation.SET, False, response_time_ms)
+            return False
+
     async def delete(self, key: str) -> bool:
         """Delete value from L2 Redis cache."""
         if not self._check_circuit_breaker() or not self.redis_client:
@@ -575,7 +641,7 @@ class L2RedisCache:
             deleted = await self.redis_client.delete(full_key)
             
             response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update_metrics(CacheOperation.DELETE, deleted > 0, response_time_ms)
+            self._record_metrics(CacheOperation.DELETE, deleted > 0, response_time_ms)
             
             if deleted > 0:
                 self._reset_circuit_breaker()
@@ -586,9 +652,15 @@ class L2RedisCache:
             logger.warning(f"L2 Redis delete error for key {key}: {e}")
             self._handle_circuit_failure()
             response_time_ms = (time.time() - start_time) * 1000
-            self.metrics.update_metrics(CacheOperation.DELETE, False, response_time_ms)
+            self._record_metrics(CacheOperation.DELETE, False, response_time_ms)
             return False
     
+    def _record_metrics(self, operation: CacheOperation, success: bool,
+                        response_time_ms: float = 0.0, size_bytes: int = 0):
+        """Update metrics and report the round trip to the current request's timing."""
+        self.metrics.update_metrics(operation, success, response_time_ms, size_bytes)
+        record_span("cache", response_time_ms)
+    
     def _serialize_value(self, value: Any) -> bytes:
         """Serialize value with compression for Redis storage."""
         try:
@@ -886,6 +958,48 @@ class MultiLayerCacheManager:
             performance_tracker.end_operation(operation_id, "cache_multi_level_set", PerformanceTarget.SUB_50MS, False, error=str(e))
             return {'L1': False, 'L2': False, 'L3': False}
     
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Multi-key get: L1 lookups, then one L2 MGET for the L1 misses.
+        Returns only the keys that were found; L2 hits are promoted to L1.
+        """
+        found = {}
+        l1_misses = []
+
+        for key in keys:
+            value = self.l1_cache.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                l1_misses.append(key)
+
+        if l1_misses:
+            l2_found = await self.l2_cache.get_many(l1_misses)
+            for key, value in l2_found.items():
+                found[key] = value
+                if self.auto_promotion_enabled:
+                    self.l1_cache.set(key, value, ttl=300, priority=2)
+
+        return found
+
+    async def set_many(self, items: Dict[str, Any], l1_ttl: int = 300,
+                       l2_ttl: int = 900, priority: int = 1) -> Dict[str, bool]:
+        """Set several values in L1 and, with one pipelined round trip, in L2."""
+        if not items:
+            return {'L1': True, 'L2': True, 'L3': True}
+
+        try:
+            l1_success = all([
+                self.l1_cache.set(key, value, ttl=l1_ttl, priority=priority)
+                for key, value in items.items()
+            ])
+            l2_success = await self.l2_cache.set_many(items, ttl=l2_ttl)
+            return {'L1': l1_success, 'L2': l2_success, 'L3': True}
+
+        except Exception as e:
+            logger.error(f"Multi-level cache set_many failed for {len(items)} keys: {e}")
+            return {'L1': False, 'L2': False, 'L3': False}
+
     async def invalidate_multi_level(self, key: str) -> Dict[str, bool]:
         """Invalidate key across all cache levels."""
         results = {}
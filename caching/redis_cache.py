@@ -14,13 +14,14 @@ from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import asyncio
 import threading
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
 from enum import Enum
 import backoff
 import random
 
 from monitoring.metrics import metrics_collector
 from config import settings
+from utils.async_redis import AsyncRedis, AsyncRedisUnavailable, async_redis
 
 # Check if backoff is available, provide fallback if not
 try:
@@ -104,6 +105,10 @@ class RedisCache:
     """
     High-performance Redis cache with monitoring and optimization.
     Supports compression, serialization, and intelligent key management.
+    
+    Redis calls go through the shared auto-pipelining redis.asyncio client
+    (utils/async_redis.py), so cache operations are coroutines and concurrent
+    lookups share round trips instead of blocking the event loop.
     """
     
     def __init__(self, 
@@ -125,8 +130,8 @@ class RedisCache:
         self._connection_retry_interval = 30  # seconds
         self._max_retries = 3
         
-        # Initialize Redis connection pool
-        self._initialize_redis_pool()
+        # Attach to the shared async Redis client
+        self._initialize_redis_client()
         
         # Local memory cache for frequently accessed items
         self._memory_cache: Dict[str, CacheEntry] = {}
@@ -145,56 +150,26 @@ class RedisCache:
         }
         self._stats_lock = threading.Lock()
     
-    def _initialize_redis_pool(self):
-        """Initialize Redis connection pool with optimized parameters."""
-        try:
-            # Enhanced connection pool configuration
-            self.connection_pool = redis.ConnectionPool.from_url(
-                self.redis_url,
-                max_connections=self.max_connections,
-                retry_on_timeout=True,
-                retry_on_error=[redis.ConnectionError, redis.TimeoutError],
-                socket_keepalive=True,
-                socket_keepalive_options={
-                    1: 1,  # TCP_KEEPIDLE
-                    2: 3,  # TCP_KEEPINTVL 
-                    3: 5,  # TCP_KEEPCNT
-                },
-                socket_connect_timeout=2,
-                socket_timeout=2,
-                health_check_interval=30
-            )
-            
-            self.redis_client = redis.Redis(
-                connection_pool=self.connection_pool,
-                socket_connect_timeout=2,
-                socket_timeout=2,
-                retry_on_timeout=True,
-                retry_on_error=[redis.ConnectionError, redis.TimeoutError],
-                retry=redis.Retry(retries=2)
-            )
-            
-            # Test initial connection
-            self._test_connection()
-            
-        except Exception as e:
-            logger.error(f"❌ Redis pool initialization failed: {e}")
+    def _initialize_redis_client(self):
+        """Use the process-wide client, or a dedicated one for a different Redis URL."""
+        if self.redis_url == async_redis.redis_url:
+            self.redis_client = async_redis
+            self._owns_client = False
+        else:
+            self.redis_client = AsyncRedis(self.redis_url)
+            self._owns_client = True
+        
+        # Connectivity is confirmed by the first command; failures switch to the memory fallback
+        self._redis_available = self.redis_client.enabled
+        if not self._redis_available:
             logger.info("🔄 Redis cache will use memory-only fallback")
-            self._redis_available = False
             self.redis_client = None
     
-    @backoff.on_exception(
-        backoff.expo,
-        (redis.ConnectionError, redis.TimeoutError),
-        max_tries=3,
-        max_time=5,
-        jitter=backoff.random_jitter
-    )
-    def _test_connection(self):
-        """Test Redis connection with exponential backoff retry."""
+    async def _test_connection(self) -> bool:
+        """Test Redis connection."""
         try:
             if self.redis_client:
-                result = self.redis_client.ping()
+                result = await self.redis_client.ping()
                 if result:
                     logger.info(f"✅ Redis cache connected to {self.redis_url}")
                     self._redis_available = True
@@ -207,12 +182,12 @@ class RedisCache:
             logger.warning(f"⚠️ Redis connection test failed: {e}")
             self._redis_available = False
             self._last_connection_attempt = time.time()
-            
-            # Only raise on first initialization, otherwise fall back gracefully
-            if not hasattr(self, '_stats'):
-                logger.error("🔄 Redis cache will use memory-only fallback")
             return False
     
+    async def ping(self) -> bool:
+        """True if Redis answers."""
+        return await self._test_connection()
+    
     def _make_key(self, key: str) -> str:
         """Create prefixed cache key."""
         return f"{self.key_prefix}{key}"
@@ -259,8 +234,10 @@ class RedisCache:
             if operation in self._stats:
                 self._stats[operation] += 1
     
-    def _should_retry_redis(self) -> bool:
+    async def _should_retry_redis(self) -> bool:
         """Check if we should retry Redis connection."""
+        if self.redis_client is None:
+            return False
         if self._redis_available:
             return True
         
@@ -268,7 +245,7 @@ class RedisCache:
         current_time = time.time()
         if current_time - self._last_connection_attempt > self._connection_retry_interval:
             try:
-                if self._test_connection():
+                if await self._test_connection():
                     logger.info("🔄 Redis connection restored")
                     return True
             except Exception as e:
@@ -276,19 +253,20 @@ class RedisCache:
         
         return False
     
-    def _execute_redis_operation(self, operation_func, fallback_result=None):
+    async def _execute_redis_operation(self, operation_func, fallback_result=None):
         """Execute Redis operation with fallback to memory cache."""
-        if not self._should_retry_redis():
+        if not await self._should_retry_redis():
             self._update_stats('memory_fallbacks')
             return fallback_result
         
         try:
-            result = operation_func()
+            result = await operation_func()
             return result
             
-        except (redis.ConnectionError, redis.TimeoutError) as e:
+        except (redis.ConnectionError, redis.TimeoutError, AsyncRedisUnavailable, OSError) as e:
             logger.debug(f"Redis operation failed: {e}")
             self._redis_available = False
+            self._last_connection_attempt = time.time()
             self._update_stats('redis_failures')
             self._update_stats('memory_fallbacks')
             return fallback_result
@@ -331,7 +309,7 @@ class RedisCache:
                 cache_level=CacheLevel.L1_MEMORY
             )
     
-    def get(self, key: str, default: Any = None) -> Any:
+    async def get(self, key: str, default: Any = None) -> Any:
         """
         Get value from cache with multi-level checking.
         First checks L1 memory cache, then L2 Redis cache with fallback.
@@ -351,12 +329,7 @@ class RedisCache:
                 return memory_value
             
             # Check L2 Redis cache with fallback handling
-            def redis_get():
-                if not self.redis_client:
-                    return None
-                return self.redis_client.get(full_key)
-            
-            redis_data = self._execute_redis_operation(redis_get)
+            redis_data = await self._execute_redis_operation(lambda: self.redis_client.get(full_key))
             if redis_data is not None:
                 try:
                     value = self._deserialize_value(redis_data)
@@ -387,8 +360,8 @@ class RedisCache:
             self._update_stats('errors')
             return default
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None, 
-            tags: Optional[Set[str]] = None) -> bool:
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None, 
+                  tags: Optional[Set[str]] = None) -> bool:
         """
         Set value in cache with TTL and tag support.
         Stores in both memory and Redis caches with fallback handling.
@@ -404,22 +377,23 @@ class RedisCache:
             
             # Attempt Redis cache with fallback
             redis_success = False
-            if self._should_retry_redis():
+            if await self._should_retry_redis():
                 try:
                     serialized_value = self._serialize_value(value)
                     
-                    def redis_set():
-                        if not self.redis_client:
-                            return False
-                        return self.redis_client.setex(full_key, ttl, serialized_value)
+                    async def redis_set():
+                        # Value and tag writes go out in the same pipelined round trip
+                        writes = [self.redis_client.setex(full_key, ttl, serialized_value)]
+                        for tag in tags or ():
+                            tag_key = self._make_key(f"tag:{tag}")
+                            writes.append(self.redis_client.sadd(tag_key, key))
+                            writes.append(self.redis_client.expire(tag_key, self.default_ttl * 2))  # Tags live longer
+                        results = await asyncio.gather(*writes)
+                        return results[0]
                     
-                    redis_result = self._execute_redis_operation(redis_set, False)
+                    redis_result = await self._execute_redis_operation(redis_set, False)
                     if redis_result:
                         redis_success = True
-                        
-                        # Store tags for invalidation (only if Redis succeeded)
-                        if tags:
-                            self._store_tags(key, tags)
                 
                 except Exception as e:
                     logger.debug(f"Redis set operation failed for key {key}: {e}")
@@ -443,7 +417,7 @@ class RedisCache:
             self._update_stats('errors')
             return False
     
-    def delete(self, key: str) -> bool:
+    async def delete(self, key: str) -> bool:
         """Delete value from all cache levels."""
         full_key = self._make_key(key)
         start_time = time.time()
@@ -458,19 +432,14 @@ class RedisCache:
             
             # Remove from Redis with fallback handling
             redis_deleted = False
-            if self._should_retry_redis():
-                def redis_delete():
-                    if not self.redis_client:
-                        return 0
-                    return self.redis_client.delete(full_key)
-                
-                result = self._execute_redis_operation(redis_delete, 0)
+            if await self._should_retry_redis():
+                result = await self._execute_redis_operation(lambda: self.redis_client.delete(full_key), 0)
                 redis_deleted = result > 0
                 
                 # Clean up tags (only if Redis is available)
                 if redis_deleted:
                     try:
-                        self._remove_tags(key)
+                        await self._remove_tags(key)
                     except Exception as tag_error:
                         logger.debug(f"Tag cleanup failed for key {key}: {tag_error}")
             
@@ -490,7 +459,7 @@ class RedisCache:
             self._update_stats('errors')
             return False
     
-    def exists(self, key: str) -> bool:
+    async def exists(self, key: str) -> bool:
         """Check if key exists in cache."""
         try:
             # Check memory cache first
@@ -504,14 +473,11 @@ class RedisCache:
                         del self._memory_cache[key]
             
             # Check Redis with fallback
-            if self._should_retry_redis():
-                def redis_exists():
-                    if not self.redis_client:
-                        return False
-                    full_key = self._make_key(key)
-                    return self.redis_client.exists(full_key) > 0
-                
-                return self._execute_redis_operation(redis_exists, False)
+            if await self._should_retry_redis():
+                count = await self._execute_redis_operation(
+                    lambda: self.redis_client.exists(self._make_key(key)), 0
+                )
+                return count > 0
             
             return False
             
@@ -519,7 +485,7 @@ class RedisCache:
             logger.error(f"Cache exists error for key {key}: {e}")
             return False
     
-    def ttl(self, key: str) -> int:
+    async def ttl(self, key: str) -> int:
         """Get TTL for key in seconds."""
         try:
             # Check memory cache first
@@ -530,14 +496,10 @@ class RedisCache:
                         return entry.time_to_live() or -1
             
             # Check Redis with fallback
-            if self._should_retry_redis():
-                def redis_ttl():
-                    if not self.redis_client:
-                        return -1
-                    full_key = self._make_key(key)
-                    return self.redis_client.ttl(full_key)
-                
-                return self._execute_redis_operation(redis_ttl, -1)
+            if await self._should_retry_redis():
+                return await self._execute_redis_operation(
+                    lambda: self.redis_client.ttl(self._make_key(key)), -1
+                )
             
             return -1
             
@@ -545,7 +507,7 @@ class RedisCache:
             logger.error(f"Cache TTL error for key {key}: {e}")
             return -1
     
-    def expire(self, key: str, ttl: int) -> bool:
+    async def expire(self, key: str, ttl: int) -> bool:
         """Set new TTL for existing key."""
         try:
             # Update memory cache TTL
@@ -558,14 +520,10 @@ class RedisCache:
             
             # Update Redis TTL with fallback
             redis_updated = False
-            if self._should_retry_redis():
-                def redis_expire():
-                    if not self.redis_client:
-                        return False
-                    full_key = self._make_key(key)
-                    return self.redis_client.expire(full_key, ttl)
-                
-                redis_updated = self._execute_redis_operation(redis_expire, False)
+            if await self._should_retry_redis():
+                redis_updated = await self._execute_redis_operation(
+                    lambda: self.redis_client.expire(self._make_key(key), ttl), False
+                )
             
             return redis_updated or memory_updated
             
@@ -573,47 +531,36 @@ class RedisCache:
             logger.error(f"Cache expire error for key {key}: {e}")
             return False
     
-    def _store_tags(self, key: str, tags: Set[str]):
-        """Store tags for cache invalidation."""
-        try:
-            for tag in tags:
-                tag_key = self._make_key(f"tag:{tag}")
-                self.redis_client.sadd(tag_key, key)
-                self.redis_client.expire(tag_key, self.default_ttl * 2)  # Tags live longer
-        except Exception as e:
-            logger.error(f"Error storing tags for key {key}: {e}")
-    
-    def _remove_tags(self, key: str):
+    async def _remove_tags(self, key: str):
         """Remove key from all tag sets."""
         try:
             # This is expensive, but needed for cleanup
             # In production, consider using a different approach
-            tag_pattern = self._make_key("tag:*")
-            for tag_key in self.redis_client.scan_iter(match=tag_pattern):
-                self.redis_client.srem(tag_key, key)
+            tag_keys = await self.redis_client.scan_keys(self._make_key("tag:*"))
+            await asyncio.gather(*(self.redis_client.srem(tag_key, key) for tag_key in tag_keys))
         except Exception as e:
             logger.error(f"Error removing tags for key {key}: {e}")
     
-    def invalidate_by_tag(self, tag: str) -> int:
+    async def invalidate_by_tag(self, tag: str) -> int:
         """Invalidate all cache entries with specified tag."""
         try:
             tag_key = self._make_key(f"tag:{tag}")
-            keys_to_delete = list(self.redis_client.smembers(tag_key))
+            keys_to_delete = list(await self.redis_client.smembers(tag_key))
             
             if keys_to_delete:
-                # Delete the actual cache entries
-                full_keys = [self._make_key(key.decode() if isinstance(key, bytes) else key) 
-                           for key in keys_to_delete]
-                deleted = self.redis_client.delete(*full_keys)
+                keys_to_delete = [key.decode() if isinstance(key, bytes) else key for key in keys_to_delete]
+                
+                # Delete the actual cache entries and the tag set
+                full_keys = [self._make_key(key) for key in keys_to_delete]
+                deleted, _ = await asyncio.gather(
+                    self.redis_client.delete(*full_keys),
+                    self.redis_client.delete(tag_key)
+                )
                 
                 # Remove from memory cache
                 with self._memory_cache_lock:
                     for key in keys_to_delete:
-                        key_str = key.decode() if isinstance(key, bytes) else key
-                        self._memory_cache.pop(key_str, None)
-                
-                # Delete the tag set
-                self.redis_client.delete(tag_key)
+                        self._memory_cache.pop(key, None)
                 
                 logger.info(f"Invalidated {deleted} cache entries with tag '{tag}'")
                 return deleted
@@ -624,14 +571,14 @@ class RedisCache:
             logger.error(f"Error invalidating cache by tag {tag}: {e}")
             return 0
     
-    def clear_all(self) -> bool:
+    async def clear_all(self) -> bool:
         """Clear all cache entries with the current prefix."""
         try:
             pattern = f"{self.key_prefix}*"
-            keys = list(self.redis_client.scan_iter(match=pattern))
+            keys = await self.redis_client.scan_keys(pattern)
             
             if keys:
-                deleted = self.redis_client.delete(*keys)
+                deleted = await self.redis_client.delete(*keys)
                 logger.info(f"Cleared {deleted} cache entries")
             
             # Clear memory cache
@@ -644,7 +591,7 @@ class RedisCache:
             logger.error(f"Error clearing cache: {e}")
             return False
     
-    def get_stats(self) -> Dict[str, Any]:
+    async def get_stats(self) -> Dict[str, Any]:
         """Get cache performance statistics."""
         try:
             with self._stats_lock:
@@ -655,7 +602,7 @@ class RedisCache:
             hit_rate = (stats['hits'] / total_operations * 100) if total_operations > 0 else 0
             
             # Redis info
-            redis_info = self.redis_client.info()
+            redis_info = await self.redis_client.info()
             
             # Memory cache info
             with self._memory_cache_lock:
@@ -671,14 +618,15 @@ class RedisCache:
                     'total_commands_processed': redis_info.get('total_commands_processed', 0),
                     'keyspace_hits': redis_info.get('keyspace_hits', 0),
                     'keyspace_misses': redis_info.get('keyspace_misses', 0)
-                }
+                },
+                'client': self.redis_client.get_stats()
             }
             
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
             return {'error': str(e)}
     
-    def health_check(self) -> Dict[str, Any]:
+    async def health_check(self) -> Dict[str, Any]:
         """Perform comprehensive health check."""
         try:
             start_time = time.time()
@@ -688,23 +636,23 @@ class RedisCache:
             test_value = {"timestamp": time.time(), "test": True}
             
             # Test set
-            set_success = self.set(test_key, test_value, ttl=60)
+            set_success = await self.set(test_key, test_value, ttl=60)
             
             # Test get
-            retrieved_value = self.get(test_key)
+            retrieved_value = await self.get(test_key)
             get_success = retrieved_value == test_value
             
             # Test delete
-            delete_success = self.delete(test_key)
+            delete_success = await self.delete(test_key)
             
             # Check Redis connection
-            ping_success = self.redis_client.ping()
+            ping_success = await self.redis_client.ping()
             
             # Calculate response time
             response_time = (time.time() - start_time) * 1000  # ms
             
             # Get memory usage
-            info = self.redis_client.info()
+            info = await self.redis_client.info()
             
             health_status = {
                 'status': 'healthy' if all([set_success, get_success, delete_success, ping_success]) else 'unhealthy',
@@ -732,23 +680,27 @@ class RedisCache:
                 'timestamp': datetime.utcnow().isoformat()
             }
     
-    @contextmanager
-    def pipeline(self):
-        """Context manager for Redis pipeline operations."""
-        pipe = self.redis_client.pipeline()
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True):
+        """
+        Context manager for explicit Redis pipelines (MULTI/EXEC by default).
+        Plain concurrent calls are already pipelined automatically.
+        """
+        pipe = self.redis_client.client().pipeline(transaction=transaction)
         try:
             yield pipe
-            pipe.execute()
+            await pipe.execute()
         except Exception as e:
             logger.error(f"Pipeline error: {e}")
             raise
         finally:
-            pipe.reset()
+            await pipe.reset()
     
-    def close(self):
-        """Close Redis connection."""
+    async def close(self):
+        """Close Redis connection (the shared client is closed at application shutdown)."""
         try:
-            self.connection_pool.disconnect()
+            if self._owns_client and self.redis_client is not None:
+                await self.redis_client.close()
             logger.info("Redis cache connection closed")
         except Exception as e:
             logger.error(f"Error closing Redis connection: {e}")
@@ -763,54 +715,54 @@ class AuthorizationCache(RedisCache):
     def __init__(self, **kwargs):
         super().__init__(key_prefix="auth:", default_ttl=1800, **kwargs)  # 30 minutes
     
-    def cache_user_permissions(self, user_id: str, permissions: List[str], 
-                              ttl: int = 1800) -> bool:
+    async def cache_user_permissions(self, user_id: str, permissions: List[str], 
+                                    ttl: int = 1800) -> bool:
         """Cache user permissions with role-based tags."""
         key = f"user_permissions:{user_id}"
         tags = {"user_permissions", f"user:{user_id}"}
-        return self.set(key, permissions, ttl=ttl, tags=tags)
+        return await self.set(key, permissions, ttl=ttl, tags=tags)
     
-    def get_user_permissions(self, user_id: str) -> Optional[List[str]]:
+    async def get_user_permissions(self, user_id: str) -> Optional[List[str]]:
         """Get cached user permissions."""
         key = f"user_permissions:{user_id}"
-        return self.get(key)
+        return await self.get(key)
     
-    def cache_role_permissions(self, role: str, permissions: List[str], 
-                              ttl: int = 3600) -> bool:
+    async def cache_role_permissions(self, role: str, permissions: List[str], 
+                                    ttl: int = 3600) -> bool:
         """Cache role permissions (longer TTL as roles change less frequently)."""
         key = f"role_permissions:{role}"
         tags = {"role_permissions", f"role:{role}"}
-        return self.set(key, permissions, ttl=ttl, tags=tags)
+        return await self.set(key, permissions, ttl=ttl, tags=tags)
     
-    def get_role_permissions(self, role: str) -> Optional[List[str]]:
+    async def get_role_permissions(self, role: str) -> Optional[List[str]]:
         """Get cached role permissions."""
         key = f"role_permissions:{role}"
-        return self.get(key)
+        return await self.get(key)
     
-    def cache_authorization_result(self, user_id: str, resource: str, 
-                                  action: str, result: bool, ttl: int = 300) -> bool:
+    async def cache_authorization_result(self, user_id: str, resource: str, 
+                                        action: str, result: bool, ttl: int = 300) -> bool:
         """Cache specific authorization result (shorter TTL for security)."""
         key = f"authz_result:{user_id}:{resource}:{action}"
         tags = {"authz_results", f"user:{user_id}", f"resource:{resource}"}
-        return self.set(key, result, ttl=ttl, tags=tags)
+        return await self.set(key, result, ttl=ttl, tags=tags)
     
-    def get_authorization_result(self, user_id: str, resource: str, 
-                               action: str) -> Optional[bool]:
+    async def get_authorization_result(self, user_id: str, resource: str, 
+                                     action: str) -> Optional[bool]:
         """Get cached authorization result."""
         key = f"authz_result:{user_id}:{resource}:{action}"
-        return self.get(key)
+        return await self.get(key)
     
-    def invalidate_user_cache(self, user_id: str) -> int:
+    async def invalidate_user_cache(self, user_id: str) -> int:
         """Invalidate all cache entries for a specific user."""
-        return self.invalidate_by_tag(f"user:{user_id}")
+        return await self.invalidate_by_tag(f"user:{user_id}")
     
-    def invalidate_role_cache(self, role: str) -> int:
+    async def invalidate_role_cache(self, role: str) -> int:
         """Invalidate all cache entries for a specific role."""
-        return self.invalidate_by_tag(f"role:{role}")
+        return await self.invalidate_by_tag(f"role:{role}")
     
-    def invalidate_resource_cache(self, resource: str) -> int:
+    async def invalidate_resource_cache(self, resource: str) -> int:
         """Invalidate all cache entries for a specific resource."""
-        return self.invalidate_by_tag(f"resource:{resource}")
+        return await self.invalidate_by_tag(f"resource:{resource}")
 
 
 class UserSessionCache(RedisCache):
@@ -822,19 +774,19 @@ class UserSessionCache(RedisCache):
     def __init__(self, **kwargs):
         super().__init__(key_prefix="session:", default_ttl=7200, **kwargs)  # 2 hours
     
-    def cache_user_session(self, user_id: str, session_data: Dict[str, Any], 
-                          ttl: int = 7200) -> bool:
+    async def cache_user_session(self, user_id: str, session_data: Dict[str, Any], 
+                                ttl: int = 7200) -> bool:
         """Cache user session data."""
         key = f"user_session:{user_id}"
         tags = {"user_sessions", f"user:{user_id}"}
-        return self.set(key, session_data, ttl=ttl, tags=tags)
+        return await self.set(key, session_data, ttl=ttl, tags=tags)
     
-    def get_user_session(self, user_id: str) -> Optional[Dict[str, Any]]:
+    async def get_user_session(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get cached user session data."""
         key = f"user_session:{user_id}"
-        return self.get(key)
+        return await self.get(key)
     
-    def cache_jwt_token(self, token_hash: str, user_id: str, expires_at: datetime) -> bool:
+    async def cache_jwt_token(self, token_hash: str, user_id: str, expires_at: datetime) -> bool:
         """Cache JWT token with expiration tracking."""
         key = f"jwt_token:{token_hash}"
         ttl = int((expires_at - datetime.utcnow()).total_seconds())
@@ -847,24 +799,24 @@ class UserSessionCache(RedisCache):
             "cached_at": datetime.utcnow().isoformat()
         }
         tags = {"jwt_tokens", f"user:{user_id}"}
-        return self.set(key, token_data, ttl=ttl, tags=tags)
+        return await self.set(key, token_data, ttl=ttl, tags=tags)
     
-    def get_jwt_token_data(self, token_hash: str) -> Optional[Dict[str, Any]]:
+    async def get_jwt_token_data(self, token_hash: str) -> Optional[Dict[str, Any]]:
         """Get cached JWT token data."""
         key = f"jwt_token:{token_hash}"
-        return self.get(key)
+        return await self.get(key)
     
-    def invalidate_jwt_token(self, token_hash: str) -> bool:
+    async def invalidate_jwt_token(self, token_hash: str) -> bool:
         """Invalidate specific JWT token."""
         key = f"jwt_token:{token_hash}"
-        return self.delete(key)
+        return await self.delete(key)
     
-    def invalidate_user_sessions(self, user_id: str) -> int:
+    async def invalidate_user_sessions(self, user_id: str) -> int:
         """Invalidate all sessions for a specific user."""
-        return self.invalidate_by_tag(f"user:{user_id}")
+        return await self.invalidate_by_tag(f"user:{user_id}")
     
-    def track_user_activity(self, user_id: str, activity: str, 
-                           metadata: Dict[str, Any] = None) -> bool:
+    async def track_user_activity(self, user_id: str, activity: str, 
+                                 metadata: Dict[str, Any] = None) -> bool:
         """Track user activity for session management."""
         key = f"user_activity:{user_id}"
         activity_data = {
@@ -872,12 +824,12 @@ class UserSessionCache(RedisCache):
             "timestamp": datetime.utcnow().isoformat(),
             "metadata": metadata or {}
         }
-        return self.set(key, activity_data, ttl=3600)  # 1 hour
+        return await self.set(key, activity_data, ttl=3600)  # 1 hour
     
-    def get_user_activity(self, user_id: str) -> Optional[Dict[str, Any]]:
+    async def get_user_activity(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get last user activity."""
         key = f"user_activity:{user_id}"
-        return self.get(key)
+        return await self.get(key)
 
 
 class PermissionCache(RedisCache):
@@ -889,44 +841,44 @@ class PermissionCache(RedisCache):
     def __init__(self, **kwargs):
         super().__init__(key_prefix="perm:", default_ttl=3600, **kwargs)  # 1 hour
     
-    def cache_permission_matrix(self, user_id: str, resource_permissions: Dict[str, List[str]], 
-                               ttl: int = 3600) -> bool:
+    async def cache_permission_matrix(self, user_id: str, resource_permissions: Dict[str, List[str]], 
+                                     ttl: int = 3600) -> bool:
         """Cache complete permission matrix for user."""
         key = f"permission_matrix:{user_id}"
         tags = {"permission_matrices", f"user:{user_id}"}
-        return self.set(key, resource_permissions, ttl=ttl, tags=tags)
+        return await self.set(key, resource_permissions, ttl=ttl, tags=tags)
     
-    def get_permission_matrix(self, user_id: str) -> Optional[Dict[str, List[str]]]:
+    async def get_permission_matrix(self, user_id: str) -> Optional[Dict[str, List[str]]]:
         """Get cached permission matrix."""
         key = f"permission_matrix:{user_id}"
-        return self.get(key)
+        return await self.get(key)
     
-    def cache_resource_access_list(self, resource: str, user_actions: Dict[str, List[str]], 
-                                  ttl: int = 1800) -> bool:
+    async def cache_resource_access_list(self, resource: str, user_actions: Dict[str, List[str]], 
+                                        ttl: int = 1800) -> bool:
         """Cache resource access control list."""
         key = f"resource_acl:{resource}"
         tags = {"resource_acls", f"resource:{resource}"}
-        return self.set(key, user_actions, ttl=ttl, tags=tags)
+        return await self.set(key, user_actions, ttl=ttl, tags=tags)
     
-    def get_resource_access_list(self, resource: str) -> Optional[Dict[str, List[str]]]:
+    async def get_resource_access_list(self, resource: str) -> Optional[Dict[str, List[str]]]:
         """Get cached resource ACL."""
         key = f"resource_acl:{resource}"
-        return self.get(key)
+        return await self.get(key)
     
-    def cache_frequently_checked_permissions(self, permission_results: Dict[str, bool], 
-                                           ttl: int = 300) -> bool:
+    async def cache_frequently_checked_permissions(self, permission_results: Dict[str, bool], 
+                                                 ttl: int = 300) -> bool:
         """Cache frequently checked permission results for fast lookup."""
         key = "frequent_permissions"
-        return self.set(key, permission_results, ttl=ttl)
+        return await self.set(key, permission_results, ttl=ttl)
     
-    def get_frequently_checked_permissions(self) -> Optional[Dict[str, bool]]:
+    async def get_frequently_checked_permissions(self) -> Optional[Dict[str, bool]]:
         """Get cached frequent permissions."""
         key = "frequent_permissions"
-        return self.get(key)
+        return await self.get(key)
     
-    def invalidate_resource_permissions(self, resource: str) -> int:
+    async def invalidate_resource_permissions(self, resource: str) -> int:
         """Invalidate all permission caches for a resource."""
-        return self.invalidate_by_tag(f"resource:{resource}")
+        return await self.invalidate_by_tag(f"resource:{resource}")
 
 
 # Global cache instances - lazy initialization to avoid import-time Redis connection
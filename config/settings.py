@@ -83,7 +83,29 @@ class Settings:
         # Performance
         self.REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
         self.CONNECTION_POOL_SIZE = int(os.getenv("CONNECTION_POOL_SIZE", "20"))
-        
+
+        # Signed media URLs: set the storage JWT secret to sign locally instead
+        # of calling the Storage API
+        self.STORAGE_SIGNING_SECRET = os.getenv("STORAGE_SIGNING_SECRET", "")
+        self.SIGNED_URL_CACHE_SIZE = int(os.getenv("SIGNED_URL_CACHE_SIZE", "20000"))
+
+        # Thumbnail render processes (utils/thumbnail_engine.py); 0 renders on a background thread
+        self.THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+        # Generation job queue (consumed by services/generation_worker.py)
+        self.GENERATION_QUEUE_ENABLED = self._parse_bool(os.getenv("GENERATION_QUEUE_ENABLED", "true"))
+        self.GENERATION_WORKER_CONCURRENCY = int(os.getenv("GENERATION_WORKER_CONCURRENCY", "8"))
+        self.GENERATION_JOB_LEASE_SECONDS = int(os.getenv("GENERATION_JOB_LEASE_SECONDS", "60"))
+        self.GENERATION_JOB_MAX_ATTEMPTS = int(os.getenv("GENERATION_JOB_MAX_ATTEMPTS", "3"))
+        self.GENERATION_JOB_RETRY_DELAY_SECONDS = int(os.getenv("GENERATION_JOB_RETRY_DELAY_SECONDS", "5"))
+        self.GENERATION_WORKER_POLL_SECONDS = float(os.getenv("GENERATION_WORKER_POLL_SECONDS", "1.0"))
+
+        # Write-behind authorization audit pipeline (services/audit_logger.py)
+        self.AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "10000"))
+        self.AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+        self.AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+        self.AUDIT_LOW_SEVERITY_SAMPLE_RATE = float(os.getenv("AUDIT_LOW_SEVERITY_SAMPLE_RATE", "0.1"))
+
         # Rate limiting defaults
         self.RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "100/minute")
         self.RATE_LIMIT_AUTH = os.getenv("RATE_LIMIT_AUTH", "30/minute")
@@ -6,9 +6,12 @@ Enhanced with singleton pattern, thread safety, and performance optimizations.
 """
 from supabase import create_client, Client
 from database_pool_manager import get_connection_pool
-from typing import Optional, Dict, Any, List, Tuple
+from utils.async_postgrest import async_postgrest
+from utils.request_timing import span
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from config import settings
 import asyncio
+import contextvars
 import httpx
 import logging
 import os
@@ -891,7 +894,83 @@ class SupabaseClient:
         auth_token: Optional[str] = None
     ) -> Any:
         """Internal method for single query execution used by parallel processing."""
-        return self.execute_query(table, operation, data, filters, user_id, use_service_key, False, None, None, None, auth_token)
+        return await self._run_query(table, operation, data, filters, user_id, use_service_key, False, None, None, None, auth_token)
+    
+    async def _run_query(
+        self,
+        table: str,
+        operation: str,
+        data: Optional[Dict[str, Any]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None,
+        use_service_key: bool = False,
+        single: bool = False,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        auth_token: Optional[str] = None
+    ) -> Any:
+        """
+        Run a query without blocking the event loop.
+        Uses the native async PostgREST engine when enabled, otherwise the
+        synchronous client on the thread pool. Client selection mirrors
+        execute_query: service key only when validated, else anon + JWT.
+        """
+        if not async_postgrest.enabled:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._thread_pool, contextvars.copy_context().run,
+                lambda: self.execute_query(table, operation, data, filters, user_id, use_service_key,
+                                           single, order_by, limit, offset, auth_token)
+            )
+        
+        if self._is_available is False:
+            raise ConnectionError("Supabase database is not available. Check API keys and connection.")
+        
+        if use_service_key and self._service_key_valid is not True:
+            if not auth_token:
+                raise ValueError("Service key invalid and no JWT token provided")
+            logger.warning(f"🔧 [DATABASE] FALLBACK: Using ANON client with JWT for {operation} on {table}")
+            use_service_key = False
+        
+        # Custom token formats are not JWTs PostgREST can verify
+        if auth_token and (auth_token.startswith("supabase_token_") or auth_token.startswith("mock_token_")):
+            auth_token = None
+        
+        with self._cache_lock:
+            self._total_queries += 1
+        
+        query_type = "auth" if table in ["users", "user_profiles"] and operation == "select" else "general"
+        start_time = time.time()
+        try:
+            result = await async_postgrest.execute(
+                table, operation, data=data, filters=filters,
+                use_service_key=use_service_key, single=single,
+                order_by=order_by, limit=limit, offset=offset,
+                auth_token=None if use_service_key else auth_token
+            )
+        except Exception as e:
+            record_query(
+                query_type=query_type,
+                execution_time_ms=(time.time() - start_time) * 1000,
+                success=False,
+                context={"table": table, "operation": operation, "native_async": True, "error": str(e)}
+            )
+            raise
+        
+        record_query(
+            query_type=query_type,
+            execution_time_ms=(time.time() - start_time) * 1000,
+            success=True,
+            context={
+                "table": table,
+                "operation": operation,
+                "native_async": True,
+                "use_service_key": use_service_key,
+                "has_filters": bool(filters),
+                "single": single
+            }
+        )
+        return result
     
     async def execute_query_async(
         self, 
@@ -909,19 +988,14 @@ class SupabaseClient:
         timeout: float = 5.0
     ) -> Any:
         """
-        ASYNC wrapper for execute_query with timeout and performance optimization.
+        Async execute_query with timeout and performance optimization.
+        Runs on the native async PostgREST engine (thread pool when disabled).
         Target: <1000ms execution time for standard queries.
         """
-        import asyncio
-        
-        def sync_query():
-            return self.execute_query(table, operation, data, filters, user_id, use_service_key, 
-                                    single, order_by, limit, offset, auth_token)
-        
         try:
-            # Execute synchronous operation in thread pool with timeout
             result = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(self._thread_pool, sync_query),
+                self._run_query(table, operation, data, filters, user_id, use_service_key,
+                                single, order_by, limit, offset, auth_token),
                 timeout=timeout
             )
             return result
@@ -936,6 +1010,113 @@ class SupabaseClient:
             logger.error(f"❌ [DATABASE] Async query failed: {e}")
             raise
 
+    async def execute_page_async(
+        self,
+        table: str,
+        filters: Optional[Dict[str, Any]] = None,
+        order: Sequence[str] = (),
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        logic_filter: Optional[str] = None,
+        count: Optional[str] = None,
+        use_service_key: bool = False,
+        auth_token: Optional[str] = None,
+        timeout: float = 5.0
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Select one page with ordering, limit and optional or=(...) filter
+        pushed down to PostgREST.
+
+        Args:
+            order: PostgREST order terms, e.g. ["created_at.desc", "id.desc"]
+            logic_filter: PostgREST or=(...) tree, e.g. a keyset predicate
+            count: "exact", "planned" or "estimated" to also return a total
+
+        Returns:
+            Tuple of (rows, total); total is None unless count was requested
+        """
+        if self._is_available is False:
+            raise ConnectionError("Supabase database is not available. Check API keys and connection.")
+
+        if use_service_key and self._service_key_valid is not True:
+            if not auth_token:
+                raise ValueError("Service key invalid and no JWT token provided")
+            logger.warning(f"🔧 [DATABASE] FALLBACK: Using ANON client with JWT for page select on {table}")
+            use_service_key = False
+
+        # Custom token formats are not JWTs PostgREST can verify
+        if auth_token and (auth_token.startswith("supabase_token_") or auth_token.startswith("mock_token_")):
+            auth_token = None
+
+        with self._cache_lock:
+            self._total_queries += 1
+
+        start_time = time.time()
+        try:
+            if async_postgrest.enabled:
+                page = async_postgrest.select_page(
+                    table, filters=filters, order=order, limit=limit, offset=offset,
+                    logic_filter=logic_filter, count=count, use_service_key=use_service_key,
+                    auth_token=None if use_service_key else auth_token
+                )
+            else:
+                page = asyncio.get_running_loop().run_in_executor(
+                    self._thread_pool, contextvars.copy_context().run,
+                    lambda: self._execute_page_sync(table, filters, order, limit, offset, logic_filter,
+                                                    count, use_service_key, auth_token)
+                )
+            rows, total = await asyncio.wait_for(page, timeout=timeout)
+        except asyncio.TimeoutError:
+            record_query(query_type="general", execution_time_ms=(time.time() - start_time) * 1000, success=False,
+                         context={"table": table, "operation": "select_page", "error": "timeout"})
+            logger.error(f"❌ [DATABASE] Page query timeout after {timeout}s on {table}")
+            raise DatabaseTimeoutError(operation=f"select page on {table}", timeout_seconds=timeout)
+        except Exception as e:
+            record_query(query_type="general", execution_time_ms=(time.time() - start_time) * 1000, success=False,
+                         context={"table": table, "operation": "select_page", "error": str(e)})
+            raise
+
+        record_query(query_type="general", execution_time_ms=(time.time() - start_time) * 1000, success=True,
+                     context={"table": table, "operation": "select_page", "limit": limit, "count": count})
+        return rows, total
+
+    def _execute_page_sync(
+        self,
+        table: str,
+        filters: Optional[Dict[str, Any]],
+        order: Sequence[str],
+        limit: Optional[int],
+        offset: Optional[int],
+        logic_filter: Optional[str],
+        count: Optional[str],
+        use_service_key: bool,
+        auth_token: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """execute_page_async on the synchronous client (native engine disabled)."""
+        client = self.service_client if use_service_key else self.client
+        query = client.table(table).select("*", count=count)
+        if auth_token and not use_service_key:
+            # Per-request header; the shared client session stays untouched
+            query.headers["Authorization"] = f"Bearer {auth_token}"
+
+        for key, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                query = query.in_(key, list(value))
+            else:
+                query = query.eq(key, value)
+        if logic_filter:
+            query.params = query.params.add("or", logic_filter)
+        if order:
+            query.params = query.params.add("order", ",".join(order))
+        if offset:
+            query = query.range(offset, offset + (limit or 101) - 1)
+        elif limit:
+            query = query.limit(limit)
+
+        with span("db"):
+            result = query.execute()
+        return result.data or [], result.count if count else None
+
     # =========================================================================
     # CRITICAL ASYNC DATABASE OPERATIONS WRAPPER
     # =========================================================================
@@ -968,52 +1149,22 @@ class SupabaseClient:
             with self._cache_lock:
                 self._async_operation_stats["total_async_operations"] += 1
             
-            def sync_auth_operation():
-                try:
-                    # Use service client for optimal performance
-                    if self._service_key_valid:
-                        # Direct user lookup via service client (bypasses RLS)
-                        filters = {"id": user_id}
-                        if additional_filters:
-                            filters.update(additional_filters)
-                            
-                        result = self.execute_query(
-                            table="users",
-                            operation="select",
-                            filters=filters,
-                            use_service_key=True,
-                            single=True
-                        )
-                        return result
-                    else:
-                        # Fallback to anon client with JWT
-                        if not auth_token:
-                            raise ValueError("Service key invalid and no auth_token provided for auth operation")
-                        
-                        filters = {"id": user_id}
-                        if additional_filters:
-                            filters.update(additional_filters)
-                            
-                        result = self.execute_query(
-                            table="users",
-                            operation="select",
-                            filters=filters,
-                            use_service_key=False,
-                            single=True,
-                            auth_token=auth_token,
-                            user_id=user_id
-                        )
-                        return result
-                        
-                except Exception as e:
-                    logger.error(f"❌ [DATABASE] Sync auth operation failed: {e}")
-                    raise
+            filters = {"id": user_id}
+            if additional_filters:
+                filters.update(additional_filters)
+            
+            if self._service_key_valid:
+                # Direct user lookup via service key (bypasses RLS)
+                query = self._run_query("users", "select", filters=filters, use_service_key=True, single=True)
+            else:
+                # Fallback to anon key with JWT
+                if not auth_token:
+                    raise ValueError("Service key invalid and no auth_token provided for auth operation")
+                query = self._run_query("users", "select", filters=filters, user_id=user_id,
+                                        single=True, auth_token=auth_token)
             
             # Execute with timeout protection
-            result = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(self._thread_pool, sync_auth_operation),
-                timeout=timeout
-            )
+            result = await asyncio.wait_for(query, timeout=timeout)
             
             # Performance tracking
             execution_time_ms = (time.time() - start_time) * 1000
@@ -1302,8 +1453,9 @@ class SupabaseClient:
             with self._cache_lock:
                 self._async_operation_stats["total_async_operations"] += 1
             
-            def sync_table_operation():
-                return self.execute_query(
+            # Execute with timeout protection
+            result = await asyncio.wait_for(
+                self._run_query(
                     table=table,
                     operation=operation,
                     data=data,
@@ -1315,11 +1467,7 @@ class SupabaseClient:
                     limit=limit,
                     offset=offset,
                     auth_token=auth_token
-                )
-            
-            # Execute with timeout protection
-            result = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(self._thread_pool, sync_table_operation),
+                ),
                 timeout=timeout
             )
             
@@ -1612,7 +1760,7 @@ class SupabaseClient:
             table: Table name
             operation: 'select', 'insert', 'update', 'delete'
             data: Data for insert/update operations
-            filters: Filters for select/update/delete operations
+            filters: Filters for select/update/delete operations (list values on select become IN filters)
             user_id: User ID for RLS context
             use_service_key: Whether to use service key (bypasses RLS)
             single: Return single record instead of list
@@ -1729,7 +1877,11 @@ class SupabaseClient:
                 
                 if filters:
                     for key, value in filters.items():
-                        query = query.eq(key, value)
+                        # List values become a single id=in.(...) filter
+                        if isinstance(value, (list, tuple, set)):
+                            query = query.in_(key, list(value))
+                        else:
+                            query = query.eq(key, value)
                 
                 # Apply ordering
                 if order_by:
@@ -1749,7 +1901,8 @@ class SupabaseClient:
                     query = query.range(offset, offset + limit - 1 if limit else offset + 100)
                 
                 logger.info(f"🔍 [DATABASE] Executing SELECT query on {table}")
-                result = query.execute()
+                with span("db"):
+                    result = query.execute()
                 logger.info(f"🔍 [DATABASE] SELECT result for {table}: {len(result.data) if result.data else 0} rows")
                 
                 if single and result.data:
@@ -1764,7 +1917,8 @@ class SupabaseClient:
                     raise ValueError("Data required for insert operation")
                     
                 logger.info(f"🔍 [DATABASE] Executing INSERT query on {table} with data keys: {list(data.keys()) if data else []}")
-                result = query.insert(data).execute()
+                with span("db"):
+                    result = query.insert(data).execute()
                 logger.info(f"🔍 [DATABASE] INSERT result for {table}: {len(result.data) if result.data else 0} rows created")
                 
                 if single:
@@ -1784,7 +1938,8 @@ class SupabaseClient:
                     for key, value in filters.items():
                         query = query.eq(key, value)
                         
-                result = query.execute()
+                with span("db"):
+                    result = query.execute()
                 logger.info(f"🔍 [DATABASE] UPDATE result for {table}: {len(result.data) if result.data else 0} rows updated")
                 
                 if single:
@@ -1799,7 +1954,8 @@ class SupabaseClient:
                 if filters:
                     for key, value in filters.items():
                         query = query.eq(key, value)
-                result = query.execute()
+                with span("db"):
+                    result = query.execute()
                 
                 # Record successful query performance
                 execution_time_ms = (time.time() - start_time) * 1000
@@ -1846,13 +2002,52 @@ class SupabaseClient:
     ) -> Any:
         """Execute Supabase RPC function."""
         try:
-            client = self.client
-            result = client.rpc(function_name, params or {}).execute()
+            client = self.service_client if use_service_key else self.client
+            with span("db"):
+                result = client.rpc(function_name, params or {}).execute()
             return result.data
         except Exception as e:
             logger.error(f"RPC function {function_name} failed: {e}")
             raise
-    
+
+    async def execute_rpc_async(
+        self,
+        function_name: str,
+        params: Optional[Dict[str, Any]] = None,
+        use_service_key: bool = False,
+        timeout: float = 5.0
+    ) -> Any:
+        """
+        Execute Supabase RPC function without blocking the event loop.
+        Uses the native async PostgREST engine when enabled, otherwise the
+        synchronous client on the thread pool.
+        """
+        if use_service_key and self._service_key_valid is False:
+            raise ValueError(f"Service key invalid; cannot call RPC {function_name}")
+
+        start_time = time.time()
+        try:
+            if async_postgrest.enabled:
+                call = async_postgrest.rpc(function_name, params, use_service_key=use_service_key)
+            else:
+                call = asyncio.get_running_loop().run_in_executor(
+                    self._thread_pool, contextvars.copy_context().run,
+                    lambda: self.execute_rpc(function_name, params, use_service_key)
+                )
+            result = await asyncio.wait_for(call, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ [DATABASE] RPC {function_name} timeout after {timeout}s")
+            raise DatabaseTimeoutError(operation=f"rpc {function_name}", timeout_seconds=timeout)
+        except Exception as e:
+            logger.error(f"RPC function {function_name} failed: {e}")
+            record_query(query_type="general", execution_time_ms=(time.time() - start_time) * 1000, success=False,
+                         context={"rpc": function_name, "error": str(e)})
+            raise
+
+        record_query(query_type="general", execution_time_ms=(time.time() - start_time) * 1000, success=True,
+                     context={"rpc": function_name})
+        return result
+
     async def execute_materialized_view_query(
         self,
         view_name: str,
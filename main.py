@@ -12,7 +12,6 @@ from typing import Dict, Any
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.gzip import GZipMiddleware
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -109,6 +108,81 @@ async def lifespan(app: FastAPI):
         logger.info("✅ [SHUTDOWN] Auth service cleaned up")
     except Exception as e:
         logger.warning(f"⚠️ [SHUTDOWN] Auth cleanup error: {e}")
+    
+    # Stop FAL completion tracking
+    try:
+        from services.fal_completion_service import fal_completion_service
+        await fal_completion_service.shutdown()
+        logger.info("✅ [SHUTDOWN] FAL completion tracker stopped")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] FAL completion tracker cleanup error: {e}")
+    
+    # Close pooled FAL queue connections
+    try:
+        from services.fal_queue_client import fal_queue_client
+        await fal_queue_client.close()
+        logger.info("✅ [SHUTDOWN] FAL queue client closed")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] FAL queue client cleanup error: {e}")
+    
+    # Release coalesced generation waiters
+    try:
+        from services.generation_coalescer import generation_coalescer
+        await generation_coalescer.close()
+        logger.info("✅ [SHUTDOWN] Generation coalescer closed")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] Generation coalescer cleanup error: {e}")
+    
+    # Stop JWKS refresh and profile invalidation listener
+    try:
+        from utils import principal_cache
+        await principal_cache.shutdown()
+        logger.info("✅ [SHUTDOWN] Principal cache stopped")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] Principal cache cleanup error: {e}")
+
+    # Let in-flight thumbnail renders finish their uploads
+    try:
+        from services.storage_service import storage_service
+        await storage_service.drain_thumbnail_tasks()
+        logger.info("✅ [SHUTDOWN] Thumbnail tasks drained")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] Thumbnail task drain error: {e}")
+
+    # Close pooled PostgREST/Storage connections
+    try:
+        from utils.async_postgrest import async_postgrest
+        await async_postgrest.close()
+        logger.info("✅ [SHUTDOWN] Async PostgREST client closed")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] Async PostgREST cleanup error: {e}")
+
+    # Close the shared auto-pipelining Redis client
+    try:
+        from utils.async_redis import async_redis
+        await async_redis.close()
+        logger.info("✅ [SHUTDOWN] Async Redis client closed")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] Async Redis cleanup error: {e}")
+
+    # Stop thumbnail render workers
+    try:
+        from utils.thumbnail_engine import thumbnail_engine
+        thumbnail_engine.shutdown()
+        logger.info("✅ [SHUTDOWN] Thumbnail render pool stopped")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] Thumbnail render pool cleanup error: {e}")
+
+    # Flush buffered authorization audit entries
+    try:
+        from services import comprehensive_authorization_integration
+        integration = comprehensive_authorization_integration._comprehensive_auth
+        if integration is not None:
+            await integration.comprehensive_orchestrator.drain_audit_logs()
+            await integration.audit_logger.shutdown()
+            logger.info("✅ [SHUTDOWN] Audit pipeline flushed")
+    except Exception as e:
+        logger.warning(f"⚠️ [SHUTDOWN] Audit pipeline flush error: {e}")
 
 
 # =============================================================================
@@ -167,11 +241,20 @@ async def health_config():
 
 if not BYPASS_ALL_MIDDLEWARE:
     logger.info("🔧 [MIDDLEWARE] Loading middleware stack...")
-    
+
+    # 0. Per-request DataLoader scope (innermost, wraps route handlers)
+    try:
+        from middleware.dataloader_scope import DataLoaderScopeMiddleware
+        app.add_middleware(DataLoaderScopeMiddleware)
+        logger.info("✅ [MW] DataLoader scope added")
+    except Exception as e:
+        logger.error(f"❌ [MW] DataLoader scope failed: {e}")
+
     # 1. GZip compression (innermost, optional)
     if not DISABLE_HEAVY_MIDDLEWARE:
         try:
-            app.add_middleware(GZipMiddleware, minimum_size=1000)
+            from middleware.streaming_gzip import StreamingSafeGZipMiddleware
+            app.add_middleware(StreamingSafeGZipMiddleware, minimum_size=1000)
             logger.info("✅ [MW] GZip compression added")
         except Exception as e:
             logger.error(f"❌ [MW] GZip failed: {e}")
@@ -198,6 +281,9 @@ if not BYPASS_ALL_MIDDLEWARE:
                 
                 # Public model endpoints
                 "/api/v1/generations/models/supported",
+                
+                # FAL completion webhooks (token-authenticated by the handler)
+                "/api/v1/generations/async/webhooks",
                 "/api/v1/models",  # Models router base path
                 
                 # Debug endpoints (if enabled)
@@ -250,16 +336,26 @@ if not BYPASS_ALL_MIDDLEWARE:
     except Exception as e:
         logger.warning(f"⚠️ [MW] Request tracking not available: {e}")
         # Fallback: minimal request ID middleware
-        from starlette.middleware.base import BaseHTTPMiddleware
+        from starlette.datastructures import Headers, MutableHeaders
         import uuid
         
-        class MinimalRequestIDMiddleware(BaseHTTPMiddleware):
-            async def dispatch(self, request: Request, call_next):
-                request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
-                request.state.request_id = request_id
-                response = await call_next(request)
-                response.headers["X-Request-ID"] = request_id
-                return response
+        class MinimalRequestIDMiddleware:
+            def __init__(self, app):
+                self.app = app
+            
+            async def __call__(self, scope, receive, send):
+                if scope["type"] != "http":
+                    await self.app(scope, receive, send)
+                    return
+                request_id = Headers(scope=scope).get("X-Request-ID") or str(uuid.uuid4())
+                scope.setdefault("state", {})["request_id"] = request_id
+                
+                async def send_with_request_id(message):
+                    if message["type"] == "http.response.start":
+                        MutableHeaders(scope=message)["X-Request-ID"] = request_id
+                    await send(message)
+                
+                await self.app(scope, receive, send_with_request_id)
         
         app.add_middleware(MinimalRequestIDMiddleware)
         logger.info("✅ [MW] Minimal request ID added")
@@ -299,6 +395,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],  # Keyset pagination headers
     max_age=86400
 )
 logger.info(f"✅ [MW] CORS added with {len(CORS_ORIGINS)} origins")
@@ -3,7 +3,6 @@ Authentication middleware for JWT token verification with Supabase.
 Following CLAUDE.md: JWT verification, proper error handling.
 """
 import logging
-import hashlib
 from typing import Optional, Dict, Any, Callable, List
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status, Request, Response, Depends
@@ -17,14 +16,11 @@ from config import settings
 from database import db
 from models.user import UserResponse
 from utils.security import JWTSecurity, SecurityError
-from utils.cache_manager import get_cache_manager, CacheLevel
 from services.auth_service_async import get_async_auth_service, AsyncAuthService
+from utils.principal_cache import jwt_verifier, profile_cache, session_principal_cache, token_revocations
 
 logger = logging.getLogger(__name__)
 
-# Initialize cache manager
-cache_manager = get_cache_manager()
-
 # Security scheme for dependency injection  
 security = HTTPBearer(auto_error=False)
 
@@ -111,15 +107,13 @@ class AuthMiddleware(BaseHTTPMiddleware):
         return await call_next(request)
     
     async def _verify_token(self, token: str) -> UserResponse:
-        """Verify JWT token with Supabase and return user - Railway optimized with caching."""
+        """
+        Verify JWT token and return user - Railway optimized with caching.
+        
+        Verified principals are cached until the token's exp and profiles until
+        they change, so the common authenticated path does no network I/O.
+        """
         try:
-            # Check cache first for token validation (short TTL for security)
-            cache_key = f"auth_token:{hashlib.md5(token.encode()).hexdigest()}"
-            cached_user = await cache_manager.get(cache_key, CacheLevel.L1_MEMORY)
-            if cached_user is not None:
-                logger.debug("🚀 [AUTH-MIDDLEWARE] Cache hit for token validation")
-                return cached_user
-            
             # SECURITY: Mock tokens completely disabled - security vulnerability removed
             if token.startswith("mock_token_"):
                 logger.error(f"🚨 [SECURITY-VIOLATION] Mock token rejected - authentication bypass disabled")
@@ -136,176 +130,21 @@ class AuthMiddleware(BaseHTTPMiddleware):
                     detail="Authentication failed - invalid token format"
                 )
             
-            # === SECURITY ENHANCED - Supabase JWT Token Verification ===
-            # Check if we should use Supabase auth
-            use_supabase = os.getenv("USE_SUPABASE_AUTH", "false").lower() == "true"
-            
-            if use_supabase:
-                # Use Supabase JWT verification
-                try:
-                    from services.supabase_auth import get_supabase_auth
-                    auth_service = get_supabase_auth()
-                    payload = auth_service.verify_jwt(token)
-                    user_id = payload.get("sub")
-                    email = payload.get("email")
-                except Exception as e:
-                    logger.debug(f"Supabase JWT verification failed: {e}")
-                    # Fall through to try standard JWT
-                    payload = None
-                    user_id = None
-                    email = None
-            else:
-                # Use standard JWT verification for backward compatibility
-                try:
-                    payload = JWTSecurity.verify_token(token, "access_token")
-                    user_id = payload.get("sub")
-                    email = payload.get("email")
-                except Exception:
-                    payload = None
-                    user_id = None
-                    email = None
-            
-            if user_id and email:
-                logger.info(f"✅ [AUTH-MIDDLEWARE] JWT token verification successful for user {user_id}")
-                
-                # Get enhanced profile from database - ASYNC OPTIMIZED
-                try:
-                    from database import SupabaseClient
-                    db_client = SupabaseClient()
-                    
-                    if db_client.is_available():
-                        # PERFORMANCE FIX: Use async database operations with timeout
-                        profile_result = await db_client.execute_query_async(
-                            table='users',
-                            operation='select',
-                            filters={'id': str(user_id)},
-                            use_service_key=True,
-                            single=True,
-                            timeout=2.0  # 2 second timeout for profile lookup
-                        )
-                        
-                        if profile_result:
-                            profile = profile_result
-                            
-                            from utils.uuid_utils import UUIDUtils
-                            safe_user_id = UUIDUtils.validate_and_convert(user_id, "JWT_profile_lookup")
-                            return UserResponse(
-                                id=safe_user_id,
-                                email=email,
-                                display_name=profile.get('display_name', ''),
-                                avatar_url=profile.get('avatar_url'),
-                                credits_balance=profile.get('credits_balance', 100),
-                                role=profile.get('role', 'viewer'),
-                                created_at=datetime.now(timezone.utc)
-                            )
-                except Exception as db_error:
-                    logger.warning(f"⚠️ [AUTH-MIDDLEWARE] Database profile fetch failed, using JWT data: {db_error}")
-                
-                # Fallback to JWT data
-                from utils.uuid_utils import UUIDUtils
-                safe_user_id = UUIDUtils.validate_and_convert(user_id, "JWT_fallback")
-                return UserResponse(
-                    id=safe_user_id,
-                    email=email,
-                    display_name=payload.get('display_name', '') if payload else '',
-                    avatar_url=payload.get('avatar_url') if payload else None,
-                    credits_balance=payload.get('credits_balance', settings.default_user_credits or 100) if payload else 100,
-                    role=payload.get('role', 'viewer') if payload else 'viewer',
-                    created_at=datetime.now(timezone.utc)
+            if token_revocations.is_revoked(token):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token has been revoked"
                 )
             
-            # === Fallback: Use AsyncAuthService for token verification ===
-            logger.info(f"🔍 [AUTH-MIDDLEWARE] Using AsyncAuthService for token verification")
+            principal = session_principal_cache.get(token)
+            if principal is not None:
+                logger.debug("🚀 [AUTH-MIDDLEWARE] Cache hit for token validation")
+            else:
+                principal = await self._verify_principal(token)
             
-            try:
-                # Get async auth service
-                auth_service = await get_async_auth_service()
-                
-                # Verify token via HTTP API
-                token_data = await auth_service.verify_token_http(token)
-                
-                if not token_data:
-                    logger.error(f"❌ [AUTH-MIDDLEWARE] AsyncAuthService token verification failed")
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid or expired token"
-                    )
-                
-                user_id = token_data.get("user_id")
-                email = token_data.get("email")
-                
-                if not user_id or not email:
-                    logger.error(f"❌ [AUTH-MIDDLEWARE] Invalid token data - missing user ID or email")
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid token payload"
-                    )
-                
-                logger.info(f"✅ [AUTH-MIDDLEWARE] AsyncAuthService token verification successful for user {user_id}")
-                
-                # Try to get enhanced profile from database via AsyncAuthService
-                try:
-                    profile = await auth_service.get_user_profile(user_id, timeout=2.0)
-                    
-                    if profile:
-                        logger.info(f"✅ [AUTH-MIDDLEWARE] Enhanced profile found for user {user_id}")
-                        
-                        from utils.uuid_utils import UUIDUtils
-                        safe_user_id = UUIDUtils.safe_uuid_convert(user_id) if isinstance(user_id, str) else user_id
-                        
-                        # Parse created_at timestamp
-                        created_at = datetime.now(timezone.utc)
-                        if profile.get('created_at'):
-                            try:
-                                created_at_str = profile['created_at']
-                                if created_at_str.endswith('Z'):
-                                    created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-                                else:
-                                    created_at = datetime.fromisoformat(created_at_str)
-                            except ValueError as date_error:
-                                logger.warning(f"⚠️ [AUTH-MIDDLEWARE] Date parsing failed: {date_error}, using current time")
-                        
-                        user_response = UserResponse(
-                            id=safe_user_id,
-                            email=email,
-                            display_name=profile.get('display_name', ''),
-                            avatar_url=profile.get('avatar_url'),
-                            credits_balance=profile.get('credits_balance', 100),
-                            role=profile.get('role', 'viewer'),
-                            created_at=created_at
-                        )
-                        return await self._cache_user_response(token, user_response)
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ [AUTH-MIDDLEWARE] Profile fetch via AsyncAuthService failed: {e}")
-                
-                # Fallback to basic user data from token
-                logger.info(f"✅ [AUTH-MIDDLEWARE] Using basic token data for user {user_id}")
-                from utils.uuid_utils import UUIDUtils
-                safe_user_id = UUIDUtils.safe_uuid_convert(user_id) if isinstance(user_id, str) else user_id
-                user_response = UserResponse(
-                    id=safe_user_id,
-                    email=email,
-                    display_name="",
-                    avatar_url=None,
-                    credits_balance=settings.default_user_credits or 100,
-                    role="viewer",
-                    created_at=datetime.now(timezone.utc)
-                )
-                return await self._cache_user_response(token, user_response)
-                
-            except httpx.TimeoutException:
-                logger.error(f"❌ [AUTH-MIDDLEWARE] AsyncAuthService timeout")
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail="Authentication service timeout"
-                )
-            except httpx.RequestError as e:
-                logger.error(f"❌ [AUTH-MIDDLEWARE] AsyncAuthService request error: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail="Authentication service error"
-                )
+            user_id = principal["user_id"]
+            profile = await profile_cache.get_or_load(user_id, lambda: self._load_profile(user_id))
+            return self._build_user_response(principal, profile)
                 
         except HTTPException:
             raise
@@ -322,16 +161,140 @@ class AuthMiddleware(BaseHTTPMiddleware):
                 detail="Authentication service error"
             )
     
-    async def _cache_user_response(self, token: str, user: UserResponse) -> UserResponse:
-        """Cache user response for performance optimization."""
+    async def _verify_principal(self, token: str) -> Dict[str, Any]:
+        """Verify a token that is not in the principal cache and cache the result until its exp."""
+        # === SECURITY ENHANCED - Supabase JWT Token Verification ===
+        # Check if we should use Supabase auth
+        use_supabase = os.getenv("USE_SUPABASE_AUTH", "false").lower() == "true"
+        
+        payload = None
         try:
-            cache_key = f"auth_token:{hashlib.md5(token.encode()).hexdigest()}"
-            # Cache for 60 seconds (short TTL for security)
-            await cache_manager.set(cache_key, user, CacheLevel.L1_MEMORY, ttl=60)
-            logger.debug("💾 [AUTH-MIDDLEWARE] Cached user authentication")
+            if use_supabase:
+                if jwt_verifier.can_verify(token):
+                    # Local verification against the JWT secret / cached JWKS keys
+                    payload = await jwt_verifier.verify(token)
+                else:
+                    from services.supabase_auth import get_supabase_auth
+                    payload = get_supabase_auth().verify_jwt(token)
+            else:
+                # Use standard JWT verification for backward compatibility
+                payload = JWTSecurity.verify_token(token, "access_token")
         except Exception as e:
-            logger.warning(f"⚠️ [AUTH-MIDDLEWARE] Failed to cache user auth: {e}")
-        return user
+            logger.debug(f"Local JWT verification failed: {e}")
+            payload = None
+        
+        if payload and payload.get("sub") and payload.get("email"):
+            logger.info(f"✅ [AUTH-MIDDLEWARE] JWT token verification successful for user {payload['sub']}")
+            principal = {"user_id": payload["sub"], "email": payload["email"], "claims": payload}
+            session_principal_cache.set(token, principal, payload.get("exp"))
+            return principal
+        
+        # === Fallback: Use AsyncAuthService for token verification ===
+        logger.info(f"🔍 [AUTH-MIDDLEWARE] Using AsyncAuthService for token verification")
+        
+        try:
+            # Get async auth service
+            auth_service = await get_async_auth_service()
+            
+            # Verify token via HTTP API
+            token_data = await auth_service.verify_token_http(token)
+        except httpx.TimeoutException:
+            logger.error(f"❌ [AUTH-MIDDLEWARE] AsyncAuthService timeout")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service timeout"
+            )
+        except httpx.RequestError as e:
+            logger.error(f"❌ [AUTH-MIDDLEWARE] AsyncAuthService request error: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service error"
+            )
+        
+        if not token_data:
+            logger.error(f"❌ [AUTH-MIDDLEWARE] AsyncAuthService token verification failed")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token"
+            )
+        
+        user_id = token_data.get("user_id")
+        email = token_data.get("email")
+        
+        if not user_id or not email:
+            logger.error(f"❌ [AUTH-MIDDLEWARE] Invalid token data - missing user ID or email")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token payload"
+            )
+        
+        logger.info(f"✅ [AUTH-MIDDLEWARE] AsyncAuthService token verification successful for user {user_id}")
+        principal = {"user_id": user_id, "email": email, "claims": {}}
+        
+        # The auth server vouched for the token; its own exp still bounds the cache entry
+        try:
+            expires_at = jwt.get_unverified_claims(token).get("exp")
+        except JWTError:
+            expires_at = None
+        session_principal_cache.set(token, principal, expires_at)
+        return principal
+    
+    async def _load_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch the user's profile row; None if unavailable."""
+        try:
+            from database import SupabaseClient
+            db_client = SupabaseClient()
+            
+            if db_client.is_available():
+                # PERFORMANCE FIX: Use async database operations with timeout
+                return await db_client.execute_query_async(
+                    table='users',
+                    operation='select',
+                    filters={'id': str(user_id)},
+                    use_service_key=True,
+                    single=True,
+                    timeout=2.0  # 2 second timeout for profile lookup
+                )
+        except Exception as db_error:
+            logger.warning(f"⚠️ [AUTH-MIDDLEWARE] Database profile fetch failed, using JWT data: {db_error}")
+        return None
+    
+    def _build_user_response(self, principal: Dict[str, Any], profile: Optional[Dict[str, Any]]) -> UserResponse:
+        """Combine a verified principal with its (cached) profile."""
+        from utils.uuid_utils import UUIDUtils
+        safe_user_id = UUIDUtils.safe_uuid_convert(principal["user_id"]) \
+            if isinstance(principal["user_id"], str) else principal["user_id"]
+        
+        if profile:
+            # Parse created_at timestamp
+            created_at = datetime.now(timezone.utc)
+            if profile.get('created_at'):
+                try:
+                    created_at = datetime.fromisoformat(str(profile['created_at']).replace('Z', '+00:00'))
+                except ValueError as date_error:
+                    logger.warning(f"⚠️ [AUTH-MIDDLEWARE] Date parsing failed: {date_error}, using current time")
+            
+            return UserResponse(
+                id=safe_user_id,
+                email=principal["email"],
+                display_name=profile.get('display_name', ''),
+                avatar_url=profile.get('avatar_url'),
+                credits_balance=profile.get('credits_balance', 100),
+                role=profile.get('role', 'viewer'),
+                created_at=created_at
+            )
+        
+        # Fallback to JWT data
+        claims = principal.get("claims") or {}
+        return UserResponse(
+            id=safe_user_id,
+            email=principal["email"],
+            display_name=claims.get('display_name', ''),
+            avatar_url=claims.get('avatar_url'),
+            credits_balance=claims.get('credits_balance', getattr(settings, "default_user_credits", 100)),
+            role=claims.get('role', 'viewer'),
+            created_at=datetime.now(timezone.utc)
+        )
 
 
 async def get_current_user(
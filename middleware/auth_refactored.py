@@ -5,19 +5,22 @@ Returns clean 401s with CORS headers, never crashes.
 import os
 import logging
 from typing import Optional, Dict, Any
-from fastapi import Request, Response, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from fastapi import Response, status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 from fastapi.responses import JSONResponse
 
+from utils.principal_cache import jwt_verifier, principal_cache, token_revocations
+from utils.request_timing import span
+
 logger = logging.getLogger(__name__)
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    """Authentication middleware that verifies JWT tokens."""
+class AuthMiddleware:
+    """Authentication middleware that verifies JWT tokens (plain ASGI)."""
     
     def __init__(self, app: ASGIApp, public_paths: list = None):
-        super().__init__(app)
+        self.app = app
         self.public_paths = public_paths or [
             "/health",
             "/__health",
@@ -28,90 +31,106 @@ class AuthMiddleware(BaseHTTPMiddleware):
             "/openapi.json",
             "/redoc",
         ]
+        # str.startswith accepts a tuple: one C-level prefix scan per request
+        self._public_prefixes = tuple(self.public_paths)
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Process request with authentication check."""
-        request_id = getattr(request.state, "request_id", "unknown")
-        path = request.url.path
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        state = scope.setdefault("state", {})
+        request_id = state.get("request_id", "unknown")
+        path = scope["path"]
         
         # Skip auth for public paths
         if self._is_public_path(path):
             logger.debug(f"[{request_id}] Auth bypass for public path: {path}")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Extract token
-        auth_header = request.headers.get("Authorization", "")
+        auth_header = Headers(scope=scope).get("Authorization", "")
         
         if not auth_header or not auth_header.startswith("Bearer "):
             logger.info(f"[{request_id}] Missing or invalid auth header for {path}")
-            return self._unauthorized_response(request_id, "Missing authentication token")
+            await self._unauthorized_response(request_id, "Missing authentication token")(scope, receive, send)
+            return
         
         token = auth_header[7:]  # Remove "Bearer " prefix
         
         try:
             # Verify token
-            user_data = await self._verify_token(token)
-            
-            if not user_data:
-                logger.info(f"[{request_id}] Invalid token for {path}")
-                return self._unauthorized_response(request_id, "Invalid or expired token")
-            
-            # Attach user to request
-            request.state.user = user_data
-            request.state.user_id = user_data.get("id")
-            
-            logger.debug(f"[{request_id}] Auth success for user {request.state.user_id}")
-            
-            # Continue processing
-            response = await call_next(request)
-            return response
-            
+            with span("mw_auth"):
+                user_data = await self._verify_token(token)
         except Exception as e:
             logger.error(f"[{request_id}] Auth middleware error: {e}")
-            return self._unauthorized_response(request_id, "Authentication failed")
+            await self._unauthorized_response(request_id, "Authentication failed")(scope, receive, send)
+            return
+        
+        if not user_data:
+            logger.info(f"[{request_id}] Invalid token for {path}")
+            await self._unauthorized_response(request_id, "Invalid or expired token")(scope, receive, send)
+            return
+        
+        # Attach user to request
+        state["user"] = user_data
+        state["user_id"] = user_data.get("id")
+        
+        logger.debug(f"[{request_id}] Auth success for user {state['user_id']}")
+        
+        # Continue processing; route errors reach the global error handler
+        await self.app(scope, receive, send)
     
     def _is_public_path(self, path: str) -> bool:
         """Check if path is public (no auth required)."""
-        for public_path in self.public_paths:
-            if path.startswith(public_path):
-                return True
-        return False
+        return path.startswith(self._public_prefixes)
     
     async def _verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify JWT token and return user data."""
         try:
-            import os
+            # Signed-out tokens stay cryptographically valid until their exp
+            if token_revocations.is_revoked(token):
+                return None
+            
+            # Hot path: principal already verified and still within its exp
+            principal = principal_cache.get(token)
+            if principal is not None:
+                return dict(principal)
             
             # Check if using Supabase auth
             use_supabase = os.getenv("USE_SUPABASE_AUTH", "true").lower() == "true"
             
             if use_supabase:
-                # Use Supabase auth service for proper JWT verification
-                from services.supabase_auth import SupabaseAuth
-                auth_service = SupabaseAuth()
-                
-                # verify_jwt returns Dict with user data
-                user_data = auth_service.verify_jwt(token)
+                # Verify locally against the JWT secret / cached JWKS keys (no network I/O)
+                locally_verified = jwt_verifier.can_verify(token)
+                if locally_verified:
+                    user_data = await jwt_verifier.verify(token)
+                else:
+                    from services.supabase_auth import get_supabase_auth
+                    user_data = get_supabase_auth().verify_jwt(token)
                 
                 # Ensure we have the expected structure
                 if isinstance(user_data, dict) and "sub" in user_data:
                     # Convert Supabase format to expected format
-                    return {
+                    principal = {
                         "id": user_data.get("sub"),
                         "email": user_data.get("email"),
                         "role": user_data.get("role", "authenticated"),
                         **user_data  # Include all other claims
                     }
+                    if locally_verified:
+                        principal_cache.set(token, principal, user_data.get("exp"))
+                    return dict(principal)
                 
                 return user_data
             else:
-                # Use legacy auth service
-                from services.auth_service_async import get_async_auth_service
-                auth_service = await get_async_auth_service()
-                
-                # For legacy, try to use jwt_security utility directly
+                # For legacy, use jwt_security utility directly
                 from utils.jwt_security import verify_supabase_jwt
                 user_data = verify_supabase_jwt(token)
+                if isinstance(user_data, dict):
+                    principal_cache.set(token, user_data, user_data.get("exp"))
                 return user_data
             
         except Exception as e:
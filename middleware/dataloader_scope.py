@@ -0,0 +1,21 @@
+"""
+Per-request DataLoader scope.
+Plain ASGI so the context variable set here is visible to the route handler
+and every task it spawns.
+"""
+from utils.dataloader import dataloader_scope
+
+
+class DataLoaderScopeMiddleware:
+    """Opens a fresh dataloader_scope() for each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with dataloader_scope():
+            await self.app(scope, receive, send)
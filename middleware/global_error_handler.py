@@ -2,71 +2,88 @@
 Global error handler middleware that ensures ALL responses have CORS headers and JSON format.
 This must be added AFTER CORSMiddleware but BEFORE all other middleware.
 """
-import json
 import time
 import uuid
-from typing import Callable
-from fastapi import Request, Response
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class GlobalErrorMiddleware(BaseHTTPMiddleware):
+class GlobalErrorMiddleware:
     """
     Ensures every error response includes:
     - JSON body
     - Access-Control-Allow-Origin header
     - Vary: Origin header
     - X-Request-ID for tracing
+    
+    Plain ASGI, so streamed responses pass through unbuffered. An exception
+    raised after the response has started cannot be turned into a 500 and
+    is re-raised to the server.
     """
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Generate or propagate request ID
-        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
-        request.state.request_id = request_id
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        # Reuse the ID assigned by request tracking, else take the client's
+        request_headers = Headers(scope=scope)
+        state = scope.setdefault("state", {})
+        request_id = state.get("request_id") or request_headers.get("X-Request-ID") or str(uuid.uuid4())
+        state["request_id"] = request_id
+        origin = request_headers.get("Origin", "")
         
         # Track timing
         start_time = time.perf_counter()
+        response_started = False
+        
+        async def send_with_headers(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                headers = MutableHeaders(scope=message)
+                
+                # Add request ID to response
+                headers["X-Request-ID"] = request_id
+                
+                # Ensure CORS headers on error responses
+                if origin and message["status"] >= 400:
+                    # Check if CORS headers are missing
+                    if "access-control-allow-origin" not in headers:
+                        headers["Access-Control-Allow-Origin"] = origin
+                        headers["Access-Control-Allow-Credentials"] = "true"
+                        headers["Vary"] = "Origin"
+                
+                # Add timing header
+                elapsed = (time.perf_counter() - start_time) * 1000
+                headers["X-Response-Time"] = f"{elapsed:.2f}ms"
+            await send(message)
         
         try:
             # Call the next middleware/route
-            response = await call_next(request)
-            
-            # Add request ID to response
-            response.headers["X-Request-ID"] = request_id
-            
-            # Ensure CORS headers on error responses
-            origin = request.headers.get("Origin", "")
-            if origin and response.status_code >= 400:
-                # Check if CORS headers are missing
-                if "access-control-allow-origin" not in response.headers:
-                    response.headers["Access-Control-Allow-Origin"] = origin
-                    response.headers["Access-Control-Allow-Credentials"] = "true"
-                    response.headers["Vary"] = "Origin"
-            
-            # Add timing header
-            elapsed = (time.perf_counter() - start_time) * 1000
-            response.headers["X-Response-Time"] = f"{elapsed:.2f}ms"
-            
-            return response
+            await self.app(scope, receive, send_with_headers)
             
         except Exception as e:
             # Log the error with request ID
-            logger.exception(f"[{request_id}] Unhandled exception in {request.url.path}: {e}")
+            logger.exception(f"[{request_id}] Unhandled exception in {scope['path']}: {e}")
             
-            # Get origin for CORS
-            origin = request.headers.get("Origin", "")
+            if response_started:
+                raise
             
             # Create error response
             error_detail = {
                 "error": "internal_server_error",
                 "detail": str(e) if logger.level <= logging.DEBUG else "Internal server error",
                 "request_id": request_id,
-                "path": str(request.url.path),
-                "method": request.method,
+                "path": scope["path"],
+                "method": scope["method"],
                 "timestamp": time.time()
             }
             
@@ -88,4 +105,4 @@ class GlobalErrorMiddleware(BaseHTTPMiddleware):
             response.headers["X-Response-Time"] = f"{elapsed:.2f}ms"
             response.headers["X-Error-Handler"] = "global"
             
-            return response
\ No newline at end of file
+            await response(scope, receive, send)
@@ -108,10 +108,96 @@ if _test_limits is not None:
 else:
     logger.info("🔒 [RATE-LIMITER] Using production rate limits")
 
+# Windows enforced per tier: (tier limit field, window length in seconds)
+RATE_LIMIT_WINDOWS = (
+    ("requests_per_minute", 60),
+    ("requests_per_hour", 3600),
+)
+
+# GCRA (generic cell rate algorithm) over every window in one atomic step.
+# State is one hash per client holding a theoretical arrival time (TAT, ms)
+# per window, so memory is O(1) per client regardless of request volume.
+# A request is admitted only if every window admits it; otherwise no state
+# changes. Returns {allowed, binding window index, remaining, reset ms}.
+GCRA_LUA_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local key = KEYS[1]
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local windows = (#ARGV) / 2
+
+local new_tats = {}
+local remaining = nil
+local binding = 1
+local reset = now
+local ttl = 0
+
+for i = 1, windows do
+    local limit = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i])
+    local interval = period / limit
+    local tat = tonumber(redis.call('HGET', key, i) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + interval
+    local allow_at = new_tat - period
+    if allow_at > now then
+        return {0, i, 0, math.ceil(allow_at)}
+    end
+    new_tats[i] = new_tat
+    local left = math.floor((period - (new_tat - now)) / interval)
+    if remaining == nil or left < remaining then
+        remaining = left
+        binding = i
+        reset = new_tat
+    end
+    if new_tat - now > ttl then ttl = new_tat - now end
+end
+
+for i = 1, windows do
+    redis.call('HSET', key, i, string.format('%.3f', new_tats[i]))
+end
+redis.call('PEXPIRE', key, math.ceil(ttl))
+return {1, binding, remaining, math.ceil(reset)}
+"""
+
+
+def gcra_windows(limits: Dict[str, int]) -> Tuple[Tuple[int, int], ...]:
+    """(limit, period_ms) for every enforced window of a tier."""
+    return tuple((int(limits[field]), period * 1000) for field, period in RATE_LIMIT_WINDOWS)
+
+
+def gcra_check(
+    tats: Optional[list],
+    windows: Tuple[Tuple[int, int], ...],
+    now_ms: float
+) -> Tuple[bool, int, int, float, list]:
+    """
+    Pure-Python mirror of GCRA_LUA_SCRIPT used by the in-memory fallback.
+    Returns (allowed, binding window index, remaining, reset ms, new TATs).
+    """
+    new_tats = []
+    remaining = None
+    binding = 0
+    reset = now_ms
+    for index, (limit, period) in enumerate(windows):
+        interval = period / limit
+        tat = max(tats[index] if tats else now_ms, now_ms)
+        new_tat = tat + interval
+        allow_at = new_tat - period
+        if allow_at > now_ms:
+            return False, index, 0, allow_at, tats
+        new_tats.append(new_tat)
+        left = int((period - (new_tat - now_ms)) // interval)
+        if remaining is None or left < remaining:
+            remaining, binding, reset = left, index, new_tat
+    return True, binding, remaining, reset, new_tats
+
+
 class ProductionRateLimiter:
     """
     Production rate limiter with Redis backend and in-memory fallback.
-    Implements sliding window rate limiting with proper error handling and timeout protection.
+    Implements GCRA rate limiting (one atomic Lua call, O(1) state per client)
+    with proper error handling and timeout protection.
     """
     
     def __init__(self):
@@ -149,10 +235,14 @@ class ProductionRateLimiter:
         else:
             logger.info("📝 Rate limiter: No Redis URL configured, using in-memory backend")
         
+        # Single-round-trip GCRA check (EVALSHA, reloaded automatically on NOSCRIPT)
+        self._gcra_script = self.redis_client.register_script(GCRA_LUA_SCRIPT) if self.redis_client else None
+        
         # In-memory fallback storage (thread-safe)
-        self.requests = defaultdict(list)  # client_id -> list of request timestamps
+        self.tats: Dict[str, list] = {}  # client_id -> theoretical arrival time (ms) per window
         self.concurrent = defaultdict(int)  # client_id -> current concurrent requests
         self.lock = Lock()
+        self._memory_checks = 0
         
         # Performance metrics
         self._redis_hits = 0
@@ -223,138 +313,40 @@ class ProductionRateLimiter:
             return self._is_allowed_memory(client_id, tier)
     
     async def _is_allowed_redis(self, client_id: str, tier: str) -> Tuple[bool, Dict[str, Any]]:
-        """Redis-based rate limiting with sliding window and timeout protection."""
-        current_time = time.time()
+        """Redis-based GCRA rate limiting: one atomic script call with timeout protection."""
         limits = RATE_LIMIT_TIERS.get(tier, RATE_LIMIT_TIERS["free"])
+        windows = gcra_windows(limits)
+        args = [value for window in windows for value in window]
         
-        # Redis keys for different windows
-        minute_key = f"rate_limit:minute:{client_id}"
-        hour_key = f"rate_limit:hour:{client_id}"
-        
-        # Use Redis pipeline for atomic operations with timeout protection
-        async def _execute_redis_pipeline():
-            pipe = self.redis_client.pipeline()
-            
-            # Sliding window implementation
-            # Remove old entries and count current
-            cutoff_minute = current_time - 60
-            cutoff_hour = current_time - 3600
-            
-            # Clean and count minute window
-            pipe.zremrangebyscore(minute_key, 0, cutoff_minute)
-            pipe.zcard(minute_key)
-            pipe.zadd(minute_key, {str(current_time): current_time})
-            pipe.expire(minute_key, 60)
-            
-            # Clean and count hour window  
-            pipe.zremrangebyscore(hour_key, 0, cutoff_hour)
-            pipe.zcard(hour_key)
-            pipe.zadd(hour_key, {str(current_time): current_time})
-            pipe.expire(hour_key, 3600)
-            
-            return await pipe.execute()
+        allowed, binding, remaining, reset_ms = await self._timeout_wrapper(
+            self._gcra_script, keys=[f"rate_limit:gcra:{client_id}"], args=args
+        )
         
-        try:
-            # Execute pipeline with timeout protection
-            results = await self._timeout_wrapper(_execute_redis_pipeline)
-            
-            requests_last_minute = results[1]  # Count after cleanup
-            requests_last_hour = results[5]   # Count after cleanup
-            
-            # Check limits (subtract 1 because we just added the current request)
-            if requests_last_minute > limits["requests_per_minute"]:
-                # Remove the request we just added since it's rejected (with timeout)
-                await self._timeout_wrapper(self.redis_client.zrem, minute_key, str(current_time))
-                await self._timeout_wrapper(self.redis_client.zrem, hour_key, str(current_time))
-                
-                return False, self._get_headers(
-                    limits["requests_per_minute"],
-                    0,
-                    int(current_time + 60)
-                )
-            
-            if requests_last_hour > limits["requests_per_hour"]:
-                # Remove the request we just added since it's rejected (with timeout)
-                await self._timeout_wrapper(self.redis_client.zrem, minute_key, str(current_time))
-                await self._timeout_wrapper(self.redis_client.zrem, hour_key, str(current_time))
-                
-                return False, self._get_headers(
-                    limits["requests_per_hour"],
-                    0,
-                    int(current_time + 3600)
-                )
-            
-            # Calculate remaining
-            remaining_minute = limits["requests_per_minute"] - requests_last_minute
-            remaining_hour = limits["requests_per_hour"] - requests_last_hour
-            remaining = min(remaining_minute, remaining_hour)
-            
-            reset_time = int(current_time + 60)
-            
-            self._redis_hits += 1
-            return True, self._get_headers(
-                limits["requests_per_minute"],
-                max(0, remaining),
-                reset_time
-            )
-            
-        except Exception as e:
-            # All errors are already logged in _timeout_wrapper
-            raise  # Re-raise so the calling function can handle the fallback
+        self._redis_hits += 1
+        limit = windows[int(binding) - 1][0]
+        return bool(allowed), self._get_headers(limit, int(remaining), int(-(-int(reset_ms) // 1000)))
     
     def _is_allowed_memory(self, client_id: str, tier: str) -> Tuple[bool, Dict[str, Any]]:
-        """In-memory rate limiting (thread-safe fallback)."""
+        """In-memory GCRA rate limiting (thread-safe fallback, same algorithm as Redis)."""
         with self.lock:
-            current_time = time.time()
-            limits = RATE_LIMIT_TIERS.get(tier, RATE_LIMIT_TIERS["free"])
+            now_ms = time.time() * 1000
+            windows = gcra_windows(RATE_LIMIT_TIERS.get(tier, RATE_LIMIT_TIERS["free"]))
             
-            # Clean old requests (older than 1 hour)
-            cutoff_hour = current_time - 3600
-            cutoff_minute = current_time - 60
-            
-            if client_id in self.requests:
-                self.requests[client_id] = [
-                    req_time for req_time in self.requests[client_id] 
-                    if req_time > cutoff_hour
-                ]
-            
-            # Count requests in different windows
-            requests_last_minute = sum(
-                1 for req_time in self.requests[client_id] 
-                if req_time > cutoff_minute
+            allowed, binding, remaining, reset_ms, new_tats = gcra_check(
+                self.tats.get(client_id), windows, now_ms
             )
-            requests_last_hour = len(self.requests[client_id])
-            
-            # Check limits
-            if requests_last_minute >= limits["requests_per_minute"]:
-                return False, self._get_headers(
-                    limits["requests_per_minute"], 
-                    0, 
-                    int(cutoff_minute + 60)
-                )
-            
-            if requests_last_hour >= limits["requests_per_hour"]:
-                return False, self._get_headers(
-                    limits["requests_per_hour"], 
-                    0, 
-                    int(cutoff_hour + 3600)
-                )
-            
-            # Record this request
-            self.requests[client_id].append(current_time)
-            
-            # Calculate remaining
-            remaining_minute = limits["requests_per_minute"] - requests_last_minute - 1
-            remaining_hour = limits["requests_per_hour"] - requests_last_hour - 1
-            remaining = min(remaining_minute, remaining_hour)
-            
-            # Reset time is when the oldest request in the window expires
-            reset_time = int(current_time + 60)
-            
-            return True, self._get_headers(
-                limits["requests_per_minute"], 
-                max(0, remaining), 
-                reset_time
+            if allowed:
+                self.tats[client_id] = new_tats
+            
+            # Drop clients whose every window has fully drained
+            self._memory_checks += 1
+            if self._memory_checks % 1000 == 0:
+                self.tats = {cid: tats for cid, tats in self.tats.items() if max(tats) > now_ms}
+            
+            return allowed, self._get_headers(
+                windows[binding][0],
+                remaining,
+                int(-(-reset_ms // 1000))
             )
     
     def _get_headers(self, limit: int, remaining: int, reset: int) -> Dict[str, str]:
@@ -6,20 +6,25 @@ import time
 import logging
 from typing import Dict, Optional
 from collections import defaultdict
-from fastapi import Request, Response, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from fastapi import Response, status
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi.responses import JSONResponse
 import redis.asyncio as redis
 
+from utils.request_timing import span
+
 logger = logging.getLogger(__name__)
 
 
-class RateLimiterMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware with graceful degradation."""
+class RateLimiterMiddleware:
+    """Rate limiting middleware with graceful degradation (plain ASGI)."""
+    
+    # Health checks are never rate limited
+    EXEMPT_PATHS = frozenset(["/health", "/__health", "/__version"])
     
     def __init__(self, app: ASGIApp, redis_url: str = None, default_limit: str = "100/minute"):
-        super().__init__(app)
+        self.app = app
         self.redis_url = redis_url
         self.redis_client = None
         self.default_limit = self._parse_limit(default_limit)
@@ -39,43 +44,52 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
             logger.info("ℹ️ [RateLimit] No Redis URL, using memory backend")
             self.backend_type = "memory"
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Process request with rate limiting."""
-        request_id = getattr(request.state, "request_id", "unknown")
-        
         # Skip rate limiting for health checks
-        if request.url.path in ["/health", "/__health", "/__version"]:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"] in self.EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        state = scope.setdefault("state", {})
+        request_id = state.get("request_id", "unknown")
         
         # Get client identifier
-        client_id = self._get_client_id(request)
+        client_id = self._get_client_id(scope)
         
         # Check rate limit
-        allowed, remaining, reset_time = await self._check_rate_limit(client_id)
+        with span("mw_ratelimit"):
+            allowed, remaining, reset_time = await self._check_rate_limit(client_id)
         
         if not allowed:
             logger.warning(f"[{request_id}] Rate limit exceeded for {client_id}")
-            return self._rate_limit_response(request_id, remaining, reset_time)
+            response = self._rate_limit_response(request_id, remaining, reset_time)
+            await response(scope, receive, send)
+            return
+        
+        async def send_with_limits(message: Message):
+            if message["type"] == "http.response.start":
+                # Add rate limit headers
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(self.default_limit[0])
+                headers["X-RateLimit-Remaining"] = str(remaining)
+                headers["X-RateLimit-Reset"] = str(int(reset_time))
+            await send(message)
         
         # Process request
-        response = await call_next(request)
-        
-        # Add rate limit headers
-        response.headers["X-RateLimit-Limit"] = str(self.default_limit[0])
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int(reset_time))
-        
-        return response
+        await self.app(scope, receive, send_with_limits)
     
-    def _get_client_id(self, request: Request) -> str:
+    def _get_client_id(self, scope: Scope) -> str:
         """Get client identifier for rate limiting."""
         # Prefer user ID if authenticated
-        if hasattr(request.state, "user_id") and request.state.user_id:
-            return f"user:{request.state.user_id}"
+        user_id = scope.get("state", {}).get("user_id")
+        if user_id:
+            return f"user:{user_id}"
         
         # Fall back to IP
-        if request.client:
-            return f"ip:{request.client.host}"
+        client = scope.get("client")
+        if client:
+            return f"ip:{client[0]}"
         
         return "unknown"
     
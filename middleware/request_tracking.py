@@ -3,125 +3,118 @@ Request tracking middleware for X-Request-ID propagation and Server-Timing heade
 """
 import time
 import uuid
-from typing import Callable, Dict, List
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 
-logger = logging.getLogger(__name__)
-
+from utils.request_timing import record_span, route_timing
 
-class TimingSegment:
-    """Track timing for a specific segment."""
-    
-    def __init__(self, name: str):
-        self.name = name
-        self.start_time = time.perf_counter()
-        self.end_time = None
-        self.duration_ms = None
-    
-    def end(self):
-        """End timing for this segment."""
-        self.end_time = time.perf_counter()
-        self.duration_ms = (self.end_time - self.start_time) * 1000
-        return self.duration_ms
-    
-    def to_header(self) -> str:
-        """Convert to Server-Timing header format."""
-        if self.duration_ms is not None:
-            return f"{self.name};dur={self.duration_ms:.2f}"
-        return f"{self.name}"
+logger = logging.getLogger(__name__)
 
 
-class RequestTrackingMiddleware(BaseHTTPMiddleware):
+class RequestTrackingMiddleware:
     """
     Middleware for request tracking and performance monitoring.
     
     Features:
     - X-Request-ID generation and propagation
-    - Server-Timing header with segment tracking
+    - Server-Timing header built from measured stage spans
+      (see utils.request_timing): mw_auth, mw_ratelimit, db, storage,
+      cache, redis, fal, plus app (unattributed) and total (time to
+      first byte)
+    - Per-route latency breakdown histograms and sampled slow-request dumps
     - Request/response logging with timing
+    
+    Plain ASGI: headers are added to the response start message as it passes
+    through, so streamed bodies (SSE, downloads) are never buffered.
     """
     
-    def __init__(self, app, dispatch=None):
-        super().__init__(app, dispatch)
+    def __init__(self, app: ASGIApp):
         self.app = app
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Start total timing
-        total_start = time.perf_counter()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not route_timing.enabled:
+            await self._call_untimed(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        path = scope["path"]
         
         # Generate or propagate request ID
-        request_id = request.headers.get("X-Request-ID")
+        request_id = Headers(scope=scope).get("X-Request-ID")
         if not request_id:
             request_id = str(uuid.uuid4())
         
         # Store in request state for access by routes
-        request.state.request_id = request_id
-        request.state.timing_segments = {}
+        scope.setdefault("state", {})["request_id"] = request_id
         
-        # Track timing segments
-        segments: List[TimingSegment] = []
+        # Every span reported while the request runs lands in this timer
+        timer, token = route_timing.start()
         
-        # CORS timing (already done by the time we get here)
-        cors_segment = TimingSegment("mw_cors")
-        cors_segment.duration_ms = 0.5  # Nominal value
-        segments.append(cors_segment)
+        # Log request start
+        logger.info(f"[{request_id}] {method} {path} - Started")
         
-        # Auth timing (if auth middleware is present)
-        auth_segment = TimingSegment("mw_auth")
+        status_code = 500
         
-        # Log request start
-        logger.info(f"[{request_id}] {request.method} {request.url.path} - Started")
+        async def send_with_tracking(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                
+                # Time to first byte; the body may still be streaming
+                total_duration_ms = (time.perf_counter() - timer.started) * 1000
+                
+                # Add headers to response
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Response-Time"] = f"{total_duration_ms:.2f}ms"
+                
+                # Build Server-Timing header; "app" is time no stage accounts
+                # for (handler code, serialization)
+                attributed_ms = sum(stage_ms for stage_ms, _ in timer.stages.values())
+                headers["Server-Timing"] = timer.server_timing({
+                    "app": max(total_duration_ms - attributed_ms, 0.0),
+                    "total": total_duration_ms
+                })
+            await send(message)
         
         try:
             # Process request through remaining middleware and routes
-            router_segment = TimingSegment("router")
-            response = await call_next(request)
-            router_segment.end()
-            segments.append(router_segment)
-            
-            # End auth timing (approximate)
-            auth_segment.duration_ms = 2.0  # Nominal value
-            segments.append(auth_segment)
-            
-            # Add any custom timing from the route
-            if hasattr(request.state, "timing_segments"):
-                for name, duration_ms in request.state.timing_segments.items():
-                    segment = TimingSegment(name)
-                    segment.duration_ms = duration_ms
-                    segments.append(segment)
-            
-            # Calculate total time
-            total_duration_ms = (time.perf_counter() - total_start) * 1000
-            total_segment = TimingSegment("total")
-            total_segment.duration_ms = total_duration_ms
-            segments.append(total_segment)
-            
-            # Add headers to response
-            response.headers["X-Request-ID"] = request_id
-            response.headers["X-Response-Time"] = f"{total_duration_ms:.2f}ms"
-            
-            # Build Server-Timing header
-            timing_header = ", ".join(seg.to_header() for seg in segments)
-            response.headers["Server-Timing"] = timing_header
-            
-            # Log request completion
-            logger.info(
-                f"[{request_id}] {request.method} {request.url.path} - "
-                f"Completed with {response.status_code} in {total_duration_ms:.2f}ms"
-            )
-            
-            return response
-            
+            await self.app(scope, receive, send_with_tracking)
         except Exception as e:
             # Log error
-            total_duration_ms = (time.perf_counter() - total_start) * 1000
+            total_duration_ms = (time.perf_counter() - timer.started) * 1000
             logger.error(
-                f"[{request_id}] {request.method} {request.url.path} - "
+                f"[{request_id}] {method} {path} - "
                 f"Failed after {total_duration_ms:.2f}ms: {e}"
             )
             raise
+        finally:
+            route_timing.finish(token, scope, timer, status_code, request_id)
+        
+        # Log request completion (including any streamed body)
+        total_duration_ms = (time.perf_counter() - timer.started) * 1000
+        logger.info(
+            f"[{request_id}] {method} {path} - "
+            f"Completed with {status_code} in {total_duration_ms:.2f}ms"
+        )
+    
+    async def _call_untimed(self, scope: Scope, receive: Receive, send: Send):
+        """Request ID propagation only (non-HTTP scopes, or timing disabled)."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_id = Headers(scope=scope).get("X-Request-ID") or str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+        
+        await self.app(scope, receive, send_with_request_id)
 
 
 def add_timing_segment(request: Request, name: str, duration_ms: float):
@@ -133,9 +126,12 @@ def add_timing_segment(request: Request, name: str, duration_ms: float):
         
         # In your route handler:
         start = time.perf_counter()
-        # ... do database operation ...
-        db_time = (time.perf_counter() - start) * 1000
-        add_timing_segment(request, "db", db_time)
+        # ... render the thumbnail ...
+        render_time = (time.perf_counter() - start) * 1000
+        add_timing_segment(request, "render", render_time)
+    
+    Timing a block with utils.request_timing.span("render") does the same
+    without the bookkeeping. Database, storage, cache and FAL calls are
+    already timed; do not report them again here.
     """
-    if hasattr(request.state, "timing_segments"):
-        request.state.timing_segments[name] = duration_ms
\ No newline at end of file
+    record_span(name, duration_ms)
@@ -30,6 +30,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 from config import settings
+from utils.input_sanitization import PatternPrefilter, SanitizedValueCache
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +75,9 @@ class InputValidator:
     """
     OWASP-compliant input validation and sanitization.
     Prevents OWASP A03:2021 – Injection attacks.
+    
+    Patterns are compiled once at import and guarded by a literal prefilter;
+    values that passed are cached per input type.
     """
     
     # SQL injection patterns (OWASP A03:2021)
@@ -114,6 +118,27 @@ class InputValidator:
         r"(>|<|>>|<<)",
     ]
     
+    # Compiled once at import
+    _SQL_INJECTION_RES = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in SQL_INJECTION_PATTERNS]
+    _XSS_RES = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in XSS_PATTERNS]
+    _PATH_TRAVERSAL_RES = [re.compile(p, re.IGNORECASE) for p in PATH_TRAVERSAL_PATTERNS]
+    _COMMAND_INJECTION_RES = [re.compile(p) for p in COMMAND_INJECTION_PATTERNS]
+    
+    # Every pattern above needs one of these to match (keep them in step);
+    # the command injection layer only applies to filename/general input
+    _PATTERN_PREFILTER = PatternPrefilter(
+        r"'<=/\\%",
+        ['javascript:'],
+        ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER', 'EXEC', 'EXECUTE', 'UNION', 'SCRIPT']
+    )
+    _COMMAND_PATTERN_PREFILTER = PatternPrefilter(
+        r"'<=/\\%;&|`$()>",
+        ['javascript:'],
+        ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER', 'EXEC', 'EXECUTE', 'UNION', 'SCRIPT',
+         'cat', 'ls', 'pwd', 'whoami', 'id', 'uname', 'netstat', 'ps', 'kill']
+    )
+    _valid_cache = SanitizedValueCache()
+    
     @classmethod
     def validate_input(cls, value: Any, field_name: str, input_type: str = "general") -> Tuple[bool, str]:
         """
@@ -138,42 +163,54 @@ class InputValidator:
             if len(str_value) > 10000:  # 10KB limit
                 return False, f"Input too long for field '{field_name}'"
             
-            # SQL injection detection
-            for pattern in cls.SQL_INJECTION_PATTERNS:
-                if re.search(pattern, str_value, re.IGNORECASE | re.MULTILINE):
-                    logger.warning(f"🚨 [SECURITY] SQL injection attempt detected in '{field_name}': {str_value[:100]}...")
-                    return False, f"Invalid characters detected in '{field_name}'"
-            
-            # XSS detection
-            for pattern in cls.XSS_PATTERNS:
-                if re.search(pattern, str_value, re.IGNORECASE | re.DOTALL):
-                    logger.warning(f"🚨 [SECURITY] XSS attempt detected in '{field_name}': {str_value[:100]}...")
-                    return False, f"Invalid script content detected in '{field_name}'"
-            
-            # Path traversal detection
-            for pattern in cls.PATH_TRAVERSAL_PATTERNS:
-                if re.search(pattern, str_value, re.IGNORECASE):
-                    logger.warning(f"🚨 [SECURITY] Path traversal attempt detected in '{field_name}': {str_value[:100]}...")
-                    return False, f"Invalid path characters detected in '{field_name}'"
-            
-            # Command injection detection
-            if input_type in ["filename", "general"]:
-                for pattern in cls.COMMAND_INJECTION_PATTERNS:
-                    if re.search(pattern, str_value):
-                        logger.warning(f"🚨 [SECURITY] Command injection attempt detected in '{field_name}': {str_value[:100]}...")
-                        return False, f"Invalid command characters detected in '{field_name}'"
+            # Same value already passed for this input type
+            cache_key = (str_value, input_type)
+            if cls._valid_cache.get(cache_key) is not None:
+                return True, ""
+            
+            check_commands = input_type in ["filename", "general"]
+            prefilter = cls._COMMAND_PATTERN_PREFILTER if check_commands else cls._PATTERN_PREFILTER
+            if prefilter.may_match(str_value):
+                # SQL injection detection
+                for pattern in cls._SQL_INJECTION_RES:
+                    if pattern.search(str_value):
+                        logger.warning(f"🚨 [SECURITY] SQL injection attempt detected in '{field_name}': {str_value[:100]}...")
+                        return False, f"Invalid characters detected in '{field_name}'"
+                
+                # XSS detection
+                for pattern in cls._XSS_RES:
+                    if pattern.search(str_value):
+                        logger.warning(f"🚨 [SECURITY] XSS attempt detected in '{field_name}': {str_value[:100]}...")
+                        return False, f"Invalid script content detected in '{field_name}'"
+                
+                # Path traversal detection
+                for pattern in cls._PATH_TRAVERSAL_RES:
+                    if pattern.search(str_value):
+                        logger.warning(f"🚨 [SECURITY] Path traversal attempt detected in '{field_name}': {str_value[:100]}...")
+                        return False, f"Invalid path characters detected in '{field_name}'"
+                
+                # Command injection detection
+                if check_commands:
+                    for pattern in cls._COMMAND_INJECTION_RES:
+                        if pattern.search(str_value):
+                            logger.warning(f"🚨 [SECURITY] Command injection attempt detected in '{field_name}': {str_value[:100]}...")
+                            return False, f"Invalid command characters detected in '{field_name}'"
             
             # Type-specific validation
             if input_type == "email":
-                return cls._validate_email(str_value)
+                is_valid, error = cls._validate_email(str_value)
             elif input_type == "uuid":
-                return cls._validate_uuid(str_value)
+                is_valid, error = cls._validate_uuid(str_value)
             elif input_type == "numeric":
-                return cls._validate_numeric(str_value)
+                is_valid, error = cls._validate_numeric(str_value)
             elif input_type == "alphanumeric":
-                return cls._validate_alphanumeric(str_value)
+                is_valid, error = cls._validate_alphanumeric(str_value)
+            else:
+                is_valid, error = True, ""
             
-            return True, ""
+            if is_valid:
+                cls._valid_cache.put(cache_key, str_value, True)
+            return is_valid, error
             
         except Exception as e:
             logger.error(f"❌ [SECURITY] Input validation error for '{field_name}': {e}")
@@ -0,0 +1,39 @@
+"""
+GZip compression that leaves streamed and already-compressed responses alone.
+Starlette's GZipResponder holds streamed chunks in the compressor until it
+flushes, which stalls Server-Sent Events, and it strips Content-Length from
+partial (Range) downloads. Those responses, and media bodies that gzip cannot
+shrink, are passed through untouched.
+"""
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+# Content types sent as-is: streams that must flush per event, and formats
+# that are already compressed
+PASSTHROUGH_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip")
+
+
+class StreamingSafeGZipResponder(GZipResponder):
+    """GZipResponder that forwards passthrough responses unmodified."""
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message["status"] == 206 or headers.get("content-type", "").startswith(PASSTHROUGH_CONTENT_TYPES):
+                # The responder forwards bodies verbatim for encoded responses
+                self.initial_message = message
+                self.content_encoding_set = True
+                return
+        await super().send_with_gzip(message)
+
+
+class StreamingSafeGZipMiddleware(GZipMiddleware):
+    """Drop-in GZipMiddleware that never buffers SSE or Range downloads."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = StreamingSafeGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,108 @@
+-- Migration 015: Single round-trip generation inheritance chain
+-- Replaces the per-ancestor parent_generation_id walk in the authorization
+-- inheritance layer with one recursive CTE that returns the full lineage,
+-- child ids, inherited permissions and access restrictions together.
+
+-- =============================================================================
+-- PHASE 1: PERMISSION AND RESTRICTION TABLES
+-- =============================================================================
+
+-- Tables read by the inheritance layer; created here if an environment lacks them
+CREATE TABLE IF NOT EXISTS generation_permissions (
+    generation_id UUID PRIMARY KEY REFERENCES generations(id) ON DELETE CASCADE,
+    permissions JSONB NOT NULL DEFAULT '[]'::jsonb,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS generation_access_restrictions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    generation_id UUID NOT NULL REFERENCES generations(id) ON DELETE CASCADE,
+    restriction_type VARCHAR(50) NOT NULL,
+    restriction_value JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (generation_id, restriction_type)
+);
+
+ALTER TABLE generation_permissions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE generation_access_restrictions ENABLE ROW LEVEL SECURITY;
+
+-- Parent lookups drive the recursive walk; child lookups reuse the same index
+CREATE INDEX IF NOT EXISTS idx_generations_parent_id ON generations(parent_generation_id);
+
+CREATE INDEX IF NOT EXISTS idx_generation_access_restrictions_generation
+ON generation_access_restrictions(generation_id);
+
+-- =============================================================================
+-- PHASE 2: INHERITANCE CHAIN RPC
+-- =============================================================================
+
+-- Returns NULL when the generation does not exist. Ancestors are ordered
+-- nearest-first and the walk stops max_depth + 1 levels above the parent so
+-- callers can still detect chains that exceed max_depth. The path array
+-- guards against parent cycles.
+CREATE OR REPLACE FUNCTION get_generation_inheritance_chain(
+    p_generation_id UUID,
+    p_max_depth INTEGER DEFAULT 10
+)
+RETURNS JSONB
+LANGUAGE SQL
+SECURITY DEFINER
+STABLE
+SET search_path = public
+AS $$
+    WITH RECURSIVE lineage AS (
+        SELECT g.id, g.parent_generation_id, g.user_id, 0 AS depth, ARRAY[g.id] AS path
+        FROM generations g
+        WHERE g.id = p_generation_id
+
+        UNION ALL
+
+        SELECT p.id, p.parent_generation_id, p.user_id, l.depth + 1, l.path || p.id
+        FROM generations p
+        JOIN lineage l ON p.id = l.parent_generation_id
+        WHERE l.depth <= p_max_depth + 1
+          AND NOT p.id = ANY(l.path)
+    ),
+    target AS (
+        SELECT * FROM lineage WHERE depth = 0
+    )
+    SELECT jsonb_build_object(
+        'generation_id', t.id,
+        'user_id', t.user_id,
+        'parent_generation_id', t.parent_generation_id,
+        'ancestors', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('id', l.id, 'user_id', l.user_id) ORDER BY l.depth)
+            FROM lineage l
+            WHERE l.depth > 0
+        ), '[]'::jsonb),
+        'child_ids', COALESCE((
+            SELECT jsonb_agg(c.id)
+            FROM generations c
+            WHERE c.parent_generation_id = t.id
+        ), '[]'::jsonb),
+        'parent_permissions', COALESCE((
+            SELECT gp.permissions
+            FROM generation_permissions gp
+            WHERE gp.generation_id = t.parent_generation_id
+        ), '[]'::jsonb),
+        'access_restrictions', COALESCE((
+            SELECT jsonb_object_agg(r.restriction_type, r.restriction_value)
+            FROM generation_access_restrictions r
+            WHERE r.generation_id = t.id
+        ), '{}'::jsonb)
+    )
+    FROM target t;
+$$;
+
+-- Lineage data bypasses RLS, so only the backend may call it
+REVOKE ALL ON FUNCTION get_generation_inheritance_chain(UUID, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION get_generation_inheritance_chain(UUID, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION get_generation_inheritance_chain(UUID, INTEGER) IS
+'Full generation lineage, children, inherited permissions and restrictions in one round trip';
+
+-- Migration completion
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 015 completed: get_generation_inheritance_chain recursive CTE';
+END $$;
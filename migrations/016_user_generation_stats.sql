@@ -0,0 +1,190 @@
+-- Migration 016: Incrementally maintained per-user generation statistics
+-- /generations/stats used to load every generation row a user owns and
+-- count them in Python. A trigger now keeps one rollup row per
+-- (user, type, model, status, favorite) combination, and a single RPC folds
+-- those few rows into the GenerationStatsResponse shape.
+
+-- =============================================================================
+-- PHASE 1: ROLLUP TABLE
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS user_generation_stats (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    generation_type TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    is_favorite BOOLEAN NOT NULL,
+    generation_count INTEGER NOT NULL DEFAULT 0,
+    credits_used BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, generation_type, model_id, status, is_favorite)
+);
+
+-- Only the backend (service role) reads this table, through the RPC below
+ALTER TABLE user_generation_stats ENABLE ROW LEVEL SECURITY;
+
+-- =============================================================================
+-- PHASE 2: MAINTENANCE TRIGGER
+-- =============================================================================
+
+-- Grouping expressions mirror the previous Python aggregation: generation_type
+-- falls back to media_type, credits_used falls back to cost.
+CREATE OR REPLACE FUNCTION maintain_user_generation_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND (
+        OLD.user_id, COALESCE(OLD.generation_type, OLD.media_type), OLD.model_id, OLD.status,
+        OLD.is_favorite, COALESCE(NULLIF(OLD.credits_used, 0), OLD.cost, 0)
+    ) IS NOT DISTINCT FROM (
+        NEW.user_id, COALESCE(NEW.generation_type, NEW.media_type), NEW.model_id, NEW.status,
+        NEW.is_favorite, COALESCE(NULLIF(NEW.credits_used, 0), NEW.cost, 0)
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE user_generation_stats
+        SET generation_count = generation_count - 1,
+            credits_used = credits_used - COALESCE(NULLIF(OLD.credits_used, 0), OLD.cost, 0),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = OLD.user_id
+          AND generation_type = COALESCE(OLD.generation_type, OLD.media_type, 'unknown')
+          AND model_id = COALESCE(OLD.model_id, 'unknown')
+          AND status = lower(COALESCE(OLD.status, 'pending'))
+          AND is_favorite = COALESCE(OLD.is_favorite, false);
+
+        DELETE FROM user_generation_stats
+        WHERE user_id = OLD.user_id
+          AND generation_type = COALESCE(OLD.generation_type, OLD.media_type, 'unknown')
+          AND model_id = COALESCE(OLD.model_id, 'unknown')
+          AND status = lower(COALESCE(OLD.status, 'pending'))
+          AND is_favorite = COALESCE(OLD.is_favorite, false)
+          AND generation_count <= 0;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO user_generation_stats AS s (
+            user_id, generation_type, model_id, status, is_favorite, generation_count, credits_used
+        ) VALUES (
+            NEW.user_id,
+            COALESCE(NEW.generation_type, NEW.media_type, 'unknown'),
+            COALESCE(NEW.model_id, 'unknown'),
+            lower(COALESCE(NEW.status, 'pending')),
+            COALESCE(NEW.is_favorite, false),
+            1,
+            COALESCE(NULLIF(NEW.credits_used, 0), NEW.cost, 0)
+        )
+        ON CONFLICT (user_id, generation_type, model_id, status, is_favorite) DO UPDATE
+        SET generation_count = s.generation_count + 1,
+            credits_used = s.credits_used + EXCLUDED.credits_used,
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_maintain_user_generation_stats ON generations;
+CREATE TRIGGER trigger_maintain_user_generation_stats
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, generation_type, media_type, model_id, status, is_favorite, credits_used, cost
+    ON generations
+    FOR EACH ROW EXECUTE FUNCTION maintain_user_generation_stats();
+
+-- =============================================================================
+-- PHASE 3: BACKFILL
+-- =============================================================================
+
+-- Rebuilds the rollup from scratch; also usable to repair drift
+CREATE OR REPLACE FUNCTION rebuild_user_generation_stats()
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    -- Block concurrent generation writes so the trigger and the rebuild agree
+    LOCK TABLE generations IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM user_generation_stats;
+
+    INSERT INTO user_generation_stats (
+        user_id, generation_type, model_id, status, is_favorite, generation_count, credits_used
+    )
+    SELECT
+        user_id,
+        COALESCE(generation_type, media_type, 'unknown'),
+        COALESCE(model_id, 'unknown'),
+        lower(COALESCE(status, 'pending')),
+        COALESCE(is_favorite, false),
+        COUNT(*),
+        SUM(COALESCE(NULLIF(credits_used, 0), cost, 0))
+    FROM generations
+    GROUP BY 1, 2, 3, 4, 5;
+END;
+$$;
+
+SELECT rebuild_user_generation_stats();
+
+-- =============================================================================
+-- PHASE 4: STATS RPC
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION get_user_generation_stats(p_user_id UUID)
+RETURNS JSONB
+LANGUAGE SQL
+SECURITY DEFINER
+STABLE
+SET search_path = public
+AS $$
+    WITH rollup AS (
+        SELECT * FROM user_generation_stats WHERE user_id = p_user_id
+    ),
+    totals AS (
+        SELECT
+            COALESCE(SUM(generation_count), 0) AS total,
+            COALESCE(SUM(generation_count) FILTER (WHERE status = 'completed'), 0) AS completed,
+            COALESCE(SUM(generation_count) FILTER (WHERE status = 'failed'), 0) AS failed,
+            COALESCE(SUM(generation_count) FILTER (WHERE status IN ('pending', 'processing')), 0) AS processing,
+            COALESCE(SUM(generation_count) FILTER (WHERE is_favorite), 0) AS favorites,
+            COALESCE(SUM(credits_used), 0) AS credits
+        FROM rollup
+    )
+    SELECT jsonb_build_object(
+        'total_generations', t.total,
+        'completed_generations', t.completed,
+        'failed_generations', t.failed,
+        'processing_generations', t.processing,
+        'favorite_generations', t.favorites,
+        'total_credits_used', t.credits,
+        'type_breakdown', COALESCE((
+            SELECT jsonb_object_agg(generation_type, n)
+            FROM (SELECT generation_type, SUM(generation_count) AS n FROM rollup GROUP BY generation_type) by_type
+        ), '{}'::jsonb),
+        'model_breakdown', COALESCE((
+            SELECT jsonb_object_agg(model_id, n)
+            FROM (SELECT model_id, SUM(generation_count) AS n FROM rollup GROUP BY model_id) by_model
+        ), '{}'::jsonb),
+        'success_rate', CASE WHEN t.total > 0 THEN round(t.completed * 100.0 / t.total, 2) ELSE 0 END
+    )
+    FROM totals t;
+$$;
+
+-- Takes an arbitrary user id, so only the backend may call it
+REVOKE ALL ON FUNCTION get_user_generation_stats(UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION get_user_generation_stats(UUID) TO service_role;
+REVOKE ALL ON FUNCTION rebuild_user_generation_stats() FROM PUBLIC;
+
+COMMENT ON TABLE user_generation_stats IS
+'Trigger-maintained generation counts and credits per user, type, model, status and favorite flag';
+COMMENT ON FUNCTION get_user_generation_stats(UUID) IS
+'Generation statistics for one user in the GenerationStatsResponse shape';
+
+-- Migration completion
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 016 completed: user_generation_stats rollup and get_user_generation_stats RPC';
+END $$;
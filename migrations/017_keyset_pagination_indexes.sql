@@ -0,0 +1,39 @@
+-- Migration 017: Composite indexes for keyset (cursor) pagination
+-- Generation, file and team listings page on (created_at, id) newest first:
+--   WHERE <owner filter> AND (created_at, id) < (cursor) ORDER BY created_at DESC, id DESC LIMIT n
+-- Each index below serves that shape as one index range scan with no sort
+-- step, so page 500 costs the same as page 1.
+-- CONCURRENTLY: run outside a transaction block.
+
+-- =============================================================================
+-- GENERATIONS
+-- =============================================================================
+
+-- GET /generations
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_generations_user_created_id
+    ON generations(user_id, created_at DESC, id DESC);
+
+-- GET /generations?project_id=...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_generations_user_project_created_id
+    ON generations(user_id, project_id, created_at DESC, id DESC);
+
+-- =============================================================================
+-- FILE METADATA
+-- =============================================================================
+
+-- GET /storage/files (bucket and generation filters are applied on top)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_file_metadata_user_created_id
+    ON file_metadata(user_id, created_at DESC, id DESC);
+
+-- =============================================================================
+-- TEAMS
+-- =============================================================================
+
+-- GET /api/v1/teams: id IN (memberships) AND is_active, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_teams_active_created_id
+    ON teams(created_at DESC, id DESC)
+    WHERE is_active = true;
+
+ANALYZE generations;
+ANALYZE file_metadata;
+ANALYZE teams;
@@ -0,0 +1,403 @@
+-- Migration 018: Atomic credit reservation ledger
+-- Credit deduction used to read the balance, check it in Python and write the
+-- new balance back: three or more round trips, and two concurrent generations
+-- could both pass the check. Credits are now reserved by one conditional
+-- UPDATE ... WHERE credits_balance >= amount inside a Postgres function, keyed
+-- by an idempotency key so retries never double-charge. A reservation is
+-- committed or refunded when its generation completes or fails.
+
+-- =============================================================================
+-- PHASE 1: RESERVATION LEDGER
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS credit_reservations (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    idempotency_key TEXT NOT NULL UNIQUE,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    -- No FK: the reservation is taken before the generation row is inserted
+    generation_id UUID,
+    amount INTEGER NOT NULL CHECK (amount > 0),
+    status TEXT NOT NULL DEFAULT 'reserved' CHECK (status IN ('reserved', 'committed', 'refunded')),
+    transaction_type TEXT NOT NULL DEFAULT 'usage',
+    description TEXT,
+    metadata JSONB DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    settled_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_credit_reservations_generation
+    ON credit_reservations(generation_id) WHERE generation_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_credit_reservations_open
+    ON credit_reservations(created_at) WHERE status = 'reserved';
+
+-- Only the backend (service role) touches the ledger, through the functions below
+ALTER TABLE credit_reservations ENABLE ROW LEVEL SECURITY;
+
+-- =============================================================================
+-- PHASE 2: RESERVE / COMMIT / REFUND
+-- =============================================================================
+
+-- Reserve credits in one round trip. Returns
+--   {success, replayed, status, reservation_id, balance, user, error}
+-- error is 'insufficient_credits' or 'user_not_found'. A repeated
+-- idempotency key returns the original outcome without charging again,
+-- unless that reservation has been refunded: the replay then fails with
+-- 'reservation_refunded' instead of reporting credits the user got back.
+CREATE OR REPLACE FUNCTION reserve_credits(
+    p_user_id UUID,
+    p_amount INTEGER,
+    p_idempotency_key TEXT,
+    p_generation_id UUID DEFAULT NULL,
+    p_transaction_type TEXT DEFAULT 'usage',
+    p_description TEXT DEFAULT NULL,
+    p_metadata JSONB DEFAULT '{}',
+    p_commit BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_reservation credit_reservations;
+    v_user users;
+BEGIN
+    IF p_amount IS NULL OR p_amount <= 0 THEN
+        RAISE EXCEPTION 'Credit amount must be positive, got %', p_amount;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM users WHERE id = p_user_id) THEN
+        RETURN jsonb_build_object('success', FALSE, 'replayed', FALSE, 'balance', 0, 'error', 'user_not_found');
+    END IF;
+
+    INSERT INTO credit_reservations (
+        idempotency_key, user_id, generation_id, amount, status,
+        transaction_type, description, metadata, settled_at
+    )
+    VALUES (
+        p_idempotency_key, p_user_id, p_generation_id, p_amount,
+        CASE WHEN p_commit THEN 'committed' ELSE 'reserved' END,
+        p_transaction_type, p_description, COALESCE(p_metadata, '{}'),
+        CASE WHEN p_commit THEN NOW() END
+    )
+    ON CONFLICT (idempotency_key) DO NOTHING
+    RETURNING * INTO v_reservation;
+
+    IF v_reservation.id IS NULL THEN
+        -- Replay: report the first call's outcome
+        SELECT * INTO v_reservation FROM credit_reservations WHERE idempotency_key = p_idempotency_key;
+        SELECT * INTO v_user FROM users WHERE id = v_reservation.user_id;
+        IF v_reservation.status = 'refunded' THEN
+            RETURN jsonb_build_object(
+                'success', FALSE,
+                'replayed', TRUE,
+                'status', v_reservation.status,
+                'reservation_id', v_reservation.id,
+                'balance', v_user.credits_balance,
+                'error', 'reservation_refunded'
+            );
+        END IF;
+        RETURN jsonb_build_object(
+            'success', TRUE,
+            'replayed', TRUE,
+            'status', v_reservation.status,
+            'reservation_id', v_reservation.id,
+            'balance', v_user.credits_balance,
+            'user', to_jsonb(v_user)
+        );
+    END IF;
+
+    UPDATE users
+    SET credits_balance = credits_balance - p_amount,
+        updated_at = NOW()
+    WHERE id = p_user_id
+      AND credits_balance >= p_amount
+    RETURNING * INTO v_user;
+
+    IF v_user.id IS NULL THEN
+        DELETE FROM credit_reservations WHERE id = v_reservation.id;
+        RETURN jsonb_build_object(
+            'success', FALSE,
+            'replayed', FALSE,
+            'balance', (SELECT credits_balance FROM users WHERE id = p_user_id),
+            'error', 'insufficient_credits'
+        );
+    END IF;
+
+    INSERT INTO credit_transactions (
+        user_id, transaction_type, amount, balance_after, description, metadata
+    )
+    VALUES (
+        p_user_id, p_transaction_type, -p_amount, v_user.credits_balance,
+        COALESCE(p_description, 'Credit reservation'),
+        COALESCE(p_metadata, '{}') || jsonb_build_object(
+            'reservation_id', v_reservation.id,
+            'idempotency_key', p_idempotency_key,
+            'generation_id', p_generation_id
+        )
+    );
+
+    RETURN jsonb_build_object(
+        'success', TRUE,
+        'replayed', FALSE,
+        'status', v_reservation.status,
+        'reservation_id', v_reservation.id,
+        'balance', v_user.credits_balance,
+        'user', to_jsonb(v_user)
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Finalise a reservation. No-op (returns the current status) unless it is
+-- still 'reserved', so repeated calls are safe.
+CREATE OR REPLACE FUNCTION commit_credit_reservation(p_idempotency_key TEXT)
+RETURNS JSONB AS $$
+DECLARE
+    v_reservation credit_reservations;
+BEGIN
+    UPDATE credit_reservations
+    SET status = 'committed', settled_at = NOW()
+    WHERE idempotency_key = p_idempotency_key
+      AND status = 'reserved'
+    RETURNING * INTO v_reservation;
+
+    IF v_reservation.id IS NULL THEN
+        SELECT * INTO v_reservation FROM credit_reservations WHERE idempotency_key = p_idempotency_key;
+        RETURN jsonb_build_object('success', COALESCE(v_reservation.status = 'committed', FALSE), 'status', v_reservation.status);
+    END IF;
+
+    RETURN jsonb_build_object('success', TRUE, 'status', 'committed');
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Return reserved credits to the user. Only a 'reserved' reservation can be
+-- refunded, and only once.
+CREATE OR REPLACE FUNCTION refund_credit_reservation(p_idempotency_key TEXT, p_reason TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    v_reservation credit_reservations;
+    v_balance INTEGER;
+BEGIN
+    UPDATE credit_reservations
+    SET status = 'refunded', settled_at = NOW()
+    WHERE idempotency_key = p_idempotency_key
+      AND status = 'reserved'
+    RETURNING * INTO v_reservation;
+
+    IF v_reservation.id IS NULL THEN
+        SELECT * INTO v_reservation FROM credit_reservations WHERE idempotency_key = p_idempotency_key;
+        RETURN jsonb_build_object('success', COALESCE(v_reservation.status = 'refunded', FALSE), 'status', v_reservation.status);
+    END IF;
+
+    UPDATE users
+    SET credits_balance = credits_balance + v_reservation.amount,
+        updated_at = NOW()
+    WHERE id = v_reservation.user_id
+    RETURNING credits_balance INTO v_balance;
+
+    INSERT INTO credit_transactions (
+        user_id, transaction_type, amount, balance_after, description, metadata
+    )
+    VALUES (
+        v_reservation.user_id, 'refund', v_reservation.amount, v_balance,
+        COALESCE(p_reason, 'Credit reservation refunded'),
+        jsonb_build_object(
+            'reservation_id', v_reservation.id,
+            'idempotency_key', p_idempotency_key,
+            'generation_id', v_reservation.generation_id
+        )
+    );
+
+    RETURN jsonb_build_object('success', TRUE, 'status', 'refunded', 'balance', v_balance);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- =============================================================================
+-- PHASE 3: SET-BASED BATCH RESERVATION
+-- =============================================================================
+
+-- p_items: [{user_id, amount, idempotency_key, generation_id?,
+--            transaction_type?, description?, metadata?}, ...]
+-- A user's items are accepted in array order while their running total fits
+-- the balance. Returns one result object per distinct idempotency key, in
+-- input order, shaped like reserve_credits(); an item whose amount is not
+-- positive fails with error 'invalid_amount' instead of being dropped.
+CREATE OR REPLACE FUNCTION reserve_credits_batch(p_items JSONB, p_commit BOOLEAN DEFAULT FALSE)
+RETURNS JSONB AS $$
+DECLARE
+    v_results JSONB;
+BEGIN
+    -- Lock every affected user up front (in id order, so concurrent batches
+    -- cannot deadlock); the statement below then sees current balances.
+    PERFORM 1 FROM users
+    WHERE id IN (SELECT (item->>'user_id')::UUID FROM jsonb_array_elements(p_items) AS item)
+    ORDER BY id
+    FOR UPDATE;
+
+    WITH items AS (
+        SELECT DISTINCT ON (x.idempotency_key)
+            x.user_id, x.amount, x.idempotency_key, x.generation_id,
+            COALESCE(x.transaction_type, 'usage') AS transaction_type,
+            x.description, COALESCE(x.metadata, '{}') AS metadata, i.ord
+        FROM jsonb_array_elements(p_items) WITH ORDINALITY AS i(item, ord),
+             jsonb_to_record(i.item) AS x(
+                 user_id UUID, amount INTEGER, idempotency_key TEXT, generation_id UUID,
+                 transaction_type TEXT, description TEXT, metadata JSONB
+             )
+        ORDER BY x.idempotency_key, i.ord
+    ),
+    replayed AS (
+        SELECT it.idempotency_key, r.status
+        FROM items it
+        JOIN credit_reservations r ON r.idempotency_key = it.idempotency_key
+        WHERE it.amount > 0
+    ),
+    running AS (
+        SELECT it.*, SUM(it.amount) OVER (PARTITION BY it.user_id ORDER BY it.ord) AS running_total
+        FROM items it
+        WHERE it.amount > 0
+          AND it.idempotency_key NOT IN (SELECT idempotency_key FROM replayed)
+    ),
+    accepted AS (
+        SELECT r.*
+        FROM running r
+        JOIN users u ON u.id = r.user_id
+        WHERE r.running_total <= u.credits_balance
+    ),
+    debited AS (
+        UPDATE users u
+        SET credits_balance = u.credits_balance - a.total,
+            updated_at = NOW()
+        FROM (SELECT user_id, SUM(amount) AS total FROM accepted GROUP BY user_id) a
+        WHERE u.id = a.user_id
+        RETURNING u.*, a.total
+    ),
+    reserved AS (
+        INSERT INTO credit_reservations (
+            idempotency_key, user_id, generation_id, amount, status,
+            transaction_type, description, metadata, settled_at
+        )
+        SELECT
+            a.idempotency_key, a.user_id, a.generation_id, a.amount,
+            CASE WHEN p_commit THEN 'committed' ELSE 'reserved' END,
+            a.transaction_type, a.description, a.metadata,
+            CASE WHEN p_commit THEN NOW() END
+        FROM accepted a
+        RETURNING id, idempotency_key, status
+    ),
+    -- Data-modifying CTEs always run to completion, referenced or not
+    logged AS (
+        INSERT INTO credit_transactions (
+            user_id, transaction_type, amount, balance_after, description, metadata
+        )
+        SELECT
+            a.user_id, a.transaction_type, -a.amount,
+            -- Balance right after this item: starting balance minus running total
+            d.credits_balance + d.total - a.running_total,
+            COALESCE(a.description, 'Credit reservation'),
+            a.metadata || jsonb_build_object(
+                'reservation_id', r.id,
+                'idempotency_key', a.idempotency_key,
+                'generation_id', a.generation_id,
+                'batch', TRUE
+            )
+        FROM accepted a
+        JOIN debited d ON d.id = a.user_id
+        JOIN reserved r ON r.idempotency_key = a.idempotency_key
+        RETURNING 1
+    )
+    SELECT jsonb_agg(
+        CASE
+            WHEN it.amount IS NULL OR it.amount <= 0 THEN jsonb_build_object(
+                'idempotency_key', it.idempotency_key, 'user_id', it.user_id,
+                'success', FALSE, 'replayed', FALSE,
+                'balance', COALESCE(d.credits_balance, u.credits_balance, 0),
+                'error', 'invalid_amount'
+            )
+            WHEN rp.status = 'refunded' THEN jsonb_build_object(
+                'idempotency_key', it.idempotency_key, 'user_id', it.user_id,
+                'success', FALSE, 'replayed', TRUE, 'status', rp.status,
+                'balance', COALESCE(d.credits_balance, u.credits_balance),
+                'error', 'reservation_refunded'
+            )
+            WHEN rp.idempotency_key IS NOT NULL THEN jsonb_build_object(
+                'idempotency_key', it.idempotency_key, 'user_id', it.user_id,
+                'success', TRUE, 'replayed', TRUE, 'status', rp.status,
+                'balance', COALESCE(d.credits_balance, u.credits_balance),
+                'user', COALESCE(to_jsonb(d) - 'total', to_jsonb(u))
+            )
+            WHEN a.idempotency_key IS NOT NULL THEN jsonb_build_object(
+                'idempotency_key', it.idempotency_key, 'user_id', it.user_id,
+                'success', TRUE, 'replayed', FALSE,
+                'status', CASE WHEN p_commit THEN 'committed' ELSE 'reserved' END,
+                'balance', d.credits_balance,
+                'user', to_jsonb(d) - 'total'
+            )
+            ELSE jsonb_build_object(
+                'idempotency_key', it.idempotency_key, 'user_id', it.user_id,
+                'success', FALSE, 'replayed', FALSE,
+                'balance', COALESCE(d.credits_balance, u.credits_balance, 0),
+                'error', CASE WHEN u.id IS NULL THEN 'user_not_found' ELSE 'insufficient_credits' END
+            )
+        END
+        ORDER BY it.ord
+    )
+    INTO v_results
+    FROM items it
+    LEFT JOIN replayed rp ON rp.idempotency_key = it.idempotency_key
+    LEFT JOIN accepted a ON a.idempotency_key = it.idempotency_key
+    LEFT JOIN debited d ON d.id = it.user_id
+    LEFT JOIN users u ON u.id = it.user_id;
+
+    RETURN COALESCE(v_results, '[]'::JSONB);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- =============================================================================
+-- PHASE 4: SETTLE WITH GENERATION STATUS
+-- =============================================================================
+
+-- Every code path that finishes a generation (worker, poller, webhook, cancel)
+-- settles its reservation here: completed commits, failed/cancelled refunds.
+CREATE OR REPLACE FUNCTION settle_generation_credit_reservation()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_key TEXT;
+BEGIN
+    IF NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NEW;
+    END IF;
+
+    FOR v_key IN
+        SELECT idempotency_key FROM credit_reservations
+        WHERE generation_id = NEW.id AND status = 'reserved'
+    LOOP
+        IF NEW.status = 'completed' THEN
+            PERFORM commit_credit_reservation(v_key);
+        ELSIF NEW.status IN ('failed', 'cancelled') THEN
+            PERFORM refund_credit_reservation(
+                v_key, 'Refund for ' || NEW.status || ' generation ' || NEW.id
+            );
+        END IF;
+    END LOOP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trg_settle_generation_credit_reservation ON generations;
+CREATE TRIGGER trg_settle_generation_credit_reservation
+    AFTER UPDATE OF status ON generations
+    FOR EACH ROW
+    WHEN (NEW.status IN ('completed', 'failed', 'cancelled'))
+    EXECUTE FUNCTION settle_generation_credit_reservation();
+
+-- =============================================================================
+-- PHASE 5: PERMISSIONS
+-- =============================================================================
+
+REVOKE ALL ON FUNCTION reserve_credits(UUID, INTEGER, TEXT, UUID, TEXT, TEXT, JSONB, BOOLEAN) FROM PUBLIC;
+REVOKE ALL ON FUNCTION commit_credit_reservation(TEXT) FROM PUBLIC;
+REVOKE ALL ON FUNCTION refund_credit_reservation(TEXT, TEXT) FROM PUBLIC;
+REVOKE ALL ON FUNCTION reserve_credits_batch(JSONB, BOOLEAN) FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION reserve_credits(UUID, INTEGER, TEXT, UUID, TEXT, TEXT, JSONB, BOOLEAN) TO service_role;
+GRANT EXECUTE ON FUNCTION commit_credit_reservation(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION refund_credit_reservation(TEXT, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION reserve_credits_batch(JSONB, BOOLEAN) TO service_role;
@@ -0,0 +1,296 @@
+-- Migration 019: Durable generation job queue
+-- Generations were processed by a bare asyncio.create_task inside the API pod:
+-- a deploy or crash dropped in-flight work, retries slept in-process and
+-- nothing bounded how many FAL jobs one pod held. Jobs now live in
+-- generation_jobs and are consumed by separate worker processes
+-- (services/generation_worker.py) that claim with FOR UPDATE SKIP LOCKED,
+-- hold a lease they renew by heartbeat, and respect per-model concurrency.
+-- A job whose worker dies is reclaimed once its lease expires.
+
+-- =============================================================================
+-- PHASE 1: QUEUE TABLE
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    generation_id UUID NOT NULL UNIQUE REFERENCES generations(id) ON DELETE CASCADE,
+    model_id TEXT NOT NULL,
+    -- Priority lane: 0 interactive, 1 standard, 2 bulk. Lower is claimed first.
+    priority SMALLINT NOT NULL DEFAULT 1 CHECK (priority BETWEEN 0 AND 2),
+    payload JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'leased', 'completed', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3 CHECK (max_attempts > 0),
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    leased_by TEXT,
+    lease_expires_at TIMESTAMPTZ,
+    last_error TEXT,
+    -- First time a lease began processing the generation. Survives release and
+    -- retries, so a generation already in processing is known to be this job's
+    -- own earlier attempt rather than an in-process run outside the queue.
+    started_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+-- Claim order within a model: ready jobs by lane, then age
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_ready
+    ON generation_jobs(model_id, priority, run_after, created_at)
+    WHERE status = 'queued';
+
+-- Active leases per model (concurrency accounting) and lease expiry scans
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_leased
+    ON generation_jobs(model_id, lease_expires_at)
+    WHERE status = 'leased';
+
+-- Only the backend (service role) touches the queue, through the functions below
+ALTER TABLE generation_jobs ENABLE ROW LEVEL SECURITY;
+
+-- =============================================================================
+-- PHASE 2: ENQUEUE
+-- =============================================================================
+
+-- Idempotent per generation: enqueueing the same generation twice returns the
+-- existing job.
+CREATE OR REPLACE FUNCTION enqueue_generation_job(
+    p_generation_id UUID,
+    p_model_id TEXT,
+    p_payload JSONB DEFAULT '{}',
+    p_priority INTEGER DEFAULT 1,
+    p_max_attempts INTEGER DEFAULT 3
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_job generation_jobs;
+BEGIN
+    INSERT INTO generation_jobs (generation_id, model_id, payload, priority, max_attempts)
+    VALUES (p_generation_id, p_model_id, COALESCE(p_payload, '{}'), p_priority, p_max_attempts)
+    ON CONFLICT (generation_id) DO NOTHING
+    RETURNING * INTO v_job;
+
+    IF v_job.id IS NULL THEN
+        SELECT * INTO v_job FROM generation_jobs WHERE generation_id = p_generation_id;
+        RETURN jsonb_build_object('job_id', v_job.id, 'status', v_job.status, 'created', FALSE);
+    END IF;
+
+    RETURN jsonb_build_object('job_id', v_job.id, 'status', v_job.status, 'created', TRUE);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- =============================================================================
+-- PHASE 3: CLAIM WITH LEASE AND PER-MODEL CONCURRENCY
+-- =============================================================================
+
+-- p_model_limits: {"<model_id>": <max concurrent jobs across all workers>}.
+-- Models missing from the map are not claimed, so a worker only takes work it
+-- knows how to run. Returns up to p_limit jobs, each leased to p_worker_id for
+-- p_lease_seconds.
+CREATE OR REPLACE FUNCTION claim_generation_jobs(
+    p_worker_id TEXT,
+    p_model_limits JSONB,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 60,
+    p_priorities INTEGER[] DEFAULT ARRAY[0, 1, 2]
+)
+RETURNS SETOF generation_jobs AS $$
+DECLARE
+    v_model RECORD;
+    v_active INTEGER;
+    v_take INTEGER;
+    v_remaining INTEGER := p_limit;
+    v_claimed generation_jobs;
+BEGIN
+    -- Expired leases: the worker died or stalled. Requeue the job, or give up
+    -- on it once its attempts are spent.
+    UPDATE generation_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+        leased_by = NULL,
+        lease_expires_at = NULL,
+        last_error = COALESCE(last_error, 'Lease expired'),
+        finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+        updated_at = NOW()
+    WHERE status = 'leased'
+      AND lease_expires_at < NOW();
+
+    -- A dead job's generation will never finish: fail it, which also refunds
+    -- its credit reservation (trg_settle_generation_credit_reservation).
+    UPDATE generations g
+    SET status = 'failed',
+        error_message = 'Generation could not be processed: ' || COALESCE(j.last_error, 'worker lost'),
+        completed_at = NOW()
+    FROM generation_jobs j
+    WHERE j.generation_id = g.id
+      AND j.status = 'dead'
+      AND g.status IN ('pending', 'processing');
+
+    -- Visit models with ready work, most urgent first
+    FOR v_model IN
+        SELECT j.model_id, (p_model_limits ->> j.model_id)::INTEGER AS max_concurrency
+        FROM generation_jobs j
+        WHERE j.status = 'queued'
+          AND j.run_after <= NOW()
+          AND j.priority = ANY(p_priorities)
+          AND p_model_limits ? j.model_id
+        GROUP BY j.model_id
+        ORDER BY MIN(j.priority), MIN(j.created_at)
+    LOOP
+        EXIT WHEN v_remaining <= 0;
+
+        -- Serialise claims per model so two workers cannot both see a free
+        -- slot and overshoot the limit. Busy models are skipped, not waited on.
+        CONTINUE WHEN NOT pg_try_advisory_xact_lock(hashtext('generation_jobs:' || v_model.model_id));
+
+        SELECT COUNT(*) INTO v_active
+        FROM generation_jobs
+        WHERE model_id = v_model.model_id AND status = 'leased';
+
+        v_take := LEAST(v_remaining, v_model.max_concurrency - v_active);
+        CONTINUE WHEN v_take <= 0;
+
+        FOR v_claimed IN
+            UPDATE generation_jobs
+            SET status = 'leased',
+                leased_by = p_worker_id,
+                lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+                attempts = attempts + 1,
+                updated_at = NOW()
+            WHERE id IN (
+                SELECT id FROM generation_jobs
+                WHERE model_id = v_model.model_id
+                  AND status = 'queued'
+                  AND run_after <= NOW()
+                  AND priority = ANY(p_priorities)
+                ORDER BY priority, created_at
+                LIMIT v_take
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *
+        LOOP
+            v_remaining := v_remaining - 1;
+            RETURN NEXT v_claimed;
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- =============================================================================
+-- PHASE 4: HEARTBEAT / COMPLETE / FAIL / RELEASE
+-- =============================================================================
+
+-- Extend the leases p_worker_id still holds. Returns the ids it still owns; a
+-- missing id means the lease was lost and the worker must stop that job.
+CREATE OR REPLACE FUNCTION heartbeat_generation_jobs(
+    p_worker_id TEXT,
+    p_job_ids UUID[],
+    p_lease_seconds INTEGER DEFAULT 60
+)
+RETURNS UUID[] AS $$
+    WITH renewed AS (
+        UPDATE generation_jobs
+        SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+            updated_at = NOW()
+        WHERE id = ANY(p_job_ids)
+          AND status = 'leased'
+          AND leased_by = p_worker_id
+        RETURNING id
+    )
+    SELECT COALESCE(array_agg(id), '{}') FROM renewed;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION complete_generation_job(p_job_id UUID, p_worker_id TEXT)
+RETURNS BOOLEAN AS $$
+    WITH done AS (
+        UPDATE generation_jobs
+        SET status = 'completed',
+            leased_by = NULL,
+            lease_expires_at = NULL,
+            finished_at = NOW(),
+            updated_at = NOW()
+        WHERE id = p_job_id
+          AND status = 'leased'
+          AND leased_by = p_worker_id
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM done);
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- Record that the lease holder is about to process the generation. Returns
+-- FALSE when the lease is no longer held.
+CREATE OR REPLACE FUNCTION start_generation_job(p_job_id UUID, p_worker_id TEXT)
+RETURNS BOOLEAN AS $$
+    WITH started AS (
+        UPDATE generation_jobs
+        SET started_at = COALESCE(started_at, NOW()),
+            updated_at = NOW()
+        WHERE id = p_job_id
+          AND status = 'leased'
+          AND leased_by = p_worker_id
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM started);
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- Record a failed attempt. Requeues with exponential backoff
+-- (p_retry_delay_seconds * 2^(attempts-1)) while attempts remain, otherwise
+-- marks the job dead. Returns the resulting job status.
+CREATE OR REPLACE FUNCTION fail_generation_job(
+    p_job_id UUID,
+    p_worker_id TEXT,
+    p_error TEXT,
+    p_retry_delay_seconds INTEGER DEFAULT 5
+)
+RETURNS TEXT AS $$
+    UPDATE generation_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+        run_after = NOW() + make_interval(secs => p_retry_delay_seconds * power(2, GREATEST(attempts - 1, 0))),
+        leased_by = NULL,
+        lease_expires_at = NULL,
+        last_error = LEFT(p_error, 2000),
+        finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+        updated_at = NOW()
+    WHERE id = p_job_id
+      AND status = 'leased'
+      AND leased_by = p_worker_id
+    RETURNING status;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- Hand a job back untouched (graceful worker shutdown): the attempt is not
+-- counted and the job is immediately claimable by another worker.
+CREATE OR REPLACE FUNCTION release_generation_job(p_job_id UUID, p_worker_id TEXT)
+RETURNS BOOLEAN AS $$
+    WITH released AS (
+        UPDATE generation_jobs
+        SET status = 'queued',
+            attempts = GREATEST(attempts - 1, 0),
+            run_after = NOW(),
+            leased_by = NULL,
+            lease_expires_at = NULL,
+            updated_at = NOW()
+        WHERE id = p_job_id
+          AND status = 'leased'
+          AND leased_by = p_worker_id
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM released);
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- =============================================================================
+-- PHASE 5: PERMISSIONS
+-- =============================================================================
+
+REVOKE ALL ON FUNCTION enqueue_generation_job(UUID, TEXT, JSONB, INTEGER, INTEGER) FROM PUBLIC;
+REVOKE ALL ON FUNCTION claim_generation_jobs(TEXT, JSONB, INTEGER, INTEGER, INTEGER[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION heartbeat_generation_jobs(TEXT, UUID[], INTEGER) FROM PUBLIC;
+REVOKE ALL ON FUNCTION start_generation_job(UUID, TEXT) FROM PUBLIC;
+REVOKE ALL ON FUNCTION complete_generation_job(UUID, TEXT) FROM PUBLIC;
+REVOKE ALL ON FUNCTION fail_generation_job(UUID, TEXT, TEXT, INTEGER) FROM PUBLIC;
+REVOKE ALL ON FUNCTION release_generation_job(UUID, TEXT) FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION enqueue_generation_job(UUID, TEXT, JSONB, INTEGER, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION claim_generation_jobs(TEXT, JSONB, INTEGER, INTEGER, INTEGER[]) TO service_role;
+GRANT EXECUTE ON FUNCTION heartbeat_generation_jobs(TEXT, UUID[], INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION start_generation_job(UUID, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION complete_generation_job(UUID, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION fail_generation_job(UUID, TEXT, TEXT, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION release_generation_job(UUID, TEXT) TO service_role;
@@ -0,0 +1,66 @@
+-- Migration 020: Authorization audit log
+-- services/audit_logger.py kept its "long-term" copy of every authorization
+-- audit entry as a Redis key with a 90 day TTL, written one event at a time
+-- on the authorization path. Entries are now buffered in memory and written
+-- here in multi-row inserts by the audit pipeline's background flusher.
+
+-- =============================================================================
+-- PHASE 1: AUDIT TABLE
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS authorization_audit_log (
+    audit_id TEXT PRIMARY KEY,
+    event_type TEXT NOT NULL,
+    severity TEXT NOT NULL CHECK (severity IN ('info', 'warning', 'error', 'critical')),
+    outcome TEXT NOT NULL,
+    threat_level TEXT NOT NULL,
+    user_id UUID,
+    resource_id UUID,
+    ip_address TEXT,
+    action_performed TEXT NOT NULL,
+    correlation_id TEXT,
+    checksum TEXT,
+    -- The full AuditLogEntry (layer results, performance and security context)
+    entry JSONB NOT NULL,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Per-user forensic timelines
+CREATE INDEX IF NOT EXISTS idx_authorization_audit_log_user
+    ON authorization_audit_log(user_id, occurred_at DESC);
+
+-- Security review queue: the rare high-severity events
+CREATE INDEX IF NOT EXISTS idx_authorization_audit_log_severity
+    ON authorization_audit_log(severity, occurred_at DESC)
+    WHERE severity IN ('error', 'critical');
+
+-- Retention sweeps by age
+CREATE INDEX IF NOT EXISTS idx_authorization_audit_log_occurred
+    ON authorization_audit_log(occurred_at);
+
+-- Written and read by the backend only; no policies means no client access
+ALTER TABLE authorization_audit_log ENABLE ROW LEVEL SECURITY;
+
+-- =============================================================================
+-- PHASE 2: RETENTION
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION purge_authorization_audit_log(p_retention_days INTEGER DEFAULT 90)
+RETURNS INTEGER AS $$
+DECLARE
+    v_deleted INTEGER;
+BEGIN
+    DELETE FROM authorization_audit_log
+    WHERE occurred_at < NOW() - make_interval(days => p_retention_days);
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    RETURN v_deleted;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- =============================================================================
+-- PHASE 3: PERMISSIONS
+-- =============================================================================
+
+GRANT SELECT, INSERT ON authorization_audit_log TO service_role;
+GRANT EXECUTE ON FUNCTION purge_authorization_audit_log(INTEGER) TO service_role;
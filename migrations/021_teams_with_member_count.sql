@@ -0,0 +1,38 @@
+-- Migration 021: Teams with aggregated member counts
+-- TeamService fetched a team's full active member list only to report
+-- len(members) as member_count. This view returns each team row with the
+-- count aggregated in the database, so team listings and the request-scoped
+-- team loader (services/team_loaders.py) read teams and counts in one query.
+
+-- =============================================================================
+-- PHASE 1: VIEW
+-- =============================================================================
+
+-- security_invoker keeps the teams/team_members RLS policies of the caller.
+-- The count is an index-only scan of idx_team_members_active per team.
+CREATE OR REPLACE VIEW teams_with_member_count
+WITH (security_invoker = true) AS
+SELECT
+    t.*,
+    (
+        SELECT COUNT(*)
+        FROM team_members tm
+        WHERE tm.team_id = t.id
+          AND tm.is_active = true
+    )::INTEGER AS member_count
+FROM teams t;
+
+-- =============================================================================
+-- PHASE 2: PERMISSIONS
+-- =============================================================================
+
+GRANT SELECT ON teams_with_member_count TO authenticated, service_role;
+
+COMMENT ON VIEW teams_with_member_count IS
+'teams rows with the number of active team_members as member_count';
+
+-- Migration completion
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 021 completed: teams_with_member_count view';
+END $$;
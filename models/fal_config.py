@@ -1,7 +1,7 @@
 """
 FAL.ai model registry configuration with all supported models.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from enum import Enum
 from pydantic import BaseModel, HttpUrl, Field
 
@@ -21,12 +21,22 @@ class FALModelConfig(BaseModel):
     parameters: Dict[str, Any]
     description: str
     example_params: Dict[str, Any]
+    # Jobs of this model running at once across all generation workers;
+    # None falls back to DEFAULT_CONCURRENCY_BY_TYPE
+    max_concurrent_jobs: Optional[int] = None
     
     model_config = {
         "protected_namespaces": (),
         "populate_by_name": True
     }
 
+# Default cap on concurrent FAL jobs per model, by model type
+DEFAULT_CONCURRENCY_BY_TYPE: Dict[FALModelType, int] = {
+    FALModelType.IMAGE: 16,
+    FALModelType.VIDEO: 4,
+    FALModelType.AUDIO: 4,
+}
+
 # FAL.ai Model Registry - Updated with current working endpoints (Jan 2025)
 FAL_MODEL_REGISTRY: Dict[str, FALModelConfig] = {
     # === IMAGE GENERATION MODELS ===
@@ -110,6 +120,7 @@ FAL_MODEL_REGISTRY: Dict[str, FALModelConfig] = {
         max_resolution="1280x720",
         supported_formats=["mp4"],
         description="Google Veo 3 - Advanced video generation with realistic motion and coherent storytelling",
+        max_concurrent_jobs=2,  # Longest-running, most expensive model
         parameters={
             "prompt": {"type": "string", "required": True, "max_length": 2000},
             "duration": {"type": "number", "default": 5.0, "min": 1.0, "max": 10.0},
@@ -212,6 +223,13 @@ def get_all_models() -> Dict[str, FALModelConfig]:
     """Get all available FAL.ai models."""
     return FAL_MODEL_REGISTRY
 
+def get_model_concurrency_limits() -> Dict[str, int]:
+    """Get the max concurrent jobs for every registered model."""
+    return {
+        model_id: config.max_concurrent_jobs or DEFAULT_CONCURRENCY_BY_TYPE[config.ai_model_type]
+        for model_id, config in FAL_MODEL_REGISTRY.items()
+    }
+
 def get_models_by_type(model_type: FALModelType) -> Dict[str, FALModelConfig]:
     """Get models filtered by type."""
     return {
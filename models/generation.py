@@ -248,6 +248,10 @@ class GenerationResponse(BaseModel):
     updated_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     
+    # Signed URLs for stored media, present when requested (include_media_urls)
+    signed_media_url: Optional[str] = None
+    signed_output_urls: Optional[List[str]] = None
+    
     @validator('output_urls')
     def validate_output_urls(cls, v):
         """Validate output URLs."""
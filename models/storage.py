@@ -179,6 +179,9 @@ class FileMetadataResponse(FileMetadataBase):
     file_extension: Optional[str] = None
     size_formatted: Optional[str] = None
     
+    # Present when the listing was asked to include signed URLs
+    signed_url: Optional[str] = None
+    
     @validator('media_type', pre=False, always=True)
     def compute_media_type(cls, v, values):
         """Compute media type from content type."""
@@ -285,6 +285,7 @@ class TeamListResponse(BaseModel):
     page: int
     per_page: int
     pages: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page
 
 
 class TeamMemberListResponse(BaseModel):
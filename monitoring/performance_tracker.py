@@ -13,17 +13,18 @@ Features:
 - PRD compliance tracking and alerting
 - Performance grading system (A-F grades)
 - Multi-layer cache monitoring (L1, L2, L3)
-- Statistical analysis (P50, P95, P99 percentiles)
+- Statistical analysis (P50, P95, P99 percentiles) from mergeable streaming histograms
 - Time window analysis (1min, 5min, 1hour)
+- Node-wide view merged from every process's histograms via Redis
 - Integration with existing monitoring systems
 - RESTful API endpoints for metrics access
 - Actionable performance recommendations
 """
 
 import asyncio
+import os
 import threading
 import time
-import statistics
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass, field, asdict
@@ -32,9 +33,13 @@ from enum import Enum
 import logging
 import json
 import weakref
+import socket
 from functools import wraps
 import traceback
 
+from config import settings
+from monitoring.streaming_histogram import StreamingHistogram
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -159,68 +164,96 @@ class PerformanceStats:
 
 
 class PerformanceTimeWindow:
-    """Thread-safe time window for performance metrics."""
+    """
+    Thread-safe sliding time window of streaming histograms.
     
-    def __init__(self, window_duration: timedelta, max_samples: int = 10000):
+    The window is a ring of slots, each a StreamingHistogram covering
+    window_duration / slot_count seconds. Recording only touches the current
+    slot; stats merge the live slots (and any histograms from other
+    processes), so memory is fixed and percentiles need no sort. The window
+    spans the last slot_count - 1 full slots plus the current partial one.
+    """
+    
+    def __init__(self, window_duration: timedelta, slot_count: int = 12, recent_samples: int = 100):
         self.window_duration = window_duration
-        self.max_samples = max_samples
-        self.metrics: deque = deque(maxlen=max_samples)
-        self._lock = threading.RLock()
+        self.slot_count = slot_count
+        self.slot_seconds = window_duration.total_seconds() / slot_count
+        self._slots = [StreamingHistogram() for _ in range(slot_count)]
+        self._slot_epochs = [-1] * slot_count
+        # Latest raw samples for "recent values" views only
+        self.metrics: deque = deque(maxlen=recent_samples)
+        self._lock = threading.Lock()
     
     def add_metric(self, metric: PerformanceMetric):
         """Add metric to the time window."""
+        epoch = int(metric.timestamp // self.slot_seconds)
+        index = epoch % self.slot_count
         with self._lock:
-            # Remove expired metrics
-            cutoff_time = time.time() - self.window_duration.total_seconds()
-            while self.metrics and self.metrics[0].timestamp < cutoff_time:
-                self.metrics.popleft()
-            
+            if self._slot_epochs[index] != epoch:
+                self._slots[index].reset()
+                self._slot_epochs[index] = epoch
+            self._slots[index].record(metric.value, metric.success)
             self.metrics.append(metric)
     
     def get_metrics(self, since: Optional[float] = None) -> List[PerformanceMetric]:
-        """Get metrics from the window, optionally filtered by time."""
+        """Get the most recent raw metrics in the window, optionally filtered by time."""
+        cutoff_time = time.time() - self.window_duration.total_seconds()
+        if since is not None:
+            cutoff_time = max(cutoff_time, since)
         with self._lock:
-            if since is None:
-                return list(self.metrics)
-            return [m for m in self.metrics if m.timestamp >= since]
+            return [m for m in self.metrics if m.timestamp >= cutoff_time]
     
-    def calculate_stats(self, target: Optional[PRDTarget] = None) -> PerformanceStats:
-        """Calculate comprehensive statistics for the window."""
+    def snapshot(self) -> StreamingHistogram:
+        """Merge the live slots into one histogram."""
+        oldest_epoch = int(time.time() // self.slot_seconds) - self.slot_count + 1
+        merged = StreamingHistogram()
         with self._lock:
-            if not self.metrics:
-                return PerformanceStats(
-                    count=0, mean=0, median=0, min_val=0, max_val=0, 
-                    std_dev=0, grade=PerformanceGrade.F
-                )
-            
-            values = [m.value for m in self.metrics]
-            successes = [m for m in self.metrics if m.success]
-            
-            stats = PerformanceStats(
-                count=len(values),
-                mean=statistics.mean(values),
-                median=statistics.median(values),
-                min_val=min(values),
-                max_val=max(values),
-                std_dev=statistics.stdev(values) if len(values) > 1 else 0,
-                success_rate=(len(successes) / len(values)) * 100
+            for histogram, epoch in zip(self._slots, self._slot_epochs):
+                if epoch >= oldest_epoch:
+                    merged.merge(histogram)
+        return merged
+    
+    def calculate_stats(
+        self,
+        target: Optional[PRDTarget] = None,
+        peer_histograms: Optional[List[StreamingHistogram]] = None
+    ) -> PerformanceStats:
+        """Calculate comprehensive statistics for the window, merged with other processes' histograms."""
+        histogram = self.snapshot()
+        for peer_histogram in peer_histograms or []:
+            histogram.merge(peer_histogram)
+        
+        if not histogram.count:
+            return PerformanceStats(
+                count=0, mean=0, median=0, min_val=0, max_val=0, 
+                std_dev=0, grade=PerformanceGrade.F
             )
-            
-            # Calculate percentiles for sufficient sample size
-            if len(values) >= 10:
-                sorted_values = sorted(values)
-                stats.p50 = statistics.median(sorted_values)
-                if len(values) >= 20:
-                    stats.p95 = sorted_values[int(0.95 * len(values))]
-                if len(values) >= 100:
-                    stats.p99 = sorted_values[int(0.99 * len(values))]
-            
-            # Calculate grade and target compliance
-            if target:
-                stats.target_compliance = self._calculate_compliance(stats.mean, target)
-                stats.grade = self._calculate_grade(stats.mean, target)
-            
-            return stats
+        
+        median, p95, p99 = histogram.quantiles([0.5, 0.95, 0.99])
+        stats = PerformanceStats(
+            count=histogram.count,
+            mean=histogram.mean,
+            median=median,
+            min_val=histogram.min,
+            max_val=histogram.max,
+            std_dev=histogram.std_dev,
+            success_rate=(histogram.successes / histogram.count) * 100
+        )
+        
+        # Report percentiles for sufficient sample size
+        if histogram.count >= 10:
+            stats.p50 = median
+            if histogram.count >= 20:
+                stats.p95 = p95
+            if histogram.count >= 100:
+                stats.p99 = p99
+        
+        # Calculate grade and target compliance
+        if target:
+            stats.target_compliance = self._calculate_compliance(stats.mean, target)
+            stats.grade = self._calculate_grade(stats.mean, target)
+        
+        return stats
     
     def _calculate_compliance(self, value: float, target: PRDTarget) -> float:
         """Calculate percentage compliance with target."""
@@ -274,6 +307,9 @@ class PerformanceTracker:
     - Concurrent user impact on performance
     """
     
+    SKETCH_KEY = "performance:window_histograms"
+    SKETCH_SYNC_SECONDS = 15
+    
     def __init__(self):
         self._lock = threading.RLock()
         self._active = True
@@ -296,7 +332,7 @@ class PerformanceTracker:
                 for metric_type in MetricType
             },
             TimeWindow.ONE_DAY: {
-                metric_type: PerformanceTimeWindow(timedelta(days=1))
+                metric_type: PerformanceTimeWindow(timedelta(days=1), slot_count=24)
                 for metric_type in MetricType
             }
         }
@@ -316,6 +352,14 @@ class PerformanceTracker:
         # Background monitoring task
         self.monitoring_task: Optional[asyncio.Task] = None
         
+        # Node-wide view: other processes publish their window histograms to
+        # Redis and this one merges them into its stats
+        self._node_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.sketch_sync_enabled = bool(getattr(settings, "redis_url", None)) and \
+            os.getenv("PERFORMANCE_SKETCH_SYNC", "true").lower() == "true"
+        self._redis = None
+        self._peer_histograms: Dict[str, Dict[str, Dict[str, StreamingHistogram]]] = {}
+        
         logger.info("Performance tracker initialized with PRD targets")
     
     def _initialize_prd_targets(self) -> Dict[MetricType, PRDTarget]:
@@ -573,6 +617,7 @@ class PerformanceTracker:
         with self._lock:
             metrics_data = {
                 'timestamp': datetime.utcnow().isoformat(),
+                'processes_reporting': 1 + len(self._peer_histograms),
                 'concurrent_users': self.concurrent_users,
                 'metrics_by_type': {},
                 'overall_grade': self._calculate_overall_grade(),
@@ -584,7 +629,7 @@ class PerformanceTracker:
             for metric_type in MetricType:
                 window = self.time_windows[TimeWindow.FIVE_MINUTES][metric_type]
                 target = self.prd_targets.get(metric_type)
-                stats = window.calculate_stats(target)
+                stats = window.calculate_stats(target, self._peer_histograms_for(TimeWindow.FIVE_MINUTES, metric_type))
                 
                 metrics_data['metrics_by_type'][metric_type.value] = {
                     'current_stats': stats.to_dict(),
@@ -643,7 +688,7 @@ class PerformanceTracker:
                               MetricType.CACHE_L1, MetricType.DATABASE_QUERY]:
                 window = self.time_windows[TimeWindow.ONE_MINUTE][metric_type]
                 target = self.prd_targets.get(metric_type)
-                stats = window.calculate_stats(target)
+                stats = window.calculate_stats(target, self._peer_histograms_for(TimeWindow.ONE_MINUTE, metric_type))
                 
                 # Component status based on recent performance
                 if stats.count > 0:
@@ -683,6 +728,7 @@ class PerformanceTracker:
             report = {
                 'timestamp': datetime.utcnow().isoformat(),
                 'report_period': '1 hour',
+                'processes_reporting': 1 + len(self._peer_histograms),
                 'executive_summary': self._generate_executive_summary(),
                 'prd_compliance_analysis': self._generate_prd_compliance_analysis(),
                 'performance_trends': self._generate_trend_analysis(),
@@ -702,7 +748,7 @@ class PerformanceTracker:
                           MetricType.CACHE_L1, MetricType.DATABASE_QUERY]:
             window = self.time_windows[TimeWindow.FIVE_MINUTES][metric_type]
             target = self.prd_targets.get(metric_type)
-            stats = window.calculate_stats(target)
+            stats = window.calculate_stats(target, self._peer_histograms_for(TimeWindow.FIVE_MINUTES, metric_type))
             if stats.count > 0:
                 grades.append(stats.grade)
         
@@ -730,7 +776,7 @@ class PerformanceTracker:
         
         for metric_type, target in self.prd_targets.items():
             window = self.time_windows[TimeWindow.ONE_HOUR][metric_type]
-            stats = window.calculate_stats(target)
+            stats = window.calculate_stats(target, self._peer_histograms_for(TimeWindow.ONE_HOUR, metric_type))
             compliance[metric_type.value] = stats.target_compliance
         
         return compliance
@@ -793,7 +839,7 @@ class PerformanceTracker:
         for metric_type, target in self.prd_targets.items():
             # Current compliance
             window = self.time_windows[TimeWindow.ONE_HOUR][metric_type]
-            stats = window.calculate_stats(target)
+            stats = window.calculate_stats(target, self._peer_histograms_for(TimeWindow.ONE_HOUR, metric_type))
             
             analysis['compliance_by_metric'][metric_type.value] = {
                 'current_compliance_pct': stats.target_compliance,
@@ -861,7 +907,7 @@ class PerformanceTracker:
             for metric_type in MetricType:
                 window = self.time_windows[window_type][metric_type]
                 target = self.prd_targets.get(metric_type)
-                stats = window.calculate_stats(target)
+                stats = window.calculate_stats(target, self._peer_histograms_for(window_type, metric_type))
                 
                 if stats.count > 0:
                     detailed[window_type.value][metric_type.value] = stats.to_dict()
@@ -905,7 +951,7 @@ class PerformanceTracker:
         # Analyze each metric type and generate specific recommendations
         for metric_type, target in self.prd_targets.items():
             window = self.time_windows[TimeWindow.ONE_HOUR][metric_type]
-            stats = window.calculate_stats(target)
+            stats = window.calculate_stats(target, self._peer_histograms_for(TimeWindow.ONE_HOUR, metric_type))
             
             if stats.count == 0:
                 continue
@@ -1038,13 +1084,85 @@ class PerformanceTracker:
                 await self.monitoring_task
             except asyncio.CancelledError:
                 pass
+        if self._redis is not None:
+            try:
+                await self._redis.hdel(self.SKETCH_KEY, self._node_id)
+                await self._redis.close()
+            except Exception:
+                pass
+            self._redis = None
         logger.info("Performance monitoring stopped")
     
+    def export_histograms(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Serialize this process's window histograms, by time window and metric type."""
+        exported = {}
+        for window_type, windows in self.time_windows.items():
+            exported[window_type.value] = {}
+            for metric_type, window in windows.items():
+                histogram = window.snapshot()
+                if histogram.count:
+                    exported[window_type.value][metric_type.value] = histogram.to_dict()
+        return exported
+    
+    def merge_peer_histograms(self, peers: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]):
+        """Replace the histograms merged in from other processes (node id -> export_histograms())."""
+        self._peer_histograms = {
+            node_id: {
+                f"{window_value}:{metric_value}": StreamingHistogram.from_dict(data)
+                for window_value, metrics in exported.items()
+                for metric_value, data in metrics.items()
+            }
+            for node_id, exported in peers.items()
+            if node_id != self._node_id
+        }
+    
+    def _peer_histograms_for(self, window_type: TimeWindow, metric_type: MetricType) -> List[StreamingHistogram]:
+        key = f"{window_type.value}:{metric_type.value}"
+        return [histograms[key] for histograms in self._peer_histograms.values() if key in histograms]
+    
+    async def _sync_histograms(self):
+        """Publish this process's histograms and pull everyone else's."""
+        try:
+            if self._redis is None:
+                import redis.asyncio as aioredis
+                self._redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+            
+            now = time.time()
+            await self._redis.hset(self.SKETCH_KEY, self._node_id, json.dumps({
+                'published_at': now,
+                'histograms': self.export_histograms()
+            }))
+            await self._redis.expire(self.SKETCH_KEY, self.SKETCH_SYNC_SECONDS * 4)
+            
+            peers = {}
+            stale = []
+            for node_id, payload in (await self._redis.hgetall(self.SKETCH_KEY)).items():
+                data = json.loads(payload)
+                if now - data['published_at'] > self.SKETCH_SYNC_SECONDS * 3:
+                    stale.append(node_id)  # Process has stopped publishing
+                else:
+                    peers[node_id] = data['histograms']
+            if stale:
+                await self._redis.hdel(self.SKETCH_KEY, *stale)
+            self.merge_peer_histograms(peers)
+        except Exception as e:
+            logger.warning(f"Performance histogram sync failed, metrics are process-local: {e}")
+            self._peer_histograms = {}
+    
     async def _monitoring_loop(self):
-        """Background monitoring loop for trend analysis and cleanup."""
+        """Background monitoring loop for trend analysis, cleanup and histogram sharing."""
+        last_cleanup = time.time()
         while self._active:
             try:
-                await asyncio.sleep(60)  # Run every minute
+                await asyncio.sleep(self.SKETCH_SYNC_SECONDS if self.sketch_sync_enabled else 60)
+                
+                # Share window histograms with the other processes
+                if self.sketch_sync_enabled:
+                    await self._sync_histograms()
+                
+                if time.time() - last_cleanup < 60:
+                    continue
+                last_cleanup = time.time()
                 
                 # Update trend analysis
                 self._update_trend_analysis()
@@ -1181,8 +1299,6 @@ def monitor_performance(metric_type: MetricType, operation_name: Optional[str] =
 
 if __name__ == "__main__":
     # Example usage and testing
-    import asyncio
-    
     async def example_usage():
         tracker = get_performance_tracker()
         
@@ -0,0 +1,200 @@
+"""
+Mergeable streaming histogram for performance metrics.
+
+Values are counted in fixed log-spaced buckets (the DDSketch/HDR histogram
+layout): bucket i holds values in (gamma^(i-1), gamma^i], so every quantile is
+reported within RELATIVE_ACCURACY of a true sample value. Recording is O(1)
+into a preallocated array, quantiles come from one walk over the cumulative
+counts instead of a sort, and two histograms merge by adding their buckets, so
+per-slot, per-worker and per-process histograms combine into one view.
+"""
+
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+RELATIVE_ACCURACY = 0.01
+MIN_TRACKED_VALUE = 1e-3    # Smaller values (including 0) share one bucket
+MAX_TRACKED_VALUE = 1e7     # Larger values are counted in the top bucket
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_INDEX_OFFSET = math.ceil(math.log(MIN_TRACKED_VALUE) / _LOG_GAMMA)
+NUM_BUCKETS = math.ceil(math.log(MAX_TRACKED_VALUE) / _LOG_GAMMA) - _INDEX_OFFSET + 1
+_log = math.log
+
+
+def _bucket_value(index: int) -> float:
+    """Representative value of a bucket (relative error <= RELATIVE_ACCURACY)."""
+    return 2 * _GAMMA ** (index + _INDEX_OFFSET) / (_GAMMA + 1)
+
+
+class StreamingHistogram:
+    """Fixed-memory, mergeable histogram with exact count/sum/min/max."""
+
+    __slots__ = ('counts', 'zero_count', 'count', 'total', 'total_sq', 'min', 'max',
+                 'successes', '_lo', '_hi')
+
+    def __init__(self):
+        self.counts: Optional[array] = None  # Allocated on first record
+        self.reset()
+
+    def reset(self):
+        """Clear all samples, keeping the bucket array for reuse."""
+        if self.counts is not None and self.count:
+            for index in range(self._lo, self._hi + 1):
+                self.counts[index] = 0
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.successes = 0
+        self._lo = NUM_BUCKETS
+        self._hi = -1
+
+    def record(self, value: float, success: bool = True):
+        """Count one sample."""
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if success:
+            self.successes += 1
+
+        if value <= MIN_TRACKED_VALUE:
+            self.zero_count += 1
+            return
+        index = math.ceil(_log(value) / _LOG_GAMMA) - _INDEX_OFFSET
+        if index >= NUM_BUCKETS:
+            index = NUM_BUCKETS - 1
+        if self.counts is None:
+            self.counts = array('Q', bytes(8 * NUM_BUCKETS))
+        self.counts[index] += 1
+        if index < self._lo:
+            self._lo = index
+        if index > self._hi:
+            self._hi = index
+
+    def merge(self, other: "StreamingHistogram"):
+        """Add another histogram's samples to this one."""
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.successes += other.successes
+        self.zero_count += other.zero_count
+        if other._hi < 0:
+            return
+        if self.counts is None:
+            self.counts = array('Q', bytes(8 * NUM_BUCKETS))
+        counts, other_counts = self.counts, other.counts
+        for index in range(other._lo, other._hi + 1):
+            if other_counts[index]:
+                counts[index] += other_counts[index]
+        self._lo = min(self._lo, other._lo)
+        self._hi = max(self._hi, other._hi)
+
+    def copy(self) -> "StreamingHistogram":
+        histogram = StreamingHistogram()
+        histogram.merge(self)
+        return histogram
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        """Sample standard deviation."""
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """
+        Estimate several quantiles in one pass; q is in [0, 1].
+
+        Quantile q is the sample at rank int(q * count) of the sorted values;
+        the lowest and highest ranks are exact.
+        """
+        if not self.count:
+            return [None for _ in qs]
+
+        ranks = sorted((min(int(q * self.count), self.count - 1), position) for position, q in enumerate(qs))
+        results: List[Optional[float]] = [None] * len(qs)
+        pending = 0
+
+        seen = self.zero_count
+        while pending < len(ranks) and ranks[pending][0] < seen:
+            results[ranks[pending][1]] = self.min
+            pending += 1
+
+        if pending < len(ranks) and self.counts is not None:
+            counts = self.counts
+            for index in range(self._lo, self._hi + 1):
+                if not counts[index]:
+                    continue
+                seen += counts[index]
+                while pending < len(ranks) and ranks[pending][0] < seen:
+                    if ranks[pending][0] == 0:
+                        value = self.min
+                    elif ranks[pending][0] == self.count - 1:
+                        value = self.max
+                    else:
+                        value = min(max(_bucket_value(index), self.min), self.max)
+                    results[ranks[pending][1]] = value
+                    pending += 1
+                if pending == len(ranks):
+                    break
+        return results
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact JSON-serializable form (sparse buckets) for sharing between processes."""
+        buckets = {}
+        if self.counts is not None:
+            for index in range(self._lo, self._hi + 1):
+                if self.counts[index]:
+                    buckets[str(index)] = self.counts[index]
+        return {
+            'count': self.count,
+            'total': self.total,
+            'total_sq': self.total_sq,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'successes': self.successes,
+            'zero_count': self.zero_count,
+            'buckets': buckets
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingHistogram":
+        histogram = cls()
+        if not data.get('count'):
+            return histogram
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.total_sq = data['total_sq']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        histogram.successes = data['successes']
+        histogram.zero_count = data['zero_count']
+        if data['buckets']:
+            histogram.counts = array('Q', bytes(8 * NUM_BUCKETS))
+            for index, bucket_count in data['buckets'].items():
+                index = int(index)
+                histogram.counts[index] = bucket_count
+                histogram._lo = min(histogram._lo, index)
+                histogram._hi = max(histogram._hi, index)
+        return histogram
@@ -0,0 +1,47 @@
+"""
+Authorization audit log repository.
+Following CLAUDE.md: Pure database layer, no business logic.
+Backed by the authorization_audit_log table (migrations/020_authorization_audit_log.sql).
+"""
+from typing import List, Dict, Any
+import logging
+
+from database import SupabaseClient
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogRepository:
+    """Repository for authorization_audit_log writes."""
+
+    def __init__(self, db_client: SupabaseClient):
+        self.db = db_client
+
+    async def insert_entries(self, rows: List[Dict[str, Any]], timeout: float = 10.0) -> int:
+        """Insert a batch of audit rows with one multi-row insert; returns the number written."""
+        if not rows:
+            return 0
+        try:
+            result = await self.db.execute_query_async(
+                "authorization_audit_log",
+                "insert",
+                data=rows,
+                use_service_key=True,
+                timeout=timeout
+            )
+            return len(result or [])
+        except Exception as e:
+            logger.error(f"Failed to insert {len(rows)} audit log entries: {e}")
+            raise
+
+    async def purge(self, retention_days: int) -> int:
+        """Delete entries older than the retention period; returns the number removed."""
+        try:
+            return await self.db.execute_rpc_async(
+                "purge_authorization_audit_log",
+                {"p_retention_days": retention_days},
+                use_service_key=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to purge audit log entries: {e}")
+            raise
@@ -15,7 +15,8 @@ from datetime import datetime
 from database import DatabaseClient
 from utils.supabase_performance_optimizer import supabase_optimizer, SupabasePerformanceConfig
 from utils.enterprise_db_pool import enterprise_pool_manager, PoolType
-from caching.multi_layer_cache_manager import cache_manager, CachePriority
+from caching.multi_layer_cache_manager import cache_manager, get_cache_manager, CachePriority
+from utils.dataloader import DataLoader, get_request_loader
 from supabase import Client
 
 logger = logging.getLogger(__name__)
@@ -63,8 +64,12 @@ class BaseRepository(Generic[T], ABC):
     - Connection pool optimization
     - Supabase-specific optimizations
     - Circuit breaker patterns
+    - Set-based batch fetches with per-request get_by_id coalescing
     """
     
+    # IDs per id=in.(...) query; keeps PostgREST URLs well under proxy limits
+    BATCH_FETCH_CHUNK_SIZE = 100
+    
     def __init__(
         self,
         db_client: DatabaseClient,
@@ -89,6 +94,11 @@ class BaseRepository(Generic[T], ABC):
         # Materialized view mappings
         self.materialized_views = self._get_materialized_views()
         
+        # Coalesces concurrent get_by_id calls made outside a request scope
+        self._coalescer = DataLoader(
+            self._batch_load_records, max_batch_size=self.BATCH_FETCH_CHUNK_SIZE, cache=False
+        )
+        
         logger.info(f"🚀 [REPO] Initialized {self.__class__.__name__} with optimizations")
     
     @abstractmethod
@@ -192,48 +202,30 @@ class BaseRepository(Generic[T], ABC):
             raise
     
     async def get_by_id(self, id: str, use_cache: bool = True) -> Optional[T]:
-        """Get single record by ID with aggressive optimization."""
-        cache_key = self._get_cache_key("get_by_id", id=id) if use_cache else None
-        
-        # Check cache first
-        if cache_key and use_cache:
-            cached_result = await cache_manager.get(cache_key)
-            if cached_result is not None:
-                self.metrics.cache_hits += 1
-                logger.debug(f"🎯 [REPO] Cache hit for {self.table_name}:{id}")
-                return self._deserialize(cached_result)
-        
-        # Execute optimized query
-        context = QueryContext(
-            query_type="get_by_id",
-            table=self.table_name,
-            operation="select",
-            use_service_key=True,  # Use service key for faster auth bypass
-            enable_caching=use_cache,
-            cache_priority=CachePriority.HIGH
-        )
-        
-        result = await self._execute_optimized_query(
-            context=context,
-            filters={"id": id},
-            limit=1
-        )
-        
-        if result and len(result) > 0:
-            record = self._deserialize(result[0])
-            
-            # Cache the result
-            if cache_key and use_cache:
-                await cache_manager.set(
-                    cache_key,
-                    result[0],
-                    ttl=300,  # 5 minutes for individual records
-                    priority=CachePriority.HIGH
-                )
-            
-            return record
-        
-        return None
+        """
+        Get single record by ID.
+        Concurrent calls are merged into one batch fetch; within a request
+        scope the record is also memoized for the rest of the request.
+        """
+        if not use_cache:
+            records = await self._fetch_records_by_ids([str(id)])
+            record = records.get(str(id))
+            return self._deserialize(record) if record is not None else None
+        
+        record = await self._loader().load(str(id))
+        return self._deserialize(record) if record is not None else None
+    
+    def _loader(self) -> DataLoader:
+        """The current request's loader for this repository, or the shared coalescer."""
+        return get_request_loader(self, self._new_request_loader) or self._coalescer
+    
+    def _new_request_loader(self) -> DataLoader:
+        return DataLoader(self._batch_load_records, max_batch_size=self.BATCH_FETCH_CHUNK_SIZE)
+    
+    async def _batch_load_records(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """DataLoader batch function: raw records aligned with ids."""
+        records = await self._load_records_by_ids(ids, use_cache=True)
+        return [records.get(id) for id in ids]
     
     async def get_by_filters(
         self,
@@ -329,6 +321,7 @@ class BaseRepository(Generic[T], ABC):
         
         if result and len(result) > 0:
             # Invalidate related cache entries
+            self._loader().clear(str(id))
             await self._invalidate_related_caches({"id": id, **data})
             
             return self._deserialize(result[0])
@@ -357,78 +350,91 @@ class BaseRepository(Generic[T], ABC):
         
         if result:
             # Invalidate all related cache entries
+            self._loader().clear(str(id))
             await self._invalidate_related_caches({"id": id})
             return True
         
         return False
     
     async def batch_get_by_ids(self, ids: List[str], use_cache: bool = True) -> List[T]:
-        """Get multiple records by IDs using parallel queries."""
+        """
+        Get multiple records by IDs: one cache multi-get, one id=in.(...) query
+        per chunk of misses and one pipelined cache write-back.
+        Order follows ids; missing IDs are skipped.
+        """
         if not ids:
             return []
         
-        # Check cache for each ID
-        cached_results = {}
-        uncached_ids = []
+        records = await self._load_records_by_ids(ids, use_cache=use_cache)
+        return [self._deserialize(records[str(id)]) for id in ids if str(id) in records]
+    
+    async def _load_records_by_ids(self, ids: List[str], use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Raw records keyed by ID, served from cache where possible."""
+        unique_ids = list(dict.fromkeys(str(id) for id in ids))
+        records: Dict[str, Dict[str, Any]] = {}
+        missing_ids = unique_ids
         
         if use_cache:
-            cache_keys = [(id, self._get_cache_key("get_by_id", id=id)) for id in ids]
-            cache_tasks = [cache_manager.get(cache_key) for _, cache_key in cache_keys]
-            cache_results = await asyncio.gather(*cache_tasks, return_exceptions=True)
-            
-            for (id, _), cache_result in zip(cache_keys, cache_results):
-                if not isinstance(cache_result, Exception) and cache_result is not None:
-                    cached_results[id] = self._deserialize(cache_result)
-                    self.metrics.cache_hits += 1
-                else:
-                    uncached_ids.append(id)
-        else:
-            uncached_ids = ids
-        
-        # Fetch uncached IDs in parallel
-        uncached_results = {}
-        if uncached_ids:
-            # Create parallel queries
-            queries = []
-            for id in uncached_ids:
-                context = QueryContext(
-                    query_type="get_by_id",
-                    table=self.table_name,
-                    operation="select",
-                    use_service_key=True,
-                    enable_caching=False  # We'll handle caching manually
-                )
-                queries.append((context, None, {"id": id}))
+            cache_keys = {id: self._get_cache_key("get_by_id", id=id) for id in unique_ids}
+            try:
+                cached = await get_cache_manager().get_many(list(cache_keys.values()))
+            except Exception as e:
+                logger.warning(f"⚠️ [REPO] Cache multi-get failed for {self.table_name}: {e}")
+                cached = {}
             
-            # Execute in parallel
-            parallel_results = await self._execute_parallel_queries(queries)
+            for id, cache_key in cache_keys.items():
+                if cache_key in cached:
+                    records[id] = cached[cache_key]
+            self.metrics.cache_hits += len(records)
+            missing_ids = [id for id in unique_ids if id not in records]
+        
+        if missing_ids:
+            fetched = await self._fetch_records_by_ids(missing_ids)
+            records.update(fetched)
             
-            # Process results
-            for id, result in zip(uncached_ids, parallel_results):
-                if result and len(result) > 0:
-                    record = self._deserialize(result[0])
-                    uncached_results[id] = record
-                    
-                    # Cache the result
-                    if use_cache:
-                        cache_key = self._get_cache_key("get_by_id", id=id)
-                        await cache_manager.set(
-                            cache_key,
-                            result[0],
-                            ttl=300,
-                            priority=CachePriority.HIGH
-                        )
-        
-        # Combine cached and uncached results, preserving order
-        final_results = []
-        for id in ids:
-            if id in cached_results:
-                final_results.append(cached_results[id])
-            elif id in uncached_results:
-                final_results.append(uncached_results[id])
-            # Note: Missing IDs are skipped (could also append None if needed)
-        
-        return final_results
+            if use_cache and fetched:
+                try:
+                    await get_cache_manager().set_many(
+                        {cache_keys[id]: record for id, record in fetched.items()},
+                        l1_ttl=300,  # 5 minutes for individual records
+                        l2_ttl=300,
+                        priority=2
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ [REPO] Cache write-back failed for {self.table_name}: {e}")
+        
+        return records
+    
+    async def _fetch_records_by_ids(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch records with id=in.(...) queries, chunked and run concurrently."""
+        start_time = time.time()
+        chunks = [
+            ids[i:i + self.BATCH_FETCH_CHUNK_SIZE]
+            for i in range(0, len(ids), self.BATCH_FETCH_CHUNK_SIZE)
+        ]
+        
+        try:
+            results = await asyncio.gather(*(
+                self.db_client.execute_query_async(
+                    self.table_name,
+                    "select",
+                    filters={"id": chunk},
+                    use_service_key=True  # Use service key for faster auth bypass
+                )
+                for chunk in chunks
+            ))
+        except Exception as e:
+            execution_time = (time.time() - start_time) * 1000
+            self._update_metrics(execution_time, "error", "get_by_id")
+            logger.error(f"❌ [REPO] Batch fetch of {len(ids)} {self.table_name} failed after {execution_time:.1f}ms: {e}")
+            raise
+        
+        execution_time = (time.time() - start_time) * 1000
+        self.metrics.parallel_query_count += len(chunks)
+        self._update_metrics(execution_time, "batch", "get_by_id")
+        logger.debug(f"🚀 [REPO] Batch fetch: {len(ids)} {self.table_name} in {len(chunks)} queries, {execution_time:.1f}ms")
+        
+        return {str(record["id"]): record for rows in results for record in (rows or [])}
     
     async def get_performance_metrics(self) -> Dict[str, Any]:
         """Get repository performance metrics."""
@@ -499,6 +505,9 @@ class BaseRepository(Generic[T], ABC):
     async def _invalidate_related_caches(self, data: Dict[str, Any]):
         """Invalidate cache entries related to the changed data."""
         try:
+            if data.get("id"):
+                await get_cache_manager().invalidate_multi_level(self._get_cache_key("get_by_id", id=data["id"]))
+            
             patterns_to_invalidate = [
                 f"{self.cache_namespace}:get_by_id:{data.get('id', '*')}",
                 f"{self.cache_namespace}:get_by_filters:*",
@@ -174,4 +174,81 @@ class CreditRepository:
             return await self.create_transaction(transaction_data)
         except Exception as e:
             logger.error(f"Failed to log credit purchase: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    # === Reservation ledger (migration 018) ===
+    
+    async def reserve_credits(
+        self,
+        user_id: str,
+        amount: int,
+        idempotency_key: str,
+        generation_id: Optional[str] = None,
+        transaction_type: str = "usage",
+        description: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        commit: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Reserve credits with one conditional UPDATE in the database.
+        Returns {success, replayed, status, balance, user, error}.
+        """
+        try:
+            return await self.db.execute_rpc_async(
+                "reserve_credits",
+                {
+                    "p_user_id": str(user_id),
+                    "p_amount": amount,
+                    "p_idempotency_key": idempotency_key,
+                    "p_generation_id": str(generation_id) if generation_id else None,
+                    "p_transaction_type": transaction_type,
+                    "p_description": description,
+                    "p_metadata": metadata or {},
+                    "p_commit": commit
+                },
+                use_service_key=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to reserve {amount} credits for user {user_id}: {e}")
+            raise
+    
+    async def commit_reservation(self, idempotency_key: str) -> Dict[str, Any]:
+        """Finalise a reservation; safe to repeat."""
+        try:
+            return await self.db.execute_rpc_async(
+                "commit_credit_reservation",
+                {"p_idempotency_key": idempotency_key},
+                use_service_key=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to commit credit reservation {idempotency_key}: {e}")
+            raise
+    
+    async def refund_reservation(self, idempotency_key: str, reason: Optional[str] = None) -> Dict[str, Any]:
+        """Return reserved credits to the user; refunds at most once."""
+        try:
+            return await self.db.execute_rpc_async(
+                "refund_credit_reservation",
+                {"p_idempotency_key": idempotency_key, "p_reason": reason},
+                use_service_key=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to refund credit reservation {idempotency_key}: {e}")
+            raise
+    
+    async def reserve_credits_batch(self, items: List[Dict[str, Any]], commit: bool = False) -> List[Dict[str, Any]]:
+        """
+        Reserve many items in one set-based RPC.
+        Returns one result per distinct idempotency key, in input order;
+        items with a non-positive amount come back with error 'invalid_amount'.
+        """
+        try:
+            return await self.db.execute_rpc_async(
+                "reserve_credits_batch",
+                {"p_items": items, "p_commit": commit},
+                use_service_key=True,
+                timeout=15.0
+            ) or []
+        except Exception as e:
+            logger.error(f"Failed to reserve credit batch of {len(items)} items: {e}")
+            raise
@@ -0,0 +1,135 @@
+"""
+Generation job queue repository.
+Following CLAUDE.md: Pure database layer, no business logic.
+All operations are RPCs defined in migrations/019_generation_job_queue.sql.
+"""
+from typing import Optional, List, Dict, Any
+import logging
+
+from database import SupabaseClient
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJobRepository:
+    """Repository for generation_jobs queue operations."""
+
+    def __init__(self, db_client: SupabaseClient):
+        self.db = db_client
+
+    async def enqueue(
+        self,
+        generation_id: str,
+        model_id: str,
+        payload: Dict[str, Any],
+        priority: int,
+        max_attempts: int
+    ) -> Dict[str, Any]:
+        """Enqueue a generation; returns {job_id, status, created}. Idempotent per generation."""
+        try:
+            return await self.db.execute_rpc_async(
+                "enqueue_generation_job",
+                {
+                    "p_generation_id": str(generation_id),
+                    "p_model_id": model_id,
+                    "p_payload": payload,
+                    "p_priority": priority,
+                    "p_max_attempts": max_attempts
+                },
+                use_service_key=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to enqueue generation job for {generation_id}: {e}")
+            raise
+
+    async def claim(
+        self,
+        worker_id: str,
+        model_limits: Dict[str, int],
+        limit: int,
+        lease_seconds: int,
+        priorities: List[int]
+    ) -> List[Dict[str, Any]]:
+        """Lease up to `limit` ready jobs to `worker_id`."""
+        try:
+            rows = await self.db.execute_rpc_async(
+                "claim_generation_jobs",
+                {
+                    "p_worker_id": worker_id,
+                    "p_model_limits": model_limits,
+                    "p_limit": limit,
+                    "p_lease_seconds": lease_seconds,
+                    "p_priorities": priorities
+                },
+                use_service_key=True
+            )
+            return rows or []
+        except Exception as e:
+            logger.error(f"Failed to claim generation jobs for worker {worker_id}: {e}")
+            raise
+
+    async def heartbeat(self, worker_id: str, job_ids: List[str], lease_seconds: int) -> List[str]:
+        """Extend leases; returns the job ids the worker still owns."""
+        try:
+            owned = await self.db.execute_rpc_async(
+                "heartbeat_generation_jobs",
+                {"p_worker_id": worker_id, "p_job_ids": job_ids, "p_lease_seconds": lease_seconds},
+                use_service_key=True
+            )
+            return owned or []
+        except Exception as e:
+            logger.error(f"Failed to heartbeat generation jobs for worker {worker_id}: {e}")
+            raise
+
+    async def start(self, job_id: str, worker_id: str) -> bool:
+        """Record that the lease holder began processing; False if the lease is gone."""
+        try:
+            return bool(await self.db.execute_rpc_async(
+                "start_generation_job",
+                {"p_job_id": job_id, "p_worker_id": worker_id},
+                use_service_key=True
+            ))
+        except Exception as e:
+            logger.error(f"Failed to start generation job {job_id}: {e}")
+            raise
+
+    async def complete(self, job_id: str, worker_id: str) -> bool:
+        """Mark a leased job completed."""
+        try:
+            return bool(await self.db.execute_rpc_async(
+                "complete_generation_job",
+                {"p_job_id": job_id, "p_worker_id": worker_id},
+                use_service_key=True
+            ))
+        except Exception as e:
+            logger.error(f"Failed to complete generation job {job_id}: {e}")
+            raise
+
+    async def fail(self, job_id: str, worker_id: str, error: str, retry_delay_seconds: int) -> Optional[str]:
+        """Record a failed attempt; returns the new job status ('queued' or 'dead')."""
+        try:
+            return await self.db.execute_rpc_async(
+                "fail_generation_job",
+                {
+                    "p_job_id": job_id,
+                    "p_worker_id": worker_id,
+                    "p_error": error,
+                    "p_retry_delay_seconds": retry_delay_seconds
+                },
+                use_service_key=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to record failure for generation job {job_id}: {e}")
+            raise
+
+    async def release(self, job_id: str, worker_id: str) -> bool:
+        """Hand a leased job back to the queue without counting the attempt."""
+        try:
+            return bool(await self.db.execute_rpc_async(
+                "release_generation_job",
+                {"p_job_id": job_id, "p_worker_id": worker_id},
+                use_service_key=True
+            ))
+        except Exception as e:
+            logger.error(f"Failed to release generation job {job_id}: {e}")
+            raise
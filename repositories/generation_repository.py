@@ -9,6 +9,8 @@ import logging
 
 from database import SupabaseClient
 from models.generation import GenerationResponse, GenerationStatus
+from utils.generation_lineage_cache import invalidate_generation_lineage
+from utils.pagination import KeysetPage, decode_cursor, fetch_keyset_page
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +18,30 @@ logger = logging.getLogger(__name__)
 class GenerationRepository:
     """Repository for generation database operations."""
     
+    # Stats are invalidated on every write made through this repository;
+    # the TTL only bounds staleness from writes on other nodes.
+    STATS_CACHE_TTL = 60
+    
+    # Columns the authorization layer's cached inheritance chains are built from
+    LINEAGE_FIELDS = ("parent_generation_id", "user_id")
+    
     def __init__(self, db_client: SupabaseClient):
         self.db = db_client
     
+    @staticmethod
+    def _stats_cache_key(user_id: Any) -> str:
+        return f"generation_stats:{user_id}"
+    
+    async def _invalidate_stats_cache(self, user_id: Any):
+        """Drop cached stats after a generation write for this user."""
+        if not user_id:
+            return
+        try:
+            from utils.cache_manager import get_cache_manager, CacheLevel
+            await get_cache_manager().invalidate(self._stats_cache_key(user_id), CacheLevel.L1_MEMORY)
+        except Exception as e:
+            logger.warning(f"⚠️ [GENERATION-STATS] Failed to invalidate stats cache for user {user_id}: {e}")
+    
     def _transform_db_record(self, db_record: Dict[str, Any]) -> Dict[str, Any]:
         """Transform database record to match GenerationResponse model."""
         # Create a copy to avoid mutating the original - db_record is already a dict
@@ -103,6 +126,9 @@ class GenerationRepository:
                     raise ValueError("Generation creation returned no data")
             
             logger.info(f"✅ [DB-CREATE] Database insert completed")
+            await self._invalidate_stats_cache(generation_data.get("user_id"))
+            # The parent's cached chain lists its children
+            await invalidate_generation_lineage(generation_data.get("parent_generation_id"))
             logger.info(f"🔍 [DB-CREATE] Insert result type: {type(result)}, length: {len(result) if isinstance(result, list) else 'N/A'}")
             
             # Supabase returns a list for inserts, take the first item
@@ -207,6 +233,18 @@ class GenerationRepository:
             if "storage_size" in update_data:
                 logger.info(f"📊 [DB-UPDATE] Storage size: {update_data['storage_size']} bytes")
             
+            lineage_changed = any(field in update_data for field in self.LINEAGE_FIELDS)
+            previous_parent_id = None
+            if "parent_generation_id" in update_data:
+                previous = await self.db.execute_query_async(
+                    "generations",
+                    "select",
+                    filters={"id": str(generation_id)},
+                    use_service_key=True,
+                    single=True
+                )
+                previous_parent_id = previous.get("parent_generation_id") if isinstance(previous, dict) else None
+            
             logger.info(f"🔍 [DB-UPDATE] Executing database update query...")
             result = self.db.execute_query(
                 "generations",
@@ -218,6 +256,14 @@ class GenerationRepository:
             )
             
             logger.info(f"✅ [DB-UPDATE] Database update completed successfully")
+            if isinstance(result, dict):
+                await self._invalidate_stats_cache(result.get("user_id"))
+            if lineage_changed:
+                await invalidate_generation_lineage(
+                    generation_id,
+                    previous_parent_id,
+                    result.get("parent_generation_id") if isinstance(result, dict) else None
+                )
             logger.info(f"🔍 [DB-UPDATE] Raw database result keys: {list(result.keys()) if isinstance(result, dict) else 'Non-dict result'}")
             
             transformed_record = self._transform_db_record(result)
@@ -266,62 +312,59 @@ class GenerationRepository:
         offset: int = 0,
         auth_token: Optional[str] = None
     ) -> List[GenerationResponse]:
-        """List generations for a user with optional filters."""
-        logger.info(f"🔍 [DB-LIST] Listing generations for user {user_id}, project_id={project_id}, auth_token: {'***' + auth_token[-10:] if auth_token else 'None'}")
+        """List generations for a user with optional filters, newest first."""
+        page = await self.list_user_generations_page(
+            user_id=user_id,
+            project_id=project_id,
+            status=status,
+            limit=limit,
+            offset=offset,
+            auth_token=auth_token
+        )
+        return page.items
+    
+    async def list_user_generations_page(
+        self,
+        user_id: str,
+        project_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        count: Optional[str] = None,
+        auth_token: Optional[str] = None
+    ) -> KeysetPage:
+        """
+        One keyset page of a user's generations, newest first.
         
+        Ordering and limit run in PostgREST on idx_generations_user_created_id
+        (migration 017), so any page transfers at most limit + 1 rows.
+        
+        Raises:
+            utils.pagination.InvalidCursorError: If cursor is malformed
+        """
+        logger.info(f"🔍 [DB-LIST] Listing generations for user {user_id}, project_id={project_id}, cursor={'yes' if cursor else 'no'}, offset={offset}, limit={limit}")
+        
+        filters = {"user_id": str(user_id)}  # Ensure user_id is string for JSON serialization
+        if project_id:
+            filters["project_id"] = project_id
+        if status:
+            filters["status"] = status
+        if cursor:
+            decode_cursor(cursor)  # Reject malformed cursors before touching the database
+        
+        page_kwargs = dict(filters=filters, limit=limit, cursor=cursor, offset=offset, count=count)
         try:
-            filters = {"user_id": str(user_id)}  # Ensure user_id is string for JSON serialization
-            
-            if project_id:
-                filters["project_id"] = project_id
-                logger.info(f"🔍 [DB-LIST] Adding project_id filter: {project_id}")
-                
-            if status:
-                filters["status"] = status
-            
-            logger.info(f"🔍 [DB-LIST] Query filters: {filters}")
-            
-            # CRITICAL FIX: Try service key first, then fallback to auth token
-            result = None
             try:
-                # Try service key first for reliable access
-                result = self.db.execute_query(
-                    "generations",
-                    "select",
-                    filters=filters,
-                    use_service_key=True,  # Use service key to bypass RLS for reliable queries
-                    user_id=user_id
-                )
-                logger.info(f"✅ [DB-LIST] Service key query successful")
+                # Service key first for reliable access, then JWT for RLS
+                page = await fetch_keyset_page(self.db, "generations", use_service_key=True, **page_kwargs)
             except Exception as service_error:
                 logger.warning(f"⚠️ [DB-LIST] Service key failed, trying auth token: {service_error}")
-                # Fallback to auth token
-                result = self.db.execute_query(
-                    "generations",
-                    "select",
-                    filters=filters,
-                    auth_token=auth_token,  # Pass JWT token for RLS authentication
-                    user_id=user_id  # Pass user_id for RLS context
-                )
-            
-            logger.info(f"✅ [DB-LIST] Database query returned {len(result)} records")
-            if project_id:
-                # Log specific project filtering results
-                project_matches = [g for g in result if g.get("project_id") == project_id]
-                logger.info(f"🔍 [DB-LIST] Project filter match count: {len(project_matches)} out of {len(result)} total records")
-                if len(project_matches) != len(result):
-                    logger.warning(f"⚠️ [DB-LIST] Project filter discrepancy detected!")
-                    # Log a few example records for debugging
-                    for i, gen in enumerate(result[:3]):
-                        logger.info(f"🔍 [DB-LIST] Sample record {i}: project_id={gen.get('project_id')}, expected={project_id}")
+                page = await fetch_keyset_page(self.db, "generations", auth_token=auth_token, **page_kwargs)
             
-            # Sort by created_at desc and apply pagination
-            sorted_result = sorted(result, key=lambda x: x["created_at"], reverse=True)
-            paginated_result = sorted_result[offset:offset + limit]
-            
-            logger.info(f"✅ [DB-LIST] Returning {len(paginated_result)} paginated records (offset={offset}, limit={limit})")
-            
-            return [GenerationResponse(**self._transform_db_record(gen)) for gen in paginated_result]
+            page.items = [GenerationResponse(**self._transform_db_record(gen)) for gen in page.items]
+            logger.info(f"✅ [DB-LIST] Returning {len(page.items)} records (more={'yes' if page.next_cursor else 'no'})")
+            return page
         except Exception as e:
             logger.error(f"Failed to list generations for user {user_id}: {e}")
             raise
@@ -344,82 +387,69 @@ class GenerationRepository:
     async def delete_generation(self, generation_id: str) -> bool:
         """Delete a generation record."""
         try:
-            self.db.execute_query(
+            deleted = self.db.execute_query(
                 "generations",
                 "delete",
                 filters={"id": generation_id},
                 use_service_key=True  # Use service key to bypass RLS for backend operations
             )
+            for record in deleted or []:
+                await self._invalidate_stats_cache(record.get("user_id"))
+                await invalidate_generation_lineage(record.get("id"), record.get("parent_generation_id"))
             return True
         except Exception as e:
             logger.error(f"Failed to delete generation {generation_id}: {e}")
             return False
     
     async def get_user_generation_stats(self, user_id: str) -> Dict[str, Any]:
-        """Get generation statistics for a user."""
+        """
+        Get generation statistics for a user.
+        Reads the trigger-maintained user_generation_stats rollup through a
+        single RPC (migration 016) instead of loading every generation row.
+        """
+        from utils.cache_manager import get_cache_manager, CacheLevel
+        
+        cache_key = self._stats_cache_key(user_id)
+        try:
+            cached_stats = await get_cache_manager().get(cache_key, CacheLevel.L1_MEMORY)
+            if cached_stats:
+                logger.debug(f"💾 [GENERATION-STATS] Cache hit for user {user_id}")
+                return dict(cached_stats)
+        except Exception as e:
+            logger.warning(f"⚠️ [GENERATION-STATS] Cache lookup failed: {e}")
+        
         try:
             logger.info(f"🔍 [GENERATION-STATS] Getting stats for user {user_id}")
             
-            result = self.db.execute_query(
-                "generations",
-                "select",
-                filters={"user_id": str(user_id)}  # Ensure user_id is string for JSON serialization
+            stats = await self.db.execute_rpc_async(
+                "get_user_generation_stats",
+                {"p_user_id": str(user_id)},  # Ensure user_id is string for JSON serialization
+                use_service_key=True  # Function is only granted to the service role
             )
-            
-            logger.info(f"🔍 [GENERATION-STATS] Query returned {len(result)} generations")
-            
-            # Calculate stats with robust string comparisons
-            total_generations = len(result)
-            
-            # Use string values for comparison instead of enum values for better reliability
-            completed_generations = len([g for g in result if str(g.get("status", "")).lower() == "completed"])
-            failed_generations = len([g for g in result if str(g.get("status", "")).lower() == "failed"])
-            processing_generations = len([g for g in result if str(g.get("status", "")).lower() in ["pending", "processing"]])
-            favorite_generations = len([g for g in result if g.get("is_favorite", False) is True])
-            
-            # Handle credits_used carefully - it might be None
-            total_credits_used = 0
-            for g in result:
-                credits = g.get("credits_used") or g.get("cost", 0)  # Fallback to cost field
-                if credits and isinstance(credits, (int, float)):
-                    total_credits_used += credits
-            
-            logger.info(f"✅ [GENERATION-STATS] Calculated: total={total_generations}, completed={completed_generations}, failed={failed_generations}, processing={processing_generations}")
-            
-            # Group by generation type - handle potential None values
-            type_stats = {}
-            for gen in result:
-                gen_type = gen.get("generation_type") or gen.get("media_type", "unknown")
-                if gen_type not in type_stats:
-                    type_stats[gen_type] = 0
-                type_stats[gen_type] += 1
-            
-            # Group by model - handle potential None values
-            model_stats = {}
-            for gen in result:
-                model_id = gen.get("model_id", "unknown")
-                if model_id not in model_stats:
-                    model_stats[model_id] = 0
-                model_stats[model_id] += 1
-            
-            # Calculate success rate safely
-            success_rate = 0.0
-            if total_generations > 0:
-                success_rate = round((completed_generations / total_generations) * 100, 2)
+            if isinstance(stats, list):
+                stats = stats[0] if stats else None
+            if not isinstance(stats, dict):
+                raise ValueError(f"Unexpected stats RPC result: {type(stats).__name__}")
             
             stats_result = {
-                "total_generations": total_generations,
-                "completed_generations": completed_generations,
-                "failed_generations": failed_generations,
-                "processing_generations": processing_generations,
-                "favorite_generations": favorite_generations,
-                "total_credits_used": total_credits_used,
-                "type_breakdown": type_stats,
-                "model_breakdown": model_stats,
-                "success_rate": success_rate
+                "total_generations": int(stats.get("total_generations") or 0),
+                "completed_generations": int(stats.get("completed_generations") or 0),
+                "failed_generations": int(stats.get("failed_generations") or 0),
+                "processing_generations": int(stats.get("processing_generations") or 0),
+                "favorite_generations": int(stats.get("favorite_generations") or 0),
+                "total_credits_used": int(stats.get("total_credits_used") or 0),
+                "type_breakdown": {k: int(v) for k, v in (stats.get("type_breakdown") or {}).items()},
+                "model_breakdown": {k: int(v) for k, v in (stats.get("model_breakdown") or {}).items()},
+                "success_rate": float(stats.get("success_rate") or 0.0)
             }
             
-            logger.info(f"✅ [GENERATION-STATS] Stats calculation successful for user {user_id}")
+            logger.info(f"✅ [GENERATION-STATS] Calculated: total={stats_result['total_generations']}, completed={stats_result['completed_generations']}, failed={stats_result['failed_generations']}, processing={stats_result['processing_generations']}")
+            
+            try:
+                await get_cache_manager().set(cache_key, stats_result, CacheLevel.L1_MEMORY, ttl=self.STATS_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"⚠️ [GENERATION-STATS] Failed to cache stats: {e}")
+            
             return stats_result
             
         except Exception as e:
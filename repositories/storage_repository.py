@@ -3,15 +3,23 @@ Storage repository for Supabase Storage operations.
 Following CLAUDE.md: Pure repository layer, no business logic.
 Following PRD.MD: Secure, efficient file operations with user isolation.
 """
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
 from uuid import UUID, uuid4
-from datetime import datetime, timedelta
+from datetime import datetime
+import asyncio
 import logging
 import hashlib
 import io
+import re
 from pathlib import Path
 
+from config import settings
 from database import SupabaseClient
+from utils.connection_pool import get_pool
+from utils.pagination import InvalidCursorError, KeysetPage, fetch_keyset_page
+from utils.signed_url_service import signed_url_service
+from utils.async_postgrest import async_postgrest
+from utils.request_timing import span
 from models.storage import (
     FileMetadataCreate, 
     FileMetadataResponse, 
@@ -27,6 +35,10 @@ from models.storage import (
 
 logger = logging.getLogger(__name__)
 
+# {user_id}/cas/{sha256}.{ext}: content-addressed objects that several
+# file_metadata rows may reference
+CONTENT_ADDRESSED_PATH = re.compile(r"^[0-9a-fA-F-]{36}/cas/[0-9a-f]{64}\.[a-z0-9]{1,8}$")
+
 
 class StorageRepository:
     """Repository for Supabase Storage and file metadata operations."""
@@ -61,6 +73,29 @@ class StorageRepository:
             logger.error(f"Failed to create file metadata: {e}")
             raise
     
+    async def create_file_metadata_batch(
+        self,
+        metadata_list: List[FileMetadataCreate],
+        user_id: UUID
+    ) -> List[FileMetadataResponse]:
+        """Create several file metadata records with one insert."""
+        if not metadata_list:
+            return []
+        try:
+            now = datetime.utcnow().isoformat()
+            rows = [
+                {**metadata.dict(), "id": str(uuid4()), "user_id": str(user_id), "created_at": now, "updated_at": now}
+                for metadata in metadata_list
+            ]
+            
+            result = await self.db.execute_query_async("file_metadata", "insert", data=rows)
+            
+            return [FileMetadataResponse(**row) for row in result or []]
+            
+        except Exception as e:
+            logger.error(f"Failed to create {len(metadata_list)} file metadata records: {e}")
+            raise
+    
     async def get_file_metadata(self, file_id: UUID, user_id: UUID) -> Optional[FileMetadataResponse]:
         """Get file metadata by ID with user isolation."""
         try:
@@ -157,6 +192,22 @@ class StorageRepository:
         offset: int = 0
     ) -> List[FileMetadataResponse]:
         """List user's files with optional filtering."""
+        page = await self.list_user_files_page(
+            user_id, bucket_name=bucket_name, generation_id=generation_id, limit=limit, offset=offset
+        )
+        return page.items
+    
+    async def list_user_files_page(
+        self,
+        user_id: UUID,
+        bucket_name: Optional[StorageBucket] = None,
+        generation_id: Optional[UUID] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        count: Optional[str] = None
+    ) -> KeysetPage:
+        """One keyset page of user's files, newest first (idx_file_metadata_user_created_id)."""
         try:
             filters = {"user_id": str(user_id)}
             
@@ -166,17 +217,21 @@ class StorageRepository:
             if generation_id:
                 filters["generation_id"] = str(generation_id)
             
-            results = self.db.execute_query(
+            page = await fetch_keyset_page(
+                self.db,
                 "file_metadata",
-                "select",
                 filters=filters,
-                order_by="created_at:desc",
                 limit=limit,
-                offset=offset
+                cursor=cursor,
+                offset=offset,
+                count=count
             )
             
-            return [FileMetadataResponse(**result) for result in results]
+            page.items = [FileMetadataResponse(**result) for result in page.items]
+            return page
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Failed to list files for user {user_id}: {e}")
             raise
@@ -213,15 +268,16 @@ class StorageRepository:
                 file_path = f"{user_id_str}/{file_path}"
             
             # Upload to storage
-            result = self.storage.from_(bucket_name.value).upload(
-                path=file_path,
-                file=file_data,
-                file_options={
-                    "content-type": content_type,
-                    "cache-control": "3600",  # 1 hour cache
-                    "upsert": False  # Prevent overwriting
-                }
-            )
+            with span("storage"):
+                result = self.storage.from_(bucket_name.value).upload(
+                    path=file_path,
+                    file=file_data,
+                    file_options={
+                        "content-type": content_type,
+                        "cache-control": "3600",  # 1 hour cache
+                        "upsert": False  # Prevent overwriting
+                    }
+                )
             
             if result.get("error"):
                 raise Exception(f"Storage upload error: {result['error']}")
@@ -232,6 +288,85 @@ class StorageRepository:
             logger.error(f"Failed to upload file {file_path} to {bucket_name}: {e}")
             raise
     
+    async def upload_files(
+        self,
+        bucket_name: StorageBucket,
+        files: List[Tuple[str, bytes, str]],
+        user_id: UUID
+    ) -> List[Any]:
+        """
+        Upload several small objects concurrently over the async Storage client.
+        
+        Args:
+            files: (file_path, file_data, content_type) tuples
+            
+        Returns:
+            The stored path for each file, or the exception it failed with
+        """
+        user_id_str = str(user_id)
+        bucket = StorageBucket(bucket_name).value
+        
+        async def upload(file_path: str, file_data: bytes, content_type: str) -> str:
+            # Ensure file path starts with user ID for RLS
+            if not file_path.startswith(f"{user_id_str}/"):
+                file_path = f"{user_id_str}/{file_path}"
+            await async_postgrest.storage_upload(
+                bucket, file_path, file_data, content_type=content_type, cache_max_age=3600
+            )
+            return file_path
+        
+        results = await asyncio.gather(*(upload(*file) for file in files), return_exceptions=True)
+        for (file_path, _, _), result in zip(files, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to upload file {file_path} to {bucket}: {result}")
+        return results
+    
+    async def upload_file_stream(
+        self,
+        bucket_name: StorageBucket,
+        file_path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str,
+        user_id: UUID,
+        content_length: Optional[int] = None,
+        timeout: float = 300.0
+    ) -> str:
+        """
+        Stream file chunks into Supabase Storage without buffering the object.
+        
+        Talks to the Storage REST API directly over the shared HTTP pool, since
+        the supabase-py storage client only accepts fully materialized bodies.
+        """
+        try:
+            # Ensure file path starts with user ID for RLS
+            user_id_str = str(user_id)
+            if not file_path.startswith(f"{user_id_str}/"):
+                file_path = f"{user_id_str}/{file_path}"
+            
+            service_key = settings.supabase_service_role_key
+            headers = {
+                "Authorization": f"Bearer {service_key}",
+                "apikey": service_key,
+                "Content-Type": content_type,
+                "Cache-Control": "max-age=3600",  # 1 hour cache
+                "x-upsert": "false"  # Prevent overwriting
+            }
+            if content_length:
+                headers["Content-Length"] = str(content_length)
+            
+            url = f"{settings.supabase_url.rstrip('/')}/storage/v1/object/{bucket_name.value}/{file_path}"
+            async with get_pool().get_connection() as client:
+                response = await client.post(url, content=chunks, headers=headers, timeout=timeout)
+            
+            if response.status_code >= 400:
+                raise Exception(f"Storage upload error: {response.status_code} {response.text[:200]}")
+            
+            return file_path
+            
+        except Exception as e:
+            logger.error(f"Failed to stream file {file_path} to {bucket_name}: {e}")
+            raise
+    
     async def download_file(
         self, 
         bucket_name: StorageBucket, 
@@ -245,7 +380,8 @@ class StorageRepository:
             if not file_path.startswith(f"{user_id_str}/"):
                 raise PermissionError("Access denied: file does not belong to user")
             
-            result = self.storage.from_(bucket_name.value).download(file_path)
+            with span("storage"):
+                result = self.storage.from_(bucket_name.value).download(file_path)
             
             if isinstance(result, dict) and result.get("error"):
                 raise Exception(f"Storage download error: {result['error']}")
@@ -256,6 +392,27 @@ class StorageRepository:
             logger.error(f"Failed to download file {file_path} from {bucket_name}: {e}")
             raise
     
+    async def open_download_stream(
+        self,
+        bucket_name: StorageBucket,
+        file_path: str,
+        user_id: UUID,
+        request_headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        Open a streaming download from Supabase Storage. Returns the upstream
+        aiohttp response; the caller iterates response.content and releases it.
+        """
+        user_id_str = str(user_id)
+        if not file_path.startswith(f"{user_id_str}/"):
+            raise PermissionError("Access denied: file does not belong to user")
+        
+        try:
+            return await async_postgrest.storage_open(StorageBucket(bucket_name).value, file_path, request_headers)
+        except Exception as e:
+            logger.error(f"Failed to open download stream for {file_path} from {bucket_name}: {e}")
+            raise
+    
     async def delete_file(
         self, 
         bucket_name: StorageBucket, 
@@ -269,7 +426,8 @@ class StorageRepository:
             if not file_path.startswith(f"{user_id_str}/"):
                 raise PermissionError("Access denied: file does not belong to user")
             
-            result = self.storage.from_(bucket_name.value).remove([file_path])
+            with span("storage"):
+                result = self.storage.from_(bucket_name.value).remove([file_path])
             
             if isinstance(result, dict) and result.get("error"):
                 raise Exception(f"Storage delete error: {result['error']}")
@@ -302,28 +460,14 @@ class StorageRepository:
             
             logger.info(f"✅ [STORAGE-URL] File ownership verified, creating Supabase signed URL...")
             
-            result = self.storage.from_(bucket_name.value).create_signed_url(
-                path=file_path,
-                expires_in=expires_in
-            )
-            
-            logger.info(f"🔍 [STORAGE-URL] Supabase signed URL result type: {type(result)}")
-            logger.info(f"🔍 [STORAGE-URL] Supabase result keys: {list(result.keys()) if isinstance(result, dict) else 'Non-dict result'}")
+            bucket_name = StorageBucket(bucket_name)  # Metadata models hold plain enum values
+            signed = await signed_url_service.sign(bucket_name.value, file_path, expires_in)
             
-            if isinstance(result, dict) and result.get("error"):
-                logger.error(f"❌ [STORAGE-URL] Supabase signed URL error: {result['error']}")
-                raise Exception(f"Signed URL error: {result['error']}")
-            
-            signed_url = result["signedURL"]
-            expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
-            
-            logger.info(f"✅ [STORAGE-URL] Signed URL created successfully")
-            logger.info(f"🔗 [STORAGE-URL] URL: {signed_url[:100]}{'...' if len(signed_url) > 100 else ''}")
-            logger.info(f"🕰️ [STORAGE-URL] Expires at: {expires_at}")
+            logger.info(f"✅ [STORAGE-URL] Signed URL created successfully, expires at {signed.expires_at}")
             
             return StorageUrlResponse(
-                signed_url=signed_url,
-                expires_at=expires_at,
+                signed_url=signed.url,
+                expires_at=signed.expires_at,
                 file_path=file_path,
                 bucket_name=bucket_name
             )
@@ -335,6 +479,38 @@ class StorageRepository:
             logger.error(f"❌ [STORAGE-URL] URL creation traceback: {traceback.format_exc()}")
             raise
     
+    async def create_signed_urls(
+        self,
+        objects: List[Tuple[StorageBucket, str]],
+        expires_in: int,
+        user_id: UUID
+    ) -> Dict[Tuple[StorageBucket, str], StorageUrlResponse]:
+        """
+        Create signed URLs for many files in one round trip per bucket.
+        Files outside the user's folder or refused by Storage are omitted.
+        """
+        user_prefix = f"{user_id}/"
+        owned = [(bucket, path) for bucket, path in objects if path.startswith(user_prefix)]
+        if len(owned) < len(objects):
+            logger.warning(f"⚠️ [STORAGE-URL] Skipped {len(objects) - len(owned)} files not owned by user {user_id}")
+        
+        # Metadata models hold plain enum values; results stay keyed by the caller's pairs
+        signed = await signed_url_service.sign_many(
+            [(StorageBucket(bucket).value, path) for bucket, path in owned], expires_in
+        )
+        
+        urls = {}
+        for bucket, path in owned:
+            signed_url = signed.get((StorageBucket(bucket).value, path))
+            if signed_url is not None:
+                urls[(bucket, path)] = StorageUrlResponse(
+                    signed_url=signed_url.url,
+                    expires_at=signed_url.expires_at,
+                    file_path=path,
+                    bucket_name=StorageBucket(bucket)
+                )
+        return urls
+    
     async def create_upload_url(
         self, 
         bucket_name: StorageBucket, 
@@ -348,7 +524,8 @@ class StorageRepository:
             if not file_path.startswith(f"{user_id_str}/"):
                 file_path = f"{user_id_str}/{file_path}"
             
-            result = self.storage.from_(bucket_name.value).create_signed_upload_url(file_path)
+            with span("storage"):
+                result = self.storage.from_(bucket_name.value).create_signed_upload_url(file_path)
             
             if isinstance(result, dict) and result.get("error"):
                 raise Exception(f"Upload URL error: {result['error']}")
@@ -374,11 +551,12 @@ class StorageRepository:
             if not source_path.startswith(f"{user_id_str}/") or not dest_path.startswith(f"{user_id_str}/"):
                 raise PermissionError("Access denied: files must belong to user")
             
-            result = self.storage.from_(source_bucket.value).copy(
-                from_path=source_path,
-                to_path=dest_path,
-                destination_bucket=dest_bucket.value
-            )
+            with span("storage"):
+                result = self.storage.from_(source_bucket.value).copy(
+                    from_path=source_path,
+                    to_path=dest_path,
+                    destination_bucket=dest_bucket.value
+                )
             
             if isinstance(result, dict) and result.get("error"):
                 raise Exception(f"Copy error: {result['error']}")
@@ -389,6 +567,60 @@ class StorageRepository:
             logger.error(f"Failed to copy file from {source_bucket}/{source_path} to {dest_bucket}/{dest_path}: {e}")
             raise
     
+    async def copy_content_addressed_file(
+        self,
+        bucket_name: StorageBucket,
+        source_path: str,
+        user_id: UUID
+    ) -> str:
+        """
+        Server-side copy of another user's content-addressed object into the
+        user's own cas folder. Only cas objects can be copied across users;
+        their names are content hashes handed out by the generation result cache.
+        
+        Returns:
+            Destination path
+        """
+        try:
+            if not CONTENT_ADDRESSED_PATH.match(source_path):
+                raise PermissionError("Access denied: only content-addressed objects can be shared")
+            
+            dest_path = f"{user_id}/{source_path.split('/', 1)[1]}"
+            with span("storage"):
+                result = self.storage.from_(bucket_name.value).copy(
+                    from_path=source_path,
+                    to_path=dest_path
+                )
+            
+            if isinstance(result, dict) and result.get("error"):
+                raise Exception(f"Copy error: {result['error']}")
+            
+            return dest_path
+            
+        except Exception as e:
+            logger.error(f"Failed to copy content-addressed file {bucket_name}/{source_path} for user {user_id}: {e}")
+            raise
+    
+    async def count_path_references(
+        self,
+        bucket_name: StorageBucket,
+        file_path: str,
+        user_id: UUID,
+        limit: int = 2
+    ) -> int:
+        """Number of the user's file_metadata rows pointing at a path, counted up to limit."""
+        rows = await self.db.execute_query_async(
+            "file_metadata",
+            "select",
+            filters={
+                "bucket_name": StorageBucket(bucket_name).value,
+                "file_path": file_path,
+                "user_id": str(user_id)
+            },
+            limit=limit
+        )
+        return len(rows or [])
+    
     async def move_file(
         self, 
         bucket_name: StorageBucket,
@@ -403,10 +635,11 @@ class StorageRepository:
             if not source_path.startswith(f"{user_id_str}/") or not dest_path.startswith(f"{user_id_str}/"):
                 raise PermissionError("Access denied: files must belong to user")
             
-            result = self.storage.from_(bucket_name.value).move(
-                from_path=source_path,
-                to_path=dest_path
-            )
+            with span("storage"):
+                result = self.storage.from_(bucket_name.value).move(
+                    from_path=source_path,
+                    to_path=dest_path
+                )
             
             if isinstance(result, dict) and result.get("error"):
                 raise Exception(f"Move error: {result['error']}")
@@ -601,11 +834,13 @@ class StorageRepository:
             True if file exists, False otherwise
         """
         try:
-            # Use storage client to check if file exists
-            result = self.storage.from_(bucket_name.value).list(
-                path=file_path,
-                limit=1
-            )
+            # List the parent folder, narrowed to entries matching the file name
+            folder, _, name = file_path.rpartition("/")
+            with span("storage"):
+                result = self.storage.from_(bucket_name.value).list(
+                    folder,
+                    {"limit": 100, "search": name}
+                )
             
             # If result is an error, file doesn't exist
             if isinstance(result, dict) and result.get("error"):
@@ -7,11 +7,12 @@ import logging
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from repositories.base_repository import BaseRepository, QueryContext, CachePriority
 from utils.enterprise_db_pool import PoolType
 from caching.multi_layer_cache_manager import cache_manager
+from utils.principal_cache import invalidate_user_profile
 from models.user import UserCreate, UserResponse, UserUpdate, User
 
 logger = logging.getLogger(__name__)
@@ -458,6 +459,7 @@ class UserRepository(BaseRepository[UserModel]):
                 use_service_key=False  # Use anon key - service key is invalid
             )
             if result:
+                invalidate_user_profile(user_id)
                 return UserResponse(**result)
             raise ValueError(f"User {user_id} not found")
         except Exception as e:
@@ -506,6 +508,7 @@ class UserRepository(BaseRepository[UserModel]):
             
             if result:
                 logger.info(f"✅ [USER_REPO] Profile updated successfully for user {user_id}")
+                invalidate_user_profile(user_id)
                 return UserResponse(**result)
             else:
                 logger.warning(f"⚠️ [USER_REPO] No user found with ID {user_id}")
@@ -524,6 +527,7 @@ class UserRepository(BaseRepository[UserModel]):
                 filters={"id": str(user_id)},  # Ensure user_id is string for JSON serialization
                 use_service_key=False  # Use anon key - service key is invalid
             )
+            invalidate_user_profile(user_id)
             return len(result) > 0
         except Exception as e:
             logger.error(f"Failed to delete user {user_id}: {e}")
@@ -591,6 +595,7 @@ class UserRepository(BaseRepository[UserModel]):
             
             if result:
                 logger.info(f"✅ [USER_REPO] Credit balance updated successfully for user {user_id}: {new_balance}")
+                invalidate_user_profile(user_id)
                 return UserResponse(**result)
             
             # CRITICAL ERROR: All update layers failed
@@ -769,44 +774,51 @@ class UserRepository(BaseRepository[UserModel]):
             logger.error(f"❌ [USER_REPO] Auth token available: {'Yes' if auth_token else 'No'}")
             raise ValueError(f"Credit balance lookup failed: {str(e)}")
     
-    async def deduct_credits(self, user_id: str, amount: int, auth_token: Optional[str] = None) -> UserResponse:
+    async def deduct_credits(
+        self,
+        user_id: str,
+        amount: int,
+        auth_token: Optional[str] = None,
+        generation_id: Optional[str] = None,
+        description: Optional[str] = None
+    ) -> UserResponse:
         """
-        Deduct credits from user's balance with enhanced auth context and JWT validation.
+        Deduct credits from user's balance in one round trip.
         
-        CRITICAL FIX: Added JWT validation to prevent expired token errors.
+        The reserve_credits RPC (migration 018) checks and debits with a single
+        conditional UPDATE and logs the credit transaction, so concurrent
+        deductions cannot overdraw. A generation is charged at most once.
+        auth_token is accepted for compatibility; the RPC runs with the
+        service key.
         """
         logger.info(f"💳 [USER_REPO] Deducting {amount} credits from user {user_id}")
         
+        idempotency_key = f"generation:{generation_id}" if generation_id else f"deduct:{uuid4()}"
         try:
-            # CRITICAL FIX: Validate JWT token before using it
-            validated_token = None
-            if auth_token:
-                is_valid = await self._validate_jwt_token(auth_token)
-                if is_valid:
-                    validated_token = auth_token
-                    logger.info(f"✅ [USER_REPO] JWT token validated for credit deduction: {user_id}")
-                else:
-                    logger.warning(f"⚠️ [USER_REPO] JWT token invalid/expired for deduction, using service key: {user_id}")
-            
-            # Get current balance with validated token context
-            current_user = await self.get_user_by_id(user_id, auth_token=validated_token)
-            if not current_user:
-                raise ValueError(f"User {user_id} not found")
-            
-            if current_user.credits_balance < amount:
-                raise ValueError(f"Insufficient credits. Required: {amount}, Available: {current_user.credits_balance}")
-            
-            new_balance = current_user.credits_balance - amount
-            logger.info(f"💳 [USER_REPO] Updating balance from {current_user.credits_balance} to {new_balance} for user {user_id}")
-            
-            return await self.update_credits_balance(user_id, new_balance, auth_token=validated_token)
-            
-        except ValueError:
-            # Re-raise validation errors as-is
-            raise
+            result = await self.db.execute_rpc_async(
+                "reserve_credits",
+                {
+                    "p_user_id": str(user_id),
+                    "p_amount": amount,
+                    "p_idempotency_key": idempotency_key,
+                    "p_generation_id": str(generation_id) if generation_id else None,
+                    "p_description": description or "Credit deduction",
+                    "p_commit": True
+                },
+                use_service_key=True
+            )
         except Exception as e:
             logger.error(f"❌ [USER_REPO] Failed to deduct {amount} credits from user {user_id}: {e}")
             raise ValueError(f"Credit deduction failed: {str(e)}")
+        
+        if not result or not result.get("success"):
+            result = result or {}
+            if result.get("error") == "user_not_found":
+                raise ValueError(f"User {user_id} not found")
+            raise ValueError(f"Insufficient credits. Required: {amount}, Available: {result.get('balance', 0)}")
+        
+        invalidate_user_profile(user_id)
+        return UserResponse(**result["user"])
     
     async def add_credits(self, user_id: str, amount: int, auth_token: Optional[str] = None) -> UserResponse:
         """
@@ -20,6 +20,7 @@ from services.supabase_auth import (
     security,
     SupabaseAuth
 )
+from utils.principal_cache import revoke_token
 
 logger = logging.getLogger(__name__)
 
@@ -319,6 +320,7 @@ async def logout(
         if token:
             auth = get_supabase_auth()
             await auth.sign_out(token)
+            revoke_token(token)
         
         logger.info(
             f"[{request_id}] User {current_user['id']} logged out",
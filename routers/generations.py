@@ -3,7 +3,7 @@ Generation API endpoints with comprehensive rate limiting and security.
 Following CLAUDE.md: Router layer for API endpoints.
 """
 from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, File, UploadFile, Form
 from fastapi.security import HTTPBearer
 import json
 
@@ -18,6 +18,7 @@ from models.generation import (
     GenerationStatsResponse
 )
 from models.user import UserResponse
+from utils.pagination import InvalidCursorError
 
 router = APIRouter(tags=["generations"])
 security = HTTPBearer()
@@ -274,13 +275,24 @@ async def create_generation(
 @limit("200/minute")  # Higher limit for list operations
 async def list_generations(
     request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     project_id: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page; overrides skip"),
+    count: Optional[str] = Query(None, regex="^(exact|planned|estimated)$", description="Return a total in X-Total-Count"),
+    include_media_urls: bool = Query(False, description="Embed signed URLs for stored media"),
     current_user: UserResponse = Depends(get_current_user)
 ):
     """
-    List user's generations with optional project filter.
+    List user's generations with optional project filter, newest first.
+    
+    Pagination is keyset-based: pass the X-Next-Cursor response header back
+    as `cursor` for the next page (absent on the last page). Every page costs
+    the same regardless of depth; `skip` is kept for older clients.
+    
+    With include_media_urls, each generation carries signed_media_url and
+    signed_output_urls, signed for the whole page in one batch.
     
     Rate limit: 200 requests per minute for list operations.
     """
@@ -297,17 +309,33 @@ async def list_generations(
         else:
             logger.warning(f"⚠️ [GENERATIONS-LIST] No auth token found in request headers for user {current_user.id}")
         
-        generations = await generation_service.list_user_generations(
+        page = await generation_service.list_user_generations_page(
             user_id=str(current_user.id),  # Convert UUID to string for JSON serialization
             project_id=project_id,
             limit=limit,
+            cursor=cursor,
             offset=skip,
+            count=count,
             auth_token=auth_token  # Pass auth token for database access
         )
         
-        logger.info(f"✅ [GENERATIONS-LIST] Successfully listed {len(generations)} generations for user {current_user.id}")
-        return generations
+        if include_media_urls:
+            try:
+                await generation_service.embed_media_urls(page.items, str(current_user.id))
+            except Exception as sign_error:
+                # The listing is still useful without URLs; clients fall back to /media-urls
+                logger.warning(f"⚠️ [GENERATIONS-LIST] Failed to embed media URLs: {sign_error}")
+        
+        if page.next_cursor:
+            response.headers["X-Next-Cursor"] = page.next_cursor
+        if page.total is not None:
+            response.headers["X-Total-Count"] = str(page.total)
         
+        logger.info(f"✅ [GENERATIONS-LIST] Successfully listed {len(page.items)} generations for user {current_user.id}")
+        return page.items
+        
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ [GENERATIONS-LIST] Failed to list generations for user {str(current_user.id)}: {str(e)}")
         logger.error(f"❌ [GENERATIONS-LIST] Error type: {type(e).__name__}")
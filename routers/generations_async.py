@@ -1,7 +1,7 @@
 """
 Async generation API endpoints for scalable FAL.ai integration.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List
 import json
@@ -9,6 +9,7 @@ import asyncio
 from pydantic import BaseModel, Field
 
 from services.fal_service_async import async_fal_service, QueueStatus
+from services.fal_completion_service import fal_completion_service
 from middleware.auth import get_current_user
 from models.user import UserResponse
 
@@ -184,6 +185,29 @@ async def cancel_generation(
         )
 
 
+@router.post("/webhooks/fal")
+async def fal_completion_webhook(
+    request: Request,
+    token: Optional[str] = Query(None)
+) -> Dict[str, Any]:
+    """
+    Receive FAL.ai queue completion webhooks.
+    
+    Public endpoint authenticated by the FAL_WEBHOOK_SECRET token embedded in
+    the webhook URL. Wakes every waiter and SSE stream for the request.
+    """
+    try:
+        payload = await request.json()
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook payload")
+    
+    accepted = await fal_completion_service.handle_webhook(payload, token=token)
+    if not accepted:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Webhook rejected")
+    
+    return {"received": True}
+
+
 @router.get("/user/history")
 async def get_user_generation_history(
     limit: int = 10,
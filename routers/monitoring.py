@@ -27,6 +27,7 @@ from monitoring.intelligent_alerting_system import intelligent_alerting_system
 from caching.redis_cache import authorization_cache, user_session_cache, permission_cache
 from services.authorization_service import authorization_service
 from utils.performance_monitor import performance_monitor
+from utils.request_timing import route_timing
 from database import get_database
 
 logger = logging.getLogger(__name__)
@@ -180,9 +181,9 @@ async def get_detailed_metrics():
         # Collect metrics from all components
         authorization_metrics = authorization_service.get_performance_metrics()
         cache_metrics = {
-            "authorization": authorization_cache.get_stats(),
-            "user_session": user_session_cache.get_stats(),
-            "permission": permission_cache.get_stats()
+            "authorization": await authorization_cache.get_stats(),
+            "user_session": await user_session_cache.get_stats(),
+            "permission": await permission_cache.get_stats()
         }
         security_metrics = security_logger.get_violation_summary()
         performance_metrics = performance_logger.get_performance_summary()
@@ -217,7 +218,7 @@ async def get_performance_summary():
         sla_compliance = 100.0 if avg_response_time < 100 else max(0, 100 - ((avg_response_time - 100) / 10))
         
         # Get cache performance
-        cache_stats = authorization_cache.get_stats()
+        cache_stats = await authorization_cache.get_stats()
         cache_hit_rate = cache_stats.get("hit_rate_percent", 0)
         
         return {
@@ -242,6 +243,32 @@ async def get_performance_summary():
         raise HTTPException(status_code=500, detail="Performance summary generation failed")
 
 
+@router.get("/performance/routes",
+           summary="Per-Route Timing",
+           description="Returns per-route p50/p95/p99 broken down by request stage")
+async def get_route_timing():
+    """Get per-route latency breakdown by stage (auth, db, cache, redis, fal, ...)."""
+    try:
+        breakdown = route_timing.get_breakdown()
+        breakdown["timestamp"] = datetime.now(timezone.utc).isoformat()
+        return breakdown
+    except Exception as e:
+        logger.error(f"Failed to get route timing: {e}")
+        raise HTTPException(status_code=500, detail="Route timing retrieval failed")
+
+
+@router.post("/performance/routes/reset",
+            summary="Reset Per-Route Timing",
+            description="Clears the per-route timing histograms")
+async def reset_route_timing():
+    """Reset per-route timing histograms."""
+    route_timing.reset()
+    return {
+        "message": "Route timing reset",
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
 @router.get("/security/violations",
            summary="Security Violations",
            description="Returns recent security violations and threat indicators")
@@ -293,9 +320,9 @@ async def invalidate_cache(cache_type: str, tag: Optional[str] = None):
             raise HTTPException(status_code=400, detail="Invalid cache type")
         
         if tag:
-            invalidated = cache.invalidate_by_tag(tag)
+            invalidated = await cache.invalidate_by_tag(tag)
         else:
-            cache.clear_all()
+            await cache.clear_all()
             invalidated = "all"
         
         # Log cache invalidation for security audit
@@ -385,7 +412,7 @@ async def _update_realtime_metrics():
             ("user_session", user_session_cache),
             ("permission", permission_cache)
         ]:
-            stats = cache.get_stats()
+            stats = await cache.get_stats()
             
             # Calculate cache size (approximate)
             cache_size = stats.get("memory_cache_entries", 0) * 1024  # Rough estimate
@@ -396,7 +423,7 @@ async def _update_realtime_metrics():
             )
         
         # Update Redis metrics if available
-        redis_info = authorization_cache.redis_client.info()
+        redis_info = await authorization_cache.redis_client.info()
         metrics_collector.cache_metrics.update_redis_metrics(
             active_connections=redis_info.get("connected_clients", 0),
             memory_used=redis_info.get("used_memory", 0),
@@ -444,7 +471,7 @@ async def _check_cache_health() -> Dict[str, Any]:
     """Check Redis cache connectivity and performance."""
     
     try:
-        health = authorization_cache.health_check()
+        health = await authorization_cache.health_check()
         return health
         
     except Exception as e:
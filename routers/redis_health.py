@@ -32,9 +32,7 @@ async def redis_health_check() -> Dict[str, Any]:
         # Test authorization cache
         try:
             auth_cache = get_authorization_cache()
-            auth_health = await asyncio.get_event_loop().run_in_executor(
-                None, auth_cache.health_check
-            )
+            auth_health = await auth_cache.health_check()
             cache_tests["authorization_cache"] = auth_health
         except Exception as e:
             cache_tests["authorization_cache"] = {
@@ -45,9 +43,7 @@ async def redis_health_check() -> Dict[str, Any]:
         # Test user session cache
         try:
             session_cache = get_user_session_cache()
-            session_health = await asyncio.get_event_loop().run_in_executor(
-                None, session_cache.health_check
-            )
+            session_health = await session_cache.health_check()
             cache_tests["user_session_cache"] = session_health
         except Exception as e:
             cache_tests["user_session_cache"] = {
@@ -58,9 +54,7 @@ async def redis_health_check() -> Dict[str, Any]:
         # Test permission cache
         try:
             perm_cache = get_permission_cache()
-            perm_health = await asyncio.get_event_loop().run_in_executor(
-                None, perm_cache.health_check
-            )
+            perm_health = await perm_cache.health_check()
             cache_tests["permission_cache"] = perm_health
         except Exception as e:
             cache_tests["permission_cache"] = {
@@ -132,25 +126,19 @@ async def redis_stats() -> Dict[str, Any]:
         
         try:
             auth_cache = get_authorization_cache()
-            cache_stats["authorization_cache"] = await asyncio.get_event_loop().run_in_executor(
-                None, auth_cache.get_stats
-            )
+            cache_stats["authorization_cache"] = await auth_cache.get_stats()
         except Exception as e:
             cache_stats["authorization_cache"] = {"error": str(e)}
         
         try:
             session_cache = get_user_session_cache()
-            cache_stats["user_session_cache"] = await asyncio.get_event_loop().run_in_executor(
-                None, session_cache.get_stats
-            )
+            cache_stats["user_session_cache"] = await session_cache.get_stats()
         except Exception as e:
             cache_stats["user_session_cache"] = {"error": str(e)}
         
         try:
             perm_cache = get_permission_cache()
-            cache_stats["permission_cache"] = await asyncio.get_event_loop().run_in_executor(
-                None, perm_cache.get_stats
-            )
+            cache_stats["permission_cache"] = await perm_cache.get_stats()
         except Exception as e:
             cache_stats["permission_cache"] = {"error": str(e)}
         
@@ -210,9 +198,7 @@ async def clear_redis_cache() -> Dict[str, Any]:
         # Clear authorization cache
         try:
             auth_cache = get_authorization_cache()
-            auth_cleared = await asyncio.get_event_loop().run_in_executor(
-                None, auth_cache.clear_all
-            )
+            auth_cleared = await auth_cache.clear_all()
             results["authorization_cache"] = {"success": auth_cleared}
         except Exception as e:
             results["authorization_cache"] = {"success": False, "error": str(e)}
@@ -220,9 +206,7 @@ async def clear_redis_cache() -> Dict[str, Any]:
         # Clear user session cache
         try:
             session_cache = get_user_session_cache()
-            session_cleared = await asyncio.get_event_loop().run_in_executor(
-                None, session_cache.clear_all
-            )
+            session_cleared = await session_cache.clear_all()
             results["user_session_cache"] = {"success": session_cleared}
         except Exception as e:
             results["user_session_cache"] = {"success": False, "error": str(e)}
@@ -230,9 +214,7 @@ async def clear_redis_cache() -> Dict[str, Any]:
         # Clear permission cache
         try:
             perm_cache = get_permission_cache()
-            perm_cleared = await asyncio.get_event_loop().run_in_executor(
-                None, perm_cache.clear_all
-            )
+            perm_cleared = await perm_cache.clear_all()
             results["permission_cache"] = {"success": perm_cleared}
         except Exception as e:
             results["permission_cache"] = {"success": False, "error": str(e)}
@@ -5,10 +5,9 @@ Following PRD.MD: Secure, efficient storage operations.
 """
 from typing import Optional, List
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Request, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, File, UploadFile, Form
 from fastapi.security import HTTPBearer
-from fastapi.responses import Response, StreamingResponse
-import io
+from fastapi.responses import Response, StreamingResponse, RedirectResponse
 import logging
 
 from middleware.auth import get_current_user
@@ -27,11 +26,29 @@ from models.storage import (
     ContentType
 )
 from models.user import UserResponse
+from utils.pagination import InvalidCursorError
+from storage3.utils import StorageException
 
 router = APIRouter(tags=["storage"])
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
+# Download proxying: per-request memory stays at one chunk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_REDIRECT_EXPIRES_IN = 300
+FORWARDED_DOWNLOAD_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+RELAYED_DOWNLOAD_HEADERS = ("content-length", "content-range", "accept-ranges", "etag", "last-modified")
+
+
+def _etag_matches(header_value: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak): '*' or any listed tag equal to etag."""
+    if not header_value:
+        return False
+    if header_value.strip() == "*":
+        return True
+    normalize = lambda tag: tag.strip().removeprefix("W/")
+    return any(normalize(tag) == normalize(etag) for tag in header_value.split(","))
+
 
 # === File Upload Endpoints ===
 
@@ -179,29 +196,79 @@ async def get_file_metadata(
 async def download_file(
     file_id: UUID,
     request: Request,
+    redirect: bool = Query(False, description="Redirect to a short-lived signed URL instead of proxying"),
     current_user: UserResponse = Depends(get_current_user)
 ):
     """
-    Download file data directly.
+    Download file data, streamed from Storage chunk by chunk.
+    
+    Supports Range requests (206 Partial Content) for seeking and resuming,
+    and ETag / If-None-Match / If-Modified-Since revalidation (304). With
+    `redirect=true` the response is a 307 to a signed Storage URL and no
+    bytes pass through the API.
     
     Rate limit: 60 downloads per minute for reasonable usage.
     """
     try:
-        file_data, file_metadata = await storage_service.download_file(file_id, current_user.id)
+        if redirect:
+            signed = await storage_service.get_signed_url(file_id, current_user.id, expires_in=DOWNLOAD_REDIRECT_EXPIRES_IN)
+            return RedirectResponse(str(signed.signed_url), status_code=307, headers={"Cache-Control": "private, no-store"})
         
-        # Create streaming response
-        def iter_file():
-            yield file_data
+        file_metadata = await storage_service.get_file_metadata(file_id, current_user.id)
+        headers = {
+            "Content-Disposition": f"attachment; filename={file_metadata.original_filename or 'file'}",
+            "Cache-Control": "private",
+            "Accept-Ranges": "bytes"
+        }
+        forwarded = {
+            name: request.headers[name] for name in FORWARDED_DOWNLOAD_HEADERS if name in request.headers
+        }
+        
+        # Files carry their SHA-256: use it as a strong ETag and answer
+        # revalidation without touching Storage
+        if file_metadata.file_hash:
+            etag = f'"{file_metadata.file_hash}"'
+            headers["ETag"] = etag
+            if _etag_matches(forwarded.pop("if-none-match", None), etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            if_range = forwarded.pop("if-range", None)
+            if if_range is not None and if_range.strip() != etag:
+                forwarded.pop("range", None)  # Changed since the client's copy: send it all
+        
+        upstream = await storage_service.open_download_stream(file_metadata, current_user.id, forwarded)
+        for name in RELAYED_DOWNLOAD_HEADERS:
+            if name in upstream.headers and not (name == "etag" and "ETag" in headers):
+                headers[name.title()] = upstream.headers[name]
+        
+        if upstream.status in (status.HTTP_304_NOT_MODIFIED, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE):
+            upstream.release()
+            headers.pop("Content-Length", None)
+            return Response(status_code=upstream.status, headers=headers)
+        
+        async def stream_chunks():
+            # Each chunk is awaited by the client before the next is read, so a
+            # slow client slows the upstream read instead of buffering
+            try:
+                async for chunk in upstream.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                upstream.release()
         
         return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type=file_metadata.content_type.value,
-            headers={
-                "Content-Disposition": f"attachment; filename={file_metadata.original_filename or 'file'}",
-                "Content-Length": str(len(file_data))
-            }
+            stream_chunks(),
+            status_code=upstream.status,
+            media_type=file_metadata.content_type.value if hasattr(file_metadata.content_type, "value") else str(file_metadata.content_type),
+            headers=headers
         )
         
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except StorageException as e:
+        details = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+        if details.get("statusCode") == 404:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File content not found")
+        logger.error(f"Storage error downloading file {file_id} for user {current_user.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Download failed")
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -251,14 +318,22 @@ async def get_signed_url(
 @api_limit()  # Standard API rate limit
 async def list_user_files(
     request: Request,
+    response: Response,
     bucket: Optional[StorageBucket] = None,
     generation_id: Optional[UUID] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    count: Optional[str] = Query(None, regex="^(exact|planned|estimated)$"),
+    include_urls: bool = False,
     current_user: UserResponse = Depends(get_current_user)
 ):
     """
-    List user's files with optional filtering.
+    List user's files with optional filtering, newest first.
+    
+    Pass the X-Next-Cursor response header back as `cursor` for the next
+    page; `count` adds an X-Total-Count header. `include_urls` fills each
+    file's signed_url, signing the whole page in one batch.
     
     Rate limit: Standard API limit (100/minute).
     """
@@ -276,16 +351,34 @@ async def list_user_files(
                 detail="offset must be non-negative"
             )
         
-        files = await storage_service.list_user_files(
+        page = await storage_service.list_user_files_page(
             user_id=current_user.id,
             bucket_name=bucket,
             generation_id=generation_id,
             limit=limit,
-            offset=offset
+            cursor=cursor,
+            offset=offset,
+            count=count
         )
         
-        return files
+        if include_urls and page.items:
+            try:
+                signed = await storage_service.get_signed_urls(page.items, current_user.id)
+                for file_meta in page.items:
+                    if file_meta.id in signed:
+                        file_meta.signed_url = str(signed[file_meta.id].signed_url)
+            except Exception as sign_error:
+                logger.warning(f"⚠️ [STORAGE-LIST] Failed to embed signed URLs: {sign_error}")
         
+        if page.next_cursor:
+            response.headers["X-Next-Cursor"] = page.next_cursor
+        if page.total is not None:
+            response.headers["X-Total-Count"] = str(page.total)
+        
+        return page.items
+        
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to list files for user {current_user.id}: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to list files")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Velro PostgREST Client Benchmark
+Compares the thread-pool wrapper SupabaseClient used before (sync supabase-py
+client on a 20-worker ThreadPoolExecutor) against the native async engine
+(pooled aiohttp session) at 500 concurrent requests, plus a bare
+httpx.AsyncClient for reference.
+
+Runs against a local mock PostgREST with simulated latency by default; set
+BENCH_SUPABASE_URL and BENCH_SUPABASE_KEY to hit a real project (read-only
+select by id on BENCH_TABLE).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+from aiohttp import web
+from supabase import create_client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.async_postgrest import AsyncPostgrestEngine  # noqa: E402
+
+# Configuration
+SUPABASE_URL = os.getenv("BENCH_SUPABASE_URL", "")
+SUPABASE_KEY = os.getenv("BENCH_SUPABASE_KEY", "bench.mock.key")
+TABLE = os.getenv("BENCH_TABLE", "users")
+RECORD_ID = os.getenv("BENCH_RECORD_ID", "00000000-0000-0000-0000-000000000001")
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "500"))
+TOTAL_REQUESTS = int(os.getenv("BENCH_REQUESTS", "5000"))
+MOCK_LATENCY_MS = float(os.getenv("BENCH_MOCK_LATENCY_MS", "20"))
+MOCK_PORT = int(os.getenv("BENCH_MOCK_PORT", "54329"))
+THREAD_POOL_WORKERS = 20  # SupabaseClient._thread_pool size
+
+
+def _serve_mock_postgrest():
+    async def handle(request: web.Request) -> web.Response:
+        await asyncio.sleep(MOCK_LATENCY_MS / 1000)
+        record_id = request.query.get("id", "eq.").split(".", 1)[-1]
+        return web.json_response([{"id": record_id, "email": "bench@example.com"}])
+
+    app = web.Application()
+    app.router.add_get("/rest/v1/{table}", handle)
+    web.run_app(app, host="127.0.0.1", port=MOCK_PORT, backlog=2048, access_log=None, print=None)
+
+
+def start_mock_postgrest() -> str:
+    """Serve /rest/v1/<table> with a fixed latency from a separate process."""
+    process = multiprocessing.Process(target=_serve_mock_postgrest, daemon=True)
+    process.start()
+
+    # Wait for the port to accept connections
+    import socket
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", MOCK_PORT), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return f"http://127.0.0.1:{MOCK_PORT}"
+
+
+async def run_backend(name: str, request_fn) -> Dict[str, float]:
+    print(f"\n🔬 {name}")
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await request_fn()
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    # Warm connections before measuring
+    await asyncio.gather(*(one() for _ in range(min(CONCURRENCY, 50))))
+    latencies.clear()
+    errors = 0
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(TOTAL_REQUESTS)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    results = {
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99)],
+        "errors": errors,
+    }
+    print(f"   {len(latencies):,} requests in {elapsed:.2f}s: {results['requests_per_sec']:,.0f} req/s | "
+          f"p50={results['p50_ms']:.1f}ms p99={results['p99_ms']:.1f}ms | errors={errors}")
+    return results
+
+
+async def main():
+    # Per-request INFO logs from httpx would dominate the httpx-based measurements
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    base_url = SUPABASE_URL or start_mock_postgrest()
+
+    print("🚀 PostgREST Client Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Target: {base_url} | table: {TABLE} | concurrency: {CONCURRENCY} | requests: {TOTAL_REQUESTS}")
+    if not SUPABASE_URL:
+        print(f"Mock latency: {MOCK_LATENCY_MS:.0f}ms")
+
+    # Previous path: sync supabase-py client on the shared thread pool
+    sync_client = create_client(base_url, SUPABASE_KEY)
+    thread_pool = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS, thread_name_prefix="bench_db")
+    loop = asyncio.get_running_loop()
+
+    async def thread_pool_request():
+        await loop.run_in_executor(
+            thread_pool,
+            lambda: sync_client.table(TABLE).select("*").eq("id", RECORD_ID).execute()
+        )
+
+    # New path: native async engine
+    engine = AsyncPostgrestEngine()
+    engine.base_url = base_url
+    engine.anon_key = engine.service_key = SUPABASE_KEY
+    engine.max_connections = CONCURRENCY
+
+    async def native_request():
+        await engine.execute(TABLE, "select", filters={"id": RECORD_ID}, use_service_key=True)
+
+    # Reference: httpx.AsyncClient with the same pool size
+    httpx_client = httpx.AsyncClient(
+        base_url=base_url,
+        limits=httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    )
+    headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+
+    async def httpx_request():
+        response = await httpx_client.get(f"/rest/v1/{TABLE}", params={"select": "*", "id": f"eq.{RECORD_ID}"},
+                                          headers=headers)
+        response.raise_for_status()
+
+    try:
+        pooled = await run_backend(f"run_in_executor ({THREAD_POOL_WORKERS}-thread pool, sync client)", thread_pool_request)
+        await run_backend("httpx.AsyncClient (reference)", httpx_request)
+        native = await run_backend("Native async engine (aiohttp keep-alive pool)", native_request)
+    finally:
+        thread_pool.shutdown(wait=False)
+        await httpx_client.aclose()
+        await engine.close()
+
+    print("\n📊 SUMMARY")
+    print(f"   throughput: {native['requests_per_sec'] / pooled['requests_per_sec']:.1f}x")
+    print(f"   p50:        {pooled['p50_ms']:.1f}ms -> {native['p50_ms']:.1f}ms")
+    print(f"   p99:        {pooled['p99_ms']:.1f}ms -> {native['p99_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
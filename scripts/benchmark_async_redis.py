@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Velro Async Redis Benchmark
+Compares the previous synchronous redis.Redis calls made inside async
+handlers (as AsyncFALService did) with the shared auto-pipelining
+redis.asyncio client (utils/async_redis.py) under concurrent generation
+traffic: each simulated request reads the result cache, runs the rate-limit
+INCR/EXPIRE and stores its generation record.
+
+Reports event-loop lag (how late a 5ms ticker fires while the burst runs),
+request throughput and Redis round trips.
+Requires a reachable Redis (REDIS_URL); benchmark keys are deleted afterwards.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List
+
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.async_redis import AsyncRedis  # noqa: E402
+
+# Configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+REQUESTS = int(os.getenv("REDIS_BENCH_REQUESTS", "20000"))
+CONCURRENCY = int(os.getenv("REDIS_BENCH_CONCURRENCY", "500"))
+TICK_SECONDS = 0.005
+PREFIX = "bench:redis"
+
+
+class SyncBackend:
+    """The previous pattern: blocking redis-py calls inside async def."""
+
+    name = "sync redis.Redis in async handlers (previous)"
+
+    def __init__(self):
+        self.client = redis.Redis(connection_pool=redis.ConnectionPool.from_url(REDIS_URL, max_connections=50))
+        self.round_trips = 0
+
+    async def handle(self, user: str, request_id: str):
+        self.round_trips += 1
+        self.client.get(f"{PREFIX}:cache:{request_id}")
+        self.round_trips += 1
+        if self.client.incr(f"{PREFIX}:rate:{user}") == 1:
+            self.round_trips += 1
+            self.client.expire(f"{PREFIX}:rate:{user}", 60)
+        self.round_trips += 1
+        self.client.setex(f"{PREFIX}:generation:{request_id}", 60, json.dumps({"user": user}))
+
+    def stats(self) -> int:
+        return self.round_trips
+
+    async def close(self):
+        self.client.connection_pool.disconnect()
+
+
+class AsyncBackend:
+    """The shared auto-pipelining redis.asyncio client."""
+
+    name = "AsyncRedis auto-pipelining"
+
+    def __init__(self):
+        self.client = AsyncRedis(REDIS_URL)
+
+    async def handle(self, user: str, request_id: str):
+        await self.client.get(f"{PREFIX}:cache:{request_id}")
+        if await self.client.incr(f"{PREFIX}:rate:{user}") == 1:
+            await self.client.expire(f"{PREFIX}:rate:{user}", 60)
+        await self.client.setex(f"{PREFIX}:generation:{request_id}", 60, json.dumps({"user": user}))
+
+    def stats(self) -> int:
+        return self.client.stats["round_trips"]
+
+    async def close(self):
+        await self.client.close()
+
+
+async def measure_lag(stop: asyncio.Event, lags: List[float]):
+    """Record how late each TICK_SECONDS sleep wakes up."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, (time.perf_counter() - start - TICK_SECONDS) * 1000))
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def run_backend(backend) -> Dict[str, float]:
+    print(f"\n🔬 {backend.name}")
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    stop = asyncio.Event()
+    lags: List[float] = []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+
+    async def one(index: int):
+        async with semaphore:
+            await backend.handle(f"user-{index % 1000}", uuid.uuid4().hex)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+
+    results = {
+        "requests_per_second": REQUESTS / elapsed,
+        "lag_p50_ms": percentile(lags, 0.50),
+        "lag_p99_ms": percentile(lags, 0.99),
+        "lag_max_ms": max(lags) if lags else 0.0,
+        "ticks": len(lags),
+        "round_trips": backend.stats()
+    }
+    print(f"   {REQUESTS} requests in {elapsed:.2f}s ({results['requests_per_second']:.0f} req/s), "
+          f"{results['round_trips']} Redis round trips")
+    print(f"   Event-loop lag: p50={results['lag_p50_ms']:.2f}ms p99={results['lag_p99_ms']:.2f}ms "
+          f"max={results['lag_max_ms']:.2f}ms over {results['ticks']} ticks")
+    await backend.close()
+    return results
+
+
+async def delete_prefix():
+    client = redis.Redis.from_url(REDIS_URL)
+    keys = list(client.scan_iter(match=f"{PREFIX}:*", count=1000))
+    for i in range(0, len(keys), 1000):
+        client.delete(*keys[i:i + 1000])
+    client.close()
+
+
+async def main():
+    print("🚀 Async Redis Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Redis: {REDIS_URL} | requests: {REQUESTS} | concurrency: {CONCURRENCY}")
+
+    await delete_prefix()
+    legacy = await run_backend(SyncBackend())
+    await delete_prefix()
+    pipelined = await run_backend(AsyncBackend())
+    await delete_prefix()
+
+    print(f"\n📊 Throughput: {pipelined['requests_per_second'] / legacy['requests_per_second']:.1f}x | "
+          f"p99 loop lag {legacy['lag_p99_ms']:.1f}ms -> {pipelined['lag_p99_ms']:.1f}ms | "
+          f"round trips {legacy['round_trips']} -> {pipelined['round_trips']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Velro Authorization Audit Pipeline Benchmark
+Compares the previous audit path, where every authorization event awaited
+its Redis stream writes, its storage write and its threat counters before
+returning, with the write-behind pipeline in services/audit_logger.py, which
+only buffers the entry and leaves the I/O to a batching background consumer.
+
+Reports the time audit logging adds to each authorization (p50/p99) and the
+sustained event rate through to Redis and the database. Redis is a fakeredis
+TCP server and the database a mock PostgREST with simulated insert latency,
+each in its own process.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List
+from uuid import uuid4
+
+import redis.asyncio as aioredis
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# services first: importing repositories first trips the package import cycle
+from services.audit_logger import AuditSecurityLogger  # noqa: E402
+from repositories.audit_log_repository import AuditLogRepository  # noqa: E402
+from models.authorization import AccessType  # noqa: E402
+from models.authorization_layers import (  # noqa: E402
+    AuthorizationLayerType, LayerResult, SecurityThreatLevel
+)
+from utils.async_postgrest import AsyncPostgrestEngine  # noqa: E402
+
+# Configuration
+EVENTS = int(os.getenv("BENCH_EVENTS", "5000"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "200"))
+FAILURE_RATIO = float(os.getenv("BENCH_FAILURE_RATIO", "0.1"))
+DB_LATENCY_MS = float(os.getenv("BENCH_DB_LATENCY_MS", "15"))
+REDIS_PORT = int(os.getenv("BENCH_REDIS_PORT", "56379"))
+MOCK_PORT = int(os.getenv("BENCH_MOCK_PORT", "54331"))
+
+
+def _serve_fake_redis():
+    from fakeredis import TcpFakeServer
+    TcpFakeServer(("127.0.0.1", REDIS_PORT)).serve_forever()
+
+
+def _serve_mock_postgrest():
+    async def insert(request: web.Request) -> web.Response:
+        rows = await request.json()
+        await asyncio.sleep(DB_LATENCY_MS / 1000)
+        return web.json_response(rows if isinstance(rows, list) else [rows], status=201)
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/rest/v1/{table}", insert)
+    web.run_app(app, host="127.0.0.1", port=MOCK_PORT, access_log=None, print=None)
+
+
+def start_process(target, port: int):
+    """Run a mock server in a separate process and wait for its port."""
+    process = multiprocessing.Process(target=target, daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process
+
+
+class BenchDatabase:
+    """Just enough of SupabaseClient for AuditLogRepository, on a mock PostgREST."""
+
+    def __init__(self, engine: AsyncPostgrestEngine):
+        self.engine = engine
+
+    async def execute_query_async(self, table, operation, data=None, use_service_key=False, timeout=5.0, **kwargs):
+        return await self.engine.execute(table, operation, data=data, use_service_key=use_service_key)
+
+
+def make_event(index: int):
+    failed = index % int(1 / FAILURE_RATIO) == 0 if FAILURE_RATIO else False
+    context = SimpleNamespace(
+        user_id=uuid4(),
+        resource_id=uuid4(),
+        resource_type="generation",
+        access_type=AccessType.READ,
+        ip_address=f"10.0.{index % 50}.1",
+        user_agent="bench/1.0"
+    )
+    layer_results = [
+        LayerResult(layer_type=layer, success=not failed, execution_time_ms=1.5)
+        for layer in list(AuthorizationLayerType)[:6]
+    ]
+    threat_level = SecurityThreatLevel.YELLOW if failed else SecurityThreatLevel.GREEN
+    return context, layer_results, not failed, threat_level
+
+
+async def previous_log(audit: AuditSecurityLogger, db: AuditLogRepository, redis_client, event):
+    """The previous per-event path: every sink and counter awaited before returning."""
+    context, layer_results, decision, threat_level = event
+    entry = await audit._build_comprehensive_audit_entry(
+        f"audit_{uuid4().hex[:8]}_{int(time.time())}", context, layer_results, decision, threat_level
+    )
+
+    async def siem():
+        await redis_client.xadd('siem:authorization_events', {
+            'audit_id': entry.audit_id, 'cef_message': await audit._format_for_siem(entry),
+            'raw_data': json.dumps(asdict(entry), default=str), 'timestamp': entry.timestamp.isoformat(),
+            'severity': entry.severity.value, 'threat_level': entry.threat_level.value
+        }, maxlen=1000)
+
+    async def streams():
+        await redis_client.xadd('audit:realtime_authorization', {
+            'audit_id': entry.audit_id, 'outcome': entry.outcome, 'timestamp': entry.timestamp.isoformat()
+        }, maxlen=1000)
+        await redis_client.xadd('audit:performance_metrics', {
+            'audit_id': entry.audit_id, 'timestamp': entry.timestamp.isoformat()
+        }, maxlen=2000)
+
+    async def store():
+        await db.insert_entries([{
+            'audit_id': entry.audit_id, 'entry': json.loads(json.dumps(asdict(entry), default=str))
+        }])
+
+    audit._log_to_file(entry)
+    await asyncio.gather(siem(), streams(), store(), return_exceptions=True)
+
+    if entry.outcome == 'failure':
+        key = f"audit:failures_by_ip:{entry.ip_address}"
+        now = time.time()
+        await redis_client.zremrangebyscore(key, 0, now - 300)
+        await redis_client.zadd(key, {entry.audit_id: now})
+        await redis_client.expire(key, 300)
+        await redis_client.zcard(key)
+
+
+async def run_path(name: str, log_one, events, wait_for_sinks=None) -> Dict[str, float]:
+    print(f"\n🔬 {name}")
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies: List[float] = []
+
+    async def one(event):
+        async with semaphore:
+            start = time.perf_counter()
+            await log_one(event)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(event) for event in events))
+    accepted = time.perf_counter() - start
+    if wait_for_sinks:
+        await wait_for_sinks()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    results = {
+        "events_per_sec": len(events) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99)],
+    }
+    print(f"   {len(events):,} events accepted in {accepted:.2f}s, written in {elapsed:.2f}s: "
+          f"{results['events_per_sec']:,.0f} events/s | added latency p50={results['p50_ms']:.2f}ms "
+          f"p99={results['p99_ms']:.2f}ms")
+    return results
+
+
+async def main():
+    # The audit file sink would otherwise print every entry
+    for name in ('security_audit', 'security_events'):
+        logging.getLogger(name).propagate = False
+        logging.getLogger(name).addHandler(logging.NullHandler())
+
+    start_process(_serve_fake_redis, REDIS_PORT)
+    start_process(_serve_mock_postgrest, MOCK_PORT)
+
+    print("🚀 Authorization Audit Pipeline Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Events: {EVENTS} | concurrency: {CONCURRENCY} | failures: {FAILURE_RATIO:.0%} | "
+          f"mock insert latency: {DB_LATENCY_MS:.0f}ms")
+
+    engine = AsyncPostgrestEngine()
+    engine.base_url = f"http://127.0.0.1:{MOCK_PORT}"
+    engine.anon_key = engine.service_key = "bench.mock.key"
+    redis_client = aioredis.from_url(f"redis://127.0.0.1:{REDIS_PORT}", decode_responses=True)
+    repository = AuditLogRepository(BenchDatabase(engine))
+
+    audit = AuditSecurityLogger()
+    audit.redis_client = redis_client
+    audit.db = object()
+    audit.audit_repo = repository
+
+    events = [make_event(i) for i in range(EVENTS)]
+    try:
+        previous = await run_path(
+            "Previous: sinks and threat counters awaited per event",
+            lambda event: previous_log(audit, repository, redis_client, event), events
+        )
+
+        async def drained():
+            while audit._buffer or audit.pipeline_stats['flushed'] < audit.pipeline_stats['accepted']:
+                await asyncio.sleep(0.01)
+
+        current = await run_path(
+            f"Write-behind: buffered, {audit.batch_size}-event batches, pipelined XADD + multi-row insert",
+            lambda event: audit.log_authorization_event(*event), events, wait_for_sinks=drained
+        )
+        stats = audit.get_performance_metrics()
+        print(f"   batches={stats['batches']} avg_flush={stats['average_flush_time_ms']:.1f}ms "
+              f"sampled_out={stats['sampled_out']} dropped={stats['dropped']} "
+              f"redis_failures={stats['redis_failures']} database_failures={stats['database_failures']}")
+        await audit.shutdown()
+    finally:
+        await redis_client.aclose()
+        await engine.close()
+
+    print("\n📊 SUMMARY")
+    print(f"   throughput:    {previous['events_per_sec']:,.0f} -> {current['events_per_sec']:,.0f} events/s "
+          f"({current['events_per_sec'] / previous['events_per_sec']:.1f}x)")
+    print(f"   added p50:     {previous['p50_ms']:.2f}ms -> {current['p50_ms']:.2f}ms")
+    print(f"   added p99:     {previous['p99_ms']:.2f}ms -> {current['p99_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
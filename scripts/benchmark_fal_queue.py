@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Velro FAL Submission Benchmark
+Compares the previous FALService path (a blocking run call per generation
+inside asyncio.to_thread) with the queue path (FALQueueClient submit plus the
+shared FALCompletionService poller) for a burst of concurrent generations.
+
+Runs against a local mock FAL queue with a fixed generation time. Besides
+wall time it probes how long an unrelated asyncio.to_thread call waits while
+the burst is in flight, which is what starved other executor users before.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime
+from typing import Dict, List
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("FAL_KEY", "bench:mock")
+os.environ.setdefault("FAL_COMPLETION_PUBSUB", "false")
+
+from services.fal_queue_client import fal_queue_client  # noqa: E402
+from services.fal_completion_service import fal_completion_service, CompletionState  # noqa: E402
+
+# Configuration
+GENERATIONS = int(os.getenv("FAL_BENCH_GENERATIONS", "500"))
+GENERATION_SECONDS = float(os.getenv("FAL_BENCH_GENERATION_SECONDS", "3"))
+MOCK_PORT = int(os.getenv("FAL_BENCH_MOCK_PORT", "54331"))
+ENDPOINT = "fal-ai/mock-video/v1"
+
+
+def _serve_mock_fal():
+    started: Dict[str, float] = {}
+
+    def result_body(request_id: str) -> Dict:
+        return {"video": {"url": f"https://example.com/{request_id}.mp4"}}
+
+    async def run(request: web.Request) -> web.Response:
+        # Synchronous endpoint: holds the caller until the generation is done
+        await asyncio.sleep(GENERATION_SECONDS)
+        return web.json_response(result_body(uuid.uuid4().hex))
+
+    async def submit(request: web.Request) -> web.Response:
+        request_id = uuid.uuid4().hex
+        started[request_id] = time.monotonic()
+        return web.json_response({"request_id": request_id})
+
+    async def status(request: web.Request) -> web.Response:
+        elapsed = time.monotonic() - started.get(request.match_info["id"], 0)
+        return web.json_response({"status": "COMPLETED" if elapsed >= GENERATION_SECONDS else "IN_PROGRESS"})
+
+    async def result(request: web.Request) -> web.Response:
+        return web.json_response(result_body(request.match_info["id"]))
+
+    async def cancel(request: web.Request) -> web.Response:
+        return web.json_response({"status": "CANCELLATION_REQUESTED"})
+
+    app = web.Application()
+    app.router.add_post("/run/{tail:.+}", run)
+    app.router.add_get("/{owner}/{app}/requests/{id}/status", status)
+    app.router.add_put("/{owner}/{app}/requests/{id}/cancel", cancel)
+    app.router.add_get("/{owner}/{app}/requests/{id}", result)
+    app.router.add_post("/{tail:.+}", submit)
+    web.run_app(app, host="127.0.0.1", port=MOCK_PORT, backlog=4096, access_log=None, print=None)
+
+
+def start_mock_fal() -> str:
+    """Serve the mock FAL queue from a separate process."""
+    process = multiprocessing.Process(target=_serve_mock_fal, daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", MOCK_PORT), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return f"http://127.0.0.1:{MOCK_PORT}"
+
+
+async def probe_executor(stop: asyncio.Event, waits: List[float]):
+    """Measure how long a trivial to_thread call waits for an executor thread."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.to_thread(lambda: None)
+        waits.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def run_burst(name: str, generate) -> Dict[str, float]:
+    print(f"\n🔬 {name}")
+    stop = asyncio.Event()
+    waits: List[float] = []
+    probe = asyncio.create_task(probe_executor(stop, waits))
+    peak_threads = threading.active_count()
+
+    async def track_threads():
+        nonlocal peak_threads
+        while not stop.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.1)
+
+    tracker = asyncio.create_task(track_threads())
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(generate() for _ in range(GENERATIONS)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(probe, tracker)
+
+    errors = sum(1 for outcome in outcomes if isinstance(outcome, Exception))
+    waits.sort()
+    results = {
+        "wall_seconds": elapsed,
+        "errors": errors,
+        "peak_threads": peak_threads,
+        "probe_p50_ms": waits[len(waits) // 2] if waits else 0.0,
+        "probe_max_ms": waits[-1] if waits else 0.0,
+    }
+    print(f"   {GENERATIONS} generations in {elapsed:.1f}s | errors={errors} | peak threads={peak_threads}")
+    print(f"   unrelated to_thread wait: p50={results['probe_p50_ms']:.1f}ms max={results['probe_max_ms']:.1f}ms")
+    return results
+
+
+async def main():
+    base_url = start_mock_fal()
+
+    print("🚀 FAL Submission Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Generations: {GENERATIONS} | generation time: {GENERATION_SECONDS:.1f}s | mock: {base_url}")
+
+    # Previous path: a blocking HTTP call per generation on the default executor
+    def blocking_run():
+        request = urllib.request.Request(f"{base_url}/run/{ENDPOINT}", data=b"{}", method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=GENERATION_SECONDS * 100) as response:
+            return json.loads(response.read())
+
+    async def threaded_generation():
+        return await asyncio.to_thread(blocking_run)
+
+    legacy = await run_burst("asyncio.to_thread(run) (previous)", threaded_generation)
+
+    # New path: queue submit, then wait on the shared poller
+    fal_queue_client.base_url = base_url
+    fal_queue_client.max_connections = 200
+    fal_completion_service.MIN_POLL_INTERVAL = 0.25
+
+    async def queued_generation():
+        request = await fal_queue_client.submit(ENDPOINT, {"prompt": "benchmark"})
+        event = await fal_completion_service.wait_for_completion(
+            request.request_id, ENDPOINT, estimated_time=GENERATION_SECONDS, timeout=GENERATION_SECONDS * 100
+        )
+        if event.status != CompletionState.COMPLETED:
+            raise RuntimeError(event.error)
+        return event.result
+
+    queued = await run_burst("FALQueueClient submit + completion tracker", queued_generation)
+    print(f"\n📊 Wall time: {legacy['wall_seconds'] / queued['wall_seconds']:.1f}x faster | "
+          f"worst unrelated to_thread wait {legacy['probe_max_ms']:.0f}ms -> {queued['probe_max_ms']:.0f}ms")
+    print(f"   Queue client: {fal_queue_client.get_stats()['requests']} HTTP calls, "
+          f"tracker: {fal_completion_service.get_stats()['status_calls']} status polls")
+
+    await fal_completion_service.shutdown()
+    await fal_queue_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Velro Input Sanitization Benchmark
+Compares the previous InputSanitizer, which ran every SQL, XSS, path traversal
+and command injection pattern (looked up by string) over each value, with the
+prefiltered engine in utils/input_sanitization.py on large prompt payloads.
+
+Reports per-call latency (p50/p99) for single prompts in strict and
+non-strict mode, for a full generation request body checked by two layers
+(validation middleware and business validation), and for a rejected payload.
+"""
+
+import html
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import urllib.parse
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.input_sanitization import InputSanitizer, ValidationError  # noqa: E402
+import re  # noqa: E402
+
+# Configuration
+PROMPT_CHARS = int(os.getenv("SANITIZE_BENCH_PROMPT_CHARS", "5000"))
+ITERATIONS = int(os.getenv("SANITIZE_BENCH_ITERATIONS", "300"))
+
+# Attack attempts are logged at WARNING; keep the output readable
+logging.getLogger("utils.input_sanitization").setLevel(logging.CRITICAL)
+
+PROMPT_WORDS = [
+    "photorealistic", "portrait", "young", "woman", "freckles", "soft", "golden", "hour", "light",
+    "shallow", "depth", "field", "85mm", "lens", "film", "grain", "highly", "detailed", "skin",
+    "texture", "cinematic", "composition", "volumetric", "fog", "neon", "reflections", "rainy",
+    "street", "night", "8k", "octane", "render", "trending", "artstation", "muted", "palette",
+]
+
+
+# Baseline: the InputSanitizer layers prior to the prefilter (kept verbatim,
+# with the \\u escape fixed so the strict SQL layer compiles)
+class LegacyInputSanitizer(InputSanitizer):
+
+    @classmethod
+    def sanitize_input(
+        cls,
+        value: Any,
+        field_name: str,
+        input_type: str = "text",
+        max_length: int = None,
+        allow_html: bool = False,
+        strict_mode: bool = True
+    ) -> Any:
+        try:
+            if value is None:
+                return None
+            if not isinstance(value, str):
+                if isinstance(value, (int, float, bool)):
+                    value = str(value)
+                elif isinstance(value, (dict, list)):
+                    value = json.dumps(value)
+                else:
+                    value = str(value)
+            if max_length and len(value) > max_length:
+                raise ValidationError(f"Input too long: {len(value)} > {max_length}", field_name, "length_violation")
+            sanitized_value = value
+            if strict_mode:
+                sanitized_value = cls._prevent_sql_injection(sanitized_value, field_name)
+            if not allow_html:
+                sanitized_value = cls._prevent_xss(sanitized_value, field_name)
+            sanitized_value = cls._prevent_path_traversal(sanitized_value, field_name)
+            if strict_mode:
+                sanitized_value = cls._prevent_command_injection(sanitized_value, field_name)
+            sanitized_value = cls._validate_by_type(sanitized_value, input_type, field_name)
+            sanitized_value = cls._final_cleanup(sanitized_value)
+            return sanitized_value
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Sanitization failed: {str(e)}", field_name, "sanitization_error")
+
+    @classmethod
+    def _prevent_sql_injection(cls, value: str, field_name: str) -> str:
+        original_value = value
+        for pattern in cls.SQL_INJECTION_PATTERNS:
+            for match in re.finditer(pattern, value, re.IGNORECASE | re.MULTILINE):
+                value = value.replace(match.group(), "[FILTERED]")
+        value = value.replace("'", "''")
+        for char, replacement in {';': '[SEMICOLON]', '--': '[COMMENT]',
+                                  '/*': '[BLOCK_COMMENT_START]', '*/': '[BLOCK_COMMENT_END]'}.items():
+            if char in value:
+                value = value.replace(char, replacement)
+        if value != original_value:
+            raise ValidationError("Input contains potentially malicious SQL content", field_name, "sql_injection_attempt")
+        return value
+
+    @classmethod
+    def _prevent_xss(cls, value: str, field_name: str) -> str:
+        for pattern in cls.XSS_PATTERNS:
+            if re.search(pattern, value, re.IGNORECASE | re.DOTALL):
+                raise ValidationError("Input contains potentially malicious script content", field_name, "xss_attempt")
+        value = html.escape(value, quote=True)
+        for char, encoded in {'<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;',
+                              '/': '&#x2F;', '`': '&#x60;', '=': '&#x3D;'}.items():
+            value = value.replace(char, encoded)
+        return value
+
+    @classmethod
+    def _prevent_path_traversal(cls, value: str, field_name: str) -> str:
+        for pattern in cls.PATH_TRAVERSAL_PATTERNS:
+            if re.search(pattern, value, re.IGNORECASE):
+                raise ValidationError("Input contains path traversal characters", field_name, "path_traversal_attempt")
+        try:
+            decoded = urllib.parse.unquote(value)
+            for pattern in cls.PATH_TRAVERSAL_PATTERNS:
+                if re.search(pattern, decoded, re.IGNORECASE):
+                    raise ValidationError("Input contains encoded path traversal", field_name, "encoded_path_traversal")
+        except Exception:
+            pass
+        return value
+
+    @classmethod
+    def _prevent_command_injection(cls, value: str, field_name: str) -> str:
+        for pattern in cls.COMMAND_INJECTION_PATTERNS:
+            for match in re.finditer(pattern, value, re.IGNORECASE):
+                raise ValidationError(
+                    f"Input contains command injection characters: {match.group()}",
+                    field_name,
+                    "command_injection_attempt"
+                )
+        return value
+
+    @classmethod
+    def _final_cleanup(cls, value: str) -> str:
+        value = value.replace('\x00', '')
+        value = re.sub(r'\s+', ' ', value).strip()
+        return ''.join(char for char in value if ord(char) >= 32 or char in '\n\t')
+
+
+def make_prompt(rng: random.Random, chars: int) -> str:
+    words: List[str] = []
+    length = 0
+    while length < chars:
+        word = rng.choice(PROMPT_WORDS)
+        words.append(word + ("," if rng.random() < 0.15 else ""))
+        length += len(word) + 2
+    return " ".join(words)[:chars].strip()
+
+
+def make_request_body(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "prompt": make_prompt(rng, PROMPT_CHARS),
+        "negative_prompt": make_prompt(rng, PROMPT_CHARS // 5),
+        "model_id": "flux-pro",
+        "parameters": {"width": 1024, "height": 1024, "steps": 28, "guidance_scale": 3.5,
+                       "style_tags": [make_prompt(rng, 20) for _ in range(8)]},
+    }
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(fn: Callable[[Any], Any], inputs: List[Any], reset: Callable[[], None] = None) -> Dict[str, float]:
+    latencies = []
+    for value in inputs:
+        if reset:
+            reset()
+        t0 = time.perf_counter()
+        try:
+            fn(value)
+        except ValidationError:
+            pass
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return {"p50_ms": percentile(latencies, 0.50), "p99_ms": percentile(latencies, 0.99),
+            "mean_ms": statistics.fmean(latencies)}
+
+
+def clear_cache():
+    InputSanitizer._clean_cache._entries.clear()
+
+
+def compare(name: str, legacy_fn, new_fn, inputs, reset=clear_cache):
+    legacy = measure(legacy_fn, inputs)
+    current = measure(new_fn, inputs, reset)
+    print(f"\n🔬 {name}")
+    print(f"   legacy:      p50={legacy['p50_ms']:.3f}ms p99={legacy['p99_ms']:.3f}ms")
+    print(f"   prefiltered: p50={current['p50_ms']:.3f}ms p99={current['p99_ms']:.3f}ms "
+          f"({legacy['mean_ms'] / current['mean_ms']:.1f}x)")
+
+
+def main():
+    print("🚀 Input Sanitization Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Prompt: {PROMPT_CHARS} chars | iterations: {ITERATIONS}")
+
+    rng = random.Random(42)
+    prompts = [make_prompt(rng, PROMPT_CHARS) for _ in range(ITERATIONS)]
+    bodies = [make_request_body(rng) for _ in range(ITERATIONS)]
+    attacks = [p[: PROMPT_CHARS // 2] + " <script>alert(1)</script> " + p[PROMPT_CHARS // 2:] for p in prompts]
+
+    compare(
+        "Prompt, non-strict (JSON body content)",
+        lambda v: LegacyInputSanitizer.sanitize_input(v, "prompt", "text", max_length=10000, strict_mode=False),
+        lambda v: InputSanitizer.sanitize_input(v, "prompt", "text", max_length=10000, strict_mode=False),
+        prompts
+    )
+    compare(
+        "Prompt, strict (business validation)",
+        lambda v: LegacyInputSanitizer.sanitize_input(v, "prompt", "text", max_length=PROMPT_CHARS),
+        lambda v: InputSanitizer.sanitize_input(v, "prompt", "text", max_length=PROMPT_CHARS),
+        prompts
+    )
+
+    def two_layers(sanitizer):
+        def check(body):
+            # Validation middleware walks the body, then the service re-checks the prompt
+            sanitizer._validate_json_content(body, "body")
+            sanitizer.sanitize_input(body["prompt"], "prompt", "text", max_length=10000, strict_mode=False)
+        return check
+
+    compare("Generation request body through two layers", two_layers(LegacyInputSanitizer),
+            two_layers(InputSanitizer), bodies)
+    compare(
+        "Rejected prompt (<script> mid-payload)",
+        lambda v: LegacyInputSanitizer.sanitize_input(v, "prompt", "text", max_length=10000, strict_mode=False),
+        lambda v: InputSanitizer.sanitize_input(v, "prompt", "text", max_length=10000, strict_mode=False),
+        attacks
+    )
+
+    cache = InputSanitizer._clean_cache
+    print(f"\n📊 Clean-value cache: {cache.hits} hits / {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Velro L1 Cache Microbenchmark
+Compares the sharded segmented-LRU L1MemoryCache against the previous
+single-lock, pickle-sized implementation at full (200MB) capacity.
+Reports get/set throughput, p50/p99 latency and multi-threaded contention.
+"""
+
+import gzip
+import os
+import pickle
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from caching.multi_layer_cache import (  # noqa: E402
+    CacheEntry, CacheMetrics, CacheOperation, EvictionPolicy, L1MemoryCache, logger
+)
+from dataclasses import asdict  # noqa: E402
+
+# Configuration
+CACHE_SIZE_MB = int(os.getenv("L1_BENCH_CACHE_MB", "200"))
+KEY_SPACE = int(os.getenv("L1_BENCH_KEYS", "200000"))
+OPERATIONS = int(os.getenv("L1_BENCH_OPS", "200000"))
+THREADS = int(os.getenv("L1_BENCH_THREADS", "8"))
+READ_RATIO = 0.9
+
+
+# Baseline: the L1 implementation prior to the sharded rewrite (kept verbatim)
+class LegacyL1MemoryCache:
+    """
+    High-performance L1 in-memory cache with thread-safe LRU eviction.
+    Target: <5ms access times, >95% hit rate for hot authorization data.
+    """
+    
+    def __init__(self, max_size_mb: int = 200, eviction_policy: EvictionPolicy = EvictionPolicy.HYBRID):
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.eviction_policy = eviction_policy
+        
+        # Thread-safe storage
+        self.cache: Dict[str, CacheEntry] = {}
+        self.lru_order: OrderedDict[str, None] = OrderedDict()
+        self.access_counts: Dict[str, int] = defaultdict(int)
+        
+        # Thread safety
+        self.lock = threading.RLock()
+        
+        # Metrics
+        self.metrics = CacheMetrics()
+        self.current_size_bytes = 0
+        
+        # Cleanup tracking
+        self.last_cleanup = time.time()
+        self.cleanup_interval = 60  # seconds
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Thread-safe get operation with performance tracking."""
+        start_time = time.time()
+        
+        try:
+            with self.lock:
+                entry = self.cache.get(key)
+                
+                if entry and not entry.is_expired():
+                    entry.access()
+                    self.lru_order.move_to_end(key)
+                    self.access_counts[key] += 1
+                    
+                    response_time_ms = (time.time() - start_time) * 1000
+                    self.metrics.update(CacheOperation.GET, True, response_time_ms)
+                    
+                    return entry.value
+                elif entry:
+                    # Expired entry cleanup
+                    self._remove_entry_unsafe(key)
+                
+                # Cache miss
+                response_time_ms = (time.time() - start_time) * 1000
+                self.metrics.update(CacheOperation.GET, False, response_time_ms)
+                return default
+                
+        except Exception as e:
+            logger.error(f"L1 cache get error for key {key}: {e}")
+            response_time_ms = (time.time() - start_time) * 1000
+            self.metrics.update(CacheOperation.GET, False, response_time_ms)
+            return default
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, priority: int = 1, 
+            tags: Optional[Set[str]] = None) -> bool:
+        """Thread-safe set operation with intelligent eviction."""
+        start_time = time.time()
+        
+        try:
+            with self.lock:
+                # Serialize and calculate size
+                serialized_value = self._serialize_value(value)
+                entry_size = len(serialized_value)
+                
+                # Reject oversized entries
+                if entry_size > self.max_size_bytes * 0.1:  # Max 10% of cache
+                    logger.warning(f"L1 cache entry too large: {entry_size} bytes")
+                    return False
+                
+                # Remove existing entry
+                if key in self.cache:
+                    self._remove_entry_unsafe(key)
+                
+                # Ensure sufficient space
+                self._ensure_space_unsafe(entry_size)
+                
+                # Create and store entry
+                expires_at = time.time() + ttl if ttl else None
+                entry = CacheEntry(
+                    key=key,
+                    value=value,
+                    created_at=time.time(),
+                    expires_at=expires_at,
+                    size_bytes=entry_size,
+                    priority=priority,
+                    tags=tags or set()
+                )
+                
+                self.cache[key] = entry
+                self.lru_order[key] = None
+                self.current_size_bytes += entry_size
+                
+                # Update metrics
+                response_time_ms = (time.time() - start_time) * 1000
+                self.metrics.update(CacheOperation.SET, True, response_time_ms)
+                self.metrics.cache_size_bytes = self.current_size_bytes
+                self.metrics.entries_count = len(self.cache)
+                
+                return True
+                
+        except Exception as e:
+            logger.error(f"L1 cache set error for key {key}: {e}")
+            response_time_ms = (time.time() - start_time) * 1000
+            self.metrics.update(CacheOperation.SET, False, response_time_ms)
+            return False
+    
+    def delete(self, key: str) -> bool:
+        """Thread-safe delete operation."""
+        start_time = time.time()
+        
+        try:
+            with self.lock:
+                success = self._remove_entry_unsafe(key)
+                
+                response_time_ms = (time.time() - start_time) * 1000
+                self.metrics.update(CacheOperation.DELETE, success, response_time_ms)
+                return success
+                
+        except Exception as e:
+            logger.error(f"L1 cache delete error for key {key}: {e}")
+            response_time_ms = (time.time() - start_time) * 1000
+            self.metrics.update(CacheOperation.DELETE, False, response_time_ms)
+            return False
+    
+    def _serialize_value(self, value: Any) -> bytes:
+        """Serialize value with compression for large objects."""
+        try:
+            serialized = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            
+            # Compress if beneficial
+            if len(serialized) > 1024:  # 1KB threshold
+                compressed = gzip.compress(serialized)
+                if len(compressed) < len(serialized) * 0.8:
+                    return compressed
+            
+            return serialized
+        except Exception as e:
+            logger.error(f"L1 cache serialization error: {e}")
+            raise
+    
+    def _remove_entry_unsafe(self, key: str) -> bool:
+        """Remove entry without lock (internal use only)."""
+        if key in self.cache:
+            entry = self.cache.pop(key)
+            self.lru_order.pop(key, None)
+            self.access_counts.pop(key, None)
+            self.current_size_bytes -= entry.size_bytes
+            self.metrics.entries_count = len(self.cache)
+            return True
+        return False
+    
+    def _ensure_space_unsafe(self, required_bytes: int):
+        """Ensure sufficient space using eviction policy."""
+        while (self.current_size_bytes + required_bytes) > self.max_size_bytes and self.cache:
+            victim_key = self._select_eviction_victim_unsafe()
+            if victim_key:
+                self._remove_entry_unsafe(victim_key)
+                self.metrics.evictions += 1
+            else:
+                break
+    
+    def _select_eviction_victim_unsafe(self) -> Optional[str]:
+        """Select victim for eviction based on policy."""
+        if not self.cache:
+            return None
+        
+        if self.eviction_policy == EvictionPolicy.LRU:
+            return next(iter(self.lru_order))
+        elif self.eviction_policy == EvictionPolicy.LFU:
+            return min(self.cache.keys(), key=lambda k: self.access_counts.get(k, 0))
+        elif self.eviction_policy == EvictionPolicy.TTL:
+            expiring_keys = [
+                (k, v) for k, v in self.cache.items()
+                if v.expires_at is not None
+            ]
+            if expiring_keys:
+                return min(expiring_keys, key=lambda x: x[1].expires_at or float('inf'))[0]
+            return next(iter(self.cache))
+        else:  # HYBRID
+            return min(self.cache.keys(), key=lambda k: self.cache[k].calculate_eviction_score())
+    
+    def cleanup_expired(self) -> int:
+        """Clean up expired entries."""
+        if time.time() - self.last_cleanup < self.cleanup_interval:
+            return 0
+        
+        expired_keys = []
+        with self.lock:
+            for key, entry in self.cache.items():
+                if entry.is_expired():
+                    expired_keys.append(key)
+            
+            for key in expired_keys:
+                self._remove_entry_unsafe(key)
+        
+        self.last_cleanup = time.time()
+        return len(expired_keys)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get comprehensive L1 cache metrics."""
+        with self.lock:
+            utilization = (self.current_size_bytes / self.max_size_bytes) * 100
+            
+            return {
+                'level': 'L1_MEMORY',
+                'metrics': asdict(self.metrics),
+                'utilization_percent': utilization,
+                'current_size_mb': self.current_size_bytes / (1024 * 1024),
+                'max_size_mb': self.max_size_bytes / (1024 * 1024),
+                'eviction_policy': self.eviction_policy.value,
+                'performance_target_ms': 5
+            }
+    
+    def clear(self):
+        """Clear all cache entries."""
+        with self.lock:
+            self.cache.clear()
+            self.lru_order.clear()
+            self.access_counts.clear()
+            self.current_size_bytes = 0
+            self.metrics = CacheMetrics()
+
+
+def make_value(i: int) -> Dict[str, Any]:
+    """Authorization-shaped payload similar to what the orchestrator caches."""
+    return {
+        "user_id": f"user-{i}",
+        "resource_id": f"gen-{i}",
+        "access_granted": i % 7 != 0,
+        "permissions": ["read", "write"] if i % 3 else ["read"],
+        "security_level": "standard",
+        "checked_at": time.time(),
+        "reason": "owner" * (1 + i % 20),
+    }
+
+
+def zipf_keys(count: int, seed: int) -> List[str]:
+    """Skewed key stream: a few hot keys, long tail (roughly Zipf s=1)."""
+    rng = random.Random(seed)
+    return [f"auth:{int(KEY_SPACE ** rng.random()) - 1}" for _ in range(count)]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def prefill(cache, count: int):
+    for i in range(count):
+        cache.set(f"auth:{i}", make_value(i), ttl=300)
+
+
+def run_single_thread(cache) -> Dict[str, float]:
+    keys = zipf_keys(OPERATIONS, seed=42)
+    rng = random.Random(7)
+    get_latencies, set_latencies = [], []
+
+    start = time.perf_counter()
+    for key in keys:
+        if rng.random() < READ_RATIO:
+            t0 = time.perf_counter()
+            if cache.get(key) is None:
+                cache.set(key, make_value(int(key.split(":")[1])), ttl=300)
+            get_latencies.append((time.perf_counter() - t0) * 1e6)
+        else:
+            t0 = time.perf_counter()
+            cache.set(key, make_value(int(key.split(":")[1])), ttl=300)
+            set_latencies.append((time.perf_counter() - t0) * 1e6)
+    elapsed = time.perf_counter() - start
+
+    metrics = cache.get_metrics()["metrics"]
+    return {
+        "ops_per_sec": OPERATIONS / elapsed,
+        "get_p50_us": percentile(get_latencies, 0.50),
+        "get_p99_us": percentile(get_latencies, 0.99),
+        "set_p50_us": percentile(set_latencies, 0.50) if set_latencies else 0.0,
+        "set_p99_us": percentile(set_latencies, 0.99) if set_latencies else 0.0,
+        "hit_rate": metrics["hit_rate_percent"],
+    }
+
+
+def run_contention(cache) -> Dict[str, float]:
+    per_thread = OPERATIONS // THREADS
+    streams = [zipf_keys(per_thread, seed=100 + t) for t in range(THREADS)]
+    barrier = threading.Barrier(THREADS + 1)
+    latencies: List[List[float]] = [[] for _ in range(THREADS)]
+
+    def worker(index: int):
+        local = latencies[index]
+        barrier.wait()
+        for key in streams[index]:
+            t0 = time.perf_counter()
+            if cache.get(key) is None:
+                cache.set(key, make_value(int(key.split(":")[1])), ttl=300)
+            local.append((time.perf_counter() - t0) * 1e6)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    merged = [sample for samples in latencies for sample in samples]
+    return {
+        "ops_per_sec": len(merged) / elapsed,
+        "p50_us": percentile(merged, 0.50),
+        "p99_us": percentile(merged, 0.99),
+    }
+
+
+def benchmark(name: str, factory) -> Dict[str, Any]:
+    print(f"\n🔬 {name}")
+    cache = factory()
+    t0 = time.perf_counter()
+    prefill(cache, KEY_SPACE)
+    prefill_s = time.perf_counter() - t0
+    print(f"   prefill {KEY_SPACE} entries: {prefill_s:.2f}s "
+          f"({cache.get_metrics()['current_size_mb']:.1f}MB, evictions={cache.get_metrics()['metrics']['evictions']})")
+
+    single = run_single_thread(cache)
+    print(f"   single-thread: {single['ops_per_sec']:,.0f} ops/s | "
+          f"get p50={single['get_p50_us']:.1f}µs p99={single['get_p99_us']:.1f}µs | "
+          f"set p50={single['set_p50_us']:.1f}µs p99={single['set_p99_us']:.1f}µs | "
+          f"hit rate {single['hit_rate']:.1f}%")
+
+    contended = run_contention(cache)
+    print(f"   {THREADS} threads: {contended['ops_per_sec']:,.0f} ops/s | "
+          f"p50={contended['p50_us']:.1f}µs p99={contended['p99_us']:.1f}µs")
+    return {"prefill_s": prefill_s, "single": single, "contended": contended}
+
+
+def main():
+    print("🚀 L1 Memory Cache Microbenchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Cache: {CACHE_SIZE_MB}MB | keys: {KEY_SPACE} | ops: {OPERATIONS} | threads: {THREADS}")
+
+    legacy = benchmark("Legacy L1 (global RLock, pickle+gzip sizing, O(n) victim scan)",
+                       lambda: LegacyL1MemoryCache(CACHE_SIZE_MB, EvictionPolicy.HYBRID))
+    sharded = benchmark("Sharded L1 (lock striping, SLRU + TinyLFU)",
+                        lambda: L1MemoryCache(CACHE_SIZE_MB, EvictionPolicy.HYBRID))
+
+    print("\n📊 SUMMARY")
+    print(f"   prefill speedup:       {legacy['prefill_s'] / sharded['prefill_s']:.1f}x")
+    print(f"   single-thread speedup: {sharded['single']['ops_per_sec'] / legacy['single']['ops_per_sec']:.1f}x")
+    print(f"   contended speedup:     {sharded['contended']['ops_per_sec'] / legacy['contended']['ops_per_sec']:.1f}x")
+    print(f"   contended p99:         {legacy['contended']['p99_us']:.1f}µs -> {sharded['contended']['p99_us']:.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Velro Middleware Stack Benchmark
+Compares the production middleware chain from main.py (CORS, request
+tracking, global error handler, rate limiter, auth, GZip, DataLoader scope)
+as the previous BaseHTTPMiddleware layers and as the current plain ASGI
+middlewares, against the bare app as a baseline.
+
+Requests are driven straight through the ASGI interface (no sockets), so the
+numbers are the per-request cost of the stack itself: mean/p50/p99 latency
+of an authenticated JSON route, throughput under concurrency, and time to
+first event of an SSE stream for a gzip-accepting client.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.middleware.gzip import GZipMiddleware  # noqa: E402
+
+from middleware.auth_refactored import AuthMiddleware  # noqa: E402
+from middleware.dataloader_scope import DataLoaderScopeMiddleware  # noqa: E402
+from middleware.global_error_handler import GlobalErrorMiddleware  # noqa: E402
+from middleware.rate_limiter_safe import RateLimiterMiddleware  # noqa: E402
+from middleware.request_tracking import RequestTrackingMiddleware  # noqa: E402
+from middleware.streaming_gzip import StreamingSafeGZipMiddleware  # noqa: E402
+from utils.principal_cache import principal_cache  # noqa: E402
+
+# Configuration
+REQUESTS = int(os.getenv("MW_BENCH_REQUESTS", "5000"))
+CONCURRENCY = int(os.getenv("MW_BENCH_CONCURRENCY", "50"))
+SSE_EVENTS = 5
+SSE_INTERVAL_SECONDS = 0.02
+TOKEN = "bench-token"
+ORIGIN = "http://localhost:3000"
+
+
+# -----------------------------------------------------------------------------
+# Previous BaseHTTPMiddleware layers (condensed, same per-request work)
+# -----------------------------------------------------------------------------
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        token = request.headers.get("Authorization", "")[7:]
+        principal = principal_cache.get(token)
+        if principal is None:
+            return JSONResponse({"detail": "Invalid or expired token"}, status_code=401)
+        request.state.user = dict(principal)
+        request.state.user_id = principal.get("id")
+        return await call_next(request)
+
+
+class LegacyRateLimiterMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.memory_store: Dict[str, list] = {}
+
+    async def dispatch(self, request: Request, call_next):
+        now = time.time()
+        hits = [ts for ts in self.memory_store.get(request.client.host, []) if ts > now - 60]
+        hits.append(now)
+        self.memory_store[request.client.host] = hits[-100:]
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = "100"
+        response.headers["X-RateLimit-Remaining"] = "99"
+        response.headers["X-RateLimit-Reset"] = str(int(now + 60))
+        return response
+
+
+class LegacyGlobalErrorMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        request.state.request_id = request_id
+        start_time = time.perf_counter()
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            return JSONResponse({"error": "internal_server_error", "detail": str(e)}, status_code=500)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Response-Time"] = f"{(time.perf_counter() - start_time) * 1000:.2f}ms"
+        return response
+
+
+class LegacyRequestTrackingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        total_start = time.perf_counter()
+        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        request.state.request_id = request_id
+        request.state.timing_segments = {}
+        router_start = time.perf_counter()
+        response = await call_next(request)
+        router_ms = (time.perf_counter() - router_start) * 1000
+        total_ms = (time.perf_counter() - total_start) * 1000
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Response-Time"] = f"{total_ms:.2f}ms"
+        response.headers["Server-Timing"] = f"mw_cors;dur=0.50, router;dur={router_ms:.2f}, mw_auth;dur=2.00, total;dur={total_ms:.2f}"
+        return response
+
+
+# -----------------------------------------------------------------------------
+# App under test
+# -----------------------------------------------------------------------------
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/bench/json")
+    async def bench_json():
+        return {"id": "bench", "status": "completed", "items": list(range(20))}
+
+    @app.get("/api/v1/bench/stream")
+    async def bench_stream():
+        async def events():
+            for i in range(SSE_EVENTS):
+                yield f"data: {json.dumps({'event': 'progress', 'step': i})}\n\n"
+                await asyncio.sleep(SSE_INTERVAL_SECONDS)
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # Same order as main.py: last added = outermost
+    if stack == "legacy":
+        app.add_middleware(DataLoaderScopeMiddleware)
+        app.add_middleware(GZipMiddleware, minimum_size=1000)
+        app.add_middleware(LegacyAuthMiddleware)
+        app.add_middleware(LegacyRateLimiterMiddleware)
+        app.add_middleware(LegacyGlobalErrorMiddleware)
+        app.add_middleware(LegacyRequestTrackingMiddleware)
+    elif stack == "asgi":
+        app.add_middleware(DataLoaderScopeMiddleware)
+        app.add_middleware(StreamingSafeGZipMiddleware, minimum_size=1000)
+        app.add_middleware(AuthMiddleware, public_paths=["/health"])
+        app.add_middleware(RateLimiterMiddleware, redis_url="", default_limit="100000000/minute")
+        app.add_middleware(GlobalErrorMiddleware)
+        app.add_middleware(RequestTrackingMiddleware)
+    app.add_middleware(CORSMiddleware, allow_origins=[ORIGIN], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+    return app
+
+
+async def call(app: Callable, path: str) -> Dict[str, float]:
+    """Drive one GET through the ASGI app; returns status and timings in ms."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench"),
+            (b"origin", ORIGIN.encode()),
+            (b"accept-encoding", b"gzip"),
+            (b"authorization", f"Bearer {TOKEN}".encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    request_sent = False
+    result = {"status": 0, "first_event_ms": 0.0, "total_ms": 0.0}
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    decoder = None
+    received = b""
+
+    async def send(message):
+        nonlocal decoder, received
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            if (b"content-encoding", b"gzip") in message["headers"]:
+                decoder = zlib.decompressobj(wbits=31)
+        elif message["type"] == "http.response.body":
+            # Gzip headers alone are not an event: look for decoded SSE data
+            body = message.get("body", b"")
+            received += decoder.decompress(body) if decoder else body
+            if not result["first_event_ms"] and b"data:" in received:
+                result["first_event_ms"] = (time.perf_counter() - start) * 1000
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    result["total_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def run_stack(stack: str) -> Dict[str, float]:
+    app = build_app(stack)
+    for _ in range(200):
+        await call(app, "/api/v1/bench/json")
+
+    latencies = []
+    for _ in range(REQUESTS):
+        result = await call(app, "/api/v1/bench/json")
+        assert result["status"] == 200, result
+        latencies.append(result["total_ms"])
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with semaphore:
+            await call(app, "/api/v1/bench/json")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    throughput = REQUESTS / (time.perf_counter() - start)
+
+    stream = await call(app, "/api/v1/bench/stream")
+
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "requests_per_second": throughput,
+        "sse_first_event_ms": stream["first_event_ms"],
+        "sse_total_ms": stream["total_ms"]
+    }
+
+
+async def main():
+    print("🚀 Middleware Stack Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Requests: {REQUESTS} | concurrency: {CONCURRENCY}")
+
+    principal_cache.set(TOKEN, {"id": "bench-user", "email": "bench@velro.ai", "role": "authenticated"},
+                        time.time() + 3600)
+
+    results = {}
+    for stack, label in (("bare", "Bare app (CORS only)"),
+                         ("legacy", "BaseHTTPMiddleware chain (previous)"),
+                         ("asgi", "Plain ASGI chain (current)")):
+        results[stack] = await run_stack(stack)
+        r = results[stack]
+        print(f"\n🔬 {label}")
+        print(f"   Latency: mean={r['mean_ms']:.3f}ms p50={r['p50_ms']:.3f}ms p99={r['p99_ms']:.3f}ms")
+        print(f"   Throughput @{CONCURRENCY}: {r['requests_per_second']:.0f} req/s")
+        print(f"   SSE first event: {r['sse_first_event_ms']:.1f}ms of {r['sse_total_ms']:.1f}ms stream")
+
+    bare = results["bare"]
+    for stack in ("legacy", "asgi"):
+        r = results[stack]
+        print(f"\n📊 {stack}: overhead per request {r['mean_ms'] - bare['mean_ms']:.3f}ms "
+              f"(p99 +{r['p99_ms'] - bare['p99_ms']:.3f}ms)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
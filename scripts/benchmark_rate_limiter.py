@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Velro Rate Limiter Benchmark
+Compares the previous sorted-set sliding window against the GCRA Lua script
+used by ProductionRateLimiter: Redis memory and check latency at 10k clients.
+Requires a reachable Redis (REDIS_URL); benchmark keys are deleted afterwards.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from redis.asyncio import Redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from middleware.production_rate_limiter import (  # noqa: E402
+    GCRA_LUA_SCRIPT, RATE_LIMIT_TIERS, gcra_windows
+)
+
+# Configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+CLIENTS = int(os.getenv("RATE_BENCH_CLIENTS", "10000"))
+REQUESTS_PER_CLIENT = int(os.getenv("RATE_BENCH_REQUESTS", "100"))
+CONCURRENCY = int(os.getenv("RATE_BENCH_CONCURRENCY", "200"))
+TIER = os.getenv("RATE_BENCH_TIER", "enterprise")  # High limits so most checks are admitted
+
+ZSET_PREFIX = "bench:zset"
+GCRA_PREFIX = "bench:gcra"
+
+
+async def zset_check(redis: Redis, client_id: str, limits: Dict[str, int]) -> bool:
+    """The sliding-window check ProductionRateLimiter used before GCRA."""
+    current_time = time.time()
+    minute_key = f"{ZSET_PREFIX}:minute:{client_id}"
+    hour_key = f"{ZSET_PREFIX}:hour:{client_id}"
+
+    pipe = redis.pipeline()
+    pipe.zremrangebyscore(minute_key, 0, current_time - 60)
+    pipe.zcard(minute_key)
+    pipe.zadd(minute_key, {str(current_time): current_time})
+    pipe.expire(minute_key, 60)
+    pipe.zremrangebyscore(hour_key, 0, current_time - 3600)
+    pipe.zcard(hour_key)
+    pipe.zadd(hour_key, {str(current_time): current_time})
+    pipe.expire(hour_key, 3600)
+    results = await pipe.execute()
+
+    if results[1] > limits["requests_per_minute"] or results[5] > limits["requests_per_hour"]:
+        await redis.zrem(minute_key, str(current_time))
+        await redis.zrem(hour_key, str(current_time))
+        return False
+    return True
+
+
+async def run_backend(redis: Redis, name: str, check, prefix: str) -> Dict[str, float]:
+    print(f"\n🔬 {name}")
+    await delete_prefix(redis, prefix)
+    memory_before = (await redis.info("memory"))["used_memory"]
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies: List[float] = []
+    rejected = 0
+
+    async def one(client_index: int):
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            allowed = await check(f"client-{client_index}")
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not allowed:
+                rejected += 1
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS_PER_CLIENT):
+        await asyncio.gather(*(one(i) for i in range(CLIENTS)))
+    elapsed = time.perf_counter() - start
+
+    memory_after = (await redis.info("memory"))["used_memory"]
+    latencies.sort()
+    results = {
+        "checks_per_sec": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99)],
+        "memory_mb": (memory_after - memory_before) / (1024 * 1024),
+        "bytes_per_client": (memory_after - memory_before) / CLIENTS,
+        "rejected": rejected,
+    }
+    print(f"   {len(latencies):,} checks: {results['checks_per_sec']:,.0f}/s | "
+          f"p50={results['p50_ms']:.2f}ms p99={results['p99_ms']:.2f}ms | rejected={rejected}")
+    print(f"   Redis memory: {results['memory_mb']:.1f}MB ({results['bytes_per_client']:.0f} bytes/client)")
+
+    await delete_prefix(redis, prefix)
+    return results
+
+
+async def delete_prefix(redis: Redis, prefix: str):
+    batch = []
+    async for key in redis.scan_iter(match=f"{prefix}:*", count=1000):
+        batch.append(key)
+        if len(batch) >= 1000:
+            await redis.delete(*batch)
+            batch = []
+    if batch:
+        await redis.delete(*batch)
+
+
+async def main():
+    print("🚀 Rate Limiter Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Redis: {REDIS_URL} | clients: {CLIENTS} | requests/client: {REQUESTS_PER_CLIENT} | tier: {TIER}")
+
+    redis = Redis.from_url(REDIS_URL, decode_responses=True, max_connections=CONCURRENCY)
+    await redis.ping()
+
+    limits = RATE_LIMIT_TIERS.get(TIER, RATE_LIMIT_TIERS["free"])
+    windows = gcra_windows(limits)
+    gcra_args = [value for window in windows for value in window]
+    gcra_script = redis.register_script(GCRA_LUA_SCRIPT)
+
+    async def gcra_check(client_id: str) -> bool:
+        allowed, _, _, _ = await gcra_script(keys=[f"{GCRA_PREFIX}:{client_id}"], args=gcra_args)
+        return bool(allowed)
+
+    try:
+        zset = await run_backend(redis, "Sorted-set sliding window (8-command pipeline)",
+                                 lambda client_id: zset_check(redis, client_id, limits), ZSET_PREFIX)
+        gcra = await run_backend(redis, "GCRA Lua script (1 round trip)", gcra_check, GCRA_PREFIX)
+    finally:
+        await redis.close()
+
+    print("\n📊 SUMMARY")
+    print(f"   throughput: {gcra['checks_per_sec'] / zset['checks_per_sec']:.1f}x")
+    print(f"   p99:        {zset['p99_ms']:.2f}ms -> {gcra['p99_ms']:.2f}ms")
+    print(f"   memory:     {zset['memory_mb']:.1f}MB -> {gcra['memory_mb']:.1f}MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Velro Thumbnail Pipeline Benchmark
+Compares the previous thumbnail path (three decodes, LANCZOS resizes and WebP
+encodes per image on the event loop, then one upload and one metadata insert
+per size, in sequence) against utils/thumbnail_engine.py (one draft-mode
+decode and cascaded resizes in a process pool, concurrent uploads and a single
+metadata insert).
+
+Reports image throughput and event-loop lag: a probe coroutine asks to wake
+every 10ms while thumbnails are rendered, and its late wake-ups are what every
+other request on the loop would have waited. Storage uploads and metadata
+inserts are simulated with a fixed latency.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.thumbnail_engine import ThumbnailEngine  # noqa: E402
+
+# Configuration
+IMAGES = int(os.getenv("BENCH_IMAGES", "12"))
+IMAGE_WIDTH = int(os.getenv("BENCH_IMAGE_WIDTH", "4000"))
+IMAGE_HEIGHT = int(os.getenv("BENCH_IMAGE_HEIGHT", "3000"))
+WORKERS = int(os.getenv("BENCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+IO_LATENCY_MS = float(os.getenv("BENCH_IO_LATENCY_MS", "40"))
+PROBE_INTERVAL_MS = 10
+SIZES = ((256, 256), (512, 512), (1024, 1024))  # Previous (width, height) list
+
+
+def make_test_image(image_format: str) -> bytes:
+    """A photo-sized image with enough detail that encoders cannot shortcut it."""
+    noise = Image.effect_noise((IMAGE_WIDTH // 4, IMAGE_HEIGHT // 4), 64).convert("RGB")
+    gradient = Image.linear_gradient("L").resize(noise.size).convert("RGB")
+    image = Image.blend(noise, gradient, 0.5).resize((IMAGE_WIDTH, IMAGE_HEIGHT), Image.Resampling.BICUBIC)
+    output = io.BytesIO()
+    image.save(output, format=image_format, quality=90)
+    return output.getvalue()
+
+
+def create_thumbnail_inline(image_data: bytes, width: int, height: int) -> bytes:
+    """The previous StorageService._create_thumbnail body."""
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((width, height), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="WEBP", quality=85, optimize=True)
+    return output.getvalue()
+
+
+async def simulated_io():
+    await asyncio.sleep(IO_LATENCY_MS / 1000)
+
+
+async def previous_pipeline(image_data: bytes):
+    for width, height in SIZES:
+        create_thumbnail_inline(image_data, width, height)
+        await simulated_io()  # upload
+        await simulated_io()  # metadata insert
+
+
+async def engine_pipeline(engine: ThumbnailEngine, image_data: bytes):
+    thumbnails = await engine.render(image_data)
+    await asyncio.gather(*(simulated_io() for _ in thumbnails))  # concurrent uploads
+    await simulated_io()  # one batched metadata insert
+
+
+async def run_pipeline(name: str, process_one, images: List[bytes]) -> Dict[str, float]:
+    print(f"\n🔬 {name}")
+    lags: List[float] = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            expected = time.perf_counter() + PROBE_INTERVAL_MS / 1000
+            await asyncio.sleep(PROBE_INTERVAL_MS / 1000)
+            lags.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(process_one(image) for image in images))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+
+    lags.sort()
+    results = {
+        "images_per_sec": len(images) / elapsed,
+        "lag_p50_ms": lags[len(lags) // 2],
+        "lag_p99_ms": lags[int(len(lags) * 0.99)],
+        "lag_max_ms": lags[-1],
+    }
+    print(f"   {len(images)} images in {elapsed:.2f}s: {results['images_per_sec']:.1f} images/s | "
+          f"loop lag p50={results['lag_p50_ms']:.1f}ms p99={results['lag_p99_ms']:.1f}ms "
+          f"max={results['lag_max_ms']:.1f}ms")
+    return results
+
+
+async def main():
+    print("🚀 Thumbnail Pipeline Benchmark")
+    print(f"Time: {datetime.now().isoformat()}")
+    print(f"Images: {IMAGES} x {IMAGE_WIDTH}x{IMAGE_HEIGHT} | workers: {WORKERS} | "
+          f"simulated I/O latency: {IO_LATENCY_MS:.0f}ms")
+
+    engine = ThumbnailEngine(max_workers=WORKERS)
+    # Start the worker processes before measuring
+    await engine.render(make_test_image("JPEG"))
+
+    summary = {}
+    try:
+        for image_format in ("JPEG", "PNG"):
+            images = [make_test_image(image_format)] * IMAGES
+            print(f"\n🖼️ {image_format} ({len(images[0]) / 1024 / 1024:.1f} MB each)")
+            previous = await run_pipeline("Previous: inline decode x3 on the event loop, sequential I/O",
+                                          previous_pipeline, images)
+            current = await run_pipeline(f"Thumbnail engine: {WORKERS}-process pool, concurrent I/O",
+                                         lambda image: engine_pipeline(engine, image), images)
+            summary[image_format] = (previous, current)
+    finally:
+        engine.shutdown()
+
+    print("\n📊 SUMMARY")
+    for image_format, (previous, current) in summary.items():
+        print(f"   {image_format}: throughput {current['images_per_sec'] / previous['images_per_sec']:.1f}x | "
+              f"loop lag p99 {previous['lag_p99_ms']:.0f}ms -> {current['lag_p99_ms']:.1f}ms | "
+              f"max {previous['lag_max_ms']:.0f}ms -> {current['lag_max_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -20,20 +20,25 @@ OWASP A09 (Security Logging and Monitoring Failures) Mitigation:
 import asyncio
 import json
 import logging
+import random
 import time
 import hashlib
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Deque, Dict, List, Optional, Any, Tuple
 from uuid import UUID, uuid4
 from dataclasses import dataclass, asdict
-import redis
+import redis.asyncio as aioredis
 from enum import Enum
 
+from config import settings
+from database import get_database
 from models.authorization import ValidationContext
 from models.authorization_layers import (
     LayerResult, SecurityThreatLevel, AnomalyType, AuthorizationLayerType,
     AuditEventType, AuditSeverity, AuditLogEntry, SIEMIntegrationConfig
 )
+from repositories.audit_log_repository import AuditLogRepository
 
 logger = logging.getLogger(__name__)
 
@@ -91,18 +96,51 @@ class AuditSecurityLogger:
     - Compliance reporting
     - Performance-optimized logging
     - Tamper-evident audit trails
+    
+    Write-behind: log_authorization_event only builds the entry and appends it
+    to a bounded in-memory buffer. A background consumer drains the buffer in
+    batches (when a batch fills or every flush interval), writes each batch
+    with one pipelined Redis round trip and one multi-row database insert, and
+    runs threat correlation and alerting on it. When the buffer runs half
+    full, info-level events are sampled; when it is full, low-severity events
+    are dropped and error/critical events go straight to the audit file.
     """
     
     def __init__(self, config: Optional[SIEMIntegrationConfig] = None):
         self.config = config or SIEMIntegrationConfig()
-        self.redis_client = redis.Redis(decode_responses=True)
+        self.redis_client = aioredis.from_url(settings.redis_url, decode_responses=True) if settings.redis_url else None
+        self.db = None
+        self.audit_repo = None
         
         # Logging destinations
         self.audit_logger = logging.getLogger('security_audit')
         self.security_logger = logging.getLogger('security_events')
         
-        # Performance metrics
-        self.logging_times = []
+        # Write-behind pipeline
+        self.buffer_size = settings.AUDIT_BUFFER_SIZE
+        self.batch_size = settings.AUDIT_BATCH_SIZE
+        self.flush_interval = settings.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.low_severity_sample_rate = settings.AUDIT_LOW_SEVERITY_SAMPLE_RATE
+        self._buffer: Deque[AuditLogEntry] = deque()
+        self._flush_event: Optional[asyncio.Event] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.pipeline_stats = {
+            'accepted': 0,
+            'sampled_out': 0,
+            'dropped': 0,
+            'file_only': 0,
+            'flushed': 0,
+            'batches': 0,
+            'redis_failures': 0,
+            'database_failures': 0,
+            'threats_detected': 0,
+            'alerts_generated': 0,
+            'flush_time_ms': 0.0
+        }
+        
+        # Performance metrics (time spent on the authorization path)
+        self.logging_times: Deque[float] = deque(maxlen=10000)
         self.log_count = 0
         self.failed_logs = 0
         
@@ -146,7 +184,7 @@ class AuditSecurityLogger:
             }
         ]
         
-        # Initialize background tasks
+        # Start the flush consumer now if constructed inside a running loop
         self._start_background_tasks()
     
     async def log_authorization_event(
@@ -158,7 +196,10 @@ class AuditSecurityLogger:
         execution_metadata: Dict[str, Any] = None
     ) -> LayerResult:
         """
-        Log comprehensive authorization event with SIEM integration.
+        Record an authorization event for SIEM, streaming and database sinks.
+        
+        The entry is queued for the background consumer; no audit I/O happens
+        on the caller's path.
         
         Args:
             context: Authorization validation context
@@ -182,47 +223,25 @@ class AuditSecurityLogger:
                 threat_level, execution_metadata
             )
             
-            # Log to multiple destinations (parallel execution for performance)
-            log_tasks = [
-                self._log_to_file(audit_entry),
-                self._log_to_siem(audit_entry),
-                self._log_to_redis_streams(audit_entry),
-                self._store_in_database(audit_entry)
-            ]
-            
-            log_results = await asyncio.gather(*log_tasks, return_exceptions=True)
-            
-            # Count successful logs
-            successful_logs = sum(1 for result in log_results if not isinstance(result, Exception))
-            
-            # Perform real-time threat analysis
-            threats_detected = await self._analyze_security_patterns(audit_entry)
-            
-            # Generate alerts if necessary
-            alerts_generated = await self._generate_security_alerts(audit_entry, threats_detected)
+            disposition = self._enqueue(audit_entry)
             
             # Update performance metrics
             execution_time = (time.time() - start_time) * 1000
             self.logging_times.append(execution_time)
             self.log_count += 1
             
-            if successful_logs == 0:
-                self.failed_logs += 1
-            
             # Create result
             result = LayerResult(
                 layer_type=AuthorizationLayerType.AUDIT_SECURITY_LOGGING_LAYER,
-                success=successful_logs > 0,
+                success=True,
                 execution_time_ms=execution_time,
                 threat_level=SecurityThreatLevel.GREEN,
                 metadata={
                     'audit_entry_id': audit_id,
-                    'successful_log_destinations': successful_logs,
-                    'total_log_destinations': len(log_tasks),
-                    'threats_detected': len(threats_detected),
-                    'alerts_generated': len(alerts_generated),
+                    'audit_disposition': disposition,
+                    'buffered_events': len(self._buffer),
                     'siem_enabled': self.config.enabled,
-                    'compliance_logged': True,
+                    'compliance_logged': disposition in ('queued', 'file_only'),
                     'tamper_protection': True
                 }
             )
@@ -245,6 +264,104 @@ class AuditSecurityLogger:
                 }
             )
     
+    # === Write-behind pipeline ===
+    
+    def _enqueue(self, audit_entry: AuditLogEntry) -> str:
+        """Buffer an entry for the consumer; returns what happened to it."""
+        high_severity = audit_entry.severity in (AuditSeverity.ERROR, AuditSeverity.CRITICAL)
+        depth = len(self._buffer)
+        
+        if depth >= self.buffer_size:
+            if high_severity:
+                # Never lose security events: keep at least the audit file record
+                self._log_to_file(audit_entry)
+                self.pipeline_stats['file_only'] += 1
+                return 'file_only'
+            self.pipeline_stats['dropped'] += 1
+            return 'dropped'
+        
+        if audit_entry.severity == AuditSeverity.INFO and depth >= self.buffer_size // 2 \
+                and random.random() >= self.low_severity_sample_rate:
+            self.pipeline_stats['sampled_out'] += 1
+            return 'sampled_out'
+        
+        self._buffer.append(audit_entry)
+        self.pipeline_stats['accepted'] += 1
+        self._start_background_tasks()
+        if len(self._buffer) >= self.batch_size:
+            self._flush_event.set()
+        return 'queued'
+    
+    async def _consume(self):
+        """Drain the buffer in batches until shutdown."""
+        while True:
+            if len(self._buffer) < self.batch_size and not self._closing:
+                try:
+                    await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._flush_event.clear()
+            
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                await self._flush_batch(batch)
+            
+            if self._closing:
+                return
+    
+    async def _flush_batch(self, batch: List[AuditLogEntry]):
+        """Write one batch to every sink, then correlate threats across it."""
+        start_time = time.perf_counter()
+        
+        for audit_entry in batch:
+            try:
+                self._log_to_file(audit_entry)
+            except Exception:
+                pass  # Logged by _log_to_file
+        
+        redis_result, database_result = await asyncio.gather(
+            self._log_to_redis_streams(batch),
+            self._store_in_database(batch),
+            return_exceptions=True
+        )
+        if isinstance(redis_result, Exception):
+            self.pipeline_stats['redis_failures'] += len(batch)
+        if isinstance(database_result, Exception):
+            self.pipeline_stats['database_failures'] += len(batch)
+            self.failed_logs += len(batch)
+        
+        try:
+            patterns = await self._analyze_security_patterns(batch)
+            alerts = await self._generate_security_alerts(batch, patterns)
+            self.pipeline_stats['threats_detected'] += sum(len(entry_patterns) for entry_patterns in patterns)
+            self.pipeline_stats['alerts_generated'] += len(alerts)
+        except Exception as e:
+            logger.error(f"Audit threat analysis failed for {len(batch)} entries: {e}")
+        
+        self.pipeline_stats['flushed'] += len(batch)
+        self.pipeline_stats['batches'] += 1
+        self.pipeline_stats['flush_time_ms'] += (time.perf_counter() - start_time) * 1000
+    
+    async def flush(self):
+        """Write everything buffered so far (for tests and shutdown paths)."""
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            await self._flush_batch(batch)
+    
+    async def shutdown(self, timeout: float = 5.0):
+        """Flush buffered entries and stop the consumer, e.g. during shutdown."""
+        self._closing = True
+        task = self._consumer_task
+        if task is None or task.done():
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+            return
+        self._flush_event.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ [AUDIT] {len(self._buffer)} buffered audit entries not flushed before shutdown")
+            task.cancel()
+    
     async def _build_comprehensive_audit_entry(
         self,
         audit_id: str,
@@ -346,7 +463,7 @@ class AuditSecurityLogger:
         
         return audit_entry
     
-    async def _log_to_file(self, audit_entry: AuditLogEntry):
+    def _log_to_file(self, audit_entry: AuditLogEntry):
         """Log audit entry to file system."""
         try:
             log_data = {
@@ -386,124 +503,147 @@ class AuditSecurityLogger:
             logger.error(f"File logging failed: {e}")
             raise
     
-    async def _log_to_siem(self, audit_entry: AuditLogEntry):
-        """Log audit entry to SIEM system."""
-        if not self.config.enabled:
+    async def _log_to_redis_streams(self, batch: List[AuditLogEntry]):
+        """Append a batch to the SIEM and real-time monitoring streams in one pipelined round trip."""
+        if self.redis_client is None:
             return
         
         try:
-            # Format for SIEM consumption (Common Event Format - CEF)
-            cef_message = await self._format_for_siem(audit_entry)
-            
-            # Send to SIEM via Redis stream for reliability
-            await self.redis_client.xadd(
-                'siem:authorization_events',
-                {
-                    'audit_id': audit_entry.audit_id,
-                    'cef_message': cef_message,
-                    'raw_data': json.dumps(asdict(audit_entry), default=str),
-                    'timestamp': audit_entry.timestamp.isoformat(),
-                    'severity': audit_entry.severity.value,
-                    'threat_level': audit_entry.threat_level.value
-                },
-                maxlen=self.config.batch_size * 10  # Keep 10 batches
-            )
-            
-        except Exception as e:
-            logger.error(f"SIEM logging failed: {e}")
-            raise
-    
-    async def _log_to_redis_streams(self, audit_entry: AuditLogEntry):
-        """Log to Redis streams for real-time monitoring."""
-        try:
-            # Real-time authorization stream
-            await self.redis_client.xadd(
-                'audit:realtime_authorization',
-                {
-                    'audit_id': audit_entry.audit_id,
-                    'user_id': str(audit_entry.user_id) if audit_entry.user_id else 'anonymous',
-                    'outcome': audit_entry.outcome,
-                    'threat_level': audit_entry.threat_level.value,
-                    'timestamp': audit_entry.timestamp.isoformat(),
-                    'execution_time_ms': audit_entry.performance_metrics.get('total_execution_time_ms', 0)
-                },
-                maxlen=1000  # Keep last 1000 events for real-time monitoring
-            )
-            
-            # Security events stream (for high-severity events)
-            if audit_entry.severity in [AuditSeverity.ERROR, AuditSeverity.CRITICAL]:
-                await self.redis_client.xadd(
-                    'audit:security_events',
+            pipe = self.redis_client.pipeline(transaction=False)
+            for audit_entry in batch:
+                if self.config.enabled:
+                    # Send to SIEM via Redis stream for reliability (Common Event Format)
+                    pipe.xadd(
+                        'siem:authorization_events',
+                        {
+                            'audit_id': audit_entry.audit_id,
+                            'cef_message': await self._format_for_siem(audit_entry),
+                            'raw_data': json.dumps(asdict(audit_entry), default=str),
+                            'timestamp': audit_entry.timestamp.isoformat(),
+                            'severity': audit_entry.severity.value,
+                            'threat_level': audit_entry.threat_level.value
+                        },
+                        maxlen=self.config.batch_size * 10  # Keep 10 batches
+                    )
+                
+                # Real-time authorization stream
+                pipe.xadd(
+                    'audit:realtime_authorization',
                     {
                         'audit_id': audit_entry.audit_id,
-                        'severity': audit_entry.severity.value,
-                        'threat_level': audit_entry.threat_level.value,
                         'user_id': str(audit_entry.user_id) if audit_entry.user_id else 'anonymous',
-                        'ip_address': audit_entry.ip_address or 'unknown',
-                        'action': audit_entry.action_performed,
-                        'timestamp': audit_entry.timestamp.isoformat()
-                    },
-                    maxlen=5000  # Keep more security events
-                )
-            
-            # Performance metrics stream
-            if audit_entry.performance_metrics:
-                await self.redis_client.xadd(
-                    'audit:performance_metrics',
-                    {
-                        'audit_id': audit_entry.audit_id,
-                        'total_execution_time_ms': audit_entry.performance_metrics.get('total_execution_time_ms', 0),
-                        'cache_hit_ratio': audit_entry.performance_metrics.get('cache_hit_ratio', 0),
-                        'failed_layers_count': audit_entry.performance_metrics.get('failed_layers_count', 0),
-                        'timestamp': audit_entry.timestamp.isoformat()
+                        'outcome': audit_entry.outcome,
+                        'threat_level': audit_entry.threat_level.value,
+                        'timestamp': audit_entry.timestamp.isoformat(),
+                        'execution_time_ms': audit_entry.performance_metrics.get('total_execution_time_ms', 0)
                     },
-                    maxlen=2000
+                    maxlen=1000  # Keep last 1000 events for real-time monitoring
                 )
+                
+                # Security events stream (for high-severity events)
+                if audit_entry.severity in [AuditSeverity.ERROR, AuditSeverity.CRITICAL]:
+                    pipe.xadd(
+                        'audit:security_events',
+                        {
+                            'audit_id': audit_entry.audit_id,
+                            'severity': audit_entry.severity.value,
+                            'threat_level': audit_entry.threat_level.value,
+                            'user_id': str(audit_entry.user_id) if audit_entry.user_id else 'anonymous',
+                            'ip_address': audit_entry.ip_address or 'unknown',
+                            'action': audit_entry.action_performed,
+                            'timestamp': audit_entry.timestamp.isoformat()
+                        },
+                        maxlen=5000  # Keep more security events
+                    )
+                
+                # Performance metrics stream
+                if audit_entry.performance_metrics:
+                    pipe.xadd(
+                        'audit:performance_metrics',
+                        {
+                            'audit_id': audit_entry.audit_id,
+                            'total_execution_time_ms': audit_entry.performance_metrics.get('total_execution_time_ms', 0),
+                            'cache_hit_ratio': audit_entry.performance_metrics.get('cache_hit_ratio', 0),
+                            'failed_layers_count': audit_entry.performance_metrics.get('failed_layers_count', 0),
+                            'timestamp': audit_entry.timestamp.isoformat()
+                        },
+                        maxlen=2000
+                    )
+            
+            await pipe.execute()
             
         except Exception as e:
-            logger.error(f"Redis streams logging failed: {e}")
+            logger.error(f"Redis streams logging failed for {len(batch)} entries: {e}")
             raise
     
-    async def _store_in_database(self, audit_entry: AuditLogEntry):
-        """Store audit entry in database for long-term retention."""
+    async def _get_repositories(self):
+        """Initialize repositories if not already done."""
+        if self.db is None:
+            self.db = await get_database()
+            self.audit_repo = AuditLogRepository(self.db)
+    
+    async def _store_in_database(self, batch: List[AuditLogEntry]):
+        """Store a batch in the audit log table for long-term retention."""
         try:
-            # This would store in a dedicated audit database table
-            # For now, we'll store in Redis with longer TTL
-            audit_key = f"audit:stored:{audit_entry.audit_id}"
-            audit_data = json.dumps(asdict(audit_entry), default=str)
-            
-            await self.redis_client.setex(
-                audit_key,
-                self.config.retention_days * 24 * 3600,  # Retention period in seconds
-                audit_data
-            )
-            
-            # Also maintain an index for querying
-            date_key = f"audit:index:{audit_entry.timestamp.date()}"
-            await self.redis_client.sadd(date_key, audit_entry.audit_id)
-            await self.redis_client.expire(date_key, self.config.retention_days * 24 * 3600)
+            await self._get_repositories()
+            rows = [
+                {
+                    'audit_id': audit_entry.audit_id,
+                    'event_type': audit_entry.event_type.value,
+                    'severity': audit_entry.severity.value,
+                    'outcome': audit_entry.outcome,
+                    'threat_level': audit_entry.threat_level.value,
+                    'user_id': str(audit_entry.user_id) if audit_entry.user_id else None,
+                    'resource_id': str(audit_entry.resource_id) if audit_entry.resource_id else None,
+                    'ip_address': audit_entry.ip_address,
+                    'action_performed': audit_entry.action_performed,
+                    'correlation_id': audit_entry.correlation_id,
+                    'checksum': audit_entry.security_context.get('audit_checksum'),
+                    'entry': json.loads(json.dumps(asdict(audit_entry), default=str)),
+                    'occurred_at': audit_entry.timestamp.isoformat()
+                }
+                for audit_entry in batch
+            ]
+            await self.audit_repo.insert_entries(rows)
             
         except Exception as e:
-            logger.error(f"Database storage failed: {e}")
+            logger.error(f"Database storage failed for {len(batch)} entries: {e}")
             raise
     
-    async def _analyze_security_patterns(self, audit_entry: AuditLogEntry) -> List[str]:
-        """Analyze audit entry for security patterns and threats."""
-        patterns_detected = []
-        
-        try:
-            # Check for failed authorization patterns
-            if audit_entry.outcome == 'failure':
+    async def _analyze_security_patterns(self, batch: List[AuditLogEntry]) -> List[List[str]]:
+        """Analyze a batch of audit entries for security patterns; returns the patterns per entry."""
+        patterns_detected: List[List[str]] = [[] for _ in batch]
+        
+        # Sliding-window counters for the whole batch in one pipelined round trip
+        if self.redis_client is not None:
+            pipe = self.redis_client.pipeline(transaction=False)
+            windows = []  # (entry index, pattern, threshold)
+            now = time.time()
+            for index, audit_entry in enumerate(batch):
                 # Check recent failures from same IP
-                recent_failures = await self._count_recent_events(
-                    'audit:failures_by_ip',
-                    audit_entry.ip_address,
-                    minutes=5
-                )
+                if audit_entry.outcome == 'failure':
+                    self._queue_window_count(pipe, 'audit:failures_by_ip', audit_entry.ip_address,
+                                             audit_entry.audit_id, now, minutes=5)
+                    windows.append((index, 'brute_force_pattern', self.alert_thresholds['failed_auth_rate'] * 100))
                 
-                if recent_failures >= self.alert_thresholds['failed_auth_rate'] * 100:
-                    patterns_detected.append('brute_force_pattern')
-            
+                # Check for geographic anomaly patterns
+                if audit_entry.threat_level == SecurityThreatLevel.ORANGE:
+                    self._queue_window_count(pipe, 'audit:geo_anomalies', str(audit_entry.user_id),
+                                             audit_entry.audit_id, now, minutes=30)
+                    windows.append((index, 'geographic_anomaly_cluster', 3))
+            
+            if windows:
+                try:
+                    results = await pipe.execute()
+                    # Each window queues 4 commands; the last one is ZCARD
+                    for (index, pattern, threshold), count in zip(windows, results[3::4]):
+                        if count >= threshold:
+                            patterns_detected[index].append(pattern)
+                except Exception as e:
+                    logger.warning(f"Security pattern analysis failed: {e}")
+        
+        injection_anomalies = ['sql_injection_attempt', 'xss_attempt']
+        for index, audit_entry in enumerate(batch):
             # Check for anomaly clusters
             if audit_entry.layer_results:
                 anomaly_count = sum(
@@ -512,57 +652,47 @@ class AuditSecurityLogger:
                 )
                 
                 if anomaly_count >= self.alert_thresholds['anomaly_cluster']:
-                    patterns_detected.append('anomaly_cluster')
+                    patterns_detected[index].append('anomaly_cluster')
             
             # Check for privilege escalation patterns
             for layer in audit_entry.layer_results:
                 if 'privilege_escalation_attempt' in layer.get('anomalies', []):
-                    patterns_detected.append('privilege_escalation_pattern')
+                    patterns_detected[index].append('privilege_escalation_pattern')
                     break
             
             # Check for injection attempt patterns
-            injection_anomalies = ['sql_injection_attempt', 'xss_attempt']
             for layer in audit_entry.layer_results:
                 if any(anomaly in layer.get('anomalies', []) for anomaly in injection_anomalies):
-                    patterns_detected.append('injection_attack_pattern')
+                    patterns_detected[index].append('injection_attack_pattern')
                     break
-            
-            # Check for geographic anomaly patterns
-            if audit_entry.threat_level == SecurityThreatLevel.ORANGE:
-                recent_geo_anomalies = await self._count_recent_events(
-                    'audit:geo_anomalies',
-                    str(audit_entry.user_id),
-                    minutes=30
-                )
-                
-                if recent_geo_anomalies >= 3:
-                    patterns_detected.append('geographic_anomaly_cluster')
-            
-        except Exception as e:
-            logger.warning(f"Security pattern analysis failed: {e}")
         
         return patterns_detected
     
     async def _generate_security_alerts(
         self, 
-        audit_entry: AuditLogEntry, 
-        patterns: List[str]
+        batch: List[AuditLogEntry], 
+        patterns: List[List[str]]
     ) -> List[SecurityAlert]:
         """Generate security alerts based on detected patterns."""
         alerts = []
         
         try:
-            for pattern in patterns:
-                alert = await self._create_alert_for_pattern(pattern, audit_entry)
-                if alert:
-                    alerts.append(alert)
-                    
+            for audit_entry, entry_patterns in zip(batch, patterns):
+                for pattern in entry_patterns:
+                    alert = await self._create_alert_for_pattern(pattern, audit_entry)
+                    if alert:
+                        alerts.append(alert)
+            
+            if alerts and self.redis_client is not None:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for alert in alerts:
                     # Store alert for tracking
-                    await self._store_security_alert(alert)
+                    self._queue_security_alert(pipe, alert)
                     
                     # Send immediate notifications for critical alerts
                     if alert.alert_type == AlertType.IMMEDIATE:
-                        await self._send_immediate_notification(alert)
+                        self._queue_immediate_notification(pipe, alert)
+                await pipe.execute()
             
         except Exception as e:
             logger.error(f"Alert generation failed: {e}")
@@ -781,87 +911,79 @@ class AuditSecurityLogger:
         
         return f"{cef_header}|{' '.join(cef_extensions)}"
     
-    async def _count_recent_events(
-        self, 
-        stream_key: str, 
-        identifier: str, 
+    def _queue_window_count(
+        self,
+        pipe,
+        stream_key: str,
+        identifier: str,
+        member: str,
+        now: float,
         minutes: int
-    ) -> int:
-        """Count recent events for pattern detection."""
-        try:
-            # Use Redis sorted set for time-based counting
-            key = f"{stream_key}:{identifier}"
-            current_time = time.time()
-            window_start = current_time - (minutes * 60)
-            
-            # Remove old entries
-            await self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Add current event
-            await self.redis_client.zadd(key, {str(current_time): current_time})
-            await self.redis_client.expire(key, minutes * 60)
-            
-            # Count entries in window
-            return await self.redis_client.zcard(key)
-            
-        except Exception:
-            return 0
+    ):
+        """Queue the 4 commands that record an event and count the events in its sliding window."""
+        # Use Redis sorted set for time-based counting
+        key = f"{stream_key}:{identifier}"
+        pipe.zremrangebyscore(key, 0, now - (minutes * 60))
+        pipe.zadd(key, {member: now})
+        pipe.expire(key, minutes * 60)
+        pipe.zcard(key)
     
-    async def _store_security_alert(self, alert: SecurityAlert):
-        """Store security alert for tracking and management."""
-        try:
-            alert_key = f"security_alert:{alert.alert_id}"
-            alert_data = json.dumps(asdict(alert), default=str)
-            
-            await self.redis_client.setex(
-                alert_key,
-                86400 * 7,  # Keep alerts for 7 days
-                alert_data
-            )
-            
-            # Index by type for easy querying
-            type_key = f"alerts_by_type:{alert.alert_type.value}"
-            await self.redis_client.sadd(type_key, alert.alert_id)
-            await self.redis_client.expire(type_key, 86400 * 7)
-            
-        except Exception as e:
-            logger.error(f"Failed to store security alert: {e}")
+    def _queue_security_alert(self, pipe, alert: SecurityAlert):
+        """Queue storing a security alert for tracking and management."""
+        alert_key = f"security_alert:{alert.alert_id}"
+        pipe.setex(
+            alert_key,
+            86400 * 7,  # Keep alerts for 7 days
+            json.dumps(asdict(alert), default=str)
+        )
+        
+        # Index by type for easy querying
+        type_key = f"alerts_by_type:{alert.alert_type.value}"
+        pipe.sadd(type_key, alert.alert_id)
+        pipe.expire(type_key, 86400 * 7)
     
-    async def _send_immediate_notification(self, alert: SecurityAlert):
-        """Send immediate notification for critical alerts."""
-        try:
-            # In production, this would integrate with notification systems
-            # (email, Slack, PagerDuty, etc.)
-            notification_data = {
-                'alert_id': alert.alert_id,
-                'title': alert.title,
-                'severity': alert.severity.value,
-                'description': alert.description,
-                'timestamp': alert.created_at.isoformat(),
-                'recommended_actions': alert.recommended_actions
-            }
-            
-            await self.redis_client.lpush(
-                'immediate_notifications',
-                json.dumps(notification_data, default=str)
-            )
-            
-        except Exception as e:
-            logger.error(f"Failed to send immediate notification: {e}")
+    def _queue_immediate_notification(self, pipe, alert: SecurityAlert):
+        """Queue an immediate notification for a critical alert."""
+        # In production, this would integrate with notification systems
+        # (email, Slack, PagerDuty, etc.)
+        notification_data = {
+            'alert_id': alert.alert_id,
+            'title': alert.title,
+            'severity': alert.severity.value,
+            'description': alert.description,
+            'timestamp': alert.created_at.isoformat(),
+            'recommended_actions': alert.recommended_actions
+        }
+        
+        pipe.lpush(
+            'immediate_notifications',
+            json.dumps(notification_data, default=str)
+        )
     
     def _start_background_tasks(self):
-        """Start background tasks for audit processing."""
-        # In production, these would be separate background processes
-        pass
+        """Start the flush consumer on the running event loop if it is not already running."""
+        if self._consumer_task is not None and not self._consumer_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Started on the first logged event
+        self._flush_event = asyncio.Event()
+        self._consumer_task = loop.create_task(self._consume())
     
     def get_performance_metrics(self) -> Dict[str, Any]:
         """Get performance metrics for audit logging."""
+        batches = self.pipeline_stats['batches']
         return {
             'total_logs': self.log_count,
             'failed_logs': self.failed_logs,
             'success_rate': (self.log_count - self.failed_logs) / max(self.log_count, 1),
             'average_logging_time_ms': sum(self.logging_times) / max(len(self.logging_times), 1),
-            'logs_per_second': self.log_count / max(sum(self.logging_times) / 1000, 1) if self.logging_times else 0
+            'logs_per_second': self.log_count / max(sum(self.logging_times) / 1000, 1) if self.logging_times else 0,
+            'buffered_events': len(self._buffer),
+            'buffer_size': self.buffer_size,
+            'average_flush_time_ms': self.pipeline_stats['flush_time_ms'] / batches if batches else 0.0,
+            **self.pipeline_stats
         }
     
     async def generate_compliance_report(
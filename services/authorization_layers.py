@@ -27,7 +27,7 @@ import user_agents
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple, Set
 from uuid import UUID
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from enum import Enum
 from urllib.parse import urlparse
 from cryptography.fernet import Fernet
@@ -42,6 +42,7 @@ from models.authorization import (
     GenerationNotFoundError
 )
 from database import get_database
+from utils.generation_lineage_cache import generation_lineage_cache
 from utils.enhanced_uuid_utils import EnhancedUUIDUtils, secure_uuid_validator
 from services.authorization_service import AuthorizationService
 
@@ -127,6 +128,9 @@ class GenerationInheritanceChain:
     inheritance_depth: int
     permissions_inherited: List[str]
     access_restrictions: Dict[str, Any]
+    owner_user_id: Optional[UUID] = None
+    parent_owner_user_id: Optional[UUID] = None
+    ancestor_ids: List[UUID] = field(default_factory=list)  # Nearest first
 
 
 @dataclass
@@ -394,8 +398,7 @@ class GenerationInheritanceValidator:
     """
     
     def __init__(self):
-        self.db = get_database()
-        self.redis_client = redis.Redis(decode_responses=True)
+        self.lineage_cache = generation_lineage_cache
         self.max_inheritance_depth = 10  # Prevent infinite loops
     
     async def validate_generation_inheritance(
@@ -467,82 +470,58 @@ class GenerationInheritanceValidator:
             )
     
     async def _build_inheritance_chain(self, generation_id: UUID) -> GenerationInheritanceChain:
-        """Build the complete inheritance chain for a generation."""
+        """Build the complete inheritance chain for a generation in one round trip."""
         # Check cache first
-        cache_key = f"inheritance_chain:{generation_id}"
-        cached_chain = await self.redis_client.get(cache_key)
+        cached_chain = await self.lineage_cache.get(generation_id)
         if cached_chain:
-            data = json.loads(cached_chain)
-            return GenerationInheritanceChain(**data)
+            return self._chain_from_dict(cached_chain)
+        
+        # Lineage, children, inherited permissions and restrictions via recursive CTE
+        db = await get_database()
+        data = await db.execute_rpc_async(
+            "get_generation_inheritance_chain",
+            {"p_generation_id": str(generation_id), "p_max_depth": self.max_inheritance_depth},
+            use_service_key=True
+        )
+        if not data:
+            raise GenerationNotFoundError(f"Generation {generation_id} not found")
+        
+        ancestors = data.get('ancestors') or []
+        permissions_inherited = data.get('parent_permissions') or []
+        if isinstance(permissions_inherited, str):
+            permissions_inherited = json.loads(permissions_inherited)
+        
+        chain = GenerationInheritanceChain(
+            generation_id=generation_id,
+            parent_generation_id=UUID(data['parent_generation_id']) if data.get('parent_generation_id') else None,
+            child_generation_ids=[UUID(child_id) for child_id in data.get('child_ids') or []],
+            # Depth counts ancestors above the direct parent
+            inheritance_depth=max(len(ancestors) - 1, 0),
+            permissions_inherited=permissions_inherited,
+            access_restrictions=data.get('access_restrictions') or {},
+            owner_user_id=UUID(data['user_id']) if data.get('user_id') else None,
+            parent_owner_user_id=UUID(ancestors[0]['user_id']) if ancestors and ancestors[0].get('user_id') else None,
+            ancestor_ids=[UUID(ancestor['id']) for ancestor in ancestors]
+        )
         
-        async with self.db.pool.acquire() as conn:
-            # Get generation details
-            generation = await conn.fetchrow(
-                "SELECT * FROM generations WHERE id = $1", generation_id
-            )
-            if not generation:
-                raise GenerationNotFoundError(f"Generation {generation_id} not found")
-            
-            # Get parent chain
-            parent_id = generation.get('parent_generation_id')
-            inheritance_depth = 0
-            
-            # Count inheritance depth
-            current_parent = parent_id
-            while current_parent and inheritance_depth < self.max_inheritance_depth:
-                parent_gen = await conn.fetchrow(
-                    "SELECT parent_generation_id FROM generations WHERE id = $1", 
-                    current_parent
-                )
-                if parent_gen and parent_gen['parent_generation_id']:
-                    current_parent = parent_gen['parent_generation_id']
-                    inheritance_depth += 1
-                else:
-                    break
-            
-            # Get child generations
-            child_generations = await conn.fetch(
-                "SELECT id FROM generations WHERE parent_generation_id = $1",
-                generation_id
-            )
-            child_ids = [UUID(row['id']) for row in child_generations]
-            
-            # Get inherited permissions
-            permissions_inherited = []
-            if parent_id:
-                parent_perms = await conn.fetchrow(
-                    "SELECT permissions FROM generation_permissions WHERE generation_id = $1",
-                    parent_id
-                )
-                if parent_perms and parent_perms['permissions']:
-                    permissions_inherited = json.loads(parent_perms['permissions'])
-            
-            # Build access restrictions
-            access_restrictions = {}
-            restrictions = await conn.fetch(
-                "SELECT restriction_type, restriction_value FROM generation_access_restrictions WHERE generation_id = $1",
-                generation_id
-            )
-            for restriction in restrictions:
-                access_restrictions[restriction['restriction_type']] = restriction['restriction_value']
-            
-            chain = GenerationInheritanceChain(
-                generation_id=generation_id,
-                parent_generation_id=UUID(parent_id) if parent_id else None,
-                child_generation_ids=child_ids,
-                inheritance_depth=inheritance_depth,
-                permissions_inherited=permissions_inherited,
-                access_restrictions=access_restrictions
-            )
-            
-            # Cache for 10 minutes
-            await self.redis_client.setex(
-                cache_key, 
-                600,
-                json.dumps(asdict(chain), default=str)
-            )
-            
-            return chain
+        await self.lineage_cache.set(generation_id, chain.ancestor_ids, asdict(chain))
+        return chain
+    
+    def _chain_from_dict(self, data: Dict[str, Any]) -> GenerationInheritanceChain:
+        def to_uuid(value):
+            return UUID(value) if value else None
+        
+        return GenerationInheritanceChain(
+            generation_id=UUID(data['generation_id']),
+            parent_generation_id=to_uuid(data.get('parent_generation_id')),
+            child_generation_ids=[UUID(child_id) for child_id in data.get('child_generation_ids', [])],
+            inheritance_depth=data['inheritance_depth'],
+            permissions_inherited=data.get('permissions_inherited', []),
+            access_restrictions=data.get('access_restrictions', {}),
+            owner_user_id=to_uuid(data.get('owner_user_id')),
+            parent_owner_user_id=to_uuid(data.get('parent_owner_user_id')),
+            ancestor_ids=[UUID(ancestor_id) for ancestor_id in data.get('ancestor_ids', [])]
+        )
     
     async def _validate_inherited_permissions(
         self,
@@ -557,24 +536,11 @@ class GenerationInheritanceValidator:
         if required_permission in chain.permissions_inherited:
             return True
         
-        # Check if user is owner of any generation in the chain
-        async with self.db.pool.acquire() as conn:
-            # Check current generation ownership
-            current_gen = await conn.fetchrow(
-                "SELECT user_id FROM generations WHERE id = $1",
-                chain.generation_id
-            )
-            if current_gen and UUID(current_gen['user_id']) == context.user_id:
-                return True
-            
-            # Check parent generation ownership
-            if chain.parent_generation_id:
-                parent_gen = await conn.fetchrow(
-                    "SELECT user_id FROM generations WHERE id = $1",
-                    chain.parent_generation_id
-                )
-                if parent_gen and UUID(parent_gen['user_id']) == context.user_id:
-                    return True
+        # Owner of the generation or its direct parent (owners come back with the chain)
+        if chain.owner_user_id == context.user_id:
+            return True
+        if chain.parent_generation_id and chain.parent_owner_user_id == context.user_id:
+            return True
         
         return False
     
@@ -1900,6 +1866,38 @@ class ComprehensiveAuthorizationOrchestrator:
             AuthorizationLayerType.AUDIT_SECURITY_LOGGING_LAYER,
             AuthorizationLayerType.EMERGENCY_RECOVERY_SYSTEMS
         ]
+        
+        decision_layers = tuple(self.layer_order[:8])
+        
+        # Layer dependency graph: a layer starts once every layer it depends on
+        # has finished. Layers without dependencies run concurrently.
+        self.layer_dependencies: Dict[AuthorizationLayerType, Tuple[AuthorizationLayerType, ...]] = {
+            AuthorizationLayerType.ADVANCED_RATE_LIMITING_ANOMALY_DETECTION: (),
+            AuthorizationLayerType.PERFORMANCE_OPTIMIZATION_LAYER: (),
+            AuthorizationLayerType.SECURITY_CONTEXT_VALIDATION: (),
+            AuthorizationLayerType.BASIC_UUID_VALIDATION: (),
+            AuthorizationLayerType.RBAC_PERMISSION_CHECK: (AuthorizationLayerType.BASIC_UUID_VALIDATION,),
+            AuthorizationLayerType.RESOURCE_OWNERSHIP_VALIDATION: (AuthorizationLayerType.BASIC_UUID_VALIDATION,),
+            AuthorizationLayerType.GENERATION_INHERITANCE_VALIDATION: (AuthorizationLayerType.BASIC_UUID_VALIDATION,),
+            AuthorizationLayerType.MEDIA_ACCESS_AUTHORIZATION: (AuthorizationLayerType.BASIC_UUID_VALIDATION,),
+            # These two ran last in the sequential version and _execute_layer has
+            # no handler for them: their unknown_layer_type (RED) result is part
+            # of the decision, so they stay in the graph after every other layer
+            AuthorizationLayerType.AUDIT_SECURITY_LOGGING_LAYER: decision_layers,
+            AuthorizationLayerType.EMERGENCY_RECOVERY_SYSTEMS: decision_layers + (
+                AuthorizationLayerType.AUDIT_SECURITY_LOGGING_LAYER,
+            )
+        }
+        
+        # Failure of any of these layers denies the request immediately
+        self.critical_layers = {
+            AuthorizationLayerType.BASIC_UUID_VALIDATION,
+            AuthorizationLayerType.RBAC_PERMISSION_CHECK,
+            AuthorizationLayerType.ADVANCED_RATE_LIMITING_ANOMALY_DETECTION
+        }
+        
+        # Strong references to in-flight audit writes so they are not garbage collected
+        self._audit_tasks: Set[asyncio.Task] = set()
     
     async def authorize_comprehensive(
         self,
@@ -1910,47 +1908,21 @@ class ComprehensiveAuthorizationOrchestrator:
         """
         Execute comprehensive 10-layer authorization with fail-fast patterns.
         
+        Independent layers run concurrently, so latency is bounded by the
+        longest dependency chain rather than the sum of all layers.
+        
         Returns:
         - Authorization decision (bool)
         - List of layer results
         - Additional metadata including performance metrics
         """
         start_time = time.time()
-        layer_results = []
-        failed_layers = []
         
         try:
-            # Execute layers in sequence (fail-fast)
-            for layer_type in self.layer_order:
-                try:
-                    result = await self._execute_layer(
-                        layer_type, context, security_context, request_metadata
-                    )
-                    layer_results.append(result)
-                    
-                    # Fail-fast on critical failures
-                    if not result.success and layer_type in [
-                        AuthorizationLayerType.BASIC_UUID_VALIDATION,
-                        AuthorizationLayerType.RBAC_PERMISSION_CHECK,
-                        AuthorizationLayerType.ADVANCED_RATE_LIMITING_ANOMALY_DETECTION
-                    ]:
-                        failed_layers.append(layer_type)
-                        break
-                    
-                    # Continue on non-critical failures but track them
-                    if not result.success:
-                        failed_layers.append(layer_type)
-                        
-                except Exception as e:
-                    logger.error(f"Layer {layer_type.value} failed: {e}")
-                    failed_layers.append(layer_type)
-                    layer_results.append(LayerResult(
-                        layer_type=layer_type,
-                        success=False,
-                        execution_time_ms=0,
-                        threat_level=SecurityThreatLevel.RED,
-                        metadata={'error': str(e)}
-                    ))
+            # Execute the layer graph concurrently (fail-fast on critical layers)
+            layer_results, failed_layers = await self._execute_layer_graph(
+                context, security_context, request_metadata
+            )
             
             # Apply emergency recovery if needed
             if failed_layers:
@@ -1971,11 +1943,10 @@ class ComprehensiveAuthorizationOrchestrator:
                 default=SecurityThreatLevel.GREEN
             )
             
-            # Log comprehensive audit entry
-            audit_result = await self.audit_logger.log_authorization_event(
-                context, layer_results, final_decision, max_threat_level
-            )
-            layer_results.append(audit_result)
+            # Log comprehensive audit entry off the response path
+            layer_results.append(self._schedule_audit_log(
+                context, list(layer_results), final_decision, max_threat_level
+            ))
             
             # Calculate performance metrics
             total_execution_time = (time.time() - start_time) * 1000
@@ -2009,6 +1980,106 @@ class ComprehensiveAuthorizationOrchestrator:
                 'total_execution_time_ms': (time.time() - start_time) * 1000
             }
     
+    async def _execute_layer_graph(
+        self,
+        context: ValidationContext,
+        security_context: SecurityContextData,
+        request_metadata: Dict[str, Any]
+    ) -> Tuple[List[LayerResult], List[AuthorizationLayerType]]:
+        """
+        Run the layers as a dependency graph.
+        
+        A layer is started as soon as its dependencies have finished. When a
+        critical layer fails, every outstanding layer is cancelled and the
+        graph stops, matching the sequential fail-fast behaviour.
+        
+        Returns:
+        - Layer results in layer_order
+        - Failed layer types, in layer_order
+        """
+        results: Dict[AuthorizationLayerType, LayerResult] = {}
+        failed_layers: List[AuthorizationLayerType] = []
+        pending = list(self.layer_order)
+        running: Dict[asyncio.Task, AuthorizationLayerType] = {}
+        critical_failure = False
+        
+        try:
+            while pending or running:
+                # Start every layer whose dependencies are satisfied
+                for layer_type in list(pending):
+                    if all(dep in results for dep in self.layer_dependencies.get(layer_type, ())):
+                        pending.remove(layer_type)
+                        task = asyncio.create_task(self._execute_layer(
+                            layer_type, context, security_context, request_metadata
+                        ))
+                        running[task] = layer_type
+                
+                if not running:
+                    # Remaining layers depend on something that never ran
+                    logger.error(f"Unresolvable layer dependencies: {[layer.value for layer in pending]}")
+                    break
+                
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    layer_type = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Layer {layer_type.value} failed: {e}")
+                        result = LayerResult(
+                            layer_type=layer_type,
+                            success=False,
+                            execution_time_ms=0,
+                            threat_level=SecurityThreatLevel.RED,
+                            metadata={'error': str(e)}
+                        )
+                    results[layer_type] = result
+                    
+                    # Continue on non-critical failures but track them
+                    if not result.success:
+                        failed_layers.append(layer_type)
+                        if layer_type in self.critical_layers:
+                            critical_failure = True
+                
+                # Fail-fast on critical failures
+                if critical_failure:
+                    break
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running.keys(), return_exceptions=True)
+        
+        layer_results = [results[layer_type] for layer_type in self.layer_order if layer_type in results]
+        failed_layers.sort(key=self.layer_order.index)
+        return layer_results, failed_layers
+    
+    def _schedule_audit_log(
+        self,
+        context: ValidationContext,
+        layer_results: List[LayerResult],
+        final_decision: bool,
+        threat_level: SecurityThreatLevel
+    ) -> LayerResult:
+        """Write the audit entry in the background and return a placeholder result for the response."""
+        task = asyncio.create_task(self.audit_logger.log_authorization_event(
+            context, layer_results, final_decision, threat_level
+        ))
+        self._audit_tasks.add(task)
+        task.add_done_callback(self._audit_tasks.discard)
+        
+        return LayerResult(
+            layer_type=AuthorizationLayerType.AUDIT_SECURITY_LOGGING_LAYER,
+            success=True,
+            execution_time_ms=0,
+            metadata={'deferred': True}
+        )
+    
+    async def drain_audit_logs(self, timeout: float = 5.0):
+        """Wait for in-flight audit writes, e.g. during shutdown."""
+        if self._audit_tasks:
+            await asyncio.wait(set(self._audit_tasks), timeout=timeout)
+    
     async def _execute_layer(
         self,
         layer_type: AuthorizationLayerType,
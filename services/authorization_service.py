@@ -566,7 +566,7 @@ class AuthorizationService:
                 expires_in=expires_in
             )
             
-            return storage_info.get('signed_urls', [])
+            return [item['signed_url'] for item in storage_info.get('signed_urls', [])]
             
         except Exception as e:
             logger.error(f"❌ [MEDIA-URL] Failed to generate secure media URLs: {e}")
@@ -589,7 +589,7 @@ class AuthorizationService:
                 expires_in=expires_in
             )
             
-            return storage_info.get('signed_urls', [])
+            return [item['signed_url'] for item in storage_info.get('signed_urls', [])]
             
         except Exception as e:
             logger.error(f"❌ [MEDIA-URL-CACHED] Failed to generate cached media URLs: {e}")
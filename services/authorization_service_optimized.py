@@ -506,7 +506,7 @@ class OptimizedAuthorizationService:
                 expires_in=expires_in
             )
             
-            urls = storage_info.get('signed_urls', [])
+            urls = [item['signed_url'] for item in storage_info.get('signed_urls', [])]
             
             # Cache for 80% of expiration time
             cache_ttl = int(expires_in * 0.8)
@@ -18,7 +18,9 @@ from models.team import (
 from models.generation import GenerationResponse, GenerationCreate, GenerationStatus
 from services.generation_service import generation_service
 from services.team_service import TeamService
+from services.team_loaders import load_membership, load_user_memberships
 from utils.exceptions import NotFoundError, ConflictError, ForbiddenError, ValidationError
+from utils.generation_lineage_cache import invalidate_generation_lineage
 # Security utilities would be imported here if needed
 
 logger = logging.getLogger(__name__)
@@ -762,12 +764,7 @@ class CollaborationService:
         # Check team-based access
         if required_access == "read":
             # For read access, check if user's teams have access
-            user_teams = db.execute_query(
-                table="team_members",
-                operation="select",
-                filters={"user_id": user_id, "is_active": True},
-                auth_token=auth_token
-            )
+            user_teams = await load_user_memberships(user_id, auth_token)
             
             team_ids = [tm["team_id"] for tm in user_teams]
             if team_ids:
@@ -792,17 +789,7 @@ class CollaborationService:
         auth_token: str = None
     ):
         """Validate user is a member of the team."""
-        membership = db.execute_query(
-            table="team_members",
-            operation="select",
-            filters={
-                "team_id": str(team_id),
-                "user_id": user_id,
-                "is_active": True
-            },
-            single=True,
-            auth_token=auth_token
-        )
+        membership = await load_membership(team_id, user_id, auth_token)
         
         if not membership:
             raise ForbiddenError("Not a member of the specified team")
@@ -815,17 +802,7 @@ class CollaborationService:
         auth_token: str = None
     ):
         """Validate user has admin access to team."""
-        membership = db.execute_query(
-            table="team_members",
-            operation="select",
-            filters={
-                "team_id": str(team_id),
-                "user_id": user_id,
-                "is_active": True
-            },
-            single=True,
-            auth_token=auth_token
-        )
+        membership = await load_membership(team_id, user_id, auth_token)
         
         if not membership or membership["role"] not in ["owner", "admin"]:
             raise ForbiddenError("Insufficient team permissions")
@@ -897,4 +874,6 @@ class CollaborationService:
                 data=update_data,
                 filters={"id": str(generation_id)},
                 auth_token=auth_token
-            )
\ No newline at end of file
+            )
+            if parent_generation_id:
+                await invalidate_generation_lineage(generation_id, parent_generation_id)
\ No newline at end of file
@@ -7,7 +7,7 @@ import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-from uuid import UUID
+from uuid import UUID, uuid4
 import hashlib
 import json
 
@@ -39,6 +39,18 @@ class CreditTransaction:
     auth_token: Optional[str] = None  # CRITICAL FIX: Direct auth token support
 
 
+@dataclass
+class CreditReservation:
+    """Outcome of a credit reservation (see migration 018)."""
+    idempotency_key: str
+    user_id: str
+    amount: int
+    status: str  # reserved | committed
+    balance: int
+    replayed: bool = False
+    user: Optional[Dict[str, Any]] = None
+
+
 @dataclass
 class CreditValidationResult:
     """Credit validation result."""
@@ -199,202 +211,145 @@ class CreditTransactionService:
             logger.error(f"❌ [CREDIT-SERVICE] Credit validation failed for user {user_id}: {e}")
             raise
     
-    @log_performance("atomic_credit_deduction")
-    async def atomic_credit_deduction(self, transaction: CreditTransaction) -> UserResponse:
+    @staticmethod
+    def idempotency_key_for(transaction: CreditTransaction) -> str:
+        """One reservation per generation; other transactions get a fresh key."""
+        if transaction.generation_id:
+            return f"generation:{transaction.generation_id}"
+        return f"txn:{uuid4()}"
+    
+    def _reservation_params(self, transaction: CreditTransaction, idempotency_key: str) -> Dict[str, Any]:
+        transaction_type = transaction.transaction_type.value if hasattr(transaction.transaction_type, 'value') else str(transaction.transaction_type)
+        # Never persist credentials into the ledger
+        metadata = {k: v for k, v in (transaction.metadata or {}).items() if k != "auth_token"}
+        metadata["model_name"] = transaction.model_name
+        return {
+            "user_id": str(transaction.user_id),
+            "amount": transaction.amount,
+            "idempotency_key": idempotency_key,
+            "generation_id": transaction.generation_id,
+            "transaction_type": transaction_type,
+            "description": transaction.description or f"Credit deduction for {transaction_type}",
+            "metadata": metadata
+        }
+    
+    @staticmethod
+    def _reservation_error(result: Dict[str, Any], transaction: CreditTransaction) -> ValueError:
+        error = result.get("error")
+        if error == "user_not_found":
+            return ValueError(f"User {transaction.user_id} not found")
+        if error == "reservation_refunded":
+            # The key's credits were already returned; charging under it again would not be tracked
+            return ValueError(f"Credit reservation for {transaction.generation_id or 'this transaction'} was already refunded")
+        if error == "invalid_amount":
+            return ValueError(f"Credit amount must be positive, got {transaction.amount}")
+        return ValueError(
+            f"Insufficient credits. Required: {transaction.amount}, Available: {result.get('balance', 0)}"
+        )
+    
+    @log_performance("reserve_credits")
+    async def reserve_credits(
+        self,
+        transaction: CreditTransaction,
+        idempotency_key: Optional[str] = None,
+        commit: bool = False
+    ) -> CreditReservation:
         """
-        Perform atomic credit deduction using Supabase built-in atomicity.
-        Since Supabase handles single operations atomically, we don't need explicit transactions.
+        Check and take credits in one database round trip.
+        
+        The balance check and debit are a single conditional UPDATE, so
+        concurrent requests can never overdraw. Reservations for a generation
+        are committed or refunded by the database when the generation
+        completes or fails (migration 018); pass commit=True for a final
+        deduction. Retrying with the same idempotency key never charges twice.
+        
+        Raises:
+            ValueError: Insufficient credits, unknown user, or a replayed
+                key whose reservation was already refunded
         """
         await self._get_repositories()
         
-        logger.info(f"💳 [CREDIT-SERVICE] Starting atomic credit deduction for user {transaction.user_id}")
-        logger.info(f"💳 [CREDIT-SERVICE] Transaction: {transaction.amount} credits, type: {transaction.transaction_type}")
+        idempotency_key = idempotency_key or self.idempotency_key_for(transaction)
+        params = self._reservation_params(transaction, idempotency_key)
         
-        # Execute atomic credit deduction (Supabase handles atomicity for single operations)
-        async def execute_transaction():
-            try:
-                # CRITICAL FIX: Safe UUID handling for transaction
-                from utils.uuid_utils import UUIDUtils
-                
-                # Ensure user_id is a proper UUID string
-                user_id_str = UUIDUtils.ensure_uuid_string(transaction.user_id)
-                if not user_id_str:
-                    raise ValueError(f"Invalid user_id format: {transaction.user_id}")
-                
-                # Step 1: Validate current balance with auth context - CRITICAL FIX: Enhanced JWT token validation
-                logger.info(f"🔍 [CREDIT-SERVICE] Getting current balance for transaction validation, user {user_id_str}")
-                
-                # CRITICAL FIX: Multi-source auth token resolution with JWT validation
-                auth_token = None
-                if transaction.auth_token:
-                    auth_token = transaction.auth_token
-                    logger.info(f"🔑 [CREDIT-SERVICE] Using direct auth_token from transaction for user {user_id_str}")
-                elif transaction.metadata and transaction.metadata.get('auth_token'):
-                    auth_token = transaction.metadata.get('auth_token')
-                    logger.info(f"🔑 [CREDIT-SERVICE] Using auth_token from metadata for user {user_id_str}")
-                else:
-                    logger.warning(f"⚠️ [CREDIT-SERVICE] No auth_token available for transaction - relying on service key for user {user_id_str}")
-                
-                # CRITICAL FIX: Validate JWT token expiration before using it
-                validated_token = None
-                if auth_token:
-                    try:
-                        # Use the user repository's JWT validation method
-                        is_valid = await self.user_repo._validate_jwt_token(auth_token)
-                        if is_valid:
-                            validated_token = auth_token
-                            logger.info(f"✅ [CREDIT-SERVICE] JWT token validated for user {user_id_str}")
-                        else:
-                            logger.warning(f"🔴 [CREDIT-SERVICE] JWT token invalid/expired for user {user_id_str}")
-                            logger.info(f"🔄 [CREDIT-SERVICE] Falling back to service key for user {user_id_str}")
-                    except Exception as validation_error:
-                        logger.error(f"❌ [CREDIT-SERVICE] JWT validation error: {validation_error}")
-                        logger.info(f"🔄 [CREDIT-SERVICE] Using service key due to validation error")
-                else:
-                    logger.info(f"🔑 [CREDIT-SERVICE] No JWT token provided, using service key for user {user_id_str}")
-                
-                # CRITICAL FIX: Enhanced credit balance retrieval with multi-layer fallback
-                current_balance = None
-                last_balance_error = None
-                
-                # LAYER 1: Try with validated JWT token
-                if validated_token:
-                    try:
-                        logger.info(f"🔑 [CREDIT-SERVICE] Attempting balance check with validated JWT token")
-                        current_balance = await self.user_repo.get_user_credits(user_id_str, auth_token=validated_token)
-                        logger.info(f"✅ [CREDIT-SERVICE] Balance retrieved with JWT: {current_balance}")
-                    except Exception as jwt_balance_error:
-                        logger.warning(f"⚠️ [CREDIT-SERVICE] JWT balance check failed: {jwt_balance_error}")
-                        last_balance_error = jwt_balance_error
-                
-                # LAYER 2: Fallback to service key if JWT failed
-                if current_balance is None:
-                    try:
-                        logger.info(f"🔑 [CREDIT-SERVICE] Fallback: Attempting balance check with service key")
-                        current_balance = await self.user_repo.get_user_credits(user_id_str, auth_token=None)
-                        logger.info(f"✅ [CREDIT-SERVICE] Balance retrieved with service key: {current_balance}")
-                    except Exception as service_balance_error:
-                        logger.error(f"❌ [CREDIT-SERVICE] Service key balance check also failed: {service_balance_error}")
-                        last_balance_error = service_balance_error
-                
-                # LAYER 3: Handle final failure with enhanced messaging
-                if current_balance is None:
-                    if last_balance_error:
-                        error_str = str(last_balance_error).lower()
-                        logger.error(f"💥 [CREDIT-SERVICE] All balance retrieval methods failed for user {user_id_str}")
-                        logger.error(f"💥 [CREDIT-SERVICE] Final error: {last_balance_error}")
-                        
-                        if "invalid api key" in error_str:
-                            if validated_token:
-                                raise ValueError("Database authentication failed. Please refresh your session and try again.")
-                            else:
-                                raise ValueError("Service authentication failed. Please try again or contact support.")
-                        elif "expired" in error_str or "token" in error_str:
-                            raise ValueError("Authentication expired. Please refresh your session and try again.")
-                        elif "not found" in error_str:
-                            raise ValueError("User profile not found. Please contact support if this continues.")
-                        elif "timeout" in error_str:
-                            raise ValueError("Database request timed out. Please try again.")
-                        elif "connection" in error_str:
-                            raise ValueError("Database connection issue. Please check your internet connection and try again.")
-                        else:
-                            # Generic database error with enhanced messaging
-                            raise ValueError(f"Unable to verify account balance. Please try again later. If the issue persists, contact support.")
-                    else:
-                        raise ValueError("Unable to access user account. Please try again later.")
-                
-                if current_balance < transaction.amount:
-                    raise ValueError(
-                        f"Insufficient credits. Required: {transaction.amount}, Available: {current_balance}"
-                    )
-                
-                # Step 2: Deduct credits atomically (Supabase ensures atomicity) - CRITICAL FIX: Use validated token
-                try:
-                    updated_user = await self.user_repo.deduct_credits(
-                        user_id_str, 
-                        transaction.amount,
-                        auth_token=validated_token  # CRITICAL FIX: Use validated JWT token only
-                    )
-                except Exception as deduct_error:
-                    # Enhanced error handling for authentication issues
-                    error_str = str(deduct_error).lower()
-                    if "invalid api key" in error_str:
-                        if not validated_token:
-                            logger.error(f"❌ [CREDIT-SERVICE] Service key invalid and no valid JWT token for deduction, user {user_id_str}")
-                            raise ValueError("Authentication expired. Please refresh your session and try again.")
-                        else:
-                            logger.error(f"❌ [CREDIT-SERVICE] Authentication issue despite valid JWT token")
-                            raise ValueError("Credit deduction failed: Database access denied. Please contact support.")
-                    elif "expired" in error_str or "token" in error_str:
-                        logger.error(f"❌ [CREDIT-SERVICE] JWT token authentication issue during deduction")
-                        raise ValueError("Authentication expired. Please refresh your session and try again.")
-                    else:
-                        # Re-raise other errors with improved messaging
-                        logger.error(f"❌ [CREDIT-SERVICE] Credit deduction failed: {deduct_error}")
-                        raise ValueError(f"Credit deduction failed: {str(deduct_error)}")
-                
-                # Step 3: Log transaction (separate operation, but not critical for credit deduction)
-                try:
-                    transaction_data = {
-                        "user_id": user_id_str,
-                        "transaction_type": transaction.transaction_type.value if hasattr(transaction.transaction_type, 'value') else str(transaction.transaction_type),
-                        "amount": -transaction.amount,  # Negative for deduction
-                        "balance_after": updated_user.credits_balance,
-                        "description": transaction.description or f"Credit deduction for {transaction.transaction_type.value if hasattr(transaction.transaction_type, 'value') else str(transaction.transaction_type)}",
-                        "metadata": {
-                            **(transaction.metadata or {}),
-                            "generation_id": transaction.generation_id,
-                            "model_name": transaction.model_name,
-                            "atomic_transaction": True
-                        }
-                    }
-                    
-                    await self.credit_repo.create_transaction(transaction_data)
-                    logger.info(f"✅ [CREDIT-SERVICE] Transaction logged successfully for user {user_id_str}")
-                    
-                except Exception as log_error:
-                    # Log transaction failure should not fail the credit deduction
-                    logger.warning(f"⚠️ [CREDIT-SERVICE] Failed to log transaction but credit deduction succeeded: {log_error}")
-                
-                # Step 4: Update performance metrics
-                performance_monitor.record_credit_operation()
-                
-                # Step 5: Invalidate cache
-                self._invalidate_cache(transaction.user_id)
-                
-                # Step 6: Log successful transaction
-                perf_logger.log_credit_operation(
-                    operation="atomic_deduction",
-                    user_id=transaction.user_id,
-                    amount=transaction.amount,
-                    balance_before=current_balance,
-                    balance_after=updated_user.credits_balance,
-                    generation_id=transaction.generation_id,
-                    model_name=transaction.model_name
-                )
-                
-                logger.info(f"✅ [CREDIT-SERVICE] Atomic deduction successful: user {user_id_str}, new balance: {updated_user.credits_balance}")
-                
-                return updated_user
-                
-            except Exception as e:
-                logger.error(f"❌ [CREDIT-SERVICE] Atomic operation failed: {e}")
-                raise
+        result = await self._retry_with_backoff(
+            self.credit_repo.reserve_credits, commit=commit, **params
+        )
+        
+        if not result or not result.get("success"):
+            result = result or {}
+            logger.warning(f"💳 [CREDIT-SERVICE] Reservation refused for user {transaction.user_id}: {result.get('error')}")
+            if result.get("balance") is not None and result.get("error") not in ("user_not_found", "invalid_amount"):
+                await self._set_cached_balance(transaction.user_id, result["balance"])
+            raise self._reservation_error(result, transaction)
+        
+        reservation = CreditReservation(
+            idempotency_key=idempotency_key,
+            user_id=str(transaction.user_id),
+            amount=transaction.amount,
+            status=result.get("status", "reserved"),
+            balance=result.get("balance", 0),
+            replayed=result.get("replayed", False),
+            user=result.get("user")
+        )
+        await self._set_cached_balance(transaction.user_id, reservation.balance)
+        performance_monitor.record_credit_operation()
+        
+        perf_logger.log_credit_operation(
+            operation="reserve" if not commit else "atomic_deduction",
+            user_id=transaction.user_id,
+            amount=transaction.amount,
+            balance_before=reservation.balance + (0 if reservation.replayed else transaction.amount),
+            balance_after=reservation.balance,
+            generation_id=transaction.generation_id,
+            model_name=transaction.model_name
+        )
+        
+        logger.info(f"✅ [CREDIT-SERVICE] {'Replayed' if reservation.replayed else 'Reserved'} {transaction.amount} credits for user {transaction.user_id} ({idempotency_key}), balance: {reservation.balance}")
+        return reservation
+    
+    async def commit_reservation(self, idempotency_key: str) -> bool:
+        """Finalise a reservation. Generation reservations settle on their own."""
+        await self._get_repositories()
+        result = await self._retry_with_backoff(self.credit_repo.commit_reservation, idempotency_key)
+        return bool(result and result.get("success"))
+    
+    async def refund_reservation(
+        self,
+        idempotency_key: str,
+        reason: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> bool:
+        """Return reserved credits; a reservation is refunded at most once."""
+        await self._get_repositories()
+        result = await self._retry_with_backoff(self.credit_repo.refund_reservation, idempotency_key, reason)
+        if user_id:
+            self._invalidate_cache(user_id)
+        refunded = bool(result and result.get("success"))
+        logger.info(f"💳 [CREDIT-SERVICE] Refund of {idempotency_key}: {'done' if refunded else result}")
+        return refunded
+    
+    @log_performance("atomic_credit_deduction")
+    async def atomic_credit_deduction(self, transaction: CreditTransaction) -> UserResponse:
+        """
+        Deduct credits and log the transaction in one database round trip.
+        Runs reserve_credits with commit=True.
+        """
+        logger.info(f"💳 [CREDIT-SERVICE] Atomic credit deduction for user {transaction.user_id}: {transaction.amount} credits, type: {transaction.transaction_type}")
         
-        # Execute with retry mechanism
         try:
-            return await self._retry_with_backoff(execute_transaction)
-            
+            reservation = await self.reserve_credits(transaction, commit=True)
         except Exception as e:
-            logger.error(f"💥 [CREDIT-SERVICE] All retry attempts failed for user {transaction.user_id}: {e}")
+            logger.error(f"❌ [CREDIT-SERVICE] Atomic operation failed: {e}")
             raise
+        
+        return UserResponse(**reservation.user)
     
     @log_performance("batch_credit_operations")
     async def batch_credit_operations(self, transactions: List[CreditTransaction]) -> List[UserResponse]:
         """
-        Execute multiple credit operations sequentially.
-        Note: Since Supabase doesn't support explicit transactions in this client,
-        we process each transaction individually with error handling.
+        Execute multiple credit deductions in one set-based RPC.
+        A user's transactions are applied in order while they fit the balance.
         """
         await self._get_repositories()
         
@@ -403,23 +358,23 @@ class CreditTransactionService:
         
         logger.info(f"🔄 [CREDIT-SERVICE] Starting batch credit operations: {len(transactions)} transactions")
         
+        keys = [self.idempotency_key_for(transaction) for transaction in transactions]
+        items = [self._reservation_params(transaction, key) for transaction, key in zip(transactions, keys)]
+        
+        batch_results = await self._retry_with_backoff(self.credit_repo.reserve_credits_batch, items, commit=True)
+        by_key = {result["idempotency_key"]: result for result in batch_results}
+        
         results = []
         failed_transactions = []
-        
-        # Process each transaction individually with error handling
-        for i, transaction in enumerate(transactions):
-            try:
-                result = await self.atomic_credit_deduction(transaction)
-                results.append(result)
-                logger.info(f"✅ [CREDIT-SERVICE] Batch transaction {i+1}/{len(transactions)} completed for user {transaction.user_id}")
-                
-            except Exception as e:
-                logger.error(f"❌ [CREDIT-SERVICE] Batch transaction {i+1}/{len(transactions)} failed for user {transaction.user_id}: {e}")
-                failed_transactions.append((i, transaction, str(e)))
-                
-                # For batch operations, we continue processing other transactions
-                # but collect the failures for reporting
-                continue
+        for i, (transaction, key) in enumerate(zip(transactions, keys)):
+            result = by_key.get(key) or {}
+            self._invalidate_cache(transaction.user_id)
+            if result.get("success"):
+                results.append(UserResponse(**result["user"]))
+            else:
+                error = self._reservation_error(result, transaction)
+                logger.error(f"❌ [CREDIT-SERVICE] Batch transaction {i+1}/{len(transactions)} failed for user {transaction.user_id}: {error}")
+                failed_transactions.append((i, transaction, str(error)))
         
         if failed_transactions:
             failed_count = len(failed_transactions)
@@ -431,6 +386,7 @@ class CreditTransactionService:
             error_details = [f"Transaction {i+1} (user {tx.user_id}): {error}" for i, tx, error in failed_transactions]
             raise ValueError(f"Batch operation partially failed. {failed_count} out of {len(transactions)} transactions failed. Details: {'; '.join(error_details)}")
         
+        performance_monitor.record_credit_operation()
         logger.info(f"✅ [CREDIT-SERVICE] Batch operations completed successfully: {len(results)} transactions processed")
         return results
     
@@ -0,0 +1,503 @@
+"""
+Process-wide FAL.ai completion tracking.
+Replaces per-generation polling loops with a single shared poller, optional
+FAL webhooks and in-process fan-out to every waiting coroutine and SSE stream.
+"""
+import asyncio
+import heapq
+import hmac
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from uuid import uuid4
+
+from config import settings
+from services.fal_queue_client import fal_queue_client
+from utils.request_timing import detached
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionState:
+    """Normalized FAL request states published to subscribers."""
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class CompletionEvent:
+    """A status change for one FAL request."""
+    request_id: str
+    status: str
+    queue_position: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.status in (CompletionState.COMPLETED, CompletionState.FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompletionEvent":
+        return cls(**data)
+
+
+@dataclass
+class _Watch:
+    """Shared polling state for one FAL request, regardless of how many waiters it has."""
+    request_id: str
+    endpoint: str
+    estimated_time: float
+    created_at: float
+    next_poll_at: float = 0.0
+    interval: float = 0.0
+    poll_count: int = 0
+    error_count: int = 0
+    last_event: Optional[CompletionEvent] = None
+    waiters: List[asyncio.Future] = field(default_factory=list)
+    subscribers: Set[asyncio.Queue] = field(default_factory=set)
+
+
+class FALCompletionService:
+    """
+    One completion subsystem per process.
+
+    Requests are deduplicated by FAL request_id. A single poller task checks
+    due requests with adaptive backoff derived from the estimated generation
+    time; when FAL webhooks are configured the poller only runs a slow safety
+    sweep. Status changes fan out to waiters and subscribers in-process, and
+    across nodes through Redis pub/sub when Redis is available.
+    """
+
+    PUBSUB_CHANNEL = "fal:completion"
+    MIN_POLL_INTERVAL = 1.0
+    MAX_POLL_INTERVAL = 15.0
+    WEBHOOK_SAFETY_INTERVAL = 30.0
+    MAX_CONCURRENT_STATUS_CALLS = 20
+    MAX_STATUS_ERRORS = 10
+    RECENT_RESULTS_SIZE = 1000
+
+    def __init__(self):
+        self.webhook_url = os.getenv("FAL_WEBHOOK_URL") or None
+        self.webhook_secret = os.getenv("FAL_WEBHOOK_SECRET") or None
+        self.pubsub_enabled = bool(getattr(settings, "redis_url", None)) and \
+            os.getenv("FAL_COMPLETION_PUBSUB", "true").lower() == "true"
+
+        self._node_id = uuid4().hex
+        self._watches: Dict[str, _Watch] = {}
+        self._schedule: List[tuple] = []  # heap of (next_poll_at, seq, request_id)
+        self._schedule_seq = 0
+        self._recent: "OrderedDict[str, CompletionEvent]" = OrderedDict()
+
+        self._poller_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._status_semaphore: Optional[asyncio.Semaphore] = None
+        self._redis = None
+        self._pubsub_task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "status_calls": 0,
+            "status_errors": 0,
+            "webhooks_received": 0,
+            "events_published": 0,
+            "remote_events": 0,
+            "deduplicated_tracks": 0
+        }
+
+    # === Public API ===
+
+    @property
+    def webhooks_enabled(self) -> bool:
+        return bool(self.webhook_url)
+
+    def get_webhook_url(self) -> Optional[str]:
+        """Webhook URL to hand to FAL on submit, including the shared secret if configured."""
+        if not self.webhook_url:
+            return None
+        if self.webhook_secret:
+            separator = "&" if "?" in self.webhook_url else "?"
+            return f"{self.webhook_url}{separator}token={self.webhook_secret}"
+        return self.webhook_url
+
+    def track(
+        self,
+        request_id: str,
+        endpoint: str,
+        estimated_time: Optional[float] = None
+    ) -> None:
+        """Start tracking a FAL request. Tracking the same request twice is a no-op."""
+        if request_id in self._watches:
+            self.stats["deduplicated_tracks"] += 1
+            return
+        if request_id in self._recent:
+            return
+
+        self._ensure_started()
+        now = time.monotonic()
+        watch = _Watch(
+            request_id=request_id,
+            endpoint=endpoint,
+            estimated_time=float(estimated_time or 60),
+            created_at=now
+        )
+        self._watches[request_id] = watch
+        self._schedule_watch(watch, self._initial_delay(watch))
+        logger.debug(f"🛰️ [FAL-COMPLETION] Tracking {request_id} on {endpoint} (active: {len(self._watches)})")
+
+    async def wait_for_completion(
+        self,
+        request_id: str,
+        endpoint: str,
+        estimated_time: Optional[float] = None,
+        timeout: float = 600.0
+    ) -> CompletionEvent:
+        """
+        Wait until the request reaches a terminal state.
+
+        Raises:
+            asyncio.TimeoutError: If no terminal state is seen within timeout
+        """
+        recent = self._recent.get(request_id)
+        if recent:
+            return recent
+
+        self.track(request_id, endpoint, estimated_time)
+        watch = self._watches[request_id]
+        future = asyncio.get_running_loop().create_future()
+        watch.waiters.append(future)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            if future in watch.waiters:
+                watch.waiters.remove(future)
+            self._release_if_unobserved(watch)
+
+    async def subscribe(
+        self,
+        request_id: str,
+        endpoint: str,
+        estimated_time: Optional[float] = None
+    ) -> AsyncIterator[CompletionEvent]:
+        """Yield status changes for a request until it completes or fails."""
+        recent = self._recent.get(request_id)
+        if recent:
+            yield recent
+            return
+
+        self.track(request_id, endpoint, estimated_time)
+        watch = self._watches[request_id]
+        queue: asyncio.Queue = asyncio.Queue()
+        watch.subscribers.add(queue)
+        try:
+            if watch.last_event:
+                yield watch.last_event
+            while True:
+                event = await queue.get()
+                yield event
+                if event.is_terminal:
+                    return
+        finally:
+            watch.subscribers.discard(queue)
+            self._release_if_unobserved(watch)
+
+    def get_last_event(self, request_id: str) -> Optional[CompletionEvent]:
+        """Latest known event for a request without issuing a status call."""
+        watch = self._watches.get(request_id)
+        if watch and watch.last_event:
+            return watch.last_event
+        return self._recent.get(request_id)
+
+    async def check(
+        self,
+        request_id: str,
+        endpoint: str,
+        estimated_time: Optional[float] = None
+    ) -> Optional[CompletionEvent]:
+        """
+        Latest event for a request, asking FAL once if nothing in this process
+        is tracking it (after a restart, or when its watch ended without a
+        terminal event). The request is tracked again, so later checks are
+        answered locally.
+        """
+        event = self.get_last_event(request_id)
+        if event is not None or request_id in self._watches:
+            return event
+
+        self.track(request_id, endpoint, estimated_time)
+        watch = self._watches.get(request_id)
+        if watch is not None:
+            await self._poll_one(watch)
+        return self.get_last_event(request_id)
+
+    async def handle_webhook(self, payload: Dict[str, Any], token: Optional[str] = None) -> bool:
+        """
+        Apply a FAL webhook delivery.
+
+        Returns:
+            False if the delivery is rejected (bad token or missing request_id)
+        """
+        if self.webhook_secret and not hmac.compare_digest(token or "", self.webhook_secret):
+            logger.warning("🚫 [FAL-COMPLETION] Rejected webhook with invalid token")
+            return False
+
+        request_id = payload.get("request_id")
+        if not request_id:
+            return False
+
+        self.stats["webhooks_received"] += 1
+        if payload.get("status") == "OK":
+            event = CompletionEvent(
+                request_id=request_id,
+                status=CompletionState.COMPLETED,
+                result=payload.get("payload") or {}
+            )
+        else:
+            detail = payload.get("error") or payload.get("payload_error")
+            if not detail and isinstance(payload.get("payload"), dict):
+                detail = payload["payload"].get("detail")
+            event = CompletionEvent(
+                request_id=request_id,
+                status=CompletionState.FAILED,
+                error=str(detail or "Generation failed")
+            )
+
+        await self._dispatch(event, publish=True)
+        return True
+
+    async def shutdown(self):
+        """Stop background tasks and wake every waiter with a failure."""
+        for task in (self._poller_task, self._pubsub_task):
+            if task and not task.done():
+                task.cancel()
+        for watch in list(self._watches.values()):
+            for future in watch.waiters:
+                if not future.done():
+                    future.set_exception(RuntimeError("FAL completion service shutting down"))
+        self._watches.clear()
+        self._schedule.clear()
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception:
+                pass
+            self._redis = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active_requests": len(self._watches),
+            "waiters": sum(len(w.waiters) for w in self._watches.values()),
+            "subscribers": sum(len(w.subscribers) for w in self._watches.values()),
+            "webhooks_enabled": self.webhooks_enabled,
+            "pubsub_enabled": self.pubsub_enabled and self._redis is not None
+        }
+
+    # === Scheduling ===
+
+    def _ensure_started(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._status_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_STATUS_CALLS)
+        if self._poller_task is None or self._poller_task.done():
+            self._poller_task = asyncio.create_task(detached(self._poll_loop()))
+        if self.pubsub_enabled and self._pubsub_task is None:
+            self._pubsub_task = asyncio.create_task(detached(self._pubsub_listener()))
+
+    def _initial_delay(self, watch: _Watch) -> float:
+        if self.webhooks_enabled:
+            return self.WEBHOOK_SAFETY_INTERVAL
+        return self._clamp(watch.estimated_time / 6)
+
+    def _next_delay(self, watch: _Watch) -> float:
+        """Adaptive backoff: poll more often as the estimate approaches, back off once past it."""
+        if self.webhooks_enabled:
+            return self.WEBHOOK_SAFETY_INTERVAL
+
+        last = watch.last_event
+        if last and last.status == CompletionState.QUEUED and last.queue_position:
+            return self._clamp(last.queue_position * 2.0)
+
+        elapsed = time.monotonic() - watch.created_at
+        remaining = watch.estimated_time - elapsed
+        if remaining > 0:
+            return self._clamp(remaining / 3)
+        return self._clamp(max(watch.interval, self.MIN_POLL_INTERVAL) * 1.5)
+
+    def _clamp(self, delay: float) -> float:
+        return max(self.MIN_POLL_INTERVAL, min(self.MAX_POLL_INTERVAL, delay))
+
+    def _schedule_watch(self, watch: _Watch, delay: float):
+        watch.interval = delay
+        watch.next_poll_at = time.monotonic() + delay
+        self._schedule_seq += 1
+        heapq.heappush(self._schedule, (watch.next_poll_at, self._schedule_seq, watch.request_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _poll_loop(self):
+        """Single poller for every tracked request in this process."""
+        try:
+            while self._watches:
+                now = time.monotonic()
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    poll_at, _, request_id = heapq.heappop(self._schedule)
+                    watch = self._watches.get(request_id)
+                    # Skip stale heap entries left behind by rescheduling or completion
+                    if watch and watch.next_poll_at == poll_at:
+                        due.append(watch)
+
+                if due:
+                    await asyncio.gather(*(self._poll_one(watch) for watch in due))
+                    continue
+
+                if not self._schedule:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, self._schedule[0][0] - now))
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            self._poller_task = None
+            raise
+        except Exception as e:
+            logger.error(f"❌ [FAL-COMPLETION] Poller crashed, restarting: {e}")
+            self._poller_task = None
+            # Keep tracking alive for requests that are still pending
+            asyncio.get_running_loop().call_later(1.0, self._ensure_started)
+            return
+        self._poller_task = None
+
+    async def _poll_one(self, watch: _Watch):
+        watch.poll_count += 1
+        async with self._status_semaphore:
+            try:
+                self.stats["status_calls"] += 1
+                status = await fal_queue_client.status(watch.endpoint, watch.request_id)
+            except Exception as e:
+                self.stats["status_errors"] += 1
+                watch.error_count += 1
+                logger.warning(f"⚠️ [FAL-COMPLETION] Status check failed for {watch.request_id} ({watch.error_count}/{self.MAX_STATUS_ERRORS}): {e}")
+                if watch.error_count >= self.MAX_STATUS_ERRORS:
+                    await self._dispatch(CompletionEvent(
+                        request_id=watch.request_id,
+                        status=CompletionState.FAILED,
+                        error=f"Status polling failed: {e}"
+                    ), publish=True)
+                elif watch.request_id in self._watches:
+                    self._schedule_watch(watch, self._clamp(max(watch.interval, self.MIN_POLL_INTERVAL) * 2))
+                return
+
+            state = status.get("status")
+            if state == "COMPLETED":
+                try:
+                    result = await fal_queue_client.result(watch.endpoint, watch.request_id)
+                    event = CompletionEvent(
+                        request_id=watch.request_id,
+                        status=CompletionState.COMPLETED,
+                        result=result,
+                        metrics=status.get("metrics") or {}
+                    )
+                except Exception as e:
+                    event = CompletionEvent(
+                        request_id=watch.request_id,
+                        status=CompletionState.FAILED,
+                        error=str(e)
+                    )
+            elif state == "IN_QUEUE":
+                event = CompletionEvent(
+                    request_id=watch.request_id,
+                    status=CompletionState.QUEUED,
+                    queue_position=status.get("queue_position")
+                )
+            else:
+                event = CompletionEvent(request_id=watch.request_id, status=CompletionState.PROCESSING)
+
+        watch.error_count = 0
+        await self._dispatch(event, publish=event.is_terminal)
+        if not event.is_terminal and watch.request_id in self._watches:
+            self._schedule_watch(watch, self._next_delay(watch))
+
+    # === Fan-out ===
+
+    async def _dispatch(self, event: CompletionEvent, publish: bool):
+        """Deliver an event to local waiters and subscribers, optionally publishing it to other nodes."""
+        watch = self._watches.get(event.request_id)
+
+        if watch:
+            previous = watch.last_event
+            changed = previous is None or previous.status != event.status or \
+                previous.queue_position != event.queue_position
+            watch.last_event = event
+            if changed or event.is_terminal:
+                for queue in list(watch.subscribers):
+                    queue.put_nowait(event)
+            if event.is_terminal:
+                for future in watch.waiters:
+                    if not future.done():
+                        future.set_result(event)
+                del self._watches[event.request_id]
+
+        if event.is_terminal:
+            self._recent[event.request_id] = event
+            self._recent.move_to_end(event.request_id)
+            while len(self._recent) > self.RECENT_RESULTS_SIZE:
+                self._recent.popitem(last=False)
+
+        if publish and self._redis is not None:
+            try:
+                await self._redis.publish(self.PUBSUB_CHANNEL, json.dumps({
+                    "origin": self._node_id,
+                    "event": event.to_dict()
+                }))
+                self.stats["events_published"] += 1
+            except Exception as e:
+                logger.warning(f"⚠️ [FAL-COMPLETION] Failed to publish event for {event.request_id}: {e}")
+
+    def _release_if_unobserved(self, watch: _Watch):
+        """Stop polling a request once nobody is waiting on it any more."""
+        if not watch.waiters and not watch.subscribers and \
+                self._watches.get(watch.request_id) is watch:
+            del self._watches[watch.request_id]
+
+    async def _pubsub_listener(self):
+        """Relay terminal events published by other nodes (e.g. webhooks they received)."""
+        try:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+            pubsub = self._redis.pubsub()
+            await pubsub.subscribe(self.PUBSUB_CHANNEL)
+            logger.info("✅ [FAL-COMPLETION] Subscribed to cross-node completion channel")
+
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                    if data.get("origin") == self._node_id:
+                        continue
+                    self.stats["remote_events"] += 1
+                    await self._dispatch(CompletionEvent.from_dict(data["event"]), publish=False)
+                except Exception as e:
+                    logger.warning(f"⚠️ [FAL-COMPLETION] Ignoring malformed completion message: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ [FAL-COMPLETION] Redis pub/sub unavailable, running node-local only: {e}")
+            self._redis = None
+
+
+# Global service instance
+fal_completion_service = FALCompletionService()
@@ -0,0 +1,336 @@
+"""
+Async FAL.ai queue client.
+Submits generations to the FAL queue REST API (submit -> request_id ->
+status/result) over one pooled keep-alive aiohttp session. No thread is held
+while a generation runs, so one process can keep thousands in flight; waiting
+is left to services/fal_completion_service.py.
+
+aiohttp rather than httpx.AsyncClient for the same reason as
+utils/async_postgrest.py: the pinned httpcore scans every idle pooled
+connection per request, which degrades at high concurrency.
+
+Per-endpoint limits (FAL_QUEUE_ENDPOINT_LIMITS, JSON) cap concurrent HTTP
+calls ("max_requests") and generations in flight ("max_in_flight") for each
+endpoint, e.g. {"fal-ai/veo3": {"max_in_flight": 50}}.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+import aiohttp
+
+from config import settings
+from utils.request_timing import record_span
+
+logger = logging.getLogger(__name__)
+
+# FAL namespaces whose app id spans three path segments
+_NAMESPACES = ("workflows", "comfy")
+
+
+class FALQueueError(Exception):
+    """A FAL queue API call failed."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class FALQueueRequest:
+    """Handle for a submitted FAL request."""
+    request_id: str
+    endpoint: str
+    status_url: Optional[str] = None
+    response_url: Optional[str] = None
+    cancel_url: Optional[str] = None
+
+
+@dataclass
+class _EndpointLimits:
+    requests: asyncio.Semaphore
+    in_flight: Optional[asyncio.Semaphore]
+    max_requests: int
+    max_in_flight: int
+    active: int = 0
+
+
+def app_path(endpoint: str) -> str:
+    """
+    The app id part of an endpoint, which queue status/result URLs are built on.
+
+    "fal-ai/flux/dev" -> "fal-ai/flux"; "workflows/owner/app/x" -> "workflows/owner/app"
+    """
+    parts = endpoint.strip("/").split("/")
+    if parts[0] in _NAMESPACES:
+        return "/".join(parts[:3])
+    return "/".join(parts[:2])
+
+
+class FALQueueClient:
+    """
+    Pooled async access to the FAL queue API.
+
+    All endpoints share one connection pool. Each endpoint gets its own
+    semaphores for concurrent HTTP calls and for generations in flight, so a
+    burst on a slow video model cannot take every connection.
+    """
+
+    QUEUE_URL = "https://queue.fal.run"
+    MAX_TRACKED_REQUESTS = 10000
+
+    def __init__(self):
+        self.base_url = os.getenv("FAL_QUEUE_URL", self.QUEUE_URL).rstrip("/")
+        self.max_connections = int(os.getenv("FAL_QUEUE_MAX_CONNECTIONS", "100"))
+        self.default_timeout = float(os.getenv("FAL_QUEUE_TIMEOUT", "30"))
+        self.default_max_requests = int(os.getenv("FAL_QUEUE_ENDPOINT_MAX_REQUESTS", "50"))
+        # 0 = no cap on generations in flight per endpoint
+        self.default_max_in_flight = int(os.getenv("FAL_QUEUE_ENDPOINT_MAX_IN_FLIGHT", "0"))
+        self.endpoint_overrides = self._parse_endpoint_limits(os.getenv("FAL_QUEUE_ENDPOINT_LIMITS", ""))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._headers: Optional[Dict[str, str]] = None
+        self._limits: Dict[str, _EndpointLimits] = {}
+        # request_id -> endpoint, so callers holding only a request_id can cancel or poll
+        self._endpoints: "OrderedDict[str, str]" = OrderedDict()
+
+        self.stats = {
+            "submitted": 0,
+            "requests": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "total_time_ms": 0.0
+        }
+
+    # -------------------------------------------------------------------------
+    # Connection and limit management
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_endpoint_limits(raw: str) -> Dict[str, Dict[str, int]]:
+        if not raw:
+            return {}
+        try:
+            limits = json.loads(raw)
+            return {endpoint: dict(values) for endpoint, values in limits.items()}
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"⚠️ [FAL-QUEUE] Ignoring malformed FAL_QUEUE_ENDPOINT_LIMITS: {e}")
+            return {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Sessions are bound to the loop that created their connections
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=300,
+                    ttl_dns_cache=300
+                ),
+                json_serialize=lambda obj: json.dumps(obj, default=str)
+            )
+            self._session_loop = loop
+            # Semaphores are loop-bound too
+            self._limits.clear()
+            logger.info(f"🔗 [FAL-QUEUE] HTTP session created (max_connections={self.max_connections})")
+        return self._session
+
+    def _get_headers(self) -> Dict[str, str]:
+        if self._headers is None:
+            fal_key = getattr(settings, "fal_key", "") or os.getenv("FAL_KEY", "")
+            if not fal_key:
+                raise FALQueueError("FAL_KEY not configured")
+            self._headers = {"Authorization": f"Key {fal_key}", "Accept": "application/json"}
+        return self._headers
+
+    def _endpoint_limits(self, endpoint: str) -> _EndpointLimits:
+        limits = self._limits.get(endpoint)
+        if limits is None:
+            override = self.endpoint_overrides.get(endpoint, {})
+            max_requests = int(override.get("max_requests", self.default_max_requests))
+            max_in_flight = int(override.get("max_in_flight", self.default_max_in_flight))
+            limits = self._limits[endpoint] = _EndpointLimits(
+                requests=asyncio.Semaphore(max(1, max_requests)),
+                in_flight=asyncio.Semaphore(max_in_flight) if max_in_flight > 0 else None,
+                max_requests=max_requests,
+                max_in_flight=max_in_flight
+            )
+        return limits
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        self._limits.clear()
+
+    # -------------------------------------------------------------------------
+    # Queue API
+    # -------------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def in_flight(self, endpoint: str):
+        """Hold one of the endpoint's in-flight generation slots (no-op without a cap)."""
+        self._get_session()
+        limits = self._endpoint_limits(endpoint)
+        if limits.in_flight is None:
+            yield
+            return
+        async with limits.in_flight:
+            limits.active += 1
+            try:
+                yield
+            finally:
+                limits.active -= 1
+
+    async def submit(
+        self,
+        endpoint: str,
+        arguments: Dict[str, Any],
+        webhook_url: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> FALQueueRequest:
+        """Queue a generation and return its handle without waiting for it to run."""
+        params = {"fal_webhook": webhook_url} if webhook_url else None
+        data = await self._request("POST", endpoint, f"/{endpoint.strip('/')}",
+                                   json=arguments, params=params, timeout=timeout)
+        request_id = data.get("request_id") if isinstance(data, dict) else None
+        if not request_id:
+            raise FALQueueError(f"FAL submit to {endpoint} returned no request_id")
+
+        self.stats["submitted"] += 1
+        self._remember(request_id, endpoint)
+        return FALQueueRequest(
+            request_id=request_id,
+            endpoint=endpoint,
+            status_url=data.get("status_url"),
+            response_url=data.get("response_url"),
+            cancel_url=data.get("cancel_url")
+        )
+
+    async def status(self, endpoint: str, request_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Raw queue status: {"status": "IN_QUEUE" | "IN_PROGRESS" | "COMPLETED", ...}.
+        IN_QUEUE carries queue_position; COMPLETED may carry metrics.
+        """
+        return await self._request("GET", endpoint, f"{self._request_path(endpoint, request_id)}/status",
+                                   timeout=timeout)
+
+    async def result(self, endpoint: str, request_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Result payload of a completed request.
+
+        Raises:
+            FALQueueError: If the request failed or is not complete
+        """
+        return await self._request("GET", endpoint, self._request_path(endpoint, request_id), timeout=timeout)
+
+    async def cancel(self, request_id: str, endpoint: Optional[str] = None) -> bool:
+        """Cancel a queued or running request. Returns False if FAL refused or the endpoint is unknown."""
+        endpoint = endpoint or self._endpoints.get(request_id)
+        if not endpoint:
+            logger.warning(f"⚠️ [FAL-QUEUE] Cannot cancel {request_id}: endpoint unknown")
+            return False
+        try:
+            await self._request("PUT", endpoint, f"{self._request_path(endpoint, request_id)}/cancel")
+        except FALQueueError as e:
+            logger.warning(f"⚠️ [FAL-QUEUE] Cancel of {request_id} refused: {e}")
+            return False
+        self.stats["cancelled"] += 1
+        return True
+
+    def endpoint_for(self, request_id: str) -> Optional[str]:
+        """Endpoint a request was submitted to by this process, if still remembered."""
+        return self._endpoints.get(request_id)
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _request_path(endpoint: str, request_id: str) -> str:
+        return f"/{app_path(endpoint)}/requests/{quote(request_id, safe='')}"
+
+    def _remember(self, request_id: str, endpoint: str):
+        self._endpoints[request_id] = endpoint
+        if len(self._endpoints) > self.MAX_TRACKED_REQUESTS:
+            self._endpoints.popitem(last=False)
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        path: str,
+        json: Any = None,
+        params: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        session = self._get_session()
+        headers = self._get_headers()
+        start_time = time.perf_counter()
+
+        async with self._endpoint_limits(endpoint).requests:
+            self.stats["requests"] += 1
+            try:
+                async with session.request(
+                    method, f"{self.base_url}{path}", json=json, params=params, headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout or self.default_timeout, connect=5.0)
+                ) as response:
+                    status = response.status
+                    body = await response.read()
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise
+            except aiohttp.ClientError as e:
+                self.stats["errors"] += 1
+                raise FALQueueError(f"FAL {method} {path} failed: {e}") from e
+            finally:
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+                self.stats["total_time_ms"] += elapsed_ms
+                record_span("fal", elapsed_ms)
+
+        if status >= 400:
+            self.stats["errors"] += 1
+            detail = body.decode(errors="replace")
+            try:
+                error = _json_loads(body)
+                if isinstance(error, dict):
+                    detail = error.get("detail") or error.get("error") or detail
+            except ValueError:
+                pass
+            raise FALQueueError(f"FAL {method} {path} returned {status}: {detail}", status_code=status)
+
+        return _json_loads(body) if body else {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        return {
+            "max_connections": self.max_connections,
+            **self.stats,
+            "avg_time_ms": self.stats["total_time_ms"] / requests if requests else 0.0,
+            "endpoints": {
+                endpoint: {
+                    "max_requests": limits.max_requests,
+                    "max_in_flight": limits.max_in_flight,
+                    "in_flight": limits.active if limits.in_flight else None
+                }
+                for endpoint, limits in self._limits.items()
+            }
+        }
+
+
+def _json_loads(body: bytes) -> Any:
+    return json.loads(body)
+
+
+# Global client instance
+fal_queue_client = FALQueueClient()
@@ -4,16 +4,16 @@ Following CLAUDE.md: Service layer for business logic.
 """
 import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set
 from uuid import UUID
 import time
 import os
 
-import fal_client
-
 from config import settings
 from models.fal_config import get_model_config, validate_model_parameters, FALModelType
 from models.generation import GenerationStatus
+from services.fal_completion_service import fal_completion_service, CompletionState
+from services.fal_queue_client import fal_queue_client, FALQueueError
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,12 @@ logger = logging.getLogger(__name__)
 class FALService:
     """Service for FAL.ai API integration."""
     
+    # Upper bound on waiting for one generation; callers usually give up sooner
+    MAX_WAIT_SECONDS = 600.0
+    
     def __init__(self):
+        self._cancel_tasks: Set[asyncio.Task] = set()
+        
         # Configure FAL client
         # CRITICAL FIX: FAL client requires environment variable, not api_key attribute
         if settings.fal_key:
@@ -40,7 +45,11 @@ class FALService:
         parameters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
-        Create a new generation using FAL.ai API (synchronous call in async wrapper).
+        Create a new generation using the FAL.ai queue API.
+        
+        The request is submitted over the pooled queue client and awaited on the
+        shared completion tracker, so no thread is held while it runs. If the
+        caller cancels or times out, the FAL request is cancelled as well.
         
         Args:
             model_id: FAL.ai model identifier
@@ -81,26 +90,36 @@ class FALService:
             logger.info(f"Starting FAL.ai generation with model {model_id}")
             logger.debug(f"Generation parameters: {validated_params}")
             
-            # Run generation synchronously using fal_client.run
-            # This is wrapped in asyncio.to_thread to make it async-compatible
             start_time = time.time()
             
-            result = await asyncio.to_thread(
-                fal_client.run,
-                model_config.endpoint,
-                arguments=validated_params
-            )
+            async with fal_queue_client.in_flight(model_config.endpoint):
+                request = await fal_queue_client.submit(
+                    model_config.endpoint,
+                    validated_params,
+                    webhook_url=fal_completion_service.get_webhook_url()
+                )
+                logger.info(f"FAL.ai request {request.request_id} queued on {model_config.endpoint}")
+                
+                try:
+                    event = await fal_completion_service.wait_for_completion(
+                        request.request_id,
+                        model_config.endpoint,
+                        estimated_time=self._get_estimated_time(model_config.ai_model_type),
+                        timeout=self.MAX_WAIT_SECONDS
+                    )
+                except (asyncio.CancelledError, asyncio.TimeoutError):
+                    # Nobody will collect the result; stop FAL from running it
+                    self._cancel_in_background(request.request_id, model_config.endpoint)
+                    raise
+            
+            if event.status != CompletionState.COMPLETED:
+                raise FALQueueError(event.error or f"FAL.ai request {request.request_id} failed")
             
+            result = event.result or {}
             generation_time = time.time() - start_time
             
             # Extract output URLs
-            output_urls = []
-            if "images" in result:
-                output_urls = [img["url"] for img in result["images"]]
-            elif "video" in result:
-                output_urls = [result["video"]["url"]]
-            elif "image" in result:
-                output_urls = [result["image"]["url"]]
+            output_urls = self.extract_output_urls(result)
             
             logger.info(f"FAL.ai generation completed in {generation_time:.2f}s")
             
@@ -111,6 +130,8 @@ class FALService:
                     "generation_time": generation_time,
                     "model_id": model_id,
                     "endpoint": model_config.endpoint,
+                    "fal_request_id": request.request_id,
+                    "fal_metrics": event.metrics,
                     "fal_result": result
                 }
             }
@@ -124,58 +145,97 @@ class FALService:
                 "metadata": {}
             }
     
-    async def check_generation_status(self, request_id: str) -> Dict[str, Any]:
+    async def check_generation_status(self, request_id: str, endpoint: Optional[str] = None) -> Dict[str, Any]:
         """
         Check the status of a FAL.ai generation.
         
-        Note: Since we're using synchronous API, this is not needed
-        but kept for interface compatibility.
-        
         Args:
             request_id: FAL.ai request ID
+            endpoint: Model endpoint; defaults to the one this process submitted it to
             
         Returns:
             Status information
         """
-        return {
-            "status": GenerationStatus.COMPLETED,
-            "request_id": request_id
-        }
+        event = fal_completion_service.get_last_event(request_id)
+        if event is not None:
+            status = {
+                CompletionState.QUEUED: GenerationStatus.PENDING,
+                CompletionState.PROCESSING: GenerationStatus.PROCESSING,
+                CompletionState.COMPLETED: GenerationStatus.COMPLETED,
+                CompletionState.FAILED: GenerationStatus.FAILED
+            }[event.status]
+            return {"status": status, "request_id": request_id, "queue_position": event.queue_position}
+        
+        endpoint = endpoint or fal_queue_client.endpoint_for(request_id)
+        if not endpoint:
+            raise ValueError(f"Unknown FAL.ai request {request_id}; endpoint required")
+        
+        queue_status = await fal_queue_client.status(endpoint, request_id)
+        status = {
+            "IN_QUEUE": GenerationStatus.PENDING,
+            "IN_PROGRESS": GenerationStatus.PROCESSING,
+            "COMPLETED": GenerationStatus.COMPLETED
+        }.get(queue_status.get("status"), GenerationStatus.PROCESSING)
+        return {"status": status, "request_id": request_id, "queue_position": queue_status.get("queue_position")}
     
-    async def get_generation_result(self, request_id: str) -> Dict[str, Any]:
+    async def get_generation_result(self, request_id: str, endpoint: Optional[str] = None) -> Dict[str, Any]:
         """
         Get the result of a completed FAL.ai generation.
         
-        Note: Since we're using synchronous API, this is not needed
-        but kept for interface compatibility.
-        
         Args:
             request_id: FAL.ai request ID
+            endpoint: Model endpoint; defaults to the one this process submitted it to
             
         Returns:
             Generation result
         """
+        endpoint = endpoint or fal_queue_client.endpoint_for(request_id)
+        if not endpoint:
+            raise ValueError(f"Unknown FAL.ai request {request_id}; endpoint required")
+        
+        try:
+            result = await fal_queue_client.result(endpoint, request_id)
+        except FALQueueError as e:
+            return {
+                "status": GenerationStatus.FAILED,
+                "error_message": str(e),
+                "output_urls": [],
+                "metadata": {}
+            }
         return {
             "status": GenerationStatus.COMPLETED,
-            "output_urls": [],
-            "metadata": {}
+            "output_urls": self.extract_output_urls(result),
+            "metadata": {"endpoint": endpoint, "fal_request_id": request_id, "fal_result": result}
         }
     
-    async def cancel_generation(self, request_id: str) -> bool:
+    async def cancel_generation(self, request_id: str, endpoint: Optional[str] = None) -> bool:
         """
-        Cancel a FAL.ai generation.
-        
-        Note: Since we're using synchronous API, cancellation is not possible
-        but kept for interface compatibility.
+        Cancel a queued or running FAL.ai generation.
         
         Args:
             request_id: FAL.ai request ID
+            endpoint: Model endpoint; defaults to the one this process submitted it to
             
         Returns:
             Success status
         """
-        logger.warning(f"Cannot cancel generation {request_id} - using synchronous API")
-        return False
+        return await fal_queue_client.cancel(request_id, endpoint)
+    
+    def _cancel_in_background(self, request_id: str, endpoint: str):
+        """Cancel without blocking the (already cancelled) caller."""
+        task = asyncio.ensure_future(fal_queue_client.cancel(request_id, endpoint))
+        self._cancel_tasks.add(task)
+        task.add_done_callback(self._cancel_tasks.discard)
+    
+    def extract_output_urls(self, result: Dict[str, Any]) -> List[str]:
+        """Extract output media URLs from a FAL.ai result payload."""
+        if "images" in result:
+            return [img["url"] for img in result["images"]]
+        elif "video" in result:
+            return [result["video"]["url"]]
+        elif "image" in result:
+            return [result["image"]["url"]]
+        return []
     
     def _get_estimated_time(self, model_type: FALModelType) -> int:
         """Get estimated generation time in seconds based on model type."""
@@ -13,12 +13,15 @@ from datetime import datetime, timedelta
 from enum import Enum
 
 import fal_client
-import redis  # Use synchronous Redis, not async
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from config import settings
 from models.fal_config import get_model_config, validate_model_parameters, FALModelType
 from models.generation import GenerationStatus
+from services.fal_completion_service import fal_completion_service, CompletionState
+from services.generation_coalescer import generation_cache_key
+from utils.async_redis import async_redis
+from utils.request_timing import detached, span
 
 logger = logging.getLogger(__name__)
 
@@ -44,22 +47,11 @@ class AsyncFALService:
         else:
             logger.error("FAL_KEY not configured - FAL API calls will fail")
             
-        # Redis for caching and queue management (optional)
-        self.redis_pool = None
-        self.redis = None
-        
-        # Try to initialize Redis if URL is provided
-        if hasattr(settings, 'redis_url') and settings.redis_url:
-            try:
-                self.redis_pool = redis.ConnectionPool.from_url(
-                    settings.redis_url,
-                    decode_responses=True,
-                    max_connections=50
-                )
-                self.redis = redis.Redis(connection_pool=self.redis_pool)
-                logger.info("Redis cache initialized for async FAL service")
-            except Exception as e:
-                logger.warning(f"Redis not available, running without cache: {e}")
+        # Redis for caching and queue management (optional): the shared
+        # auto-pipelining client, so cache and rate-limit calls never block the loop
+        self.redis = async_redis if async_redis.enabled else None
+        if self.redis:
+            logger.info("Redis cache initialized for async FAL service")
         else:
             logger.info("Running async FAL service without Redis cache")
         
@@ -146,18 +138,15 @@ class AsyncFALService:
             # Submit to FAL async queue (non-blocking)
             logger.info(f"Submitting generation {generation_id} to FAL async queue")
             
-            # FAL client has both sync and async methods
-            # We'll use the synchronous submit method in an executor
-            import asyncio
-            from functools import partial
-            loop = asyncio.get_event_loop()
-            
             async with self.semaphore:  # Limit concurrent FAL calls
-                # Use synchronous submit (not submit_async) in thread pool
-                response = await loop.run_in_executor(
-                    None,
-                    partial(fal_client.submit, model_config.endpoint, arguments=validated_params)
-                )
+                with span("fal"):
+                    response = await fal_client.submit_async(
+                        model_config.endpoint,
+                        arguments=validated_params,
+                        webhook_url=fal_completion_service.get_webhook_url()
+                    )
+            
+            estimated_time = self._estimate_generation_time(model_config.ai_model_type)
             
             # Store generation metadata in Redis
             generation_data = {
@@ -173,18 +162,22 @@ class AsyncFALService:
             }
             
             if self.redis:
-                self.redis.setex(
-                    f"generation:{generation_id}",
-                    3600,  # 1 hour TTL
-                    json.dumps(generation_data)
+                # Issued together so they share one pipelined round trip
+                await asyncio.gather(
+                    self.redis.setex(
+                        f"generation:{generation_id}",
+                        3600,  # 1 hour TTL
+                        json.dumps(generation_data)
+                    ),
+                    # Store user's generation list
+                    self.redis.lpush(f"user_generations:{user_id}", generation_id),
+                    self.redis.ltrim(f"user_generations:{user_id}", 0, 99)  # Keep last 100
                 )
-                
-                # Store user's generation list
-                self.redis.lpush(f"user_generations:{user_id}", generation_id)
-                self.redis.ltrim(f"user_generations:{user_id}", 0, 99)  # Keep last 100
             
             # Start background task to process generation
-            asyncio.create_task(self._process_generation(generation_id, response))
+            asyncio.create_task(detached(self._process_generation(
+                generation_id, response.request_id, model_config.endpoint, estimated_time
+            )))
             
             # Get queue position
             queue_position = await self._get_queue_position(response.request_id)
@@ -193,7 +186,7 @@ class AsyncFALService:
                 "generation_id": generation_id,
                 "status": QueueStatus.QUEUED,
                 "queue_position": queue_position,
-                "estimated_time": self._estimate_generation_time(model_config.ai_model_type),
+                "estimated_time": estimated_time,
                 "cached": False
             }
             
@@ -220,7 +213,7 @@ class AsyncFALService:
             # Get generation data from Redis (if available)
             generation_data = None
             if self.redis:
-                generation_data = self.redis.get(f"generation:{generation_id}") if self.redis else None
+                generation_data = await self.redis.get(f"generation:{generation_id}")
             
             if not generation_data:
                 return {
@@ -240,49 +233,36 @@ class AsyncFALService:
                     "metadata": data.get("metadata", {})
                 }
             
-            # If still processing, check FAL status
+            # If still processing, report the shared completion tracker's view; it
+            # only calls FAL when this process is not already tracking the request
             if data["status"] in [QueueStatus.QUEUED, QueueStatus.PROCESSING]:
-                request_id = data["request_id"]
+                model_config = get_model_config(data.get("model_id", ""))
+                event = await fal_completion_service.check(
+                    data["request_id"],
+                    model_config.endpoint,
+                    self._estimate_generation_time(model_config.ai_model_type)
+                )
                 
-                # Get current status from FAL
-                try:
-                    # FAL client is synchronous, run in executor
-                    # We need both the application endpoint and request_id
-                    model_config = get_model_config(data.get("model_id", ""))
-                    loop = asyncio.get_event_loop()
-                    status = await loop.run_in_executor(
-                        None, 
-                        lambda: fal_client.sync_client.status(model_config.endpoint, request_id)
-                    )
-                    
-                    if isinstance(status, fal_client.Completed):
-                        # Update to completed and get results
-                        # FAL client is synchronous, run in executor
-                        result = await loop.run_in_executor(
-                            None,
-                            lambda: fal_client.sync_client.result(model_config.endpoint, request_id)
-                        )
-                        await self._handle_completion(generation_id, result)
-                        
-                        return {
-                            "generation_id": generation_id,
-                            "status": QueueStatus.COMPLETED,
-                            "output_urls": self._extract_output_urls(result),
-                            "metadata": {"generation_time": status.metrics.get("inference_time")}
-                        }
-                    else:
-                        # Still in queue or processing
-                        queue_position = getattr(status, 'queue_position', None)
-                        
-                        return {
-                            "generation_id": generation_id,
-                            "status": QueueStatus.PROCESSING if isinstance(status, fal_client.InProgress) else QueueStatus.QUEUED,
-                            "queue_position": queue_position,
-                            "estimated_time": self._estimate_remaining_time(queue_position)
-                        }
-                        
-                except Exception as e:
-                    logger.error(f"Failed to get FAL status: {e}")
+                if event and event.status == CompletionState.COMPLETED:
+                    return {
+                        "generation_id": generation_id,
+                        "status": QueueStatus.COMPLETED,
+                        "output_urls": self._extract_output_urls(event.result or {}),
+                        "metadata": {"generation_time": event.metrics.get("inference_time")}
+                    }
+                elif event and event.status == CompletionState.FAILED:
+                    return {
+                        "generation_id": generation_id,
+                        "status": QueueStatus.FAILED,
+                        "error": event.error
+                    }
+                elif event:
+                    return {
+                        "generation_id": generation_id,
+                        "status": QueueStatus.PROCESSING if event.status == CompletionState.PROCESSING else QueueStatus.QUEUED,
+                        "queue_position": event.queue_position,
+                        "estimated_time": self._estimate_remaining_time(event.queue_position)
+                    }
                     
             return {
                 "generation_id": generation_id,
@@ -311,7 +291,7 @@ class AsyncFALService:
         """
         try:
             # Get generation data
-            generation_data = self.redis.get(f"generation:{generation_id}") if self.redis else None
+            generation_data = await self.redis.get(f"generation:{generation_id}") if self.redis else None
             
             if not generation_data:
                 yield {
@@ -322,59 +302,44 @@ class AsyncFALService:
             
             data = json.loads(generation_data)
             request_id = data["request_id"]
-            
-            # Stream FAL events
-            # Note: Streaming is not available with synchronous client
-            # We'll poll instead
-            import asyncio
-            loop = asyncio.get_event_loop()
-            
-            # Get model config for FAL client calls
             model_config = get_model_config(data.get("model_id", ""))
             
-            while True:
-                await asyncio.sleep(2)
-                status = await loop.run_in_executor(
-                    None,
-                    lambda: fal_client.sync_client.status(model_config.endpoint, request_id)
-                )
-                
-                if hasattr(status, 'queue_position'):
+            # Subscribe to the shared completion tracker instead of polling FAL per client
+            async for event in fal_completion_service.subscribe(
+                request_id,
+                model_config.endpoint,
+                self._estimate_generation_time(model_config.ai_model_type)
+            ):
+                if event.status == CompletionState.QUEUED:
                     yield {
                         "event": "queued",
                         "data": {
-                            "position": status.queue_position,
+                            "position": event.queue_position,
                             "status": QueueStatus.QUEUED
                         }
                     }
-                elif isinstance(status, fal_client.InProgress):
+                elif event.status == CompletionState.PROCESSING:
                     yield {
                         "event": "processing",
                         "data": {
                             "status": QueueStatus.PROCESSING
                         }
                     }
-                elif isinstance(status, fal_client.Completed):
-                    result = await loop.run_in_executor(
-                        None,
-                        lambda: fal_client.sync_client.result(model_config.endpoint, request_id) 
-                    )
-                    await self._handle_completion(generation_id, result)
-                    
+                elif event.status == CompletionState.COMPLETED:
                     yield {
                         "event": "completed",
                         "data": {
                             "status": QueueStatus.COMPLETED,
-                            "output_urls": self._extract_output_urls(result)
+                            "output_urls": self._extract_output_urls(event.result or {})
                         }
                     }
                     break
-                elif hasattr(status, 'failed') and status.failed:
+                else:
                     yield {
                         "event": "error",
                         "data": {
                             "status": QueueStatus.FAILED,
-                            "error": getattr(status, 'error', 'Generation failed')
+                            "error": event.error or "Generation failed"
                         }
                     }
                     break
@@ -399,7 +364,7 @@ class AsyncFALService:
             True if cancelled, False otherwise
         """
         try:
-            generation_data = self.redis.get(f"generation:{generation_id}") if self.redis else None
+            generation_data = await self.redis.get(f"generation:{generation_id}") if self.redis else None
             
             if not generation_data:
                 return False
@@ -409,7 +374,7 @@ class AsyncFALService:
             if data["status"] in [QueueStatus.QUEUED, QueueStatus.PROCESSING]:
                 # Update status to cancelled
                 data["status"] = QueueStatus.CANCELLED
-                self.redis.setex(
+                await self.redis.setex(
                     f"generation:{generation_id}",
                     3600,
                     json.dumps(data)
@@ -417,13 +382,8 @@ class AsyncFALService:
                 
                 # Attempt to cancel with FAL (may not always work)
                 try:
-                    # FAL client is synchronous, run in executor
                     model_config = get_model_config(data.get("model_id", ""))
-                    loop = asyncio.get_event_loop()
-                    await loop.run_in_executor(
-                        None,
-                        lambda: fal_client.sync_client.cancel(model_config.endpoint, data["request_id"])
-                    )
+                    await fal_client.cancel_async(model_config.endpoint, data["request_id"])
                 except:
                     pass  # FAL cancel might fail if already processing
                 
@@ -437,56 +397,31 @@ class AsyncFALService:
     
     # Private helper methods
     
-    async def _process_generation(self, generation_id: str, response):
+    async def _process_generation(
+        self,
+        generation_id: str,
+        request_id: str,
+        endpoint: str,
+        estimated_time: int
+    ):
         """
-        Background task to process generation and update status.
+        Background task waiting on the shared completion tracker and updating status.
         """
         try:
-            # The response from submit_async is already a handle object
-            # We need to use fal_client.result() to get the actual result
-            request_id = response.request_id if hasattr(response, 'request_id') else str(response)
-            
-            # Poll for completion
-            max_attempts = 60  # 3 minutes max
-            for attempt in range(max_attempts):
-                await asyncio.sleep(3)  # Wait 3 seconds between polls
-                
-                try:
-                    # Check status (FAL client is synchronous, run in executor) 
-                    # Get the application endpoint from stored data
-                    gen_data = self.redis.get(f"generation:{generation_id}") if self.redis else None
-                    if gen_data:
-                        data = json.loads(gen_data)
-                        model_config = get_model_config(data.get("model_id", ""))
-                        
-                        loop = asyncio.get_event_loop()
-                        status = await loop.run_in_executor(
-                            None,
-                            lambda: fal_client.sync_client.status(model_config.endpoint, request_id)
-                        )
-                    else:
-                        raise Exception("Generation data not found")
-                    
-                    if isinstance(status, fal_client.Completed):
-                        # Get the result (synchronous, run in executor)
-                        result = await loop.run_in_executor(
-                            None,
-                            lambda: fal_client.sync_client.result(model_config.endpoint, request_id)
-                        )
-                        await self._handle_completion(generation_id, result)
-                        return
-                    elif hasattr(status, 'failed') and status.failed:
-                        error_msg = getattr(status, 'error', 'Generation failed')
-                        await self._mark_generation_failed(generation_id, error_msg)
-                        return
-                except Exception as poll_error:
-                    logger.warning(f"Poll attempt {attempt + 1} failed: {poll_error}")
-                    if attempt >= max_attempts - 1:
-                        raise
-            
-            # Timeout
+            event = await fal_completion_service.wait_for_completion(
+                request_id,
+                endpoint,
+                estimated_time=estimated_time,
+                timeout=600
+            )
+            
+            if event.status == CompletionState.COMPLETED:
+                await self._handle_completion(generation_id, event.result or {})
+            else:
+                await self._mark_generation_failed(generation_id, event.error or "Generation failed")
+            
+        except asyncio.TimeoutError:
             await self._mark_generation_failed(generation_id, "Generation timed out")
-            
         except Exception as e:
             logger.error(f"Failed to process generation {generation_id}: {e}")
             await self._mark_generation_failed(generation_id, str(e))
@@ -497,7 +432,7 @@ class AsyncFALService:
         """
         try:
             # Get generation data
-            generation_data = self.redis.get(f"generation:{generation_id}") if self.redis else None
+            generation_data = await self.redis.get(f"generation:{generation_id}") if self.redis else None
             if not generation_data:
                 return
             
@@ -516,7 +451,7 @@ class AsyncFALService:
             
             # Store updated data
             if self.redis:
-                self.redis.setex(
+                await self.redis.setex(
                     f"generation:{generation_id}",
                     3600,  # Keep for 1 hour
                     json.dumps(data)
@@ -541,7 +476,7 @@ class AsyncFALService:
         Mark a generation as failed.
         """
         try:
-            generation_data = self.redis.get(f"generation:{generation_id}") if self.redis else None
+            generation_data = await self.redis.get(f"generation:{generation_id}") if self.redis else None
             if not generation_data:
                 return
             
@@ -551,7 +486,7 @@ class AsyncFALService:
             data["failed_at"] = datetime.now().isoformat()
             
             if self.redis:
-                self.redis.setex(
+                await self.redis.setex(
                     f"generation:{generation_id}",
                     3600,
                     json.dumps(data)
@@ -563,25 +498,16 @@ class AsyncFALService:
     def _generate_cache_key(self, model_id: str, prompt: str, parameters: Optional[Dict]) -> str:
         """
         Generate a cache key for a generation request.
+        Same key the generation coalescer uses for deterministic requests.
         """
-        import hashlib
-        
-        # Normalize prompt
-        normalized_prompt = prompt.lower().strip()
-        
-        # Sort parameters for consistency
-        sorted_params = json.dumps(parameters or {}, sort_keys=True)
-        
-        # Create hash
-        content = f"{model_id}:{normalized_prompt}:{sorted_params}"
-        return hashlib.sha256(content.encode()).hexdigest()
+        return generation_cache_key(model_id, prompt, parameters)
     
     async def _get_cached_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """
         Get cached result if available.
         """
         try:
-            cached = self.redis.get(f"cache:{cache_key}") if self.redis else None
+            cached = await self.redis.get(f"cache:{cache_key}") if self.redis else None
             if cached:
                 return json.loads(cached)
         except Exception as e:
@@ -594,7 +520,7 @@ class AsyncFALService:
         """
         try:
             if self.redis:
-                self.redis.setex(
+                await self.redis.setex(
                     f"cache:{cache_key}",
                     3600,  # 1 hour cache
                     json.dumps(result)
@@ -613,11 +539,11 @@ class AsyncFALService:
             if not self.redis:
                 return True  # No rate limiting without Redis
                 
-            count = self.redis.incr(key)
+            count = await self.redis.incr(key)
             
             # Set expiry on first request
             if count == 1:
-                self.redis.expire(key, self.rate_limit_window)
+                await self.redis.expire(key, self.rate_limit_window)
             
             # Check if over limit
             if count > self.rate_limit_max:
@@ -707,15 +633,10 @@ class AsyncFALService:
             if not self.redis:
                 return []
                 
-            generation_ids = self.redis.lrange(f"user_generations:{user_id}", 0, limit - 1)
-            
-            generations = []
-            for gen_id in generation_ids:
-                gen_data = self.redis.get(f"generation:{gen_id}") if self.redis else None
-                if gen_data:
-                    generations.append(json.loads(gen_data))
+            generation_ids = await self.redis.lrange(f"user_generations:{user_id}", 0, limit - 1)
             
-            return generations
+            keys = [f"generation:{gen_id.decode() if isinstance(gen_id, bytes) else gen_id}" for gen_id in generation_ids]
+            return [json.loads(gen_data) for gen_data in await self.redis.mget(keys) if gen_data]
             
         except Exception as e:
             logger.error(f"Failed to get user generations: {e}")
@@ -737,10 +658,11 @@ class AsyncFALService:
                     "cache_entries": 0,
                     "redis_connections": None,
                     "semaphore_available": self.semaphore._value,
+                    "completion_tracker": fal_completion_service.get_stats(),
                     "timestamp": datetime.now().isoformat()
                 }
                 
-            all_keys = self.redis.keys("generation:*")
+            all_keys = await self.redis.scan_keys("generation:*")
             
             status_counts = {
                 QueueStatus.QUEUED: 0,
@@ -749,8 +671,7 @@ class AsyncFALService:
                 QueueStatus.FAILED: 0
             }
             
-            for key in all_keys:
-                data = self.redis.get(key) if self.redis else None
+            for data in await self.redis.mget(all_keys):
                 if data:
                     gen_data = json.loads(data)
                     status = gen_data.get("status")
@@ -758,14 +679,15 @@ class AsyncFALService:
                         status_counts[status] += 1
             
             # Get cache stats
-            cache_keys = self.redis.keys("cache:*") if self.redis else []
+            cache_keys = await self.redis.scan_keys("cache:*")
             
             return {
                 "active_generations": len(self.active_generations),
                 "status_counts": status_counts,
                 "cache_entries": len(cache_keys),
-                "redis_connections": self.redis_pool.connection_kwargs,
+                "redis_connections": self.redis.get_stats(),
                 "semaphore_available": self.semaphore._value,
+                "completion_tracker": fal_completion_service.get_stats(),
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -0,0 +1,180 @@
+"""
+Single-flight coalescing and result cache for deterministic generations.
+A generation whose parameters carry a seed is deterministic: the same model,
+prompt and parameters produce the same output. Concurrent identical requests
+in this process join one in-flight FAL job instead of each paying for a run,
+and completed results are cached in Redis so retries and repeats of popular
+prompts are served without calling FAL at all.
+
+Cached results point at content-addressed storage objects
+({user_id}/cas/{sha256}.{ext}, see StorageService) rather than FAL output
+URLs, which expire. Joiners and cache hits attach those objects to their own
+generation records by reference; nothing is downloaded from FAL again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.async_redis import async_redis
+
+logger = logging.getLogger(__name__)
+
+# A stored object shared between generations: bucket, path, file_hash,
+# file_size, content_type
+StoredObject = Dict[str, Any]
+
+
+def generation_cache_key(
+    model_id: str,
+    prompt: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    negative_prompt: Optional[str] = None,
+    reference_image_url: Optional[str] = None
+) -> str:
+    """
+    SHA-256 over model, whitespace-normalized prompt and sorted parameters.
+
+    Prompts keep their case: models are case-sensitive, so "A cat" and
+    "a cat" are different requests.
+    """
+    normalized_prompt = " ".join(prompt.split())
+    sorted_params = json.dumps(parameters or {}, sort_keys=True, default=str)
+    content = f"{model_id}:{normalized_prompt}:{sorted_params}"
+    if negative_prompt:
+        content += f":neg={' '.join(negative_prompt.split())}"
+    if reference_image_url:
+        content += f":ref={reference_image_url}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class GenerationCoalescer:
+    """
+    Joins identical seeded generations onto one leader and caches its result.
+
+    Flights are process-local; the Redis result cache is what spans
+    processes. A leader must always settle its flight with publish() or
+    abandon(), so joiners never wait on a flight nobody will finish.
+    """
+
+    CACHE_PREFIX = "generation:result:"
+
+    def __init__(self):
+        self.enabled = os.getenv("GENERATION_COALESCING_ENABLED", "true").lower() == "true"
+        self.result_ttl = int(os.getenv("GENERATION_RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+        # How long a joiner waits for the leader before running on its own
+        self.join_timeout = float(os.getenv("GENERATION_COALESCING_JOIN_TIMEOUT", "900"))
+
+        self._flights: Dict[str, asyncio.Future] = {}
+
+        self.stats = {
+            "leaders": 0,
+            "joined": 0,
+            "cache_hits": 0,
+            "published": 0,
+            "abandoned": 0,
+            "join_timeouts": 0
+        }
+
+    def key_for(
+        self,
+        model_id: str,
+        prompt: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        negative_prompt: Optional[str] = None,
+        reference_image_url: Optional[str] = None
+    ) -> Optional[str]:
+        """Coalescing key for a request, or None when it is not deterministic (no seed)."""
+        if not self.enabled or not parameters or parameters.get("seed") is None:
+            return None
+        return generation_cache_key(model_id, prompt, parameters, negative_prompt, reference_image_url)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    async def acquire(self, key: str) -> Tuple[Optional[List[StoredObject]], bool]:
+        """
+        Find a result for key or become the one producing it.
+
+        Returns:
+            (objects, leading): cached or joined objects if there are any;
+            leading is True when the caller must run the generation and then
+            publish() or abandon(). (None, False) means the leader gave up
+            and the caller should run on its own.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            cached = await self._get_cached(key)
+            if cached:
+                self.stats["cache_hits"] += 1
+                return cached, False
+            # A leader may have started while the cache was read
+            flight = self._flights.get(key)
+            if flight is None:
+                self._flights[key] = asyncio.get_running_loop().create_future()
+                self.stats["leaders"] += 1
+                return None, True
+
+        self.stats["joined"] += 1
+        logger.info(f"🔗 [COALESCE] Joining in-flight generation {key[:16]}")
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight), timeout=self.join_timeout), False
+        except asyncio.TimeoutError:
+            self.stats["join_timeouts"] += 1
+            logger.warning(f"⚠️ [COALESCE] Leader of {key[:16]} still running after {self.join_timeout:.0f}s")
+            return None, False
+
+    async def publish(self, key: str, objects: List[StoredObject]):
+        """Hand the leader's stored objects to joiners and cache them."""
+        self.stats["published"] += 1
+        flight = self._flights.pop(key, None)
+        if flight is not None and not flight.done():
+            flight.set_result(objects)
+
+        if async_redis.enabled:
+            try:
+                await async_redis.set(f"{self.CACHE_PREFIX}{key}", json.dumps(objects), ex=self.result_ttl)
+            except Exception as e:
+                logger.warning(f"⚠️ [COALESCE] Failed to cache result {key[:16]}: {e}")
+
+    def abandon(self, key: str):
+        """Release joiners of a flight whose leader produced no shareable result."""
+        flight = self._flights.pop(key, None)
+        if flight is not None and not flight.done():
+            self.stats["abandoned"] += 1
+            flight.set_result(None)
+
+    async def forget(self, key: str):
+        """Drop a cached result whose storage objects can no longer be attached."""
+        if async_redis.enabled:
+            try:
+                await async_redis.delete(f"{self.CACHE_PREFIX}{key}")
+            except Exception as e:
+                logger.warning(f"⚠️ [COALESCE] Failed to drop cached result {key[:16]}: {e}")
+
+    async def _get_cached(self, key: str) -> Optional[List[StoredObject]]:
+        if not async_redis.enabled:
+            return None
+        try:
+            cached = await async_redis.get(f"{self.CACHE_PREFIX}{key}")
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"⚠️ [COALESCE] Result cache read failed for {key[:16]}: {e}")
+            return None
+
+    async def close(self):
+        for key in list(self._flights):
+            self.abandon(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            **self.stats
+        }
+
+
+# Global coalescer instance
+generation_coalescer = GenerationCoalescer()
@@ -0,0 +1,161 @@
+"""
+Durable generation job queue.
+API pods enqueue generations here; separate worker processes
+(services/generation_worker.py) claim, process and settle them.
+Backed by the generation_jobs table (migration 019): claims use
+FOR UPDATE SKIP LOCKED, owners hold a heartbeat-renewed lease, and per-model
+concurrency comes from FAL_MODEL_REGISTRY.
+"""
+import logging
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Optional, Dict, Any, List
+
+from config import settings
+from database import get_database
+from models.fal_config import FALModelConfig, FALModelType
+from repositories.generation_job_repository import GenerationJobRepository
+
+logger = logging.getLogger(__name__)
+
+
+class JobLane(IntEnum):
+    """Priority lanes; lower values are claimed first."""
+    INTERACTIVE = 0
+    STANDARD = 1
+    BULK = 2
+
+
+# Images are waited on in the UI; video and audio take minutes either way
+LANE_BY_MODEL_TYPE: Dict[FALModelType, JobLane] = {
+    FALModelType.IMAGE: JobLane.INTERACTIVE,
+    FALModelType.VIDEO: JobLane.STANDARD,
+    FALModelType.AUDIO: JobLane.STANDARD,
+}
+
+
+@dataclass
+class GenerationJob:
+    """A leased generation job."""
+    id: str
+    generation_id: str
+    model_id: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    payload: Dict[str, Any] = field(default_factory=dict)
+    last_error: Optional[str] = None
+    leased_by: Optional[str] = None
+    started_at: Optional[str] = None
+
+    @property
+    def is_final_attempt(self) -> bool:
+        return self.attempts >= self.max_attempts
+
+    @property
+    def started(self) -> bool:
+        """An earlier lease of this job already began processing the generation."""
+        return self.started_at is not None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "GenerationJob":
+        return cls(
+            id=str(row["id"]),
+            generation_id=str(row["generation_id"]),
+            model_id=row["model_id"],
+            priority=row.get("priority", JobLane.STANDARD),
+            attempts=row.get("attempts", 1),
+            max_attempts=row.get("max_attempts", 1),
+            payload=row.get("payload") or {},
+            last_error=row.get("last_error"),
+            leased_by=row.get("leased_by"),
+            started_at=row.get("started_at")
+        )
+
+
+class GenerationJobQueue:
+    """Enqueue, lease and settle generation jobs."""
+
+    def __init__(self):
+        self.db = None
+        self.job_repo = None
+
+    async def _get_repositories(self):
+        """Initialize repositories if not already done."""
+        if self.db is None:
+            self.db = await get_database()
+            self.job_repo = GenerationJobRepository(self.db)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.GENERATION_QUEUE_ENABLED
+
+    async def enqueue(
+        self,
+        generation_id: str,
+        model_config: FALModelConfig,
+        model_id: str,
+        payload: Dict[str, Any],
+        lane: Optional[JobLane] = None
+    ) -> Dict[str, Any]:
+        """Enqueue a generation for the workers. Safe to repeat for the same generation."""
+        await self._get_repositories()
+        lane = lane if lane is not None else LANE_BY_MODEL_TYPE[model_config.ai_model_type]
+        result = await self.job_repo.enqueue(
+            generation_id=generation_id,
+            model_id=model_id,
+            payload=payload,
+            priority=int(lane),
+            max_attempts=settings.GENERATION_JOB_MAX_ATTEMPTS
+        )
+        logger.info(f"📥 [JOB-QUEUE] Generation {generation_id} queued on lane {lane.name.lower()} (job {result.get('job_id')})")
+        return result
+
+    async def claim(
+        self,
+        worker_id: str,
+        model_limits: Dict[str, int],
+        limit: int,
+        lanes: List[JobLane]
+    ) -> List[GenerationJob]:
+        """Lease up to `limit` ready jobs, highest-priority lane first."""
+        await self._get_repositories()
+        rows = await self.job_repo.claim(
+            worker_id=worker_id,
+            model_limits=model_limits,
+            limit=limit,
+            lease_seconds=settings.GENERATION_JOB_LEASE_SECONDS,
+            priorities=[int(lane) for lane in lanes]
+        )
+        return [GenerationJob.from_row(row) for row in rows]
+
+    async def heartbeat(self, worker_id: str, job_ids: List[str]) -> List[str]:
+        """Renew leases; returns the job ids still owned by the worker."""
+        if not job_ids:
+            return []
+        await self._get_repositories()
+        owned = await self.job_repo.heartbeat(worker_id, job_ids, settings.GENERATION_JOB_LEASE_SECONDS)
+        return [str(job_id) for job_id in owned]
+
+    async def start(self, job: GenerationJob) -> bool:
+        """Mark the job as processing its generation, once per job (see migration 019)."""
+        await self._get_repositories()
+        return await self.job_repo.start(job.id, job.leased_by)
+
+    async def complete(self, job: GenerationJob, worker_id: str) -> bool:
+        await self._get_repositories()
+        return await self.job_repo.complete(job.id, worker_id)
+
+    async def fail(self, job: GenerationJob, worker_id: str, error: str) -> Optional[str]:
+        """Record a failed attempt; the queue retries with exponential backoff until max_attempts."""
+        await self._get_repositories()
+        return await self.job_repo.fail(job.id, worker_id, error, settings.GENERATION_JOB_RETRY_DELAY_SECONDS)
+
+    async def release(self, job: GenerationJob, worker_id: str) -> bool:
+        """Return a job untouched so another worker can take it (shutdown)."""
+        await self._get_repositories()
+        return await self.job_repo.release(job.id, worker_id)
+
+
+# Global generation job queue instance
+generation_job_queue = GenerationJobQueue()
@@ -6,7 +6,7 @@ import asyncio
 import logging
 import time
 from typing import Dict, Any, Optional, List
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime
 from pydantic import HttpUrl
 
@@ -14,7 +14,10 @@ from database import get_database
 from repositories.generation_repository import GenerationRepository
 from services.fal_service import fal_service
 from services.storage_service import storage_service
+from services.fal_completion_service import fal_completion_service, CompletionState
 from services.credit_transaction_service import credit_transaction_service, CreditTransaction
+from services.generation_job_queue import generation_job_queue, GenerationJob
+from services.generation_coalescer import generation_coalescer
 from models.generation import (
     GenerationCreate, 
     GenerationResponse, 
@@ -22,10 +25,13 @@ from models.generation import (
     GenerationType
 )
 from models.fal_config import get_model_config
+from models.storage import StorageBucket
 from models.credit import TransactionType
 from utils.logging_config import perf_logger, log_performance
 from utils.performance_monitor import performance_monitor
 from utils.cache_manager import cached, CacheLevel
+from utils.pagination import KeysetPage
+from utils.request_timing import detached
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +41,11 @@ class CircuitBreakerError(Exception):
     pass
 
 
+class GenerationRetryError(Exception):
+    """Transient processing failure; the job queue should retry the generation."""
+    pass
+
+
 class GenerationService:
     """Service for managing AI generation lifecycle."""
     
@@ -214,140 +225,43 @@ class GenerationService:
             model_config = get_model_config(generation_data.model_id)
             credits_required = model_config.credits
             
-            # Optimized credit validation using the new credit transaction service
-            logger.info(f"🔍 [GENERATION] Starting optimized credit validation for user {user_id}, credits_required: {credits_required}")
-            
-            try:
-                # Use optimized credit validation with caching
-                validation_result = await credit_transaction_service.validate_credit_transaction(
-                    user_id=user_id,
-                    required_amount=credits_required,
-                    auth_token=auth_token
-                )
-                
-                logger.info(f"✅ [GENERATION] Credit validation result for user {user_id}: {validation_result.message}")
-                
-                if not validation_result.valid:
-                    logger.error(f"💳 [GENERATION] {validation_result.message}")
-                    performance_monitor.record_generation_result(False)
-                    raise ValueError(validation_result.message)
-                    
-                logger.info(f"✅ [GENERATION] Credit validation passed for user {user_id}, proceeding with generation")
-                
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"❌ [GENERATION] Credit validation exception for user {user_id}: {e}")
-                logger.error(f"❌ [GENERATION] Exception type: {type(e).__name__}")
-                logger.error(f"❌ [GENERATION] Exception message: {error_msg}")
-                
-                performance_monitor.record_generation_result(False)
-                
-                if "not found" in error_msg.lower():
-                    logger.error(f"👤 [GENERATION] Credit validation failed - user profile missing for {user_id}: {e}")
-                    raise ValueError(f"User profile not found. Please contact support if this continues.")
-                else:
-                    logger.error(f"💥 [GENERATION] Credit validation failed for user {user_id}: {e}")
-                    raise ValueError(f"Credit verification failed: {str(e)}")
-            
-            # Create generation record in database (match actual schema)
-            generation_record = {
-                "user_id": str(user_id),
-                "project_id": str(generation_data.project_id) if generation_data.project_id else "00000000-0000-0000-0000-000000000000",  # Use default UUID for NULL project_id
-                "model_id": generation_data.model_id,  # CRITICAL: Include model_id in database record
-                "prompt": generation_data.prompt,
-                "status": GenerationStatus.PENDING.value,
-                "cost": credits_required,
-                "media_type": model_config.ai_model_type.value,
-                # media_url will be set after generation completes
-                # parent_generation_id and style_stack_id can be None
-            }
-            
-            # Debug: log the generation record before saving
-            logger.info(f"Creating generation record: {generation_record}")
-            
-            # EMERGENCY FIX: Handle generation repository compatibility
-            try:
-                # Try new signature with auth_token
-                created_generation = await self.generation_repo.create_generation(generation_record, auth_token=auth_token)
-            except TypeError as te:
-                if "unexpected keyword argument 'auth_token'" in str(te):
-                    logger.warning("🔧 [GENERATION] Using legacy repository signature - calling without auth_token")
-                    # Fall back to old signature without auth_token
-                    created_generation = await self.generation_repo.create_generation(generation_record)
-                else:
-                    raise
-            
-            # Optimized atomic credit deduction using the new credit transaction service
             # CRITICAL FIX: Safe UUID handling for user_id
             from utils.uuid_utils import UUIDUtils
             user_id_str = UUIDUtils.ensure_uuid_string(user_id)
             if not user_id_str:
                 raise ValueError(f"Invalid user_id format: {user_id}")
             
-            logger.info(f"💳 [GENERATION] Starting atomic credit deduction for user {user_id_str}, generation {created_generation.id}")
-            logger.info(f"💳 [GENERATION] Deduction amount: {credits_required}, model: {generation_data.model_id}")
+            # Assign the generation id up front so the credit reservation is keyed
+            # by it: retries never double-charge, and the database commits or
+            # refunds the reservation when this generation completes or fails.
+            generation_id = str(uuid4())
+            credit_transaction = CreditTransaction(
+                user_id=user_id_str,
+                amount=credits_required,
+                transaction_type=TransactionType.USAGE,
+                generation_id=generation_id,
+                model_name=generation_data.model_id,
+                description=f"Credit deduction for {generation_data.model_id} generation",
+                metadata={
+                    "generation_model": generation_data.model_id,
+                    "operation_context": "generation_credit_reservation"
+                }
+            )
             
+            # Balance check and debit in one round trip (conditional UPDATE in the database)
+            logger.info(f"💳 [GENERATION] Reserving {credits_required} credits for user {user_id_str}, generation {generation_id}")
             try:
-                # Create credit transaction for atomic deduction - CRITICAL FIX: Enhanced auth token handling
-                credit_transaction = CreditTransaction(
-                    user_id=user_id_str,
-                    amount=credits_required,
-                    transaction_type=TransactionType.USAGE,
-                    generation_id=str(created_generation.id),
-                    model_name=generation_data.model_id,
-                    description=f"Credit deduction for {generation_data.model_id} generation",
-                    auth_token=auth_token,  # CRITICAL FIX: Pass JWT token for database operations
-                    metadata={
-                        "auth_token": auth_token,  # Also store in metadata as backup
-                        "generation_model": generation_data.model_id,
-                        "credit_deduction": True,
-                        "service_key_available": True,  # Will be used to determine fallback strategy
-                        "operation_context": "generation_credit_deduction"
-                    }
-                )
-                
-                logger.info(f"🔍 [GENERATION] Executing atomic credit deduction for user {user_id_str}")
-                updated_user = await credit_transaction_service.atomic_credit_deduction(credit_transaction)
-                
-                logger.info(f"✅ [GENERATION] Successfully deducted {credits_required} credits from user {user_id_str} for generation {created_generation.id}")
-                logger.info(f"✅ [GENERATION] New user balance: {updated_user.credits_balance}")
-                
-                # Record successful credit operation
-                performance_monitor.record_credit_operation()
+                reservation = await credit_transaction_service.reserve_credits(credit_transaction)
                 
             except Exception as credit_error:
-                logger.error(f"❌ [GENERATION] Atomic credit deduction failed for generation {created_generation.id}: {credit_error}")
+                error_msg = str(credit_error)
+                logger.error(f"❌ [GENERATION] Credit reservation failed for user {user_id}: {credit_error}")
                 logger.error(f"❌ [GENERATION] Credit error type: {type(credit_error).__name__}")
-                logger.error(f"❌ [GENERATION] Credit error message: {str(credit_error)}")
                 
-                # Record failed generation
                 performance_monitor.record_generation_result(False)
                 
-                # If credit deduction fails after creation, we need to mark generation as failed
-                logger.info(f"🔄 [GENERATION] Marking generation {created_generation.id} as failed due to credit deduction failure")
-                try:
-                    await self.generation_repo.update_generation(
-                        created_generation.id,
-                        {
-                            "status": GenerationStatus.FAILED,
-                            "error_message": "Credit deduction failed",
-                            "completed_at": datetime.utcnow().isoformat()
-                        }
-                    )
-                    logger.info(f"✅ [GENERATION] Generation {created_generation.id} marked as failed")
-                except Exception as update_error:
-                    logger.error(f"❌ [GENERATION] Failed to update generation status after credit error: {update_error}")
-                
-                logger.error(f"💥 [GENERATION] Raising credit processing error for user {user_id}")
-                # CRITICAL FIX: More specific error message for debugging
-                error_msg = str(credit_error)
-                logger.error(f"💥 [GENERATION] Detailed credit error: {error_msg}")
-                
-                # CRITICAL FIX: Enhanced error handling with better user messaging and profile creation
-                if "authentication expired" in error_msg.lower() or "refresh your session" in error_msg.lower():
-                    logger.error(f"🔴 [GENERATION] JWT token authentication issue: {error_msg}")
-                    raise ValueError("Your session has expired. Please refresh the page and try again.")
-                elif "not found" in error_msg.lower():
+                reservation = None
+                if "not found" in error_msg.lower():
                     logger.error(f"💳 [GENERATION] Profile lookup failed during credit processing: {error_msg}")
                     # CRITICAL FIX: Try to auto-create profile for missing users
                     try:
@@ -365,44 +279,74 @@ class GenerationService:
                             except Exception as jwt_error:
                                 logger.warning(f"⚠️ [GENERATION] Failed to decode JWT for email: {jwt_error}")
                         
-                        # Try to create user profile
-                        new_user = await user_service.create_user_profile(
+                        await user_service.create_user_profile(
                             user_id=user_id,
                             email=user_email,
                             full_name="Auto-created User"
                         )
                         logger.info(f"✅ [GENERATION] Successfully auto-created profile for user {user_id}")
                         
-                        # Retry credit validation after profile creation
-                        logger.info(f"🔄 [GENERATION] Retrying credit validation after profile creation")
-                        validation_result_retry = await credit_transaction_service.validate_credit_transaction(
-                            user_id=user_id,
-                            required_amount=credits_required,
-                            auth_token=auth_token
-                        )
-                        
-                        if not validation_result_retry.valid:
-                            logger.error(f"💳 [GENERATION] Credit validation still failed after profile creation: {validation_result_retry.message}")
-                            raise ValueError(validation_result_retry.message)
-                        
-                        logger.info(f"✅ [GENERATION] Credit validation successful after profile creation")
+                        # Retry the reservation after profile creation
+                        reservation = await credit_transaction_service.reserve_credits(credit_transaction)
+                        logger.info(f"✅ [GENERATION] Credit reservation successful after profile creation")
                         
                     except Exception as profile_creation_error:
                         logger.error(f"❌ [GENERATION] Profile auto-creation failed: {profile_creation_error}")
-                        # Fall back to user-friendly error message
                         # SECURITY FIX: Prevent information leakage in error messages
-                    logger.error(f"Account verification failed: {error_msg}")
-                    raise ValueError("Account verification failed. Please ensure you are logged in and try again.")
+                        if "insufficient" in str(profile_creation_error).lower():
+                            raise ValueError(str(profile_creation_error))
+                        logger.error(f"Account verification failed: {error_msg}")
+                        raise ValueError("Account verification failed. Please ensure you are logged in and try again.")
                 elif "insufficient" in error_msg.lower():
-                    raise ValueError("Insufficient credits available") 
-                elif "generation_usage" in error_msg.lower() or "GENERATION_USAGE" in error_msg:
-                    raise ValueError("Credit processing failed: Invalid transaction type format")
+                    logger.error(f"💳 [GENERATION] {error_msg}")
+                    raise ValueError(error_msg)
+                elif any(keyword in error_msg.lower() for keyword in ["token", "auth", "jwt", "expired"]):
+                    raise ValueError("Your session has expired. Please refresh the page and try again.")
                 else:
-                    # Default to session expiration for unknown authentication-related errors
-                    if any(keyword in error_msg.lower() for keyword in ["token", "auth", "jwt", "expired"]):
-                        raise ValueError("Your session has expired. Please refresh the page and try again.")
+                    raise ValueError(f"Credit processing failed: {error_msg}")
+            
+            logger.info(f"✅ [GENERATION] Reserved {credits_required} credits for generation {generation_id}, new balance: {reservation.balance}")
+            
+            # Create generation record in database (match actual schema)
+            generation_record = {
+                "id": generation_id,
+                "user_id": str(user_id),
+                "project_id": str(generation_data.project_id) if generation_data.project_id else "00000000-0000-0000-0000-000000000000",  # Use default UUID for NULL project_id
+                "model_id": generation_data.model_id,  # CRITICAL: Include model_id in database record
+                "prompt": generation_data.prompt,
+                "status": GenerationStatus.PENDING.value,
+                "cost": credits_required,
+                "media_type": model_config.ai_model_type.value,
+                # media_url will be set after generation completes
+                # parent_generation_id and style_stack_id can be None
+            }
+            
+            # Debug: log the generation record before saving
+            logger.info(f"Creating generation record: {generation_record}")
+            
+            try:
+                # EMERGENCY FIX: Handle generation repository compatibility
+                try:
+                    # Try new signature with auth_token
+                    created_generation = await self.generation_repo.create_generation(generation_record, auth_token=auth_token)
+                except TypeError as te:
+                    if "unexpected keyword argument 'auth_token'" in str(te):
+                        logger.warning("🔧 [GENERATION] Using legacy repository signature - calling without auth_token")
+                        # Fall back to old signature without auth_token
+                        created_generation = await self.generation_repo.create_generation(generation_record)
                     else:
-                        raise ValueError(f"Credit processing failed: {error_msg}")
+                        raise
+            except Exception:
+                # No generation row means no status change will ever settle the reservation
+                await credit_transaction_service.refund_reservation(
+                    reservation.idempotency_key,
+                    reason=f"Refund: generation {generation_id} could not be created",
+                    user_id=user_id_str
+                )
+                raise
+            
+            # Record successful credit operation
+            performance_monitor.record_credit_operation()
             
             # Start FAL.ai generation asynchronously with updated reference URL
             updated_generation_data = generation_data.model_copy()
@@ -411,16 +355,13 @@ class GenerationService:
                 from pydantic import HttpUrl
                 updated_generation_data.reference_image_url = HttpUrl(reference_image_url)
             
-            asyncio.create_task(
-                self._process_generation(created_generation.id, updated_generation_data)
-            )
+            await self._dispatch_generation(str(created_generation.id), updated_generation_data, model_config)
             
             # Record successful generation creation
             performance_monitor.record_generation_result(True)
             
             logger.info(f"🎉 [GENERATION] Successfully created generation {created_generation.id} for user {user_id}")
             logger.info(f"✅ [GENERATION] Generation created with status: {created_generation.status}, cost: {created_generation.cost}")
-            logger.info(f"🚀 [GENERATION] Background processing task started for generation {created_generation.id}")
             
             # Log generation lifecycle event
             perf_logger.log_generation_lifecycle(
@@ -445,17 +386,202 @@ class GenerationService:
             # Wrap unexpected errors in a more user-friendly message
             raise RuntimeError(f"Generation creation failed due to system error. Please try again later.")
     
+    async def _dispatch_generation(self, generation_id: str, generation_data: GenerationCreate, model_config):
+        """
+        Hand a created generation to the durable job queue. Falls back to
+        in-process processing when the queue is disabled or unreachable, so a
+        queue outage degrades to the old behaviour instead of failing requests.
+        """
+        if generation_job_queue.enabled:
+            try:
+                await generation_job_queue.enqueue(
+                    generation_id=generation_id,
+                    model_config=model_config,
+                    model_id=generation_data.model_id,
+                    payload=generation_data.model_dump(mode="json")
+                )
+                return
+            except Exception as queue_error:
+                logger.error(f"❌ [GENERATION] Job queue unavailable, processing {generation_id} in-process: {queue_error}")
+        
+        asyncio.create_task(detached(self._process_generation(generation_id, generation_data)))
+        logger.info(f"🚀 [GENERATION] Background processing task started for generation {generation_id}")
+    
+    async def process_generation_job(self, job: GenerationJob):
+        """
+        Run one attempt of a queued generation (called by generation workers).
+        Raises GenerationRetryError when the attempt should be retried by the queue.
+        """
+        await self._get_repositories()
+        
+        generation = await self.generation_repo.get_generation_by_id(
+            generation_id=job.generation_id,
+            user_id=None,
+            auth_token=None
+        )
+        if not generation:
+            logger.warning(f"⚠️ [GENERATION-JOB] Generation {job.generation_id} no longer exists, dropping job {job.id}")
+            return
+        
+        status = generation.status.value if hasattr(generation.status, "value") else str(generation.status)
+        if status in (GenerationStatus.COMPLETED.value, GenerationStatus.FAILED.value, GenerationStatus.CANCELLED.value):
+            logger.info(f"⏭️ [GENERATION-JOB] Generation {job.generation_id} already {status}, nothing to do")
+            return
+        if not job.started:
+            if status == GenerationStatus.PROCESSING.value:
+                # No lease of this job has run it, so the in-process fallback
+                # (an enqueue that failed after committing) owns the generation
+                logger.info(f"⏭️ [GENERATION-JOB] Generation {job.generation_id} is being processed in-process")
+                return
+            if not await generation_job_queue.start(job):
+                raise GenerationRetryError(f"Lost lease on job {job.id} before processing")
+        
+        await self._process_generation(
+            job.generation_id,
+            GenerationCreate(**job.payload),
+            fal_attempts=1,
+            final_attempt=job.is_final_attempt
+        )
+    
     async def _process_generation(
         self,
         generation_id: str,
-        generation_data: GenerationCreate
+        generation_data: GenerationCreate,
+        fal_attempts: int = 3,
+        final_attempt: bool = True
     ):
         """
         Process the generation with FAL.ai (background task).
         
+        Seeded (deterministic) requests go through the generation coalescer:
+        a cached or in-flight identical generation's stored files are attached
+        by reference instead of running FAL again.
+        
         Args:
             generation_id: Database generation ID
             generation_data: Generation parameters
+            fal_attempts: FAL.ai calls to make in this run before giving up
+            final_attempt: False when the job queue will retry; a FAL.ai
+                failure then raises GenerationRetryError instead of failing
+                the generation
+        """
+        coalesce_key = generation_coalescer.key_for(
+            model_id=generation_data.model_id,
+            prompt=generation_data.prompt,
+            parameters=generation_data.parameters,
+            negative_prompt=generation_data.negative_prompt,
+            reference_image_url=str(generation_data.reference_image_url) if generation_data.reference_image_url else None
+        )
+        if not coalesce_key:
+            await self._run_generation(generation_id, generation_data, fal_attempts, final_attempt)
+            return
+        
+        if generation_coalescer.in_flight(coalesce_key):
+            # Joiners wait for the leader; show them as processing meanwhile
+            await self.generation_repo.update_generation_status(generation_id, GenerationStatus.PROCESSING)
+        
+        shared_objects, leading = await generation_coalescer.acquire(coalesce_key)
+        if shared_objects:
+            if await self._complete_from_shared_result(generation_id, shared_objects, coalesce_key):
+                return
+            await generation_coalescer.forget(coalesce_key)
+        
+        if not leading:
+            # The leader gave up or its objects are gone; run independently
+            await self._run_generation(generation_id, generation_data, fal_attempts, final_attempt, content_addressed=True)
+            return
+        
+        stored_files = None
+        try:
+            stored_files = await self._run_generation(
+                generation_id, generation_data, fal_attempts, final_attempt, content_addressed=True
+            )
+        finally:
+            shared_objects = storage_service.content_addressed_objects(stored_files) if stored_files else None
+            if shared_objects:
+                await generation_coalescer.publish(coalesce_key, shared_objects)
+            else:
+                generation_coalescer.abandon(coalesce_key)
+    
+    async def _complete_from_shared_result(
+        self,
+        generation_id: str,
+        objects: List[Dict[str, Any]],
+        coalesce_key: str
+    ) -> bool:
+        """
+        Complete a generation with another identical generation's stored files.
+        Returns False when the objects could not be attached.
+        """
+        try:
+            generation = await self.generation_repo.get_generation_by_id(
+                generation_id=generation_id,
+                user_id=None,
+                auth_token=None
+            )
+            if not generation:
+                raise ValueError(f"Generation {generation_id} not found")
+            
+            stored_files = await storage_service.attach_generation_files(
+                user_id=generation.user_id,
+                generation_id=generation_id,
+                objects=objects,
+                project_id=generation.project_id
+            )
+            if not stored_files:
+                return False
+            
+            total_storage_size = sum(file_meta.file_size for file_meta in stored_files)
+            await self.generation_repo.update_generation(
+                generation_id,
+                {
+                    "status": GenerationStatus.COMPLETED,
+                    "output_urls": [f.file_path for f in stored_files],
+                    "media_url": stored_files[0].file_path,
+                    "media_files": [
+                        {
+                            "file_id": str(f.id),
+                            "bucket": f.bucket_name.value if hasattr(f.bucket_name, 'value') else str(f.bucket_name),
+                            "path": f.file_path,
+                            "size": f.file_size,
+                            "content_type": f.content_type.value if hasattr(f.content_type, 'value') else str(f.content_type),
+                            "is_thumbnail": f.is_thumbnail
+                        } for f in stored_files
+                    ],
+                    "storage_size": total_storage_size,
+                    "is_media_processed": True,
+                    "metadata": {
+                        "files_stored": len(stored_files),
+                        "total_size": total_storage_size,
+                        "storage_successful": True,
+                        "supabase_urls_used": True,
+                        "shared_result": True,
+                        "result_key": coalesce_key
+                    },
+                    "completed_at": datetime.utcnow().isoformat()
+                }
+            )
+            
+            logger.info(f"♻️ [GENERATION-PROCESSING] Generation {generation_id} completed from shared result: {len(stored_files)} files, {total_storage_size} bytes")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"⚠️ [GENERATION-PROCESSING] Could not reuse shared result for {generation_id}, running FAL.ai: {e}")
+            return False
+    
+    async def _run_generation(
+        self,
+        generation_id: str,
+        generation_data: GenerationCreate,
+        fal_attempts: int = 3,
+        final_attempt: bool = True,
+        content_addressed: bool = False
+    ) -> Optional[List[Any]]:
+        """
+        Run the generation on FAL.ai and store its outputs.
+        
+        Returns:
+            Stored file metadata when the generation completed, otherwise None
         """
         logger.info(f"🚀 [GENERATION-PROCESSING] Starting background processing for generation {generation_id}")
         logger.info(f"🔍 [GENERATION-PROCESSING] Model: {generation_data.model_id}, Prompt length: {len(generation_data.prompt)}")
@@ -477,7 +603,7 @@ class GenerationService:
             logger.info(f"🔍 [GENERATION-PROCESSING] FAL parameters: model={generation_data.model_id}, has_negative_prompt={generation_data.negative_prompt is not None}, has_reference_image={generation_data.reference_image_url is not None}")
             
             # Implement retry logic for FAL service calls
-            max_retries = 3
+            max_retries = fal_attempts
             retry_delay = 5  # seconds
             fal_result = None
             
@@ -503,12 +629,16 @@ class GenerationService:
                 except asyncio.TimeoutError:
                     logger.error(f"⏰ [GENERATION-PROCESSING] FAL.ai timeout on attempt {attempt + 1} for generation {generation_id}")
                     if attempt == max_retries - 1:
+                        if not final_attempt:
+                            raise GenerationRetryError("FAL.ai service timeout")
                         raise RuntimeError(f"FAL.ai service timeout after {max_retries} attempts")
                     await asyncio.sleep(retry_delay)
                     
                 except Exception as fal_error:
                     logger.error(f"❌ [GENERATION-PROCESSING] FAL.ai error on attempt {attempt + 1}: {fal_error}")
                     if attempt == max_retries - 1:
+                        if not final_attempt:
+                            raise GenerationRetryError(f"FAL.ai error: {fal_error}") from fal_error
                         raise
                     await asyncio.sleep(retry_delay)
             
@@ -578,7 +708,8 @@ class GenerationService:
                                 file_urls=output_urls,
                                 file_type="image" if generation.media_type == "image" else "video",
                                 project_id=generation.project_id if generation.project_id and isinstance(generation.project_id, UUID) else (UUID(generation.project_id) if generation.project_id else None),
-                                progress_callback=storage_progress_callback
+                                progress_callback=storage_progress_callback,
+                                content_addressed=content_addressed
                             )
                             
                             logger.info(f"✅ [STORAGE] Successfully uploaded {len(stored_files)} files to Supabase Storage")
@@ -597,7 +728,8 @@ class GenerationService:
                                         generation_id=generation_id if isinstance(generation_id, UUID) else UUID(generation_id),
                                         file_urls=[url],  # Single file
                                         file_type="image" if generation.media_type == "image" else "video",
-                                        project_id=generation.project_id if generation.project_id and isinstance(generation.project_id, UUID) else (UUID(generation.project_id) if generation.project_id else None)
+                                        project_id=generation.project_id if generation.project_id and isinstance(generation.project_id, UUID) else (UUID(generation.project_id) if generation.project_id else None),
+                                        content_addressed=content_addressed
                                     )
                                     stored_files.extend(individual_files)
                                     logger.info(f"✅ [STORAGE-RECOVERY] Recovered file {i+1}: {individual_files[0].file_path}")
@@ -679,6 +811,7 @@ class GenerationService:
                     logger.info(f"✅ [STORAGE] Generation {generation_id} updated successfully in database")
                     logger.info(f"🎉 [GENERATION-PROCESSING] Generation {generation_id} completed and stored: {len(stored_files)} files, {total_storage_size} bytes")
                     logger.info(f"🔍 [GENERATION-PROCESSING] Final generation status: {updated_generation.status}, media_url: {updated_generation.media_url}")
+                    return stored_files
                     
                 except Exception as storage_error:
                     logger.error(f"❌ [STORAGE] Failed to store generation results for {generation_id}: {storage_error}")
@@ -710,7 +843,8 @@ class GenerationService:
                                 file_urls=output_urls,
                                 file_type="image" if generation.media_type == "image" else "video",
                                 project_id=generation.project_id if generation.project_id and isinstance(generation.project_id, UUID) else (UUID(generation.project_id) if generation.project_id else None),
-                                progress_callback=None  # Skip progress callback during retry
+                                progress_callback=None,  # Skip progress callback during retry
+                                content_addressed=content_addressed
                             )
                             
                             logger.info(f"✅ [STORAGE-RETRY] Retry successful! Uploaded {len(stored_files)} files on attempt {retry_attempt + 1}")
@@ -814,6 +948,7 @@ class GenerationService:
                         logger.info(f"✅ [STORAGE-RETRY] Generation {generation_id} completed successfully after retry")
                         logger.info(f"🎉 [GENERATION-PROCESSING] Generation {generation_id} completed and stored: {len(stored_files)} files, {total_storage_size} bytes")
                         logger.info(f"🔍 [GENERATION-PROCESSING] Final generation status: {updated_generation.status}, media_url: {updated_generation.media_url}")
+                        return stored_files
             
             elif fal_result["status"] == GenerationStatus.FAILED:
                 logger.error(f"❌ [GENERATION-PROCESSING] FAL.ai generation failed for {generation_id}")
@@ -846,6 +981,9 @@ class GenerationService:
                 logger.warning(f"⚠️ [GENERATION-PROCESSING] Unexpected FAL.ai status for generation {generation_id}: {fal_result['status']}")
                 logger.warning(f"🔍 [GENERATION-PROCESSING] Full FAL result: {fal_result}")
             
+        except GenerationRetryError:
+            logger.warning(f"🔁 [GENERATION-PROCESSING] Generation {generation_id} will be retried by the job queue")
+            raise
         except Exception as e:
             logger.error(f"💥 [GENERATION-PROCESSING] Critical error processing generation {generation_id}: {e}")
             logger.error(f"❌ [GENERATION-PROCESSING] Exception type: {type(e).__name__}")
@@ -889,131 +1027,32 @@ class GenerationService:
     
     async def _poll_generation_completion(self, generation_id: str, fal_request_id: str):
         """
-        Poll FAL.ai for generation completion.
+        Wait for FAL.ai generation completion via the shared completion tracker.
         
         Args:
             generation_id: Database generation ID
             fal_request_id: FAL.ai request ID
         """
-        max_attempts = 60  # 10 minutes with 10-second intervals
-        attempt = 0
-        
-        while attempt < max_attempts:
-            try:
-                # Check status with FAL.ai
-                status_result = await fal_service.check_generation_status(fal_request_id)
-                
-                if status_result["status"] == GenerationStatus.COMPLETED:
-                    # Generation completed successfully - store results in Supabase Storage
-                    try:
-                        # Get generation details for user context
-                        generation = await self.generation_repo.get_generation_by_id(
-                            generation_id=generation_id,
-                            user_id=None,  # No user_id available in polling context
-                            auth_token=None  # No auth token available in polling context, rely on service key
-                        )
-                        if not generation:
-                            raise ValueError(f"Generation {generation_id} not found")
-                        
-                        # Store generation results in storage
-                        output_urls = status_result.get("output_urls", [])
-                        stored_files = []
-                        
-                        if output_urls:
-                            stored_files = await storage_service.upload_generation_result(
-                                user_id=generation.user_id,  # Pass string directly
-                                generation_id=generation_id,  # Pass string directly
-                                file_urls=output_urls,
-                                file_type="image" if generation.media_type == "image" else "video",
-                                project_id=generation.project_id if generation.project_id else None
-                            )
-                        
-                        # Calculate total storage size
-                        total_storage_size = sum(file_meta.file_size for file_meta in stored_files)
-                        
-                        # Update generation with storage information
-                        await self.generation_repo.update_generation(
-                            generation_id,
-                            {
-                                "status": GenerationStatus.COMPLETED,
-                                "output_urls": [f.file_path for f in stored_files],  # Use storage paths instead of external URLs
-                                "media_url": stored_files[0].file_path if stored_files else None,  # Set primary media URL
-                                "media_files": [
-                                    {
-                                        "file_id": str(f.id),
-                                        "bucket": f.bucket_name.value if hasattr(f.bucket_name, 'value') else str(f.bucket_name),
-                                        "path": f.file_path,
-                                        "size": f.file_size,
-                                        "content_type": f.content_type.value if hasattr(f.content_type, 'value') else str(f.content_type),
-                                        "is_thumbnail": f.is_thumbnail
-                                    } for f in stored_files
-                                ],
-                                "storage_size": total_storage_size,
-                                "is_media_processed": True,
-                                "metadata": {
-                                    **status_result.get("metadata", {}),
-                                    "fal_request_id": fal_request_id,
-                                    "processing_time": attempt * 10,
-                                    "files_stored": len(stored_files),
-                                    "total_size": total_storage_size
-                                },
-                                "completed_at": datetime.utcnow().isoformat()
-                            }
-                        )
-                        
-                        logger.info(
-                            f"Generation {generation_id} completed and stored: "
-                            f"{len(stored_files)} files, {total_storage_size} bytes"
-                        )
-                        
-                    except Exception as storage_error:
-                        logger.error(f"Failed to store generation results for {generation_id}: {storage_error}")
-                        
-                        # Mark generation as completed but with storage warning
-                        await self.generation_repo.update_generation(
-                            generation_id,
-                            {
-                                "status": GenerationStatus.COMPLETED,
-                                "output_urls": status_result.get("output_urls", []),  # Fallback to external URLs
-                                "metadata": {
-                                    **status_result.get("metadata", {}),
-                                    "fal_request_id": fal_request_id,
-                                    "processing_time": attempt * 10,
-                                    "storage_error": str(storage_error)
-                                },
-                                "completed_at": datetime.utcnow().isoformat()
-                            }
-                        )
-                        logger.warning(f"Generation {generation_id} completed but storage failed")
-                    
-                    break
-                    
-                elif status_result["status"] == GenerationStatus.FAILED:
-                    # Generation failed
-                    await self.generation_repo.update_generation(
-                        generation_id,
-                        {
-                            "status": GenerationStatus.FAILED,
-                            "error_message": status_result.get("error_message", "Generation failed"),
-                            "completed_at": datetime.utcnow().isoformat()
-                        }
-                    )
-                    
-                    logger.error(f"Generation {generation_id} failed: {status_result.get('error_message')}")
-                    break
-                    
-                else:
-                    # Still processing, continue polling
-                    attempt += 1
-                    await asyncio.sleep(10)  # Wait 10 seconds before next check
-                    
-            except Exception as e:
-                logger.error(f"Error polling generation {generation_id}: {e}")
-                attempt += 1
-                await asyncio.sleep(10)
+        max_wait_seconds = 600  # 10 minutes
+        started_at = time.time()
         
-        # If we've exceeded max attempts, mark as failed
-        if attempt >= max_attempts:
+        try:
+            generation = await self.generation_repo.get_generation_by_id(
+                generation_id=generation_id,
+                user_id=None,  # No user_id available in polling context
+                auth_token=None  # No auth token available in polling context, rely on service key
+            )
+            if not generation:
+                raise ValueError(f"Generation {generation_id} not found")
+            
+            model_config = get_model_config(generation.model_id)
+            event = await fal_completion_service.wait_for_completion(
+                fal_request_id,
+                model_config.endpoint,
+                estimated_time=fal_service._get_estimated_time(model_config.ai_model_type),
+                timeout=max_wait_seconds
+            )
+        except asyncio.TimeoutError:
             await self.generation_repo.update_generation(
                 generation_id,
                 {
@@ -1022,7 +1061,97 @@ class GenerationService:
                     "completed_at": datetime.utcnow().isoformat()
                 }
             )
-            logger.error(f"Generation {generation_id} timed out after {max_attempts} attempts")
+            logger.error(f"Generation {generation_id} timed out after {max_wait_seconds}s")
+            return
+        except Exception as e:
+            logger.error(f"Error waiting for generation {generation_id}: {e}")
+            return
+        
+        processing_time = int(time.time() - started_at)
+        
+        if event.status != CompletionState.COMPLETED:
+            # Generation failed
+            await self.generation_repo.update_generation(
+                generation_id,
+                {
+                    "status": GenerationStatus.FAILED,
+                    "error_message": event.error or "Generation failed",
+                    "completed_at": datetime.utcnow().isoformat()
+                }
+            )
+            logger.error(f"Generation {generation_id} failed: {event.error}")
+            return
+        
+        # Generation completed successfully - store results in Supabase Storage
+        output_urls = fal_service.extract_output_urls(event.result or {})
+        try:
+            stored_files = []
+            if output_urls:
+                stored_files = await storage_service.upload_generation_result(
+                    user_id=generation.user_id,  # Pass string directly
+                    generation_id=generation_id,  # Pass string directly
+                    file_urls=output_urls,
+                    file_type="image" if generation.media_type == "image" else "video",
+                    project_id=generation.project_id if generation.project_id else None
+                )
+            
+            # Calculate total storage size
+            total_storage_size = sum(file_meta.file_size for file_meta in stored_files)
+            
+            # Update generation with storage information
+            await self.generation_repo.update_generation(
+                generation_id,
+                {
+                    "status": GenerationStatus.COMPLETED,
+                    "output_urls": [f.file_path for f in stored_files],  # Use storage paths instead of external URLs
+                    "media_url": stored_files[0].file_path if stored_files else None,  # Set primary media URL
+                    "media_files": [
+                        {
+                            "file_id": str(f.id),
+                            "bucket": f.bucket_name.value if hasattr(f.bucket_name, 'value') else str(f.bucket_name),
+                            "path": f.file_path,
+                            "size": f.file_size,
+                            "content_type": f.content_type.value if hasattr(f.content_type, 'value') else str(f.content_type),
+                            "is_thumbnail": f.is_thumbnail
+                        } for f in stored_files
+                    ],
+                    "storage_size": total_storage_size,
+                    "is_media_processed": True,
+                    "metadata": {
+                        "fal_metrics": event.metrics,
+                        "fal_request_id": fal_request_id,
+                        "processing_time": processing_time,
+                        "files_stored": len(stored_files),
+                        "total_size": total_storage_size
+                    },
+                    "completed_at": datetime.utcnow().isoformat()
+                }
+            )
+            
+            logger.info(
+                f"Generation {generation_id} completed and stored: "
+                f"{len(stored_files)} files, {total_storage_size} bytes"
+            )
+            
+        except Exception as storage_error:
+            logger.error(f"Failed to store generation results for {generation_id}: {storage_error}")
+            
+            # Mark generation as completed but with storage warning
+            await self.generation_repo.update_generation(
+                generation_id,
+                {
+                    "status": GenerationStatus.COMPLETED,
+                    "output_urls": output_urls,  # Fallback to external URLs
+                    "metadata": {
+                        "fal_metrics": event.metrics,
+                        "fal_request_id": fal_request_id,
+                        "processing_time": processing_time,
+                        "storage_error": str(storage_error)
+                    },
+                    "completed_at": datetime.utcnow().isoformat()
+                }
+            )
+            logger.warning(f"Generation {generation_id} completed but storage failed")
     
     async def get_generation(self, generation_id: str, user_id: str, auth_token: Optional[str] = None) -> GenerationResponse:
         """Get a generation by ID."""
@@ -1073,6 +1202,32 @@ class GenerationService:
             logger.error(f"❌ [GENERATION-SERVICE] Error type: {type(e).__name__}")
             raise
     
+    async def list_user_generations_page(
+        self,
+        user_id: str,
+        project_id: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        count: Optional[str] = None,
+        auth_token: Optional[str] = None
+    ) -> KeysetPage:
+        """List one keyset page of a user's generations (see GenerationRepository)."""
+        await self._get_repositories()
+        
+        page = await self.generation_repo.list_user_generations_page(
+            user_id=user_id,
+            project_id=project_id,
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            count=count,
+            auth_token=auth_token
+        )
+        
+        logger.info(f"✅ [GENERATION-SERVICE] Retrieved {len(page.items)} generations for user {user_id}")
+        return page
+    
     async def delete_generation(self, generation_id: str, user_id: str) -> bool:
         """Delete a generation and its associated storage files with enhanced cleanup."""
         await self._get_repositories()
@@ -1334,24 +1489,14 @@ class GenerationService:
         except Exception as e:
             logger.error(f"❌ [MEDIA-URLS] Failed to get storage info, falling back to legacy method: {e}")
             
-            # Fallback to legacy method
+            # Fallback: sign the storage paths recorded on the generation itself
             signed_urls = []
-            
-            if hasattr(generation, 'media_files') and generation.media_files:
-                logger.info(f"🔄 [MEDIA-URLS] Using legacy method for {len(generation.media_files)} media files")
-                
-                for file_info in generation.media_files:
-                    try:
-                        file_id = file_info.get('file_id')
-                        if file_id:
-                            signed_url_response = await storage_service.get_signed_url(
-                                file_id=file_id if isinstance(file_id, UUID) else UUID(file_id),
-                                user_id=user_id if isinstance(user_id, UUID) else UUID(user_id),
-                                expires_in=expires_in
-                            )
-                            signed_urls.append(signed_url_response.signed_url)
-                    except Exception as e:
-                        logger.warning(f"⚠️ [MEDIA-URLS] Failed to get signed URL for file {file_info.get('file_id')}: {e}")
+            try:
+                [signed_generation] = await self.embed_media_urls([generation], str(user_id), expires_in)
+                signed_urls = signed_generation.signed_output_urls or []
+                logger.info(f"🔄 [MEDIA-URLS] Signed {len(signed_urls)} stored paths for generation {generation_id}")
+            except Exception as e:
+                logger.warning(f"⚠️ [MEDIA-URLS] Failed to sign stored paths for generation {generation_id}: {e}")
             
             return {
                 'generation_id': generation_id,
@@ -1363,6 +1508,45 @@ class GenerationService:
                 'legacy_fallback': True
             }
     
+    @staticmethod
+    def _stored_media_paths(generation: GenerationResponse) -> List[str]:
+        """Storage paths (not external URLs) among a generation's media."""
+        paths = [generation.media_url, *generation.output_urls]
+        return list(dict.fromkeys(p for p in paths if p and not p.startswith(("http://", "https://"))))
+    
+    async def embed_media_urls(
+        self,
+        generations: List[GenerationResponse],
+        user_id: str,
+        expires_in: int = 3600
+    ) -> List[GenerationResponse]:
+        """
+        Attach signed URLs for stored media to a page of generations. The
+        whole page is signed in one Storage round trip (or none, when cached
+        or signed locally).
+        """
+        objects = [
+            (StorageBucket.GENERATIONS, path)
+            for generation in generations
+            for path in self._stored_media_paths(generation)
+        ]
+        if not objects:
+            return generations
+        
+        signed = await storage_service.get_signed_urls_for_paths(objects, user_id, expires_in)
+        
+        def url_for(path: Optional[str]) -> Optional[str]:
+            response = signed.get((StorageBucket.GENERATIONS, path))
+            return str(response.signed_url) if response else None
+        
+        for generation in generations:
+            paths = self._stored_media_paths(generation)
+            if not paths:
+                continue
+            generation.signed_media_url = url_for(generation.media_url)
+            generation.signed_output_urls = [url for url in map(url_for, paths) if url]
+        return generations
+    
     async def _check_service_dependencies(self):
         """Check if all required services are available."""
         try:
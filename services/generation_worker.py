@@ -0,0 +1,183 @@
+"""
+Generation worker process.
+Consumes the durable generation job queue so API pods never hold FAL.ai jobs.
+Run one or more per deployment, scaled independently of the web service:
+
+    python -m services.generation_worker [--concurrency N] [--lanes interactive,standard]
+
+Each worker leases jobs (respecting per-model concurrency across all
+workers), renews its leases by heartbeat while jobs run, and on SIGTERM stops
+claiming, lets running jobs finish for a grace period and hands the rest back.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from config import settings
+from models.fal_config import get_model_concurrency_limits
+from services.generation_job_queue import generation_job_queue, GenerationJob, JobLane
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationWorker:
+    """Leases generation jobs and runs them with bounded concurrency."""
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        lanes: Optional[List[JobLane]] = None,
+        worker_id: Optional[str] = None,
+        shutdown_grace_seconds: float = 30.0
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self.concurrency = concurrency or settings.GENERATION_WORKER_CONCURRENCY
+        self.lanes = lanes or list(JobLane)
+        self.model_limits = get_model_concurrency_limits()
+        self.shutdown_grace_seconds = shutdown_grace_seconds
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._jobs: Dict[str, GenerationJob] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def stop(self):
+        """Stop claiming new jobs; run() returns once in-flight jobs are drained."""
+        if self._stopping is not None:
+            self._stopping.set()
+            self._wakeup.set()
+
+    async def run(self):
+        """Claim and process jobs until stop() is called."""
+        # Processing code lives in the API modules; import lazily so a bare
+        # `import services.generation_worker` stays cheap
+        from services.generation_service import generation_service, GenerationRetryError
+        self._generation_service = generation_service
+        self._retry_error = GenerationRetryError
+
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+        logger.info(f"✅ [GENERATION-WORKER] {self.worker_id} started: concurrency={self.concurrency}, "
+                    f"lanes={[lane.name.lower() for lane in self.lanes]}")
+        try:
+            while not self._stopping.is_set():
+                claimed = await self._claim()
+                if claimed:
+                    continue
+                # Idle or at capacity: wait for a free slot, shutdown or the next poll
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.GENERATION_WORKER_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            await self._drain()
+        finally:
+            heartbeat_task.cancel()
+            logger.info(f"👋 [GENERATION-WORKER] {self.worker_id} stopped")
+
+    async def _claim(self) -> int:
+        free = self.concurrency - len(self._in_flight)
+        if free <= 0:
+            return 0
+        try:
+            jobs = await generation_job_queue.claim(self.worker_id, self.model_limits, free, self.lanes)
+        except Exception as e:
+            logger.error(f"❌ [GENERATION-WORKER] Claim failed: {e}")
+            return 0
+
+        for job in jobs:
+            logger.info(f"🚀 [GENERATION-WORKER] Leased job {job.id} (generation {job.generation_id}, "
+                        f"model {job.model_id}, attempt {job.attempts}/{job.max_attempts})")
+            self._jobs[job.id] = job
+            self._in_flight[job.id] = asyncio.create_task(self._run_job(job))
+        return len(jobs)
+
+    async def _run_job(self, job: GenerationJob):
+        try:
+            await self._generation_service.process_generation_job(job)
+            await generation_job_queue.complete(job, self.worker_id)
+            logger.info(f"✅ [GENERATION-WORKER] Job {job.id} completed")
+        except asyncio.CancelledError:
+            # Shutdown or lost lease: hand the job back (a no-op if the lease is gone)
+            try:
+                await generation_job_queue.release(job, self.worker_id)
+            except Exception as e:
+                logger.error(f"❌ [GENERATION-WORKER] Failed to release job {job.id}: {e}")
+            raise
+        except Exception as e:
+            level = logging.WARNING if isinstance(e, self._retry_error) else logging.ERROR
+            try:
+                status = await generation_job_queue.fail(job, self.worker_id, str(e))
+                logger.log(level, f"🔁 [GENERATION-WORKER] Job {job.id} attempt {job.attempts} failed, now {status}: {e}")
+            except Exception as fail_error:
+                # The lease will expire and the job will be reclaimed
+                logger.error(f"❌ [GENERATION-WORKER] Failed to record failure for job {job.id}: {fail_error}")
+        finally:
+            self._in_flight.pop(job.id, None)
+            self._jobs.pop(job.id, None)
+            self._wakeup.set()
+
+    async def _heartbeat_loop(self):
+        interval = max(settings.GENERATION_JOB_LEASE_SECONDS / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            job_ids = list(self._in_flight)
+            if not job_ids:
+                continue
+            try:
+                owned = set(await generation_job_queue.heartbeat(self.worker_id, job_ids))
+            except Exception as e:
+                logger.error(f"❌ [GENERATION-WORKER] Heartbeat failed: {e}")
+                continue
+
+            for job_id in job_ids:
+                task = self._in_flight.get(job_id)
+                if job_id not in owned and task is not None:
+                    # Another worker may already be running it; stop ours
+                    logger.warning(f"⚠️ [GENERATION-WORKER] Lost lease on job {job_id}, cancelling")
+                    task.cancel()
+
+    async def _drain(self):
+        if not self._in_flight:
+            return
+        logger.info(f"⏳ [GENERATION-WORKER] Waiting up to {self.shutdown_grace_seconds:.0f}s "
+                    f"for {len(self._in_flight)} running jobs")
+        tasks = list(self._in_flight.values())
+        _, pending = await asyncio.wait(tasks, timeout=self.shutdown_grace_seconds)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _parse_lanes(value: str) -> List[JobLane]:
+    return [JobLane[name.strip().upper()] for name in value.split(",") if name.strip()]
+
+
+async def _main(args: argparse.Namespace):
+    worker = GenerationWorker(
+        concurrency=args.concurrency,
+        lanes=_parse_lanes(args.lanes) if args.lanes else None,
+        shutdown_grace_seconds=args.shutdown_grace
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Velro generation worker")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Jobs run at once by this worker (default: GENERATION_WORKER_CONCURRENCY)")
+    parser.add_argument("--lanes", default=None,
+                        help="Comma-separated lanes to consume: interactive,standard,bulk (default: all)")
+    parser.add_argument("--shutdown-grace", type=float, default=30.0,
+                        help="Seconds to let running jobs finish on SIGTERM")
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    asyncio.run(_main(parser.parse_args()))
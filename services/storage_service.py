@@ -6,16 +6,15 @@ Following PRD.MD: Secure, efficient media storage with user isolation.
 import asyncio
 import hashlib
 import logging
-from typing import Dict, Any, Optional, List, Tuple, Union
+from typing import Dict, Any, Optional, List, Set, Tuple, Union
 from uuid import UUID, uuid4
 from datetime import datetime, timedelta
 from pathlib import Path
 import mimetypes
-from PIL import Image
-import io
 
 from database import get_database
-from repositories.storage_repository import StorageRepository
+from utils.connection_pool import get_pool
+from repositories.storage_repository import StorageRepository, CONTENT_ADDRESSED_PATH
 from repositories.generation_repository import GenerationRepository
 from models.storage import (
     FileMetadataCreate,
@@ -32,6 +31,9 @@ from models.storage import (
     ContentType
 )
 from models.generation import GenerationResponse
+from utils.pagination import KeysetPage
+from utils.request_timing import detached
+from utils.thumbnail_engine import thumbnail_engine
 
 logger = logging.getLogger(__name__)
 
@@ -39,10 +41,16 @@ logger = logging.getLogger(__name__)
 class StorageService:
     """Service for managing file storage and media operations."""
     
+    # Streaming ingestion settings for generation results
+    GENERATION_UPLOAD_CONCURRENCY = 4
+    STREAM_CHUNK_SIZE = 256 * 1024  # 256KB
+    MAX_GENERATION_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+    
     def __init__(self):
         self.db = None
         self.storage_repo = None
         self.generation_repo = None
+        self._thumbnail_tasks: Set[asyncio.Task] = set()
     
     async def _get_repositories(self):
         """Initialize repositories if not already done."""
@@ -159,9 +167,7 @@ class StorageService:
             content_type_value = upload_request.content_type.value if hasattr(upload_request.content_type, 'value') else str(upload_request.content_type)
             if content_type_value.startswith("image/"):
                 logger.info(f"🖼️ [STORAGE-FILE] Scheduling thumbnail generation for image file...")
-                asyncio.create_task(
-                    self._generate_thumbnails(file_metadata, file_data, user_id)
-                )
+                self._schedule_thumbnails(self._generate_thumbnails(file_metadata, file_data, user_id))
             
             logger.info(f"🎉 [STORAGE-FILE] File upload completed successfully: {uploaded_path} for user {str(user_id)}")
             logger.info(f"🔍 [STORAGE-FILE] Final file metadata: ID={file_metadata.id}, Path={file_metadata.file_path}, Size={file_metadata.file_size}")
@@ -181,20 +187,28 @@ class StorageService:
         file_urls: List[str],
         file_type: str = "image",
         project_id: Optional[Union[UUID, str]] = None,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        content_addressed: bool = False
     ) -> List[FileMetadataResponse]:
         """
         Upload generation results from external URLs.
         
+        Files are streamed from the source URL straight into Supabase Storage
+        through the shared HTTP connection pool, with up to
+        GENERATION_UPLOAD_CONCURRENCY transfers in flight. Each transfer holds
+        roughly one chunk in memory and hashes it on the fly.
+        
         Args:
             user_id: User who owns the generation
             generation_id: Generation ID
             file_urls: List of URLs to download and store
             file_type: Type of files (image/video)
             project_id: Optional project ID for organization
+            content_addressed: Store each file under its content hash so other
+                generations can reference it (see attach_generation_files)
             
         Returns:
-            List of created file metadata
+            List of created file metadata, in the order of file_urls
         """
         # Convert string IDs to UUID objects for consistency
         if isinstance(user_id, str):
@@ -210,143 +224,41 @@ class StorageService:
         await self._get_repositories()
         
         try:
-            uploaded_files = []
-            
-            for i, url in enumerate(file_urls):
-                logger.info(f"📥 [STORAGE-UPLOAD] Processing file {i+1}/{len(file_urls)}: {url[:100]}{'...' if len(url) > 100 else ''}")
-                
-                # Update progress if callback provided - handle signature mismatch
-                if progress_callback:
-                    try:
-                        # Try dictionary-style callback first
-                        await progress_callback({
-                            'stage': 'downloading',
-                            'current_file': i + 1,
-                            'total_files': len(file_urls),
-                            'percentage': (i / len(file_urls)) * 50  # First 50% is downloading
-                        })
-                    except TypeError as te:
-                        # Fallback to individual parameters if signature mismatch
-                        try:
-                            await progress_callback(i + 1, len(file_urls), f"Downloading file {i + 1}")
-                        except Exception as cb_error:
-                            logger.warning(f"⚠️ [STORAGE-UPLOAD] Progress callback error: {cb_error}")
-                
-                max_retries = 3
-                retry_delay = 2  # seconds
-                
-                for attempt in range(max_retries):
+            total_files = len(file_urls)
+            semaphore = asyncio.Semaphore(self.GENERATION_UPLOAD_CONCURRENCY)
+            completed_files = 0
+            
+            async def transfer(index: int, url: str) -> Optional[FileMetadataResponse]:
+                nonlocal completed_files
+                async with semaphore:
+                    logger.info(f"📥 [STORAGE-UPLOAD] Processing file {index+1}/{total_files}: {url[:100]}{'...' if len(url) > 100 else ''}")
+                    await self._notify_upload_progress(
+                        progress_callback, 'downloading', index + 1, total_files,
+                        (completed_files / total_files) * 50  # First 50% is downloading
+                    )
                     try:
-                        # Download file from URL with enhanced error handling
-                        logger.info(f"⬇️ [STORAGE-UPLOAD] Downloading file from external URL (attempt {attempt + 1}/{max_retries})...")
-                        file_data = await self._download_file_from_url(url, max_retries=2, timeout=120.0)
-                        logger.info(f"✅ [STORAGE-UPLOAD] File downloaded successfully: {len(file_data)} bytes")
-                        break  # Success, exit retry loop
-                        
-                    except Exception as download_error:
-                        logger.error(f"❌ [STORAGE-UPLOAD] Download attempt {attempt + 1} failed: {download_error}")
-                        
-                        if attempt == max_retries - 1:
-                            # Last attempt failed, skip this file
-                            logger.error(f"❌ [STORAGE-UPLOAD] All download attempts failed for file {i+1}, skipping...")
-                            continue  # Skip to next file in outer loop
-                        
-                        # Wait before retry
-                        await asyncio.sleep(retry_delay * (attempt + 1))
-                        continue
-                else:
-                    # This executes only if the for loop completed without break (all attempts failed)
-                    logger.error(f"❌ [STORAGE-UPLOAD] Failed to download file {i+1} after {max_retries} attempts, skipping")
-                    continue  # Skip to next file
+                        file_metadata = await self._transfer_generation_file(
+                            user_id=user_id,
+                            generation_id=generation_id,
+                            project_id=project_id,
+                            url=url,
+                            index=index,
+                            content_addressed=content_addressed
+                        )
+                    except Exception as e:
+                        logger.error(f"❌ [STORAGE-UPLOAD] Failed to upload generation result file {index+1} from {url}: {e}")
+                        logger.error(f"❌ [STORAGE-UPLOAD] File upload error type: {type(e).__name__}")
+                        return None
                 
-                try:
-                    # Determine content type and extension
-                    content_type, extension = self._detect_content_type(file_data, url)
-                    logger.info(f"🔍 [STORAGE-UPLOAD] Detected content type: {content_type}, extension: {extension}")
-                    
-                    # Generate filename - ensure generation_id is converted to string
-                    filename = f"generation_{str(generation_id)}_{i+1}.{extension}"
-                    logger.info(f"📁 [STORAGE-UPLOAD] Generated filename: {filename}")
-                    
-                    # Create upload request
-                    upload_request = FileUploadRequest(
-                    bucket_name=StorageBucket.GENERATIONS,
-                    filename=filename,
-                    content_type=ContentType(content_type),
-                        file_size=len(file_data),
-                        generation_id=generation_id,
-                        project_id=project_id,
-                        metadata={
-                            "source_url": url,
-                            "generation_id": str(generation_id),
-                            "project_id": str(project_id) if project_id else None,
-                            "file_index": i,
-                            "upload_type": "generation_result",
-                            "original_external_url": url
-                        }
-                    )
-                    
-                    # Safe enum value extraction
-                    bucket_value = StorageBucket.GENERATIONS.value if hasattr(StorageBucket.GENERATIONS, 'value') else str(StorageBucket.GENERATIONS)
-                    logger.info(f"☁️ [STORAGE-UPLOAD] Uploading file to Supabase Storage bucket: {bucket_value}")
-                    
-                    # Upload file with progress tracking - handle signature mismatch
-                    if progress_callback:
-                        try:
-                            # Try dictionary-style callback first
-                            await progress_callback({
-                                'stage': 'uploading',
-                                'current_file': i + 1,
-                                'total_files': len(file_urls),
-                                'percentage': 50 + ((i / len(file_urls)) * 50)  # Second 50% is uploading
-                            })
-                        except TypeError as te:
-                            # Fallback to individual parameters if signature mismatch
-                            try:
-                                await progress_callback(i + 1, len(file_urls), f"Uploading file {i + 1}")
-                            except Exception as cb_error:
-                                logger.warning(f"⚠️ [STORAGE-UPLOAD] Upload progress callback error: {cb_error}")
-                    
-                    # Upload with retry logic
-                    upload_retries = 2
-                    file_metadata = None
-                    
-                    for upload_attempt in range(upload_retries):
-                        try:
-                            file_metadata = await self.upload_file(
-                                user_id=user_id,
-                                file_data=file_data,
-                                upload_request=upload_request,
-                                generation_id=generation_id
-                            )
-                            break  # Success, exit retry loop
-                            
-                        except Exception as upload_error:
-                            logger.error(f"❌ [STORAGE-UPLOAD] Upload attempt {upload_attempt + 1} failed: {upload_error}")
-                            
-                            if upload_attempt == upload_retries - 1:
-                                # Last attempt failed
-                                raise upload_error
-                            
-                            # Wait before retry
-                            await asyncio.sleep(1.0 * (upload_attempt + 1))
-                    
-                    if not file_metadata:
-                        raise RuntimeError("Upload failed after all retry attempts")
-                    
-                    logger.info(f"✅ [STORAGE-UPLOAD] File uploaded successfully: {file_metadata.file_path}")
-                    # Safe enum value extraction
-                    bucket_value = file_metadata.bucket_name.value if hasattr(file_metadata.bucket_name, 'value') else str(file_metadata.bucket_name)
-                    logger.info(f"🔍 [STORAGE-UPLOAD] File metadata: ID={file_metadata.id}, Size={file_metadata.file_size}, Bucket={bucket_value}")
-                    
-                    uploaded_files.append(file_metadata)
-                    
-                except Exception as e:
-                    logger.error(f"❌ [STORAGE-UPLOAD] Failed to upload generation result file {i+1} from {url}: {e}")
-                    logger.error(f"❌ [STORAGE-UPLOAD] File upload error type: {type(e).__name__}")
-                    import traceback
-                    logger.error(f"❌ [STORAGE-UPLOAD] File upload traceback: {traceback.format_exc()}")
-                    continue
+                completed_files += 1
+                await self._notify_upload_progress(
+                    progress_callback, 'uploading', index + 1, total_files,
+                    50 + ((completed_files / total_files) * 50)  # Second 50% is uploading
+                )
+                return file_metadata
+            
+            results = await asyncio.gather(*(transfer(i, url) for i, url in enumerate(file_urls)))
+            uploaded_files = [file_metadata for file_metadata in results if file_metadata is not None]
             
             logger.info(f"🎉 [STORAGE-UPLOAD] Upload process completed: {len(uploaded_files)}/{len(file_urls)} files uploaded successfully for generation {generation_id}")
             
@@ -356,6 +268,9 @@ class StorageService:
             elif len(uploaded_files) < len(file_urls):
                 logger.warning(f"⚠️ [STORAGE-UPLOAD] Partial upload success: {len(uploaded_files)}/{len(file_urls)} files uploaded")
             
+            # Link all files in one read-modify-write so concurrent transfers cannot race on media_files
+            await self._link_files_to_generation(uploaded_files, generation_id, user_id)
+            
             return uploaded_files
             
         except Exception as e:
@@ -365,6 +280,343 @@ class StorageService:
             logger.error(f"❌ [STORAGE-UPLOAD] Critical error traceback: {traceback.format_exc()}")
             raise
     
+    async def _transfer_generation_file(
+        self,
+        user_id: UUID,
+        generation_id: UUID,
+        project_id: Optional[UUID],
+        url: str,
+        index: int,
+        content_addressed: bool = False,
+        max_retries: int = 3,
+        retry_delay: float = 2.0,
+        timeout: float = 120.0
+    ) -> FileMetadataResponse:
+        """
+        Stream one generation output from its external URL into storage.
+        
+        The first bytes are buffered to sniff the content type and screen for
+        malicious signatures; everything after that is piped chunk by chunk
+        into the storage upload while the SHA-256 hash and size are accumulated.
+        Thumbnails are rendered from the stored object afterwards, so no more
+        than a chunk of the file is held here. A failed attempt deletes
+        whatever it uploaded before retrying.
+        """
+        for attempt in range(max_retries):
+            partial_path = None
+            try:
+                logger.info(f"⬇️ [STORAGE-UPLOAD] Streaming file {index+1} from external URL (attempt {attempt + 1}/{max_retries})...")
+                start_time = datetime.utcnow()
+                
+                async with get_pool().get_connection() as client:
+                    async with client.stream(
+                        "GET",
+                        url,
+                        timeout=timeout,
+                        follow_redirects=True,
+                        headers={
+                            'User-Agent': 'Velro-Backend/1.0 (Storage-Service)',
+                            'Accept': 'image/*, video/*, application/octet-stream'
+                        }
+                    ) as response:
+                        response.raise_for_status()
+                        
+                        source = response.aiter_bytes(self.STREAM_CHUNK_SIZE)
+                        head = b""
+                        while len(head) < 1024:
+                            try:
+                                head += await source.__anext__()
+                            except StopAsyncIteration:
+                                break
+                        
+                        content_type, extension = self._detect_content_type(head, url)
+                        logger.info(f"🔍 [STORAGE-UPLOAD] Detected content type: {content_type}, extension: {extension}")
+                        try:
+                            content_type_enum = ContentType(content_type)
+                        except ValueError:
+                            raise ValueError(f"Unsupported generation content type: {content_type}")
+                        if self._contains_malicious_content(head):
+                            raise ValueError("File contains potentially malicious content")
+                        
+                        filename = f"generation_{str(generation_id)}_{index+1}.{extension}"
+                        file_path = self._generate_secure_file_path(
+                            user_id=user_id,
+                            filename=filename,
+                            bucket=StorageBucket.GENERATIONS,
+                            generation_id=generation_id,
+                            project_id=project_id
+                        )
+                        
+                        hasher = hashlib.sha256()
+                        transferred = 0
+                        max_file_size = self.MAX_GENERATION_FILE_SIZE
+                        
+                        async def body():
+                            nonlocal transferred
+                            chunk = head
+                            while chunk:
+                                transferred += len(chunk)
+                                if transferred > max_file_size:
+                                    raise ValueError(f"Downloaded file is too large, exceeds {max_file_size} bytes limit")
+                                hasher.update(chunk)
+                                yield chunk
+                                try:
+                                    chunk = await source.__anext__()
+                                except StopAsyncIteration:
+                                    chunk = b""
+                        
+                        # Only forward the length when the body is not being transparently decoded
+                        content_length = None
+                        if response.headers.get("content-encoding", "identity") == "identity":
+                            content_length = response.headers.get("content-length")
+                        
+                        # The object may exist even if the upload fails part way
+                        partial_path = file_path
+                        uploaded_path = await self.storage_repo.upload_file_stream(
+                            bucket_name=StorageBucket.GENERATIONS,
+                            file_path=file_path,
+                            chunks=body(),
+                            content_type=content_type,
+                            user_id=user_id,
+                            content_length=int(content_length) if content_length else None,
+                            timeout=timeout
+                        )
+                        partial_path = uploaded_path
+                
+                transfer_time = max((datetime.utcnow() - start_time).total_seconds(), 1e-6)
+                logger.info(f"✅ [STORAGE-UPLOAD] Streamed {transferred} bytes to {uploaded_path} in {transfer_time:.2f}s ({transferred / transfer_time / 1024:.2f} KB/s)")
+                
+                # Validate minimum file size (prevent empty/corrupt downloads)
+                if transferred < 100:
+                    raise ValueError(f"Downloaded file is too small ({transferred} bytes), possibly corrupted")
+                
+                file_hash = hasher.hexdigest()
+                if content_addressed:
+                    uploaded_path = await self._store_content_addressed(user_id, uploaded_path, file_hash, extension)
+                    if uploaded_path != partial_path:
+                        # Moved to (or deduplicated into) a shared object other generations may reference
+                        partial_path = None
+                
+                metadata_create = FileMetadataCreate(
+                    bucket_name=StorageBucket.GENERATIONS,
+                    file_path=uploaded_path,
+                    original_filename=filename,
+                    file_size=transferred,
+                    content_type=content_type_enum,
+                    file_hash=file_hash,
+                    is_thumbnail=False,
+                    is_processed=False,
+                    metadata={
+                        "source_url": url,
+                        "generation_id": str(generation_id),
+                        "project_id": str(project_id) if project_id else None,
+                        "file_index": index,
+                        "upload_type": "generation_result",
+                        "original_external_url": url
+                    },
+                    expires_at=self._calculate_expiry(StorageBucket.GENERATIONS)
+                )
+                file_metadata = await self.storage_repo.create_file_metadata(
+                    metadata=metadata_create,
+                    user_id=user_id
+                )
+                partial_path = None
+                logger.info(f"✅ [STORAGE-UPLOAD] File uploaded successfully: ID={file_metadata.id}, Path={file_metadata.file_path}, Size={file_metadata.file_size}")
+                
+                if content_type.startswith("image/"):
+                    self._schedule_thumbnails(self._generate_thumbnails_from_storage(file_metadata, user_id))
+                
+                return file_metadata
+                
+            except Exception as e:
+                logger.error(f"❌ [STORAGE-UPLOAD] Transfer attempt {attempt + 1} failed for file {index+1}: {e}")
+                if partial_path:
+                    await self._discard_partial_upload(partial_path, user_id)
+                if attempt == max_retries - 1:
+                    raise RuntimeError(f"Transfer failed after {max_retries} attempts: {str(e)}")
+                await asyncio.sleep(retry_delay * (attempt + 1))
+        
+        raise RuntimeError(f"Transfer failed after all {max_retries} attempts")
+    
+    async def _discard_partial_upload(self, file_path: str, user_id: UUID):
+        """Best-effort delete of an object left by a failed transfer attempt."""
+        try:
+            await self.storage_repo.delete_file(StorageBucket.GENERATIONS, file_path, user_id)
+            logger.info(f"🧹 [STORAGE-UPLOAD] Removed partial upload {file_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ [STORAGE-UPLOAD] Could not remove partial upload {file_path}: {e}")
+    
+    # === Content-Addressed Generation Results ===
+    
+    @staticmethod
+    def _content_addressed_path(user_id: UUID, file_hash: str, extension: str) -> str:
+        return f"{user_id}/cas/{file_hash}.{extension.lower()}"
+    
+    @staticmethod
+    def is_content_addressed(file_path: str) -> bool:
+        return bool(CONTENT_ADDRESSED_PATH.match(file_path))
+    
+    async def _store_content_addressed(
+        self,
+        user_id: UUID,
+        uploaded_path: str,
+        file_hash: str,
+        extension: str
+    ) -> str:
+        """
+        Move a fresh upload to its content-addressed path. When the user
+        already has that object, the upload is dropped and the existing
+        object referenced instead. Falls back to the upload path on failure.
+        """
+        cas_path = self._content_addressed_path(user_id, file_hash, extension)
+        try:
+            if not await self.storage_repo.file_exists(StorageBucket.GENERATIONS, cas_path):
+                try:
+                    await self.storage_repo.move_file(StorageBucket.GENERATIONS, uploaded_path, cas_path, user_id)
+                    return cas_path
+                except Exception:
+                    # Another worker may have stored the same content meanwhile
+                    if not await self.storage_repo.file_exists(StorageBucket.GENERATIONS, cas_path):
+                        raise
+            await self.storage_repo.delete_file(StorageBucket.GENERATIONS, uploaded_path, user_id)
+            logger.info(f"♻️ [STORAGE-CAS] Reusing existing object {cas_path}")
+            return cas_path
+        except Exception as e:
+            logger.warning(f"⚠️ [STORAGE-CAS] Keeping {uploaded_path}, content-addressed store failed: {e}")
+            return uploaded_path
+    
+    def content_addressed_objects(self, files: List[FileMetadataResponse]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Shareable descriptors of stored generation files, or None unless every
+        file is content-addressed.
+        """
+        if not files or not all(self.is_content_addressed(f.file_path) and f.file_hash for f in files):
+            return None
+        return [
+            {
+                "bucket": f.bucket_name.value if hasattr(f.bucket_name, 'value') else str(f.bucket_name),
+                "path": f.file_path,
+                "file_hash": f.file_hash,
+                "file_size": f.file_size,
+                "content_type": f.content_type.value if hasattr(f.content_type, 'value') else str(f.content_type)
+            }
+            for f in files
+        ]
+    
+    async def attach_generation_files(
+        self,
+        user_id: Union[UUID, str],
+        generation_id: Union[UUID, str],
+        objects: List[Dict[str, Any]],
+        project_id: Optional[Union[UUID, str]] = None
+    ) -> List[FileMetadataResponse]:
+        """
+        Attach existing content-addressed objects to a generation by reference.
+        
+        Objects already in the user's cas folder get a new metadata row only;
+        another user's objects are copied server-side into this user's folder
+        first, since ownership is checked on the path prefix. Nothing is
+        downloaded or uploaded through this process.
+        
+        Args:
+            user_id: User who owns the generation
+            generation_id: Generation ID
+            objects: Descriptors from content_addressed_objects()
+            project_id: Optional project ID for organization
+            
+        Returns:
+            List of created file metadata, in the order of objects
+        """
+        if isinstance(user_id, str):
+            user_id = UUID(user_id)
+        if isinstance(generation_id, str):
+            generation_id = UUID(generation_id)
+        
+        await self._get_repositories()
+        
+        async def resolve(source_path: str) -> str:
+            if source_path.startswith(f"{user_id}/"):
+                return source_path
+            target_path = f"{user_id}/{source_path.split('/', 1)[1]}"
+            if await self.storage_repo.file_exists(StorageBucket.GENERATIONS, target_path):
+                return target_path
+            return await self.storage_repo.copy_content_addressed_file(StorageBucket.GENERATIONS, source_path, user_id)
+        
+        paths = await asyncio.gather(*(resolve(obj["path"]) for obj in objects))
+        
+        metadata_list = [
+            FileMetadataCreate(
+                bucket_name=StorageBucket.GENERATIONS,
+                file_path=path,
+                original_filename=f"generation_{generation_id}_{index+1}{Path(path).suffix}",
+                file_size=obj["file_size"],
+                content_type=ContentType(obj["content_type"]),
+                file_hash=obj["file_hash"],
+                is_thumbnail=False,
+                is_processed=False,
+                metadata={
+                    "generation_id": str(generation_id),
+                    "project_id": str(project_id) if project_id else None,
+                    "file_index": index,
+                    "upload_type": "generation_result",
+                    "shared_from": obj["path"]
+                },
+                expires_at=self._calculate_expiry(StorageBucket.GENERATIONS)
+            )
+            for index, (obj, path) in enumerate(zip(objects, paths))
+        ]
+        files = await self.storage_repo.create_file_metadata_batch(metadata_list, user_id)
+        logger.info(f"♻️ [STORAGE-CAS] Attached {len(files)} existing objects to generation {generation_id}")
+        
+        await self._link_files_to_generation(files, generation_id, user_id)
+        for file_metadata in files:
+            if file_metadata.content_type.startswith("image/"):
+                self._schedule_thumbnails(self._generate_thumbnails_from_storage(file_metadata, user_id))
+        
+        return files
+    
+    async def _delete_stored_object(self, file_metadata: FileMetadataResponse, user_id: UUID) -> bool:
+        """Delete a file's storage object unless other metadata rows still reference it."""
+        if self.is_content_addressed(file_metadata.file_path):
+            references = await self.storage_repo.count_path_references(
+                file_metadata.bucket_name, file_metadata.file_path, user_id
+            )
+            if references > 1:
+                logger.info(f"♻️ [STORAGE-CAS] Keeping {file_metadata.file_path}, still referenced")
+                return True
+        return await self.storage_repo.delete_file(
+            bucket_name=file_metadata.bucket_name,
+            file_path=file_metadata.file_path,
+            user_id=user_id
+        )
+    
+    async def _notify_upload_progress(
+        self,
+        progress_callback: Optional[callable],
+        stage: str,
+        current_file: int,
+        total_files: int,
+        percentage: float
+    ):
+        """Report upload progress, supporting both dict-style and positional callbacks."""
+        if not progress_callback:
+            return
+        try:
+            await progress_callback({
+                'stage': stage,
+                'current_file': current_file,
+                'total_files': total_files,
+                'percentage': percentage
+            })
+        except TypeError:
+            # Fallback to individual parameters if signature mismatch
+            try:
+                await progress_callback(current_file, total_files, f"{stage.capitalize()} file {current_file}")
+            except Exception as cb_error:
+                logger.warning(f"⚠️ [STORAGE-UPLOAD] Progress callback error: {cb_error}")
+        except Exception as cb_error:
+            logger.warning(f"⚠️ [STORAGE-UPLOAD] Progress callback error: {cb_error}")
+    
     # === File Access Operations ===
     
     async def get_file_metadata(
@@ -401,6 +653,38 @@ class StorageService:
             user_id=user_id
         )
     
+    async def get_signed_urls_for_paths(
+        self,
+        objects: List[Tuple[StorageBucket, str]],
+        user_id: Union[UUID, str],
+        expires_in: int = 3600
+    ) -> Dict[Tuple[StorageBucket, str], StorageUrlResponse]:
+        """Signed URLs for (bucket, path) pairs in the user's folder, one round trip per bucket."""
+        if isinstance(user_id, str):
+            user_id = UUID(user_id)
+        await self._get_repositories()
+        return await self.storage_repo.create_signed_urls(objects, expires_in, user_id)
+    
+    async def get_signed_urls(
+        self,
+        files: List[FileMetadataResponse],
+        user_id: Union[UUID, str],
+        expires_in: int = 3600
+    ) -> Dict[UUID, StorageUrlResponse]:
+        """
+        Signed URLs for already-loaded file metadata, keyed by file id.
+        One Storage round trip per bucket however many files are passed;
+        files that could not be signed are omitted.
+        """
+        signed = await self.get_signed_urls_for_paths(
+            [(f.bucket_name, f.file_path) for f in files], user_id, expires_in
+        )
+        return {
+            f.id: signed[(f.bucket_name, f.file_path)]
+            for f in files
+            if (f.bucket_name, f.file_path) in signed
+        }
+    
     async def download_file(
         self,
         file_id: UUID,
@@ -421,6 +705,26 @@ class StorageService:
         
         return file_data, file_metadata
     
+    async def open_download_stream(
+        self,
+        file_metadata: FileMetadataResponse,
+        user_id: UUID,
+        request_headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        Open a streaming download for a file whose metadata (and so ownership)
+        the caller already verified. Returns the upstream response; the caller
+        must release it.
+        """
+        await self._get_repositories()
+        
+        return await self.storage_repo.open_download_stream(
+            bucket_name=file_metadata.bucket_name,
+            file_path=file_metadata.file_path,
+            user_id=user_id,
+            request_headers=request_headers
+        )
+    
     async def list_user_files(
         self,
         user_id: UUID,
@@ -440,6 +744,29 @@ class StorageService:
             offset=offset
         )
     
+    async def list_user_files_page(
+        self,
+        user_id: UUID,
+        bucket_name: Optional[StorageBucket] = None,
+        generation_id: Optional[UUID] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        count: Optional[str] = None
+    ) -> KeysetPage:
+        """List one keyset page of user's files with filtering."""
+        await self._get_repositories()
+        
+        return await self.storage_repo.list_user_files_page(
+            user_id=user_id,
+            bucket_name=bucket_name,
+            generation_id=generation_id,
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            count=count
+        )
+    
     # === File Management Operations ===
     
     async def delete_file(
@@ -475,11 +802,7 @@ class StorageService:
             await self._delete_file_thumbnails(file_metadata, user_id)
         
         # Delete from storage
-        success = await self.storage_repo.delete_file(
-            bucket_name=file_metadata.bucket_name,
-            file_path=file_metadata.file_path,
-            user_id=user_id
-        )
+        success = await self._delete_stored_object(file_metadata, user_id)
         
         if success:
             # Delete metadata
@@ -542,6 +865,23 @@ class StorageService:
     
     # === Thumbnail and Processing Operations ===
     
+    def _schedule_thumbnails(self, render) -> asyncio.Task:
+        """Render thumbnails in the background, keeping a reference until the task finishes."""
+        task = asyncio.create_task(detached(render))
+        self._thumbnail_tasks.add(task)
+        task.add_done_callback(self._thumbnail_task_done)
+        return task
+    
+    def _thumbnail_task_done(self, task: asyncio.Task):
+        self._thumbnail_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ [STORAGE-THUMBNAIL] Thumbnail task failed: {task.exception()}")
+    
+    async def drain_thumbnail_tasks(self, timeout: float = 10.0):
+        """Wait for in-flight thumbnail renders, e.g. during shutdown."""
+        if self._thumbnail_tasks:
+            await asyncio.wait(set(self._thumbnail_tasks), timeout=timeout)
+    
     async def _generate_thumbnails(
         self,
         file_metadata: FileMetadataResponse,
@@ -553,62 +893,52 @@ class StorageService:
             if not file_metadata.content_type.startswith("image/"):
                 return
             
-            thumbnail_sizes = [
-                (256, 256, "thumb_256"),
-                (512, 512, "thumb_512"),
-                (1024, 1024, "thumb_1024")
-            ]
+            # Decode and resize off the event loop, all sizes from one decode
+            thumbnails = await thumbnail_engine.render(original_data)
             
-            for width, height, suffix in thumbnail_sizes:
-                try:
-                    # Generate thumbnail
-                    thumbnail_data = await self._create_thumbnail(original_data, width, height)
-                    
-                    # Generate thumbnail filename
-                    original_name = Path(file_metadata.original_filename or "image")
-                    thumbnail_filename = f"{original_name.stem}_{suffix}{original_name.suffix}"
-                    
-                    # Upload thumbnail
-                    thumbnail_path = self._generate_secure_file_path(
-                        user_id=user_id,
-                        filename=thumbnail_filename,
-                        bucket=StorageBucket.THUMBNAILS,
-                        generation_id=file_metadata.generation_id
-                    )
-                    
-                    await self.storage_repo.upload_file(
-                        bucket_name=StorageBucket.THUMBNAILS,
-                        file_path=thumbnail_path,
-                        file_data=thumbnail_data,
-                        content_type="image/webp",  # Always use WebP for thumbnails
-                        user_id=user_id
-                    )
-                    
-                    # Create thumbnail metadata
-                    thumbnail_metadata = FileMetadataCreate(
-                        bucket_name=StorageBucket.THUMBNAILS,
-                        file_path=thumbnail_path,
-                        original_filename=thumbnail_filename,
-                        file_size=len(thumbnail_data),
-                        content_type=ContentType.WEBP,
-                        file_hash=self._calculate_file_hash(thumbnail_data),
-                        is_thumbnail=True,
-                        is_processed=True,
-                        metadata={
-                            "original_file_id": str(file_metadata.id),
-                            "thumbnail_size": f"{width}x{height}",
-                            "compression": "webp"
-                        }
-                    )
-                    
-                    await self.storage_repo.create_file_metadata(
-                        metadata=thumbnail_metadata,
-                        user_id=user_id
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Failed to generate {width}x{height} thumbnail: {e}")
+            original_name = Path(file_metadata.original_filename or "image")
+            uploads = []
+            for thumbnail in thumbnails:
+                thumbnail_filename = f"{original_name.stem}_thumb_{thumbnail.size}{original_name.suffix}"
+                thumbnail_path = self._generate_secure_file_path(
+                    user_id=user_id,
+                    filename=thumbnail_filename,
+                    bucket=StorageBucket.THUMBNAILS,
+                    generation_id=file_metadata.generation_id
+                )
+                uploads.append((thumbnail, thumbnail_filename, thumbnail_path))
+            
+            # Upload every size concurrently, then record them with a single insert
+            upload_results = await self.storage_repo.upload_files(
+                StorageBucket.THUMBNAILS,
+                [(path, thumbnail.data, "image/webp") for thumbnail, _, path in uploads],  # Always WebP
+                user_id
+            )
+            
+            thumbnail_records = []
+            for (thumbnail, thumbnail_filename, _), uploaded in zip(uploads, upload_results):
+                if isinstance(uploaded, Exception):
+                    logger.error(f"Failed to generate {thumbnail.size}x{thumbnail.size} thumbnail: {uploaded}")
                     continue
+                thumbnail_records.append(FileMetadataCreate(
+                    bucket_name=StorageBucket.THUMBNAILS,
+                    file_path=uploaded,
+                    original_filename=thumbnail_filename,
+                    file_size=len(thumbnail.data),
+                    content_type=ContentType.WEBP,
+                    file_hash=self._calculate_file_hash(thumbnail.data),
+                    is_thumbnail=True,
+                    is_processed=True,
+                    metadata={
+                        "original_file_id": str(file_metadata.id),
+                        "thumbnail_size": f"{thumbnail.size}x{thumbnail.size}",
+                        "width": thumbnail.width,
+                        "height": thumbnail.height,
+                        "compression": "webp"
+                    }
+                ))
+            
+            await self.storage_repo.create_file_metadata_batch(thumbnail_records, user_id)
             
             # Mark original file as processed
             await self.storage_repo.update_file_metadata(
@@ -620,28 +950,18 @@ class StorageService:
         except Exception as e:
             logger.error(f"Failed to generate thumbnails for file {file_metadata.id}: {e}")
     
-    async def _create_thumbnail(self, image_data: bytes, width: int, height: int) -> bytes:
-        """Create thumbnail from image data."""
+    async def _generate_thumbnails_from_storage(
+        self,
+        file_metadata: FileMetadataResponse,
+        user_id: UUID
+    ):
+        """Generate thumbnails for a streamed upload by reading the stored original back."""
         try:
-            # Open image
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Convert to RGB if necessary
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-            
-            # Create thumbnail maintaining aspect ratio
-            image.thumbnail((width, height), Image.Resampling.LANCZOS)
-            
-            # Save as WebP with optimization
-            output = io.BytesIO()
-            image.save(output, format="WEBP", quality=85, optimize=True)
-            
-            return output.getvalue()
-            
+            bucket_name = file_metadata.bucket_name if isinstance(file_metadata.bucket_name, StorageBucket) else StorageBucket(file_metadata.bucket_name)
+            file_data = await self.storage_repo.download_file(bucket_name, file_metadata.file_path, user_id)
+            await self._generate_thumbnails(file_metadata, file_data, user_id)
         except Exception as e:
-            logger.error(f"Failed to create thumbnail: {e}")
-            raise
+            logger.error(f"Failed to generate thumbnails for streamed file {file_metadata.id}: {e}")
     
     # === Statistics and Management ===
     
@@ -1088,25 +1408,37 @@ class StorageService:
         user_id: UUID
     ):
         """Link file to generation in metadata."""
+        await self._link_files_to_generation([file_metadata], generation_id, user_id)
+    
+    async def _link_files_to_generation(
+        self,
+        files: List[FileMetadataResponse],
+        generation_id: UUID,
+        user_id: UUID
+    ):
+        """Link several files to a generation with a single metadata update."""
+        if not files:
+            return
         try:
             generation = await self.generation_repo.get_generation_by_id(str(generation_id))
             if generation and generation.user_id == str(user_id):
                 # Update generation with file information
                 media_files = generation.media_files or []
-                media_files.append({
-                    "file_id": str(file_metadata.id),
-                    "bucket": file_metadata.bucket_name.value if hasattr(file_metadata.bucket_name, 'value') else str(file_metadata.bucket_name),
-                    "path": file_metadata.file_path,
-                    "size": file_metadata.file_size,
-                    "content_type": file_metadata.content_type.value if hasattr(file_metadata.content_type, 'value') else str(file_metadata.content_type)
-                })
+                for file_metadata in files:
+                    media_files.append({
+                        "file_id": str(file_metadata.id),
+                        "bucket": file_metadata.bucket_name.value if hasattr(file_metadata.bucket_name, 'value') else str(file_metadata.bucket_name),
+                        "path": file_metadata.file_path,
+                        "size": file_metadata.file_size,
+                        "content_type": file_metadata.content_type.value if hasattr(file_metadata.content_type, 'value') else str(file_metadata.content_type)
+                    })
                 
                 await self.generation_repo.update_generation(
                     str(generation_id),
                     {"media_files": media_files}
                 )
         except Exception as e:
-            logger.error(f"Failed to link file to generation {generation_id}: {e}")
+            logger.error(f"Failed to link files to generation {generation_id}: {e}")
     
     async def _unlink_file_from_generation(
         self,
@@ -1199,11 +1531,7 @@ class StorageService:
             for file_metadata in generation_files:
                 try:
                     # Delete from storage
-                    success = await self.storage_repo.delete_file(
-                        bucket_name=file_metadata.bucket_name,
-                        file_path=file_metadata.file_path,
-                        user_id=user_id
-                    )
+                    success = await self._delete_stored_object(file_metadata, user_id)
                     
                     if success:
                         # Delete metadata
@@ -1225,7 +1553,8 @@ class StorageService:
     async def get_generation_storage_info(
         self,
         generation_id: Union[UUID, str],
-        user_id: Union[UUID, str]
+        user_id: Union[UUID, str],
+        expires_in: int = 3600
     ) -> Dict[str, Any]:
         """
         Get comprehensive storage information for a generation.
@@ -1262,24 +1591,24 @@ class StorageService:
             main_files = [f for f in generation_files if not f.is_thumbnail]
             thumbnail_files = [f for f in generation_files if f.is_thumbnail]
             
-            # Generate signed URLs for main files
+            # Sign the main files in one batch (metadata is already loaded)
             signed_urls = []
-            for file_meta in main_files[:10]:  # Limit to 10 URLs
-                try:
-                    signed_url_response = await self.get_signed_url(
-                        file_id=file_meta.id,
-                        user_id=user_id,
-                        expires_in=3600  # 1 hour
-                    )
-                    signed_urls.append({
-                        'file_id': str(file_meta.id),
-                        'signed_url': signed_url_response.signed_url,
-                        'file_path': file_meta.file_path,
-                        'content_type': file_meta.content_type.value if hasattr(file_meta.content_type, 'value') else str(file_meta.content_type),
-                        'file_size': file_meta.file_size
-                    })
-                except Exception as e:
-                    logger.warning(f"⚠️ [STORAGE-INFO] Failed to generate signed URL for file {file_meta.id}: {e}")
+            url_files = main_files[:10]  # Limit to 10 URLs
+            try:
+                signed = await self.get_signed_urls(url_files, user_id, expires_in)
+            except Exception as e:
+                logger.warning(f"⚠️ [STORAGE-INFO] Failed to generate signed URLs for generation {generation_id}: {e}")
+                signed = {}
+            for file_meta in url_files:
+                if file_meta.id not in signed:
+                    continue
+                signed_urls.append({
+                    'file_id': str(file_meta.id),
+                    'signed_url': str(signed[file_meta.id].signed_url),
+                    'file_path': file_meta.file_path,
+                    'content_type': file_meta.content_type.value if hasattr(file_meta.content_type, 'value') else str(file_meta.content_type),
+                    'file_size': file_meta.file_size
+                })
             
             storage_info = {
                 'generation_id': str(generation_id),
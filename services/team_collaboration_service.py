@@ -23,6 +23,7 @@ from services.enhanced_authorization_service import enhanced_authorization_servi
 from utils.enhanced_uuid_utils import secure_uuid_validator
 from utils.exceptions import NotFoundError, ForbiddenError, ConflictError
 from utils.cache_manager import CacheManager
+from utils.generation_lineage_cache import invalidate_generation_lineage
 import json
 
 logger = logging.getLogger(__name__)
@@ -109,6 +110,8 @@ class TeamCollaborationService:
             )
             
             generation_id = UUID(generation["id"])
+            # The parent's cached inheritance chain lists its children
+            await invalidate_generation_lineage(generation_request.parent_generation_id)
             
             # Create collaboration record if team context exists
             if generation_request.team_context_id:
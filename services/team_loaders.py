@@ -0,0 +1,158 @@
+"""
+Request-scoped loaders for teams, memberships and roles.
+TeamService, CollaborationService and the authorization layers ask the same
+membership questions several times per request. Loading through these merges
+lookups issued in the same tick into one in.(...) query and, inside a
+dataloader_scope, memoizes the rows for the rest of the request.
+
+Loaders are keyed by auth token so rows read under one caller's RLS context
+are never served to another.
+"""
+import logging
+from functools import partial
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from uuid import UUID
+
+from database import get_database
+from utils.dataloader import DataLoader, clear_request_loaders, get_request_loader
+
+logger = logging.getLogger(__name__)
+
+TEAMS_VIEW = "teams_with_member_count"
+
+# Two in.(...) lists per membership batch; keeps PostgREST URLs short
+MAX_BATCH_SIZE = 50
+
+_MEMBERSHIP = "team_loaders:membership"
+_USER_MEMBERSHIPS = "team_loaders:user_memberships"
+_TEAM = "team_loaders:team"
+
+
+async def load_membership(
+    team_id: UUID,
+    user_id: UUID,
+    auth_token: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """The user's active team_members row for the team, or None."""
+    return await _loader(_MEMBERSHIP, auth_token).load((str(team_id), str(user_id)))
+
+
+async def load_user_memberships(user_id: UUID, auth_token: Optional[str] = None) -> List[Dict[str, Any]]:
+    """All of the user's active team_members rows."""
+    return await _loader(_USER_MEMBERSHIPS, auth_token).load(str(user_id)) or []
+
+
+async def load_team(team_id: UUID, auth_token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The team row with member_count (active or not), or None."""
+    return await _loader(_TEAM, auth_token).load(str(team_id))
+
+
+async def load_teams(team_ids: List[UUID], auth_token: Optional[str] = None) -> List[Optional[Dict[str, Any]]]:
+    return await _loader(_TEAM, auth_token).load_many([str(team_id) for team_id in team_ids])
+
+
+def prime_team(team: Dict[str, Any], auth_token: Optional[str] = None):
+    """Seed the team loader with a teams_with_member_count row read elsewhere."""
+    loader = get_request_loader((_TEAM, auth_token), lambda: _new_loader(_TEAM, auth_token))
+    if loader is not None:
+        loader.prime(team["id"], team)
+
+
+def clear_team_loaders():
+    """Forget memoized teams and memberships for this request, e.g. after a membership change."""
+    clear_request_loaders(_is_team_loader)
+
+
+def _is_team_loader(owner: Hashable) -> bool:
+    return isinstance(owner, tuple) and owner[0] in _BATCH_FUNCTIONS
+
+
+def _loader(kind: str, auth_token: Optional[str]) -> DataLoader:
+    """The current request's loader, or a fresh uncached one outside a request scope."""
+    return (
+        get_request_loader((kind, auth_token), lambda: _new_loader(kind, auth_token))
+        or _new_loader(kind, auth_token, cache=False)
+    )
+
+
+def _new_loader(kind: str, auth_token: Optional[str], cache: bool = True) -> DataLoader:
+    return DataLoader(
+        partial(_BATCH_FUNCTIONS[kind], auth_token=auth_token),
+        max_batch_size=MAX_BATCH_SIZE,
+        cache=cache
+    )
+
+
+def _single_user(user_ids: List[str]) -> Optional[str]:
+    """RLS user context for the query when every key belongs to one user."""
+    return user_ids[0] if len(user_ids) == 1 else None
+
+
+async def _batch_load_memberships(
+    keys: List[Tuple[str, str]],
+    auth_token: Optional[str] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """DataLoader batch function: membership rows aligned with (team_id, user_id) keys."""
+    team_ids = sorted({team_id for team_id, _ in keys})
+    user_ids = sorted({user_id for _, user_id in keys})
+
+    db = await get_database()
+    # Cross product of the two id lists; rows for pairs nobody asked for are dropped
+    rows = await db.execute_query_async(
+        table="team_members",
+        operation="select",
+        filters={"team_id": team_ids, "user_id": user_ids, "is_active": True},
+        auth_token=auth_token,
+        user_id=_single_user(user_ids)
+    )
+
+    by_key = {(row["team_id"], row["user_id"]): row for row in rows or []}
+    return [by_key.get(key) for key in keys]
+
+
+async def _batch_load_user_memberships(
+    user_ids: List[str],
+    auth_token: Optional[str] = None
+) -> List[List[Dict[str, Any]]]:
+    """DataLoader batch function: each user's active membership rows."""
+    db = await get_database()
+    rows = await db.execute_query_async(
+        table="team_members",
+        operation="select",
+        filters={"user_id": user_ids, "is_active": True},
+        auth_token=auth_token,
+        user_id=_single_user(user_ids)
+    )
+
+    by_user: Dict[str, List[Dict[str, Any]]] = {user_id: [] for user_id in user_ids}
+    membership_loader = get_request_loader((_MEMBERSHIP, auth_token), lambda: _new_loader(_MEMBERSHIP, auth_token))
+    for row in rows or []:
+        by_user.setdefault(row["user_id"], []).append(row)
+        # Later role checks for these teams are answered from memory
+        if membership_loader is not None:
+            membership_loader.prime((row["team_id"], row["user_id"]), row)
+    return [by_user[user_id] for user_id in user_ids]
+
+
+async def _batch_load_teams(
+    team_ids: List[str],
+    auth_token: Optional[str] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """DataLoader batch function: teams_with_member_count rows aligned with team_ids."""
+    db = await get_database()
+    rows = await db.execute_query_async(
+        table=TEAMS_VIEW,
+        operation="select",
+        filters={"id": team_ids},
+        auth_token=auth_token
+    )
+
+    by_id = {row["id"]: row for row in rows or []}
+    return [by_id.get(team_id) for team_id in team_ids]
+
+
+_BATCH_FUNCTIONS = {
+    _MEMBERSHIP: _batch_load_memberships,
+    _USER_MEMBERSHIPS: _batch_load_user_memberships,
+    _TEAM: _batch_load_teams,
+}
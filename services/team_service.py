@@ -2,6 +2,7 @@
 Team collaboration service for multi-user project management.
 Following CLAUDE.md: Security-first, RLS-aware, performant queries.
 """
+import asyncio
 from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID, uuid4
 from datetime import datetime, timedelta
@@ -21,7 +22,10 @@ from models.authorization import (
 )
 from utils.enhanced_uuid_utils import EnhancedUUIDUtils, secure_uuid_validator
 from utils.exceptions import NotFoundError, ConflictError, ForbiddenError
-from utils.pagination import PaginationParams
+from utils.pagination import KeysetPage, PaginationParams, decode_cursor, fetch_keyset_page
+from services.team_loaders import (
+    TEAMS_VIEW, clear_team_loaders, load_membership, load_team, load_user_memberships, prime_team
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -125,102 +129,100 @@ class TeamService:
         auth_token: str = None
     ) -> Tuple[List[TeamResponse], int]:
         """Get teams for a user with member count."""
+        page = await TeamService.get_user_teams_page(
+            user_id, limit=pagination.limit, offset=pagination.offset, auth_token=auth_token
+        )
+        return page.items, page.total
+    
+    @staticmethod
+    async def get_user_teams_page(
+        user_id: UUID,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        auth_token: str = None
+    ) -> KeysetPage:
+        """
+        One keyset page of a user's teams with member count, newest first.
+        
+        Ordering and limit run in PostgREST against teams_with_member_count,
+        so counts come back with the page. total is exact on cursor-less pages
+        and the user's membership count on cursor pages.
+        
+        Raises:
+            utils.pagination.InvalidCursorError: If cursor is malformed
+        """
+        if cursor:
+            decode_cursor(cursor)  # Reject malformed cursors before touching the database
+        
         # Performance optimization: Use cache for frequently accessed user teams
+        cache_manager = None
+        cache_key = f"user_teams:{user_id}:{cursor or offset}:{limit}"
         try:
             from utils.cache_manager import get_cache_manager
             cache_manager = get_cache_manager()
-            cache_key = f"user_teams:{user_id}:{pagination.offset}:{pagination.limit}"
             
             # Try cache first (30 second TTL for active data)
             cached_result = await cache_manager.get(cache_key)
             if cached_result:
                 logger.info(f"🚀 [CACHE-HIT] User teams for {user_id}")
-                return cached_result['teams'], cached_result['total']
+                return cached_result
         except Exception as e:
             logger.warning(f"Cache lookup failed: {e}")
         
         db = await get_database()
         
         try:
-            # Get user's team memberships
-            user_memberships = db.execute_query(
-                table="team_members",
-                operation="select",
-                filters={
-                    "user_id": str(user_id),
-                    "is_active": True
-                },
-                auth_token=auth_token,
-                user_id=str(user_id)
-            )
+            # Get user's team memberships (shared with later role checks in this request)
+            user_memberships = await load_user_memberships(user_id, auth_token)
             
             if not user_memberships:
-                return [], 0
-            
-            team_ids = [member["team_id"] for member in user_memberships]
-            
-            # Get teams with basic info
-            all_teams = []
-            total_count = 0
-            
-            for team_id in team_ids:
-                team = db.execute_query(
-                    table="teams",
-                    operation="select",
-                    filters={
-                        "id": team_id,
-                        "is_active": True
-                    },
-                    single=True,
-                    auth_token=auth_token,
-                    user_id=str(user_id)
-                )
-                
-                if team:
-                    # Get member count for this team
-                    members = db.execute_query(
-                        table="team_members",
-                        operation="select",
-                        filters={
-                            "team_id": team_id,
-                            "is_active": True
-                        },
-                        auth_token=auth_token,
-                        user_id=str(user_id)
-                    )
-                    
-                    team_response = TeamResponse(
-                        id=UUID(team["id"]),
-                        name=team["name"],
-                        description=team["description"],
-                        owner_id=UUID(team["owner_id"]),
-                        team_code=team["team_code"],
-                        is_active=team["is_active"],
-                        max_members=team["max_members"],
-                        metadata=team["metadata"],
-                        member_count=len(members) if members else 0,
-                        created_at=datetime.fromisoformat(team["created_at"]),
-                        updated_at=datetime.fromisoformat(team["updated_at"])
-                    )
-                    all_teams.append(team_response)
-            
-            # Sort by creation date (newest first)
-            all_teams.sort(key=lambda x: x.created_at, reverse=True)
-            total_count = len(all_teams)
+                return KeysetPage(items=[], total=0)
+            
+            team_ids = list({member["team_id"] for member in user_memberships})
+            
+            page = await fetch_keyset_page(
+                db,
+                TEAMS_VIEW,
+                filters={"id": team_ids, "is_active": True},
+                limit=limit,
+                cursor=cursor,
+                offset=offset,
+                # With a cursor the count would only cover the remaining teams
+                count=None if cursor else "exact",
+                auth_token=auth_token
+            )
             
-            # Apply pagination
-            start_idx = pagination.offset
-            end_idx = start_idx + pagination.limit
-            paginated_teams = all_teams[start_idx:end_idx]
+            for team in page.items:
+                prime_team(team, auth_token)
+            
+            page.items = [
+                TeamResponse(
+                    id=UUID(team["id"]),
+                    name=team["name"],
+                    description=team["description"],
+                    owner_id=UUID(team["owner_id"]),
+                    team_code=team["team_code"],
+                    is_active=team["is_active"],
+                    max_members=team["max_members"],
+                    metadata=team["metadata"],
+                    member_count=team["member_count"],
+                    created_at=datetime.fromisoformat(team["created_at"]),
+                    updated_at=datetime.fromisoformat(team["updated_at"])
+                )
+                for team in page.items
+            ]
+            if page.total is None:
+                page.total = len(team_ids)  # Active memberships; may include inactive teams
             
             # Cache the result for performance (30 seconds)
-            try:
-                result_data = {'teams': paginated_teams, 'total': total_count}
-                await cache_manager.set(cache_key, result_data, ttl=30)
-            except Exception as e:
-                logger.warning(f"Failed to cache result: {e}")
+            if cache_manager is not None:
+                try:
+                    await cache_manager.set(cache_key, page, ttl=30)
+                except Exception as e:
+                    logger.warning(f"Failed to cache result: {e}")
             
-            return paginated_teams, total_count
+            return page
             
         except Exception as e:
             logger.error(f"Failed to get user teams: {e}")
@@ -229,54 +231,19 @@ class TeamService:
     @staticmethod
     async def get_team(team_id: UUID, user_id: UUID, auth_token: str = None) -> TeamResponse:
         """Get team details if user has access."""
-        db = await get_database()
-        
         try:
-            # Verify user is a member of the team
-            membership = db.execute_query(
-                table="team_members",
-                operation="select",
-                filters={
-                    "team_id": str(team_id),
-                    "user_id": str(user_id),
-                    "is_active": True
-                },
-                single=True,
-                auth_token=auth_token,
-                user_id=str(user_id)
+            # Membership and team (with member count) load concurrently
+            membership, team = await asyncio.gather(
+                load_membership(team_id, user_id, auth_token),
+                load_team(team_id, auth_token)
             )
             
             if not membership:
                 raise NotFoundError("Team not found or access denied")
             
-            # Get team details
-            team = db.execute_query(
-                table="teams",
-                operation="select",
-                filters={
-                    "id": str(team_id),
-                    "is_active": True
-                },
-                single=True,
-                auth_token=auth_token,
-                user_id=str(user_id)
-            )
-            
-            if not team:
+            if not team or not team["is_active"]:
                 raise NotFoundError("Team not found")
             
-            # Get member count
-            members = db.execute_query(
-                table="team_members",
-                operation="select",
-                filters={
-                    "team_id": str(team_id),
-                    "is_active": True
-                },
-                auth_token=auth_token,
-                user_id=str(user_id)
-            )
-            
             return TeamResponse(
                 id=UUID(team["id"]),
                 name=team["name"],
@@ -286,7 +253,7 @@ class TeamService:
                 is_active=team["is_active"],
                 max_members=team["max_members"],
                 metadata=team["metadata"],
-                member_count=len(members) if members else 0,
+                member_count=team["member_count"],
                 created_at=datetime.fromisoformat(team["created_at"]),
                 updated_at=datetime.fromisoformat(team["updated_at"])
             )
@@ -486,21 +453,8 @@ class TeamService:
     @staticmethod
     async def _get_user_role(team_id: UUID, user_id: UUID, auth_token: str = None) -> Optional[TeamRole]:
         """Get user's role in a team."""
-        db = await get_database()
-        
         try:
-            membership = db.execute_query(
-                table="team_members",
-                operation="select",
-                filters={
-                    "team_id": str(team_id),
-                    "user_id": str(user_id),
-                    "is_active": True
-                },
-                single=True,
-                auth_token=auth_token,
-                user_id=str(user_id)
-            )
+            membership = await load_membership(team_id, user_id, auth_token)
             
             return TeamRole(membership["role"]) if membership else None
             
@@ -637,21 +591,8 @@ class TeamService:
             )
         
         try:
-            db = await get_database()
-            
             # Check team membership with role
-            member_record = await db.execute_query(
-                table="team_members",
-                operation="select",
-                filters={
-                    "team_id": str(validated_team_id),
-                    "user_id": str(validated_user_id),
-                    "is_active": True
-                },
-                single=True,
-                auth_token=auth_token,
-                user_id=str(validated_user_id)
-            )
+            member_record = await load_membership(validated_team_id, validated_user_id, auth_token)
             
             if not member_record:
                 logger.warning(f"❌ [TEAM-ACCESS] User {user_id} not a member of team {team_id}")
@@ -846,6 +787,7 @@ class TeamService:
     @staticmethod
     async def _invalidate_user_team_cache(user_id: UUID) -> None:
         """Invalidate cached team permissions for user."""
+        clear_team_loaders()
         try:
             from utils.cache_manager import get_cache_manager
             cache_manager = get_cache_manager()
@@ -950,13 +892,7 @@ class TeamService:
             logger.info(f"Team {team_id} updated by user {user_id}")
             
             # Get member count for response
-            members = db.execute_query(
-                table="team_members",
-                operation="select",
-                filters={"team_id": str(team_id), "is_active": True},
-                auth_token=auth_token,
-                user_id=str(user_id)
-            )
+            team_with_count = await load_team(team_id, auth_token)
             
             return TeamResponse(
                 id=UUID(updated_team["id"]),
@@ -967,7 +903,7 @@ class TeamService:
                 is_active=updated_team["is_active"],
                 max_members=updated_team["max_members"],
                 metadata=updated_team["metadata"],
-                member_count=len(members) if members else 0,
+                member_count=team_with_count["member_count"] if team_with_count else 0,
                 created_at=datetime.fromisoformat(updated_team["created_at"]),
                 updated_at=datetime.fromisoformat(updated_team["updated_at"])
             )
@@ -1100,6 +1036,7 @@ class TeamService:
     @staticmethod
     async def _invalidate_team_related_cache(team_id: UUID) -> None:
         """Invalidate all team-related cache entries."""
+        clear_team_loaders()
         try:
             from utils.cache_manager import get_cache_manager
             cache_manager = get_cache_manager()
@@ -143,47 +143,15 @@ class UserService:
         logger.info(f"💳 [USER_SERVICE] Generation ID: {generation_id}, Model: {model_name}")
         
         try:
-            # Check current balance
-            logger.info(f"🔍 [USER_SERVICE] Checking current balance for user {user_id}")
-            logger.info(f"🔍 [USER_SERVICE] About to call user_repo.get_user_credits")
-            try:
-                current_balance = await self.user_repo.get_user_credits(user_id)
-                logger.info(f"✅ [USER_SERVICE] get_user_credits returned: {current_balance} (type: {type(current_balance)})")
-            except Exception as e:
-                logger.error(f"❌ [USER_SERVICE] Error in get_user_credits: {e} (type: {type(e)})")
-                raise
-                
-            logger.info(f"💳 [USER_SERVICE] Current balance for user {user_id}: {current_balance}, deducting: {amount}")
-            
-            if current_balance < amount:
-                logger.error(f"❌ [USER_SERVICE] Insufficient credits for user {user_id}. Required: {amount}, Available: {current_balance}")
-                raise ValueError(
-                    f"Insufficient credits. Required: {amount}, Available: {current_balance}"
-                )
-            
-            # Deduct credits
-            logger.info(f"🔍 [USER_SERVICE] Calling user_repo.deduct_credits for user {user_id}")
-            logger.info(f"🔍 [USER_SERVICE] About to call user_repo.deduct_credits")
-            try:
-                updated_user = await self.user_repo.deduct_credits(user_id, amount)
-                logger.info(f"✅ [USER_SERVICE] deduct_credits returned: {type(updated_user)} with balance: {getattr(updated_user, 'credits', 'no credits attr')}")
-            except Exception as e:
-                logger.error(f"❌ [USER_SERVICE] Error in deduct_credits: {e} (type: {type(e)})")
-                raise
-            logger.info(f"✅ [USER_SERVICE] Credits deducted successfully for user {user_id}, new balance: {updated_user.credits_balance}")
-            
-            # Log the transaction
-            logger.info(f"🔍 [USER_SERVICE] Logging generation usage transaction for user {user_id}")
-            await self.credit_repo.log_generation_usage(
-                user_id=user_id,
+            # Balance check, debit and transaction log happen in one RPC
+            updated_user = await self.user_repo.deduct_credits(
+                user_id,
+                amount,
                 generation_id=generation_id,
-                credits_used=amount,
-                balance_after=updated_user.credits_balance,
-                model_name=model_name or "Unknown"
+                description=f"Generation using {model_name or 'Unknown'}"
             )
-            logger.info(f"✅ [USER_SERVICE] Transaction logged successfully for user {user_id}")
             
-            logger.info(f"✅ [USER_SERVICE] Successfully deducted {amount} credits from user {user_id}")
+            logger.info(f"✅ [USER_SERVICE] Successfully deducted {amount} credits from user {user_id}, new balance: {updated_user.credits_balance}")
             return updated_user
             
         except Exception as e:
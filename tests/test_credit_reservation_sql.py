@@ -0,0 +1,295 @@
+"""
+Migration 018 against a real Postgres.
+The reservation functions run in a throwaway pgserver cluster on a minimal
+users/generations/credit_transactions schema (the columns and checks of the
+earlier migrations that the ledger and UserResponse touch). Each test runs in a transaction that
+is rolled back. Skipped when pgserver is not installed (dev dependency).
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+
+pgserver = pytest.importorskip("pgserver")
+asyncpg = pytest.importorskip("asyncpg")
+
+from repositories.credit_repository import CreditRepository  # noqa: E402
+from services.credit_transaction_service import CreditTransaction, CreditTransactionService  # noqa: E402
+from models.credit import TransactionType  # noqa: E402
+
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "018_credit_reservation_ledger.sql"
+
+USER = "00000000-0000-0000-0000-000000000001"
+OTHER_USER = "00000000-0000-0000-0000-000000000002"
+GENERATION = "00000000-0000-0000-0000-0000000000aa"
+OTHER_GENERATION = "00000000-0000-0000-0000-0000000000bb"
+
+SCHEMA = """
+CREATE ROLE service_role;
+CREATE TABLE users (
+    id UUID PRIMARY KEY,
+    display_name TEXT,
+    credits_balance INTEGER DEFAULT 1000,
+    role TEXT DEFAULT 'viewer',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE TABLE generations (
+    id UUID PRIMARY KEY,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed', 'cancelled'))
+);
+CREATE TABLE credit_transactions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    transaction_type TEXT NOT NULL CHECK (transaction_type IN ('purchase', 'usage', 'refund', 'bonus')),
+    amount INTEGER NOT NULL,
+    balance_after INTEGER NOT NULL,
+    description TEXT,
+    metadata JSONB DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+
+async def _apply_schema(uri):
+    conn = await asyncpg.connect(uri)
+    try:
+        await conn.execute(SCHEMA)
+        await conn.execute(MIGRATION.read_text())
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    asyncio.run(_apply_schema(server.get_uri()))
+    yield server
+    server.cleanup()
+
+
+@asynccontextmanager
+async def ledger(server, balances=((USER, 10),)):
+    conn = await asyncpg.connect(server.get_uri())
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        await conn.executemany("INSERT INTO users (id, credits_balance) VALUES ($1, $2)", balances)
+        yield conn
+    finally:
+        await transaction.rollback()
+        await conn.close()
+
+
+async def reserve(db, amount, key, user_id=USER, **kwargs):
+    args = {"p_user_id": user_id, "p_amount": amount, "p_idempotency_key": key, **kwargs}
+    call = ", ".join(f"{name} => ${i}" for i, name in enumerate(args, 1))
+    return await db.fetchval(f"SELECT reserve_credits({call})", *args.values())
+
+
+async def balance(db, user_id=USER):
+    return await db.fetchval("SELECT credits_balance FROM users WHERE id = $1", user_id)
+
+
+class RpcDatabase:
+    """Routes execute_rpc_async to the SQL functions on a test connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def execute_rpc_async(self, function_name, params=None, use_service_key=False, timeout=5.0):
+        params = params or {}
+        call = ", ".join(f"{name} => ${i}" for i, name in enumerate(params, 1))
+        return await self.conn.fetchval(f"SELECT {function_name}({call})", *params.values())
+
+
+class TestReserveCredits:
+    @pytest.mark.asyncio
+    async def test_debits_and_logs_the_reservation(self, server):
+        async with ledger(server) as db:
+            result = await reserve(db, 4, "k1")
+
+            assert (result["success"], result["status"], result["balance"]) == (True, "reserved", 6)
+            logged = await db.fetchrow("SELECT amount, balance_after, transaction_type FROM credit_transactions")
+            assert tuple(logged) == (-4, 6, "usage")
+
+    @pytest.mark.asyncio
+    async def test_insufficient_credits_leave_no_reservation(self, server):
+        async with ledger(server) as db:
+            result = await reserve(db, 11, "k1")
+
+            assert (result["success"], result["error"], result["balance"]) == (False, "insufficient_credits", 10)
+            assert await db.fetchval("SELECT count(*) FROM credit_reservations") == 0
+            assert await balance(db) == 10
+
+    @pytest.mark.asyncio
+    async def test_unknown_user(self, server):
+        async with ledger(server) as db:
+            assert (await reserve(db, 1, "k1", user_id=OTHER_USER))["error"] == "user_not_found"
+
+    @pytest.mark.asyncio
+    async def test_replay_does_not_charge_again(self, server):
+        async with ledger(server) as db:
+            await reserve(db, 4, "k1")
+            replay = await reserve(db, 4, "k1")
+
+            assert (replay["success"], replay["replayed"], replay["status"]) == (True, True, "reserved")
+            assert await balance(db) == 6
+
+    @pytest.mark.asyncio
+    async def test_replay_of_a_refunded_reservation_fails(self, server):
+        async with ledger(server) as db:
+            await reserve(db, 4, "k1")
+            await db.fetchval("SELECT refund_credit_reservation('k1')")
+
+            replay = await reserve(db, 4, "k1")
+
+            assert (replay["success"], replay["replayed"], replay["error"]) == (False, True, "reservation_refunded")
+            assert await balance(db) == 10
+
+    @pytest.mark.asyncio
+    async def test_non_positive_amount_raises(self, server):
+        async with ledger(server) as db:
+            with pytest.raises(asyncpg.RaiseError, match="must be positive"):
+                await reserve(db, 0, "k1")
+
+
+class TestSettlement:
+    @pytest.mark.asyncio
+    async def test_refund_returns_credits_once(self, server):
+        async with ledger(server) as db:
+            await reserve(db, 4, "k1")
+
+            first = await db.fetchval("SELECT refund_credit_reservation('k1')")
+            second = await db.fetchval("SELECT refund_credit_reservation('k1')")
+
+            assert (first["success"], first["balance"]) == (True, 10)
+            assert (second["success"], second["status"]) == (True, "refunded")
+            assert await db.fetchval("SELECT count(*) FROM credit_transactions WHERE transaction_type = 'refund'") == 1
+            assert await balance(db) == 10
+
+    @pytest.mark.asyncio
+    async def test_committed_reservation_cannot_be_refunded(self, server):
+        async with ledger(server) as db:
+            await reserve(db, 4, "k1", p_commit=True)
+
+            refund = await db.fetchval("SELECT refund_credit_reservation('k1')")
+
+            assert (refund["success"], refund["status"]) == (False, "committed")
+            assert await balance(db) == 6
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status, settled, final_balance", [
+        ("completed", "committed", 6),
+        ("failed", "refunded", 10),
+        ("cancelled", "refunded", 10),
+    ])
+    async def test_generation_status_settles_its_reservation(self, server, status, settled, final_balance):
+        async with ledger(server) as db:
+            await db.execute("INSERT INTO generations (id, user_id) VALUES ($1, $2)", GENERATION, USER)
+            await reserve(db, 4, "k1", p_generation_id=GENERATION)
+
+            await db.execute("UPDATE generations SET status = $1 WHERE id = $2", status, GENERATION)
+
+            assert await db.fetchval("SELECT status FROM credit_reservations WHERE idempotency_key = 'k1'") == settled
+            assert await balance(db) == final_balance
+
+
+class TestReserveCreditsBatch:
+    @staticmethod
+    async def reserve_batch(db, items):
+        return await db.fetchval("SELECT reserve_credits_batch($1)", items)
+
+    @pytest.mark.asyncio
+    async def test_items_are_accepted_while_the_running_total_fits(self, server):
+        async with ledger(server, balances=[(USER, 10), (OTHER_USER, 3)]) as db:
+            results = await self.reserve_batch(db, [
+                {"user_id": USER, "amount": 4, "idempotency_key": "a"},
+                {"user_id": OTHER_USER, "amount": 5, "idempotency_key": "b"},
+                {"user_id": USER, "amount": 3, "idempotency_key": "c"},
+                {"user_id": USER, "amount": 7, "idempotency_key": "d"},
+                # The running total counts refused items, so this no longer fits
+                {"user_id": USER, "amount": 1, "idempotency_key": "e"},
+            ])
+
+            assert [(r["idempotency_key"], r["success"]) for r in results] == [
+                ("a", True), ("b", False), ("c", True), ("d", False), ("e", False)
+            ]
+            assert results[1]["error"] == "insufficient_credits"
+            assert (await balance(db), await balance(db, OTHER_USER)) == (3, 3)
+            balances_after = await db.fetch("SELECT balance_after FROM credit_transactions ORDER BY balance_after DESC")
+            assert [row["balance_after"] for row in balances_after] == [6, 3]
+
+    @pytest.mark.asyncio
+    async def test_non_positive_amounts_fail_in_place(self, server):
+        async with ledger(server) as db:
+            results = await self.reserve_batch(db, [
+                {"user_id": USER, "amount": 0, "idempotency_key": "a"},
+                {"user_id": USER, "amount": 2, "idempotency_key": "b"},
+                {"user_id": USER, "amount": -3, "idempotency_key": "c"},
+            ])
+
+            assert [(r["idempotency_key"], r.get("error")) for r in results] == [
+                ("a", "invalid_amount"), ("b", None), ("c", "invalid_amount")
+            ]
+            assert await balance(db) == 8
+
+    @pytest.mark.asyncio
+    async def test_replays_report_the_original_outcome(self, server):
+        async with ledger(server) as db:
+            await reserve(db, 4, "reserved")
+            await reserve(db, 1, "refunded")
+            await db.fetchval("SELECT refund_credit_reservation('refunded')")
+
+            results = await self.reserve_batch(db, [
+                {"user_id": USER, "amount": 4, "idempotency_key": "reserved"},
+                {"user_id": USER, "amount": 1, "idempotency_key": "refunded"},
+            ])
+
+            assert [(r["success"], r["replayed"], r.get("error")) for r in results] == [
+                (True, True, None), (False, True, "reservation_refunded")
+            ]
+            assert await balance(db) == 6
+
+
+def transaction(amount, generation_id=GENERATION):
+    return CreditTransaction(user_id=USER, amount=amount, transaction_type=TransactionType.USAGE,
+                             generation_id=generation_id)
+
+
+@asynccontextmanager
+async def credit_service(server, balances=((USER, 10),)):
+    async with ledger(server, balances) as db:
+        service = CreditTransactionService()
+        service.db = object()  # Repositories are injected below
+        service.credit_repo = CreditRepository(RpcDatabase(db))
+        yield service
+
+
+class TestCreditTransactionService:
+    @pytest.mark.asyncio
+    async def test_reservation_round_trip(self, server):
+        async with credit_service(server) as service:
+            reservation = await service.reserve_credits(transaction(4))
+
+            assert (reservation.status, reservation.balance, reservation.user["credits_balance"]) == ("reserved", 6, 6)
+            assert await service.refund_reservation(reservation.idempotency_key, "failed")
+
+    @pytest.mark.asyncio
+    async def test_reusing_a_refunded_key_raises(self, server):
+        async with credit_service(server) as service:
+            reservation = await service.reserve_credits(transaction(4))
+            await service.refund_reservation(reservation.idempotency_key, "failed")
+
+            with pytest.raises(ValueError, match="already refunded"):
+                await service.reserve_credits(transaction(4))
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_invalid_amounts_per_transaction(self, server):
+        async with credit_service(server) as service:
+            with pytest.raises(ValueError, match=r"1 out of 2 .*Transaction 2 .*must be positive, got 0"):
+                await service.batch_credit_operations([transaction(2, GENERATION), transaction(0, OTHER_GENERATION)])
@@ -0,0 +1,126 @@
+"""
+CreditTransactionService reservation tests.
+The reserve/commit/refund RPCs are replaced by an in-memory ledger with the
+same idempotency rules as migration 018; the SQL itself is exercised in
+test_credit_reservation_sql.py.
+"""
+import pytest
+
+from models.credit import TransactionType
+from services.credit_transaction_service import CreditTransaction, CreditTransactionService
+
+
+class InMemoryLedger:
+    """Stands in for CreditRepository's reservation RPCs."""
+
+    def __init__(self, balances):
+        self.balances = dict(balances)
+        self.reservations = {}
+        self.reserve_calls = []
+
+    async def reserve_credits(self, commit=False, **params):
+        self.reserve_calls.append(params)
+        key, user_id = params["idempotency_key"], params["user_id"]
+        if key in self.reservations:
+            if self.reservations[key]["status"] == "refunded":
+                return {"success": False, "replayed": True, "status": "refunded",
+                        "balance": self.balances[user_id], "error": "reservation_refunded"}
+            return {"success": True, "replayed": True, "status": self.reservations[key]["status"],
+                    "balance": self.balances[user_id]}
+        if user_id not in self.balances:
+            return {"success": False, "error": "user_not_found"}
+        if self.balances[user_id] < params["amount"]:
+            return {"success": False, "error": "insufficient_credits", "balance": self.balances[user_id]}
+        self.balances[user_id] -= params["amount"]
+        self.reservations[key] = {"user_id": user_id, "amount": params["amount"],
+                                  "status": "committed" if commit else "reserved"}
+        return {"success": True, "status": self.reservations[key]["status"], "balance": self.balances[user_id]}
+
+    async def refund_reservation(self, idempotency_key, reason=None):
+        reservation = self.reservations.get(idempotency_key)
+        if reservation is None or reservation["status"] == "refunded":
+            return {"success": False}
+        reservation["status"] = "refunded"
+        self.balances[reservation["user_id"]] += reservation["amount"]
+        return {"success": True}
+
+
+@pytest.fixture
+def ledger():
+    return InMemoryLedger({"user-1": 10})
+
+
+@pytest.fixture
+def service(ledger):
+    service = CreditTransactionService()
+    service.db = object()  # Repositories are injected below
+    service.credit_repo = ledger
+    return service
+
+
+def transaction(amount, generation_id="gen-1", user_id="user-1", **kwargs):
+    return CreditTransaction(user_id=user_id, amount=amount, transaction_type=TransactionType.GENERATION_USAGE,
+                             generation_id=generation_id, **kwargs)
+
+
+class TestReserveCredits:
+    @pytest.mark.asyncio
+    async def test_reservation_is_keyed_by_generation(self, service, ledger):
+        reservation = await service.reserve_credits(transaction(4))
+
+        assert reservation.idempotency_key == "generation:gen-1"
+        assert (reservation.status, reservation.balance) == ("reserved", 6)
+        assert await service._get_cached_balance("user-1") == 6
+
+    @pytest.mark.asyncio
+    async def test_retry_with_same_key_does_not_charge_twice(self, service, ledger):
+        await service.reserve_credits(transaction(4))
+        replay = await service.reserve_credits(transaction(4))
+
+        assert replay.replayed
+        assert ledger.balances["user-1"] == 6
+
+    @pytest.mark.asyncio
+    async def test_insufficient_credits_raise_and_refresh_the_cached_balance(self, service):
+        with pytest.raises(ValueError, match="Insufficient credits. Required: 11, Available: 10"):
+            await service.reserve_credits(transaction(11))
+
+        assert await service._get_cached_balance("user-1") == 10
+
+    @pytest.mark.asyncio
+    async def test_unknown_user(self, service):
+        with pytest.raises(ValueError, match="not found"):
+            await service.reserve_credits(transaction(1, user_id="ghost"))
+
+    @pytest.mark.asyncio
+    async def test_auth_token_is_never_written_to_the_ledger(self, service, ledger):
+        await service.reserve_credits(transaction(1, model_name="flux", metadata={"auth_token": "secret", "tier": "pro"}))
+
+        assert ledger.reserve_calls[0]["metadata"] == {"tier": "pro", "model_name": "flux"}
+
+    @pytest.mark.asyncio
+    async def test_transactions_without_generation_get_fresh_keys(self, service, ledger):
+        await service.reserve_credits(transaction(1, generation_id=None))
+        await service.reserve_credits(transaction(1, generation_id=None))
+
+        assert ledger.balances["user-1"] == 8
+
+
+class TestRefundReservation:
+    @pytest.mark.asyncio
+    async def test_refund_returns_credits_once(self, service, ledger):
+        reservation = await service.reserve_credits(transaction(4))
+
+        assert await service.refund_reservation(reservation.idempotency_key, "failed", user_id="user-1")
+        assert not await service.refund_reservation(reservation.idempotency_key, "failed", user_id="user-1")
+        assert ledger.balances["user-1"] == 10
+        assert await service._get_cached_balance("user-1") is None
+
+    @pytest.mark.asyncio
+    async def test_refunded_key_cannot_be_reserved_again(self, service, ledger):
+        reservation = await service.reserve_credits(transaction(4))
+        await service.refund_reservation(reservation.idempotency_key, "failed", user_id="user-1")
+
+        with pytest.raises(ValueError, match="already refunded"):
+            await service.reserve_credits(transaction(4))
+        assert ledger.balances["user-1"] == 10
@@ -0,0 +1,138 @@
+"""
+DataLoader batching, memoization and priming tests.
+"""
+import asyncio
+
+import pytest
+
+from utils.dataloader import DataLoader, clear_request_loaders, dataloader_scope, get_request_loader
+
+
+class RecordingBatchFn:
+    def __init__(self, error: Exception = None):
+        self.batches = []
+        self.error = error
+
+    async def __call__(self, keys):
+        self.batches.append(list(keys))
+        if self.error is not None:
+            raise self.error
+        return [f"value-{key}" for key in keys]
+
+
+class TestDataLoader:
+    @pytest.mark.asyncio
+    async def test_same_tick_loads_share_one_batch(self):
+        batch_fn = RecordingBatchFn()
+        loader = DataLoader(batch_fn)
+
+        values = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1))
+
+        assert values == ["value-1", "value-2", "value-1"]
+        assert batch_fn.batches == [[1, 2]]
+
+    @pytest.mark.asyncio
+    async def test_batches_are_split_at_max_batch_size(self):
+        batch_fn = RecordingBatchFn()
+        loader = DataLoader(batch_fn, max_batch_size=2)
+
+        assert await loader.load_many([1, 2, 3]) == ["value-1", "value-2", "value-3"]
+        assert batch_fn.batches == [[1, 2], [3]]
+
+    @pytest.mark.asyncio
+    async def test_memoized_key_is_not_loaded_again(self):
+        batch_fn = RecordingBatchFn()
+        loader = DataLoader(batch_fn)
+
+        await loader.load(1)
+        await loader.load(1)
+
+        assert batch_fn.batches == [[1]]
+        assert loader.get_stats()["memoized"] == 1
+
+    @pytest.mark.asyncio
+    async def test_without_cache_each_tick_loads_again(self):
+        batch_fn = RecordingBatchFn()
+        loader = DataLoader(batch_fn, cache=False)
+
+        await loader.load(1)
+        await loader.load(1)
+
+        assert batch_fn.batches == [[1], [1]]
+
+    @pytest.mark.asyncio
+    async def test_primed_value_skips_the_batch(self):
+        batch_fn = RecordingBatchFn()
+        loader = DataLoader(batch_fn)
+
+        loader.prime(1, "written")
+        loader.prime(1, "ignored")
+
+        assert await loader.load(1) == "written"
+        assert batch_fn.batches == []
+
+    @pytest.mark.asyncio
+    async def test_clear_forces_a_reload(self):
+        batch_fn = RecordingBatchFn()
+        loader = DataLoader(batch_fn)
+        loader.prime(1, "stale")
+
+        loader.clear(1)
+
+        assert await loader.load(1) == "value-1"
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_not_memoized(self):
+        batch_fn = RecordingBatchFn(error=RuntimeError("db down"))
+        loader = DataLoader(batch_fn)
+
+        with pytest.raises(RuntimeError):
+            await loader.load(1)
+        batch_fn.error = None
+
+        assert await loader.load(1) == "value-1"
+        assert len(batch_fn.batches) == 2
+
+    @pytest.mark.asyncio
+    async def test_wrong_value_count_fails_the_batch(self):
+        async def short(keys):
+            return []
+
+        with pytest.raises(ValueError):
+            await DataLoader(short).load(1)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_fail_the_batch(self):
+        release = asyncio.Event()
+
+        async def slow(keys):
+            await release.wait()
+            return list(keys)
+
+        loader = DataLoader(slow)
+        cancelled = asyncio.create_task(loader.load(1))
+        survivor = asyncio.create_task(loader.load(1))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+
+        assert await survivor == 1
+
+
+class TestRequestScope:
+    def test_no_loader_outside_a_scope(self):
+        assert get_request_loader("users", lambda: DataLoader(RecordingBatchFn())) is None
+
+    @pytest.mark.asyncio
+    async def test_scope_reuses_its_loader_and_clears_by_owner(self):
+        batch_fn = RecordingBatchFn()
+        with dataloader_scope():
+            loader = get_request_loader("users", lambda: DataLoader(batch_fn))
+            assert get_request_loader("users", lambda: DataLoader(batch_fn)) is loader
+
+            await loader.load(1)
+            clear_request_loaders(lambda owner: owner == "users")
+            await loader.load(1)
+
+        assert batch_fn.batches == [[1], [1]]
+        assert get_request_loader("users", lambda: DataLoader(batch_fn)) is None
@@ -0,0 +1,74 @@
+"""
+FALCompletionService status check tests.
+FAL is replaced by a fake queue client that counts status calls.
+"""
+import pytest
+
+from services import fal_completion_service as completion_module
+from services.fal_completion_service import CompletionEvent, CompletionState, FALCompletionService
+
+
+class FakeQueueClient:
+    def __init__(self, status):
+        self.status_response = status
+        self.status_calls = 0
+
+    async def status(self, endpoint, request_id):
+        self.status_calls += 1
+        return self.status_response
+
+    async def result(self, endpoint, request_id):
+        return {"images": [{"url": "https://fal.media/out.png"}]}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("FAL_WEBHOOK_URL", "")
+    service = FALCompletionService()
+    service.pubsub_enabled = False
+    yield service
+    for task in (service._poller_task, service._pubsub_task):
+        if task and not task.done():
+            task.cancel()
+
+
+class TestCheck:
+    @pytest.mark.asyncio
+    async def test_untracked_request_asks_fal_and_is_tracked_again(self, service, monkeypatch):
+        client = FakeQueueClient({"status": "IN_QUEUE", "queue_position": 3})
+        monkeypatch.setattr(completion_module, "fal_queue_client", client)
+
+        event = await service.check("req-1", "fal-ai/flux/dev", 30)
+
+        assert event.status == CompletionState.QUEUED
+        assert event.queue_position == 3
+        assert client.status_calls == 1
+        assert "req-1" in service._watches
+
+        # Answered locally from now on
+        assert (await service.check("req-1", "fal-ai/flux/dev", 30)).queue_position == 3
+        assert client.status_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_completed_request_is_remembered(self, service, monkeypatch):
+        client = FakeQueueClient({"status": "COMPLETED", "metrics": {"inference_time": 2.5}})
+        monkeypatch.setattr(completion_module, "fal_queue_client", client)
+
+        event = await service.check("req-2", "fal-ai/flux/dev")
+
+        assert event.status == CompletionState.COMPLETED
+        assert event.result == {"images": [{"url": "https://fal.media/out.png"}]}
+        assert "req-2" not in service._watches
+        assert service.get_last_event("req-2") is event
+
+    @pytest.mark.asyncio
+    async def test_known_event_needs_no_status_call(self, service, monkeypatch):
+        client = FakeQueueClient({"status": "IN_PROGRESS"})
+        monkeypatch.setattr(completion_module, "fal_queue_client", client)
+        await service._dispatch(CompletionEvent(request_id="req-3", status=CompletionState.FAILED, error="nsfw"),
+                                publish=False)
+
+        event = await service.check("req-3", "fal-ai/flux/dev")
+
+        assert event.error == "nsfw"
+        assert client.status_calls == 0
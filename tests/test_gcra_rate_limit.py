@@ -0,0 +1,67 @@
+"""
+GCRA rate limit tests against the pure-Python mirror of the Lua script.
+"""
+from middleware.production_rate_limiter import gcra_check, gcra_windows
+
+MINUTE = (10, 60_000)
+
+
+def burst(windows, now_ms, count, tats=None):
+    results = []
+    for _ in range(count):
+        allowed, binding, remaining, reset_ms, tats = gcra_check(tats, windows, now_ms)
+        results.append((allowed, binding, remaining, reset_ms))
+    return results, tats
+
+
+class TestGcraCheck:
+    def test_full_burst_then_deny(self):
+        results, _ = burst((MINUTE,), 0, 11)
+
+        assert [allowed for allowed, *_ in results] == [True] * 10 + [False]
+        assert [remaining for _, _, remaining, _ in results[:10]] == list(range(9, -1, -1))
+
+    def test_denied_request_reports_when_to_retry_and_keeps_state(self):
+        _, tats = burst((MINUTE,), 0, 10)
+
+        allowed, binding, remaining, reset_ms, after = gcra_check(tats, (MINUTE,), 1_000)
+
+        assert not allowed
+        assert remaining == 0
+        assert reset_ms == 6_000  # One emission interval after the burst started
+        assert after == tats
+
+    def test_capacity_drips_back_one_interval_at_a_time(self):
+        _, tats = burst((MINUTE,), 0, 10)
+
+        results, _ = burst((MINUTE,), 6_000, 2, tats)
+
+        assert [allowed for allowed, *_ in results] == [True, False]
+
+    def test_idle_client_starts_from_a_full_bucket(self):
+        _, tats = burst((MINUTE,), 0, 10)
+
+        results, _ = burst((MINUTE,), 120_000, 10, tats)
+
+        assert all(allowed for allowed, *_ in results)
+
+    def test_tightest_window_binds_and_denies(self):
+        windows = (MINUTE, (15, 3_600_000))
+        first, tats = burst(windows, 0, 10)
+        second, _ = burst(windows, 60_000, 6, tats)
+
+        assert all(allowed for allowed, *_ in first + second[:5])
+        allowed, binding, remaining, _ = second[5]
+        assert not allowed
+        assert binding == 1  # The hour window, while the minute window still has room
+        assert remaining == 0
+
+    def test_remaining_reports_the_binding_window(self):
+        allowed, binding, remaining, _, _ = gcra_check(None, ((100, 60_000), (5, 3_600_000)), 0)
+
+        assert allowed
+        assert (binding, remaining) == (1, 4)
+
+
+def test_windows_follow_tier_limits():
+    assert gcra_windows({"requests_per_minute": 10, "requests_per_hour": 30}) == ((10, 60_000), (30, 3_600_000))
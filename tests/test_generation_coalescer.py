@@ -0,0 +1,125 @@
+"""
+GenerationCoalescer tests: joiners share the leader's result, abandoned
+flights release them, and published results are served from the cache.
+The shared Redis client is replaced by an in-memory fake.
+"""
+import asyncio
+import json
+
+import pytest
+
+from services import generation_coalescer as coalescer_module
+from services.generation_coalescer import GenerationCoalescer, generation_cache_key
+
+OBJECTS = [{"bucket": "generations", "path": "u/cas/abc.png", "file_hash": "abc",
+            "file_size": 1024, "content_type": "image/png"}]
+
+
+class InMemoryAsyncRedis:
+    enabled = True
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = InMemoryAsyncRedis()
+    monkeypatch.setattr(coalescer_module, "async_redis", redis)
+    return redis
+
+
+@pytest.fixture
+def coalescer(redis):
+    return GenerationCoalescer()
+
+
+class TestCacheKey:
+    def test_whitespace_is_normalized_but_case_is_kept(self):
+        key = generation_cache_key("flux", "a  cat\n", {"seed": 1})
+
+        assert key == generation_cache_key("flux", "a cat", {"seed": 1})
+        assert key != generation_cache_key("flux", "A cat", {"seed": 1})
+
+    def test_parameter_order_does_not_matter(self):
+        assert (generation_cache_key("flux", "cat", {"seed": 1, "steps": 20})
+                == generation_cache_key("flux", "cat", {"steps": 20, "seed": 1}))
+
+    def test_unseeded_requests_are_not_coalesced(self, coalescer):
+        assert coalescer.key_for("flux", "cat", {"steps": 20}) is None
+        assert coalescer.key_for("flux", "cat", {"seed": 7}) is not None
+
+
+class TestFlights:
+    @pytest.mark.asyncio
+    async def test_joiners_receive_the_published_result(self, coalescer, redis):
+        assert await coalescer.acquire("key") == (None, True)
+        joiners = [asyncio.create_task(coalescer.acquire("key")) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        await coalescer.publish("key", OBJECTS)
+
+        assert await asyncio.gather(*joiners) == [(OBJECTS, False)] * 3
+        assert not coalescer.in_flight("key")
+        assert json.loads(redis.values[f"{GenerationCoalescer.CACHE_PREFIX}key"]) == OBJECTS
+        assert coalescer.stats["joined"] == 3
+
+    @pytest.mark.asyncio
+    async def test_published_result_is_served_from_cache(self, coalescer):
+        await coalescer.acquire("key")
+        await coalescer.publish("key", OBJECTS)
+
+        assert await coalescer.acquire("key") == (OBJECTS, False)
+        assert coalescer.stats["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_abandoned_flight_releases_joiners(self, coalescer):
+        await coalescer.acquire("key")
+        joiner = asyncio.create_task(coalescer.acquire("key"))
+        await asyncio.sleep(0)
+
+        coalescer.abandon("key")
+
+        assert await joiner == (None, False)
+        # The next request leads a fresh flight
+        assert await coalescer.acquire("key") == (None, True)
+
+    @pytest.mark.asyncio
+    async def test_joiner_gives_up_after_timeout(self, coalescer):
+        coalescer.join_timeout = 0.01
+        await coalescer.acquire("key")
+
+        assert await coalescer.acquire("key") == (None, False)
+        assert coalescer.stats["join_timeouts"] == 1
+        assert coalescer.in_flight("key")
+
+    @pytest.mark.asyncio
+    async def test_close_abandons_every_flight(self, coalescer):
+        await coalescer.acquire("a")
+        await coalescer.acquire("b")
+        joiner = asyncio.create_task(coalescer.acquire("a"))
+        await asyncio.sleep(0)
+
+        await coalescer.close()
+
+        assert await joiner == (None, False)
+        assert coalescer.get_stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_forget_drops_the_cached_result(self, coalescer):
+        await coalescer.acquire("key")
+        await coalescer.publish("key", OBJECTS)
+
+        await coalescer.forget("key")
+
+        assert await coalescer.acquire("key") == (None, True)
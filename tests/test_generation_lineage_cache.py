@@ -0,0 +1,175 @@
+"""
+Generation lineage cache tests.
+A chain is dropped when any generation in its lineage is invalidated, and
+generation writes through the repository invalidate the right lineages.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from repositories.generation_repository import GenerationRepository
+from utils import generation_lineage_cache as lineage_module
+from utils.generation_lineage_cache import GenerationLineageCache, invalidate_generation_lineage
+
+
+class InMemoryRedis:
+    """The handful of redis.asyncio commands the lineage cache uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += int(self.values.pop(key, None) is not None or self.sets.pop(key, None) is not None)
+        return removed
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.redis.values[key] = value
+
+    def sadd(self, key, member):
+        self.redis.sets.setdefault(key, set()).add(member)
+
+    def expire(self, key, ttl):
+        pass
+
+    async def execute(self):
+        return []
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = GenerationLineageCache(redis_client=InMemoryRedis())
+    monkeypatch.setattr(lineage_module, "generation_lineage_cache", cache)
+    return cache
+
+
+class TestGenerationLineageCache:
+    @pytest.mark.asyncio
+    async def test_round_trip(self, cache):
+        await cache.set("child", ["parent"], {"generation_id": "child", "inheritance_depth": 0})
+
+        assert await cache.get("child") == {"generation_id": "child", "inheritance_depth": 0}
+
+    @pytest.mark.asyncio
+    async def test_invalidating_an_ancestor_drops_descendant_chains(self, cache):
+        await cache.set("parent", ["root"], {"generation_id": "parent"})
+        await cache.set("child", ["parent", "root"], {"generation_id": "child"})
+        await cache.set("sibling", ["other-root"], {"generation_id": "sibling"})
+
+        assert await cache.invalidate("root") == 2
+
+        assert await cache.get("parent") is None
+        assert await cache.get("child") is None
+        assert await cache.get("sibling") == {"generation_id": "sibling"}
+
+    @pytest.mark.asyncio
+    async def test_invalidating_a_leaf_keeps_its_ancestors(self, cache):
+        await cache.set("parent", [], {"generation_id": "parent"})
+        await cache.set("child", ["parent"], {"generation_id": "child"})
+
+        assert await cache.invalidate("child") == 1
+        assert await cache.get("parent") == {"generation_id": "parent"}
+
+    @pytest.mark.asyncio
+    async def test_helper_skips_missing_ids(self, cache):
+        await cache.set("parent", [], {"generation_id": "parent"})
+
+        assert await invalidate_generation_lineage(None, "parent", "parent") == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_are_not_raised(self):
+        redis_client = MagicMock()
+        redis_client.smembers.side_effect = ConnectionError("redis down")
+
+        assert await GenerationLineageCache(redis_client=redis_client).invalidate("gen") == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_read_is_a_miss(self):
+        redis_client = MagicMock()
+        redis_client.get.side_effect = ConnectionError("redis down")
+
+        assert await GenerationLineageCache(redis_client=redis_client).get("gen") is None
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_redis_is_a_miss(self, monkeypatch):
+        monkeypatch.setattr(lineage_module.async_redis, "enabled", False)
+
+        assert await GenerationLineageCache().get("gen") is None
+
+    @pytest.mark.asyncio
+    async def test_bytes_replies_from_the_shared_client(self, cache):
+        await cache.set("child", ["parent"], {"generation_id": "child"})
+        cache.redis_client.sets = {key: {m.encode() for m in members} for key, members in cache.redis_client.sets.items()}
+
+        assert await cache.invalidate("parent") == 1
+        assert await cache.get("child") is None
+
+
+class TestGenerationRepositoryInvalidation:
+    @pytest.fixture
+    def invalidated(self, monkeypatch):
+        calls = []
+
+        async def record(*generation_ids):
+            calls.append(generation_ids)
+            return 0
+
+        async def no_stats(self, user_id):
+            pass
+
+        monkeypatch.setattr("repositories.generation_repository.invalidate_generation_lineage", record)
+        monkeypatch.setattr(GenerationRepository, "_invalidate_stats_cache", no_stats)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_delete_invalidates_generation_and_parent(self, invalidated):
+        db = MagicMock()
+        db.execute_query.return_value = [{"id": "child", "parent_generation_id": "parent", "user_id": "u"}]
+
+        assert await GenerationRepository(db).delete_generation("child")
+        assert invalidated == [("child", "parent")]
+
+    @pytest.mark.asyncio
+    async def test_status_update_leaves_lineage_alone(self, invalidated, monkeypatch):
+        db = MagicMock()
+        db.execute_query.return_value = {"id": "child", "user_id": "u"}
+        monkeypatch.setattr(GenerationRepository, "_transform_db_record", lambda self, record: record)
+        monkeypatch.setattr("repositories.generation_repository.GenerationResponse", lambda **record: MagicMock(**record))
+
+        await GenerationRepository(db).update_generation("child", {"status": "completed"})
+
+        assert invalidated == []
+
+    @pytest.mark.asyncio
+    async def test_reparenting_invalidates_old_and_new_parent(self, invalidated, monkeypatch):
+        db = MagicMock()
+        db.execute_query_async = AsyncMock(return_value={"id": "child", "parent_generation_id": "old-parent"})
+        db.execute_query.return_value = {"id": "child", "parent_generation_id": "new-parent", "user_id": "u"}
+        monkeypatch.setattr(GenerationRepository, "_transform_db_record", lambda self, record: record)
+        monkeypatch.setattr("repositories.generation_repository.GenerationResponse", lambda **record: MagicMock(**record))
+
+        await GenerationRepository(db).update_generation("child", {"parent_generation_id": "new-parent"})
+
+        assert invalidated == [("child", "old-parent", "new-parent")]
@@ -0,0 +1,136 @@
+"""
+Generation worker tests.
+The job queue is an in-memory stand-in following the lease rules of
+migration 019 (claim counts an attempt, release hands it back, started_at
+survives both); generations live in a fake repository.
+"""
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from models.generation import GenerationStatus
+from services.generation_job_queue import GenerationJob
+from services.generation_worker import GenerationWorker
+
+# services/__init__ re-exports the generation_service instance under the module's name
+generation_module = sys.modules["services.generation_service"]
+worker_module = sys.modules["services.generation_worker"]
+
+
+class InMemoryJobQueue:
+    def __init__(self, *rows):
+        self.rows = {row["id"]: dict(row, status="queued", attempts=0, leased_by=None, started_at=None)
+                     for row in rows}
+        self.claimed = asyncio.Event()
+
+    async def claim(self, worker_id, model_limits, limit, lanes):
+        jobs = []
+        for row in self.rows.values():
+            if row["status"] == "queued" and len(jobs) < limit:
+                row.update(status="leased", leased_by=worker_id, attempts=row["attempts"] + 1)
+                jobs.append(GenerationJob.from_row(dict(row)))
+        if jobs:
+            self.claimed.set()
+        return jobs
+
+    async def start(self, job):
+        row = self.rows[job.id]
+        if row["status"] != "leased" or row["leased_by"] != job.leased_by:
+            return False
+        row["started_at"] = row["started_at"] or "2026-01-01T00:00:00+00:00"
+        return True
+
+    async def heartbeat(self, worker_id, job_ids):
+        return [job_id for job_id in job_ids if self.rows[job_id]["leased_by"] == worker_id]
+
+    async def complete(self, job, worker_id):
+        self.rows[job.id].update(status="completed", leased_by=None)
+        return True
+
+    async def fail(self, job, worker_id, error):
+        self.rows[job.id].update(status="queued", leased_by=None)
+        return "queued"
+
+    async def release(self, job, worker_id):
+        row = self.rows[job.id]
+        row.update(status="queued", leased_by=None, attempts=max(row["attempts"] - 1, 0))
+        return True
+
+
+class FakeGenerationRepository:
+    def __init__(self, status=GenerationStatus.PENDING):
+        self.status = status
+
+    async def get_generation_by_id(self, generation_id, user_id=None, auth_token=None):
+        return SimpleNamespace(id=generation_id, status=self.status)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = InMemoryJobQueue({"id": "job-1", "generation_id": "gen-1", "model_id": "fal-ai/flux/dev",
+                              "payload": {}, "max_attempts": 3})
+    monkeypatch.setattr(generation_module, "generation_job_queue", queue)
+    monkeypatch.setattr(worker_module, "generation_job_queue", queue)
+    return queue
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = generation_module.generation_service
+    repository = FakeGenerationRepository()
+    service.runs = []
+
+    async def repositories():
+        service.generation_repo = repository
+
+    async def process(generation_id, generation_data, fal_attempts=3, final_attempt=True):
+        service.runs.append(generation_id)
+        repository.status = GenerationStatus.PROCESSING
+        if len(service.runs) == 1:
+            await asyncio.Event().wait()  # Still running when the worker shuts down
+        repository.status = GenerationStatus.COMPLETED
+
+    monkeypatch.setattr(service, "_get_repositories", repositories)
+    monkeypatch.setattr(service, "_process_generation", process)
+    monkeypatch.setattr(generation_module, "GenerationCreate", lambda **payload: payload)
+    service.repository = repository
+    yield service
+    del service.runs, service.repository
+
+
+async def run_until_claimed(queue, worker):
+    queue.claimed.clear()
+    task = asyncio.create_task(worker.run())
+    await asyncio.wait_for(queue.claimed.wait(), 1)
+    await asyncio.sleep(0.01)
+    worker.stop()
+    await asyncio.wait_for(task, 1)
+
+
+class TestGenerationWorker:
+    @pytest.mark.asyncio
+    async def test_released_job_is_processed_again_when_reclaimed(self, queue, service):
+        await run_until_claimed(queue, GenerationWorker(concurrency=1, worker_id="w1", shutdown_grace_seconds=0))
+
+        row = queue.rows["job-1"]
+        assert (row["status"], row["attempts"]) == ("queued", 0)
+        assert row["started_at"] is not None
+        assert service.repository.status == GenerationStatus.PROCESSING
+
+        await run_until_claimed(queue, GenerationWorker(concurrency=1, worker_id="w2", shutdown_grace_seconds=1))
+
+        assert service.runs == ["gen-1", "gen-1"]
+        assert queue.rows["job-1"]["status"] == "completed"
+        assert service.repository.status == GenerationStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_unstarted_job_leaves_in_process_generation_alone(self, queue, service):
+        service.repository.status = GenerationStatus.PROCESSING
+
+        await run_until_claimed(queue, GenerationWorker(concurrency=1, worker_id="w1", shutdown_grace_seconds=1))
+
+        assert service.runs == []
+        assert queue.rows["job-1"]["status"] == "completed"
+        assert queue.rows["job-1"]["started_at"] is None
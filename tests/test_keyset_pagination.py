@@ -0,0 +1,93 @@
+"""
+Keyset pagination tests: cursor encoding, the PostgREST keyset predicate
+and page assembly in fetch_keyset_page.
+"""
+import pytest
+
+from utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, fetch_keyset_page, keyset_filter
+
+CREATED_AT = "2025-03-01T12:00:00.123456+00:00"
+ROW_ID = "5b0e4c1e-7f3a-4d0b-9a57-2f6c8a1d9e10"
+
+
+class TestCursor:
+    def test_round_trip(self):
+        cursor = encode_cursor(CREATED_AT, ROW_ID)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (CREATED_AT, ROW_ID)
+
+    def test_zulu_timestamps_are_accepted(self):
+        assert decode_cursor(encode_cursor("2025-03-01T12:00:00Z", ROW_ID))[0] == "2025-03-01T12:00:00Z"
+
+    @pytest.mark.parametrize("cursor", [
+        "not-base64!",
+        encode_cursor("yesterday", ROW_ID),
+        "WzEsMl0",  # [1,2]
+        "WyJvbmx5Il0",  # ["only"]
+    ])
+    def test_malformed_cursor_is_rejected(self, cursor):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
+
+
+class TestKeysetFilter:
+    def test_descending_selects_older_rows(self):
+        assert keyset_filter(CREATED_AT, "abc") == (
+            f'(created_at.lt."{CREATED_AT}",and(created_at.eq."{CREATED_AT}",id.lt.abc))'
+        )
+
+    def test_ascending_selects_newer_rows(self):
+        assert keyset_filter(CREATED_AT, "abc", descending=False).count(".gt.") == 2
+
+    def test_reserved_characters_are_quoted(self):
+        assert 'id.lt."a,b)"' in keyset_filter(CREATED_AT, "a,b)")
+
+
+class FakeDatabase:
+    def __init__(self, rows, total=None):
+        self.rows = rows
+        self.total = total
+        self.calls = []
+
+    async def execute_page_async(self, table, **kwargs):
+        self.calls.append(kwargs)
+        return self.rows[:kwargs["limit"]], self.total
+
+
+def rows(count):
+    return [{"id": f"id-{i}", "created_at": f"2025-03-01T12:00:{59 - i:02d}+00:00"} for i in range(count)]
+
+
+class TestFetchKeysetPage:
+    @pytest.mark.asyncio
+    async def test_extra_row_becomes_the_next_cursor(self):
+        db = FakeDatabase(rows(3), total=3)
+
+        page = await fetch_keyset_page(db, "generations", limit=2, count="exact")
+
+        assert [row["id"] for row in page.items] == ["id-0", "id-1"]
+        assert decode_cursor(page.next_cursor) == ("2025-03-01T12:00:58+00:00", "id-1")
+        assert page.total == 3
+        assert db.calls[0]["limit"] == 3
+        assert db.calls[0]["order"] == ["created_at.desc", "id.desc"]
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self):
+        page = await fetch_keyset_page(FakeDatabase(rows(2)), "generations", limit=2)
+
+        assert page.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_cursor_replaces_offset_with_keyset_predicate(self):
+        db = FakeDatabase([])
+
+        await fetch_keyset_page(db, "generations", cursor=encode_cursor(CREATED_AT, "abc"), offset=40)
+
+        assert db.calls[0]["offset"] is None
+        assert db.calls[0]["logic_filter"] == keyset_filter(CREATED_AT, "abc")
+
+    @pytest.mark.asyncio
+    async def test_unknown_count_method_is_rejected(self):
+        with pytest.raises(ValueError):
+            await fetch_keyset_page(FakeDatabase([]), "generations", count="all")
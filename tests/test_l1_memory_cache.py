@@ -0,0 +1,192 @@
+"""
+L1 memory cache eviction tests.
+Exercises _L1Shard directly (one shard, exact byte budgets) and the
+L1MemoryCache front end.
+"""
+import time
+
+import pytest
+
+from caching.multi_layer_cache import EvictionPolicy, L1MemoryCache, _L1Entry, _L1Shard
+
+
+def make_shard(policy: EvictionPolicy, max_size_bytes: int = 100) -> _L1Shard:
+    return _L1Shard(max_size_bytes, policy, sketch_capacity=64)
+
+
+def put(shard: _L1Shard, key: str, size: int = 10, ttl: float = None, priority: int = 1) -> bool:
+    expires_at = time.time() + ttl if ttl is not None else None
+    return shard.insert(key, _L1Entry(key, expires_at, size, priority, set()), hash(key))
+
+
+def resident(shard: _L1Shard) -> set:
+    return set(shard.keys())
+
+
+class TestLRUShard:
+    def test_evicts_least_recently_used(self):
+        shard = make_shard(EvictionPolicy.LRU, max_size_bytes=30)
+        for key in ("a", "b", "c"):
+            put(shard, key)
+        shard.lookup("a", time.time())
+
+        assert put(shard, "d")
+        assert resident(shard) == {"a", "c", "d"}
+        assert shard.metrics.evictions == 1
+
+    def test_overwrite_does_not_double_count_size(self):
+        shard = make_shard(EvictionPolicy.LRU)
+        put(shard, "a", size=10)
+        put(shard, "a", size=25)
+
+        assert shard.size_bytes == 25
+        assert resident(shard) == {"a"}
+
+    def test_expired_entry_is_a_miss(self):
+        shard = make_shard(EvictionPolicy.LRU)
+        put(shard, "a", ttl=-1)
+
+        assert shard.lookup("a", time.time()) is None
+        assert shard.size_bytes == 0
+
+
+class TestSegmentedShard:
+    def test_second_touch_promotes_to_protected(self):
+        shard = make_shard(EvictionPolicy.HYBRID)
+        put(shard, "a")
+        shard.lookup("a", time.time())
+
+        assert "a" in shard.protected
+        assert shard.protected_bytes == 10
+
+    def test_probation_is_evicted_before_protected(self):
+        shard = make_shard(EvictionPolicy.HYBRID, max_size_bytes=30)
+        put(shard, "hot")
+        shard.lookup("hot", time.time())
+        put(shard, "b")
+        put(shard, "c")
+        for _ in range(3):
+            shard.admission.increment(hash("d"))
+
+        assert put(shard, "d")
+        assert "hot" in resident(shard)
+        assert "b" not in resident(shard)
+
+    def test_admission_rejects_colder_candidate(self):
+        shard = make_shard(EvictionPolicy.HYBRID, max_size_bytes=20)
+        put(shard, "a")
+        put(shard, "b")
+        for _ in range(5):
+            shard.admission.increment(hash("a"))
+
+        assert not put(shard, "cold")
+        assert resident(shard) == {"a", "b"}
+
+    def test_admission_is_decided_before_any_eviction(self):
+        shard = make_shard(EvictionPolicy.HYBRID, max_size_bytes=30)
+        for key in ("a", "b", "c"):
+            put(shard, key)
+        shard.admission.increment(hash("c"))
+
+        # Judged against the first victim only: never half-evict and then refuse
+        assert put(shard, "new", size=30)
+        assert resident(shard) == {"new"}
+        assert shard.metrics.evictions == 3
+
+    def test_rejected_candidate_evicts_nothing(self):
+        shard = make_shard(EvictionPolicy.HYBRID, max_size_bytes=30)
+        for key in ("a", "b", "c"):
+            put(shard, key)
+        shard.admission.increment(hash("a"))
+
+        assert not put(shard, "cold", size=30)
+        assert resident(shard) == {"a", "b", "c"}
+        assert shard.metrics.evictions == 0
+
+    def test_high_priority_entries_skip_admission(self):
+        shard = make_shard(EvictionPolicy.HYBRID, max_size_bytes=20)
+        put(shard, "a")
+        put(shard, "b")
+        for _ in range(5):
+            shard.admission.increment(hash("a"))
+
+        assert put(shard, "important", priority=3)
+        assert "important" in shard.protected
+
+
+class TestOversizedEntries:
+    def test_entry_larger_than_shard_keeps_residents(self):
+        shard = make_shard(EvictionPolicy.LRU, max_size_bytes=30)
+        put(shard, "a")
+        put(shard, "b")
+
+        assert not put(shard, "huge", size=31)
+        assert resident(shard) == {"a", "b"}
+        assert shard.metrics.evictions == 0
+
+    def test_failed_overwrite_drops_the_old_value(self):
+        shard = make_shard(EvictionPolicy.LRU, max_size_bytes=30)
+        put(shard, "a")
+
+        assert not put(shard, "a", size=31)
+        assert resident(shard) == set()
+
+
+class TestTTLShard:
+    def test_evicts_soonest_expiry_first(self):
+        shard = make_shard(EvictionPolicy.TTL, max_size_bytes=30)
+        put(shard, "late", ttl=300)
+        put(shard, "soon", ttl=10)
+        put(shard, "middle", ttl=100)
+
+        assert put(shard, "new", ttl=200)
+        assert resident(shard) == {"late", "middle", "new"}
+
+    def test_overwritten_key_uses_new_expiry(self):
+        shard = make_shard(EvictionPolicy.TTL, max_size_bytes=20)
+        put(shard, "a", ttl=10)
+        put(shard, "b", ttl=100)
+        put(shard, "a", ttl=1000)
+
+        assert put(shard, "c", ttl=500)
+        assert resident(shard) == {"a", "c"}
+
+    def test_expiry_heap_stays_bounded_without_eviction_pressure(self):
+        shard = make_shard(EvictionPolicy.TTL, max_size_bytes=10 ** 9)
+        for i in range(10000):
+            put(shard, f"key-{i % 10}", ttl=60)
+        for i in range(5000):
+            put(shard, f"churn-{i}", ttl=60)
+            shard.remove(f"churn-{i}")
+
+        assert len(resident(shard)) == 10
+        assert len(shard.expiry_heap) <= max(2 * 10, _L1Shard.EXPIRY_HEAP_MIN_REBUILD) + 1
+
+
+class TestL1MemoryCache:
+    @pytest.mark.parametrize("policy", list(EvictionPolicy))
+    def test_get_set_delete(self, policy):
+        cache = L1MemoryCache(max_size_mb=1, eviction_policy=policy, shard_count=4)
+
+        assert cache.set("key", {"value": 1}, ttl=60)
+        assert cache.get("key") == {"value": 1}
+        assert cache.delete("key")
+        assert cache.get("key", "missing") == "missing"
+
+    def test_shard_count_rounds_to_power_of_two(self):
+        cache = L1MemoryCache(max_size_mb=1, shard_count=5)
+
+        assert len(cache._shards) == 8
+
+    def test_rejects_entries_larger_than_a_shard(self):
+        cache = L1MemoryCache(max_size_mb=16, shard_count=16)
+        for i in range(64):
+            cache.set(f"hot-{i}", i, size_bytes=1024)
+
+        assert not cache.set("big", b"", size_bytes=1400 * 1024)
+        assert all(cache.get(f"hot-{i}") == i for i in range(64))
+
+    def test_rejects_entries_over_a_tenth_of_capacity(self):
+        cache = L1MemoryCache(max_size_mb=1, shard_count=1)
+
+        assert not cache.set("big", b"", size_bytes=200 * 1024)
@@ -0,0 +1,96 @@
+"""
+Principal cache and token revocation tests.
+Both auth middlewares verify the same tokens; their cached principals must
+not leak into each other and a signed-out token must stay rejected.
+"""
+import time
+
+import jwt
+import pytest
+
+from utils.principal_cache import PrincipalCache, TokenRevocations, token_key
+
+
+def make_token(exp_in: float = 600) -> str:
+    return jwt.encode(
+        {"sub": "user-1", "email": "user@velro.ai", "aud": "authenticated", "exp": int(time.time() + exp_in)},
+        "s" * 40,
+        algorithm="HS256"
+    )
+
+
+@pytest.fixture
+def revocations():
+    return TokenRevocations()
+
+
+class TestPrincipalCache:
+    def test_hit_until_exp(self, revocations):
+        cache = PrincipalCache("test", revocations)
+        token = make_token()
+        cache.set(token, {"id": "user-1"}, time.time() + 60)
+
+        assert cache.get(token) == {"id": "user-1"}
+        assert cache.get(make_token(exp_in=601)) is None
+
+    def test_expired_entry_is_dropped(self, revocations):
+        cache = PrincipalCache("test", revocations)
+        token = make_token()
+        cache.set(token, {"id": "user-1"}, time.time() - 1)
+
+        assert cache.get(token) is None
+        assert cache.get_stats()["entries"] == 0
+
+    def test_instances_do_not_share_entries(self, revocations):
+        claims_cache = PrincipalCache("claims", revocations)
+        session_cache = PrincipalCache("session", revocations)
+        token = make_token()
+        claims_cache.set(token, {"id": "user-1", "email": "user@velro.ai"}, time.time() + 60)
+
+        assert session_cache.get(token) is None
+
+    def test_evicts_least_recently_used(self, revocations, monkeypatch):
+        monkeypatch.setattr(PrincipalCache, "MAX_ENTRIES", 2)
+        cache = PrincipalCache("test", revocations)
+        expires_at = time.time() + 60
+        cache.set("a", {"id": "a"}, expires_at)
+        cache.set("b", {"id": "b"}, expires_at)
+        cache.get("a")
+        cache.set("c", {"id": "c"}, expires_at)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"id": "a"}
+
+
+class TestTokenRevocations:
+    def test_revoked_token_is_not_served_or_recached(self, revocations):
+        cache = PrincipalCache("test", revocations)
+        token = make_token()
+        cache.set(token, {"id": "user-1"}, time.time() + 60)
+
+        revocations.revoke(token)
+
+        assert revocations.is_revoked(token)
+        assert cache.get(token) is None
+        cache.set(token, {"id": "user-1"}, time.time() + 60)
+        assert cache.get(token) is None
+
+    def test_revocation_lasts_until_token_exp(self, revocations):
+        token = make_token(exp_in=600)
+        key, expires_at = revocations.revoke(token)
+
+        assert key == token_key(token)
+        assert expires_at == jwt.decode(token, options={"verify_signature": False})["exp"]
+
+    def test_expired_revocations_are_forgotten(self, revocations):
+        revocations.add("key", time.time() + 0.01)
+        time.sleep(0.02)
+
+        assert not revocations.contains("key")
+        assert len(revocations) == 0
+
+    def test_unreadable_token_uses_default_ttl(self, revocations):
+        key, expires_at = revocations.revoke("not-a-jwt")
+
+        assert revocations.contains(key)
+        assert expires_at > time.time() + TokenRevocations.DEFAULT_TTL - 5
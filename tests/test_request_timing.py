@@ -0,0 +1,80 @@
+"""
+Request timing tests.
+Spans land in the timer of the request that is current, and tasks that
+outlive the request do not keep reporting into it.
+"""
+import asyncio
+
+import pytest
+
+from utils.request_timing import RouteTimingStats, current_timer, detached, record_span, route_key, span
+
+SCOPE = {"method": "GET", "path": "/api/v1/generations/abc", "endpoint": object(),
+         "path_params": {"generation_id": "abc"}}
+
+
+@pytest.fixture
+def timing():
+    return RouteTimingStats()
+
+
+class TestSpans:
+    def test_spans_add_up_per_stage(self, timing):
+        timer, token = timing.start()
+        with span("db"):
+            pass
+        with span("db"):
+            pass
+        record_span("fal", 5)
+        timing.finish(token, SCOPE, timer, 200, "req-1")
+
+        assert timer.stages["db"][1] == 2
+        assert timer.stages["fal"][0] == pytest.approx(5, abs=0.1)
+        assert 'desc="2 calls"' in timer.server_timing()
+
+    def test_outside_a_request_records_nothing(self):
+        assert current_timer() is None
+        with span("db"):
+            pass
+        record_span("fal", 5)
+
+    def test_route_key_collapses_path_params(self):
+        assert route_key(SCOPE) == "GET /api/v1/generations/{generation_id}"
+        assert route_key({"method": "GET", "path": "/nope"}) == "GET unmatched"
+
+
+class TestBackgroundTasks:
+    @pytest.mark.asyncio
+    async def test_detached_task_records_nothing(self, timing):
+        timer, token = timing.start()
+        seen = []
+
+        async def background():
+            seen.append(current_timer())
+            with span("storage"):
+                pass
+
+        await asyncio.create_task(detached(background()))
+        timing.finish(token, SCOPE, timer, 200, "req-1")
+
+        assert seen == [None]
+        assert "storage" not in timer.stages
+
+    @pytest.mark.asyncio
+    async def test_finished_timer_ignores_late_spans(self, timing):
+        timer, token = timing.start()
+        release = asyncio.Event()
+
+        async def straggler():
+            await release.wait()
+            with span("db"):
+                pass
+
+        task = asyncio.create_task(straggler())
+        timing.finish(token, SCOPE, timer, 200, "req-1")
+        release.set()
+        await task
+
+        assert timer.stages == {}
+        breakdown = timing.get_breakdown()["routes"]["GET /api/v1/generations/{generation_id}"]
+        assert set(breakdown["stages"]) == {"total"}
@@ -0,0 +1,121 @@
+"""
+SignedUrlService coalescing, caching and cancellation tests.
+The Storage API call is replaced by a controllable fake _issue.
+"""
+import asyncio
+
+import pytest
+
+from utils.signed_url_service import SignedUrl, SignedUrlService
+
+
+class FakeIssuer:
+    """Stands in for SignedUrlService._issue; each call blocks until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def __call__(self, to_sign, expiry, now):
+        self.calls.append({bucket: list(paths) for bucket, paths in to_sign.items()})
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return {
+            (bucket, path): SignedUrl(url=f"https://signed/{bucket}/{path}", expires_at_ts=expiry)
+            for bucket, paths in to_sign.items()
+            for path in paths
+        }
+
+
+@pytest.fixture
+def service():
+    service = SignedUrlService(max_entries=100)
+    service._issue = FakeIssuer()
+    return service
+
+
+class TestSignedUrlService:
+    @pytest.mark.asyncio
+    async def test_sign_many_issues_one_call_per_batch(self, service):
+        service._issue.release.set()
+        signed = await service.sign_many([("generations", "a.png"), ("generations", "b.png"), ("avatars", "c.png")])
+
+        assert len(service._issue.calls) == 1
+        assert service._issue.calls[0] == {"generations": ["a.png", "b.png"], "avatars": ["c.png"]}
+        assert signed[("avatars", "c.png")].url == "https://signed/avatars/c.png"
+
+    @pytest.mark.asyncio
+    async def test_cached_url_is_reused(self, service):
+        service._issue.release.set()
+        first = await service.sign("generations", "a.png")
+        second = await service.sign("generations", "a.png")
+
+        assert first == second
+        assert len(service._issue.calls) == 1
+        assert service.stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_coalesced(self, service):
+        first = asyncio.create_task(service.sign("generations", "a.png"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(service.sign("generations", "a.png"))
+        await asyncio.sleep(0)
+        service._issue.release.set()
+
+        assert await first == await second
+        assert len(service._issue.calls) == 1
+        assert service.stats["coalesced"] == 1
+
+    @pytest.mark.asyncio
+    async def test_issuer_error_is_a_miss_for_waiters(self, service):
+        service._issue.error = RuntimeError("storage down")
+        first = asyncio.create_task(service.sign_many([("generations", "a.png")]))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(service.sign_many([("generations", "a.png")]))
+        await asyncio.sleep(0)
+        service._issue.release.set()
+
+        with pytest.raises(RuntimeError):
+            await first
+        assert await second == {}
+        assert not service._in_flight
+
+    @pytest.mark.asyncio
+    async def test_cancelled_issuer_does_not_strand_later_requests(self, service):
+        issuer = asyncio.create_task(service.sign("generations", "a/b.png"))
+        await asyncio.sleep(0)
+        issuer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await issuer
+
+        assert not service._in_flight
+        service._issue.release.set()
+        signed = await asyncio.wait_for(service.sign("generations", "a/b.png"), 1)
+        assert signed.url == "https://signed/generations/a/b.png"
+
+    @pytest.mark.asyncio
+    async def test_waiter_signs_itself_when_issuer_is_cancelled(self, service):
+        issuer = asyncio.create_task(service.sign("generations", "a.png"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(service.sign("generations", "a.png"))
+        await asyncio.sleep(0)
+        issuer.cancel()
+        await asyncio.sleep(0)
+        service._issue.release.set()
+
+        signed = await asyncio.wait_for(waiter, 1)
+        assert signed.url == "https://signed/generations/a.png"
+        assert len(service._issue.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_waiter_gives_up_after_timeout(self, service, monkeypatch):
+        monkeypatch.setattr(SignedUrlService, "COALESCE_WAIT_SECONDS", 0.01)
+        issuer = asyncio.create_task(service.sign_many([("generations", "a.png")]))
+        await asyncio.sleep(0)
+
+        assert await service.sign_many([("generations", "a.png")]) == {}
+
+        service._issue.release.set()
+        await issuer
@@ -0,0 +1,131 @@
+"""
+Thumbnail scheduling and partial-upload cleanup tests for streamed
+generation uploads. The external download is served by an httpx
+MockTransport and the storage repository is an in-memory fake.
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+import httpx
+import pytest
+from unittest.mock import MagicMock
+
+from services.storage_service import StorageService
+
+# services/__init__ re-exports the storage_service instance under the module's name
+storage_module = sys.modules["services.storage_service"]
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096
+
+
+class FakePool:
+    def __init__(self, body: bytes):
+        self.transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body, headers={"content-type": "image/png"})
+        )
+
+    @asynccontextmanager
+    async def get_connection(self):
+        async with httpx.AsyncClient(transport=self.transport) as client:
+            yield client
+
+
+class FakeStorageRepository:
+    def __init__(self, failing_uploads=0, failing_metadata=0):
+        self.uploaded = {}
+        self.downloads = 0
+        self.failing_uploads = failing_uploads
+        self.failing_metadata = failing_metadata
+
+    async def upload_file_stream(self, bucket_name, file_path, chunks, **kwargs):
+        received = b""
+        async for chunk in chunks:
+            received += chunk
+            # The object exists as soon as the first chunk lands
+            self.uploaded[file_path] = received
+            if self.failing_uploads:
+                self.failing_uploads -= 1
+                raise ConnectionError("connection reset")
+        return file_path
+
+    async def create_file_metadata(self, metadata, user_id):
+        if self.failing_metadata:
+            self.failing_metadata -= 1
+            raise RuntimeError("metadata insert failed")
+        return MagicMock(id=uuid4(), file_path=metadata.file_path, file_size=metadata.file_size,
+                         bucket_name=metadata.bucket_name)
+
+    async def download_file(self, bucket_name, file_path, user_id):
+        self.downloads += 1
+        return self.uploaded[file_path]
+
+    async def delete_file(self, bucket_name, file_path, user_id):
+        return self.uploaded.pop(file_path, None) is not None
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = StorageService()
+    service.storage_repo = FakeStorageRepository()
+    service.rendered = []
+
+    async def render(file_metadata, original_data, user_id):
+        service.rendered.append(original_data)
+
+    service._generate_thumbnails = render
+    monkeypatch.setattr(storage_module, "get_pool", lambda: FakePool(PNG))
+    return service
+
+
+async def transfer(service: StorageService, max_retries=1):
+    result = await service._transfer_generation_file(uuid4(), uuid4(), None, "https://fal.media/out.png", 0,
+                                                     max_retries=max_retries, retry_delay=0)
+    await service.drain_thumbnail_tasks(timeout=1)
+    return result
+
+
+class TestStreamedThumbnails:
+    @pytest.mark.asyncio
+    async def test_image_is_rendered_from_the_stored_object(self, service):
+        await transfer(service)
+
+        assert service.rendered == [PNG]
+        assert service.storage_repo.downloads == 1
+        assert not service._thumbnail_tasks
+
+
+class TestPartialUploads:
+    @pytest.mark.asyncio
+    async def test_interrupted_upload_is_deleted_before_retrying(self, service):
+        service.storage_repo.failing_uploads = 1
+
+        result = await transfer(service, max_retries=2)
+
+        assert list(service.storage_repo.uploaded) == [result.file_path]
+
+    @pytest.mark.asyncio
+    async def test_upload_without_metadata_is_deleted(self, service):
+        service.storage_repo.failing_metadata = 1
+
+        with pytest.raises(RuntimeError, match="metadata insert failed"):
+            await transfer(service)
+
+        assert service.storage_repo.uploaded == {}
+
+
+class TestThumbnailTasks:
+    @pytest.mark.asyncio
+    async def test_failed_task_is_logged_and_released(self, service, caplog):
+        async def fail():
+            raise RuntimeError("render pool gone")
+
+        task = service._schedule_thumbnails(fail())
+        assert task in service._thumbnail_tasks
+
+        await service.drain_thumbnail_tasks(timeout=1)
+        await asyncio.sleep(0)
+
+        assert not service._thumbnail_tasks
+        assert "render pool gone" in caplog.text
@@ -0,0 +1,88 @@
+"""
+StreamingHistogram accuracy, merge and serialization tests.
+Quantiles are checked against the exact sample at the same rank.
+"""
+import math
+import random
+
+import pytest
+
+from monitoring.streaming_histogram import RELATIVE_ACCURACY, StreamingHistogram
+
+QUANTILES = [0.0, 0.1, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0]
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def histogram_of(values) -> StreamingHistogram:
+    histogram = StreamingHistogram()
+    for value in values:
+        histogram.record(value)
+    return histogram
+
+
+@pytest.fixture
+def latencies():
+    rng = random.Random(42)
+    return [rng.lognormvariate(3, 1.2) for _ in range(20000)]
+
+
+class TestQuantiles:
+    def test_quantiles_are_within_relative_accuracy(self, latencies):
+        histogram = histogram_of(latencies)
+
+        for q, estimate in zip(QUANTILES, histogram.quantiles(QUANTILES)):
+            exact = exact_quantile(latencies, q)
+            assert abs(estimate - exact) <= RELATIVE_ACCURACY * exact + 1e-9, q
+
+    def test_extremes_are_exact(self, latencies):
+        histogram = histogram_of(latencies)
+
+        assert histogram.quantile(0.0) == min(latencies)
+        assert histogram.quantile(1.0) == max(latencies)
+
+    def test_values_below_tracking_floor(self):
+        histogram = histogram_of([0, 0, 0, 5.0])
+
+        assert histogram.quantiles([0.5, 1.0]) == [0, 5.0]
+
+    def test_empty_histogram(self):
+        assert StreamingHistogram().quantiles([0.5, 0.99]) == [None, None]
+
+    def test_exact_moments(self):
+        histogram = histogram_of([1.0, 2.0, 3.0, 4.0])
+        histogram.record(10.0, success=False)
+
+        assert histogram.mean == 4.0
+        assert histogram.std_dev == pytest.approx(math.sqrt(12.5))
+        assert (histogram.count, histogram.successes) == (5, 4)
+
+
+class TestMerge:
+    def test_merged_histogram_matches_one_built_from_all_samples(self, latencies):
+        merged = StreamingHistogram()
+        for start in range(0, len(latencies), 5000):
+            merged.merge(histogram_of(latencies[start:start + 5000]))
+
+        combined = histogram_of(latencies)
+        assert merged.quantiles(QUANTILES) == combined.quantiles(QUANTILES)
+        assert merged.count == combined.count
+        assert merged.total == pytest.approx(combined.total)
+
+    def test_reset_keeps_nothing(self, latencies):
+        histogram = histogram_of(latencies)
+        histogram.reset()
+        histogram.record(7.0)
+
+        assert histogram.quantiles([0.0, 0.5, 1.0]) == [7.0, 7.0, 7.0]
+
+    def test_dict_round_trip(self, latencies):
+        histogram = histogram_of(latencies + [0])
+
+        restored = StreamingHistogram.from_dict(histogram.to_dict())
+
+        assert restored.quantiles(QUANTILES) == histogram.quantiles(QUANTILES)
+        assert restored.to_dict() == histogram.to_dict()
@@ -0,0 +1,459 @@
+"""
+Native async PostgREST / Storage engine.
+Talks to Supabase over one pooled keep-alive aiohttp session instead of
+running the synchronous supabase-py client on a thread pool. Used by
+SupabaseClient's *_async methods.
+
+aiohttp rather than httpx.AsyncClient: with the pinned httpcore, every async
+request scans all idle pooled connections, which made it slower than the
+thread pool it replaces at 500 concurrent requests
+(scripts/benchmark_async_postgrest.py).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import aiohttp
+from postgrest.exceptions import APIError
+from storage3.utils import StorageException
+
+from config import settings
+from utils.request_timing import record_span, span
+
+logger = logging.getLogger(__name__)
+
+# Characters that force PostgREST list values into double quotes
+_RESERVED_FILTER_CHARS = set(',.:()" ')
+
+
+def _json_loads(body: bytes) -> Any:
+    return json.loads(body)
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _format_list_value(value: Any) -> str:
+    text = _format_value(value)
+    if any(char in _RESERVED_FILTER_CHARS for char in text):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+
+def quote_filter_value(value: Any) -> str:
+    """Format a value for use inside an in.(...) list or an or=(...) tree."""
+    return _format_list_value(value)
+
+
+def _parse_content_range(header: Optional[str]) -> Optional[int]:
+    # "0-24/3573", "*/0" or "0-24/*" when no count was requested
+    if not header or "/" not in header:
+        return None
+    total = header.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+def build_filter_params(filters: Optional[Dict[str, Any]]) -> List[tuple]:
+    """PostgREST query params for equality filters; list values become in.(...)."""
+    params = []
+    for key, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            params.append((key, f"in.({','.join(_format_list_value(v) for v in value)})"))
+        else:
+            params.append((key, f"eq.{_format_value(value)}"))
+    return params
+
+
+class AsyncPostgrestEngine:
+    """
+    Pooled async HTTP access to PostgREST and Storage.
+
+    One connection pool is shared by all credentials; request headers for the
+    anon key, the service key and recently seen user JWTs are built once and
+    reused.
+    """
+
+    MAX_USER_HEADER_SETS = 1000
+
+    def __init__(self):
+        self.base_url = (getattr(settings, "supabase_url", "") or "").rstrip("/")
+        self.anon_key = getattr(settings, "supabase_anon_key", "") or ""
+        self.service_key = getattr(settings, "supabase_service_role_key", "") or ""
+
+        self.enabled = bool(self.base_url and self.anon_key) and \
+            os.getenv("ASYNC_POSTGREST_ENABLED", "true").lower() == "true"
+        self.max_connections = int(os.getenv("ASYNC_POSTGREST_MAX_CONNECTIONS", "100"))
+        self.default_timeout = float(os.getenv("ASYNC_POSTGREST_TIMEOUT", "30"))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._role_headers: Dict[str, Dict[str, str]] = {}
+        self._user_headers: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "total_time_ms": 0.0}
+
+    # -------------------------------------------------------------------------
+    # Connection and credential management
+    # -------------------------------------------------------------------------
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Sessions are bound to the loop that created their connections
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=300,
+                    ttl_dns_cache=300
+                ),
+                json_serialize=lambda obj: json.dumps(obj, default=str)
+            )
+            self._session_loop = loop
+            logger.info(f"🔗 [ASYNC-POSTGREST] HTTP session created (max_connections={self.max_connections})")
+        return self._session
+
+    def _timeout(self, timeout: Optional[float]) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=timeout or self.default_timeout, connect=5.0)
+
+    def _headers(self, use_service_key: bool, auth_token: Optional[str]) -> Dict[str, str]:
+        if use_service_key:
+            return self._role_headers.setdefault("service", {
+                "apikey": self.service_key,
+                "Authorization": f"Bearer {self.service_key}"
+            })
+        if not auth_token:
+            return self._role_headers.setdefault("anon", {
+                "apikey": self.anon_key,
+                "Authorization": f"Bearer {self.anon_key}"
+            })
+
+        headers = self._user_headers.get(auth_token)
+        if headers is None:
+            headers = {"apikey": self.anon_key, "Authorization": f"Bearer {auth_token}"}
+            self._user_headers[auth_token] = headers
+            if len(self._user_headers) > self.MAX_USER_HEADER_SETS:
+                self._user_headers.popitem(last=False)
+        else:
+            self._user_headers.move_to_end(auth_token)
+        return headers
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    # -------------------------------------------------------------------------
+    # PostgREST
+    # -------------------------------------------------------------------------
+
+    async def execute(
+        self,
+        table: str,
+        operation: str,
+        data: Optional[Any] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        use_service_key: bool = False,
+        single: bool = False,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        auth_token: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Same contract as SupabaseClient.execute_query: returns the row list,
+        or the first row (None when empty) for single writes.
+
+        Raises:
+            postgrest.exceptions.APIError: On PostgREST error responses
+            asyncio.TimeoutError: When the request exceeds timeout
+        """
+        params = build_filter_params(filters)
+        headers = dict(self._headers(use_service_key, auth_token))
+
+        if operation == "select":
+            method = "GET"
+            params.insert(0, ("select", "*"))
+            if order_by:
+                column, _, direction = order_by.partition(":")
+                params.append(("order", f"{column}.desc" if direction.lower() == "desc" else column))
+            if offset:
+                # Matches execute_query's range(): offset without limit returns 101 rows
+                limit = limit or 101
+                params.append(("offset", str(offset)))
+            if limit:
+                params.append(("limit", str(limit)))
+        elif operation == "insert":
+            if not data:
+                raise ValueError("Data required for insert operation")
+            method = "POST"
+            headers["Prefer"] = "return=representation"
+        elif operation == "update":
+            if not data:
+                raise ValueError("Data required for update operation")
+            method = "PATCH"
+            headers["Prefer"] = "return=representation"
+        elif operation == "delete":
+            method = "DELETE"
+            headers["Prefer"] = "return=representation"
+        else:
+            raise ValueError(f"Unsupported operation: {operation}")
+
+        rows = await self._request(
+            method, f"/rest/v1/{table}",
+            params=params, json=data if method in ("POST", "PATCH") else None,
+            headers=headers, timeout=timeout
+        )
+
+        if single and operation in ("insert", "update"):
+            return rows[0] if rows else None
+        if single and rows:
+            return rows[0]
+        return rows
+
+    async def select_page(
+        self,
+        table: str,
+        filters: Optional[Dict[str, Any]] = None,
+        order: Sequence[str] = (),
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        logic_filter: Optional[str] = None,
+        count: Optional[str] = None,
+        use_service_key: bool = False,
+        auth_token: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of rows plus, when count is "exact", "planned" or "estimated",
+        the total reported in Content-Range.
+
+        order holds PostgREST order terms ("created_at.desc"); logic_filter is
+        an or=(...) tree, e.g. a keyset predicate.
+        """
+        params = build_filter_params(filters)
+        params.insert(0, ("select", "*"))
+        if logic_filter:
+            params.append(("or", logic_filter))
+        if order:
+            params.append(("order", ",".join(order)))
+        if limit:
+            params.append(("limit", str(limit)))
+        if offset:
+            params.append(("offset", str(offset)))
+
+        headers = self._headers(use_service_key, auth_token)
+        if count:
+            headers = dict(headers)
+            headers["Prefer"] = f"count={count}"
+
+        return await self._request(
+            "GET", f"/rest/v1/{table}", params=params, headers=headers,
+            timeout=timeout, with_count=True
+        )
+
+    async def rpc(
+        self,
+        function_name: str,
+        params: Optional[Dict[str, Any]] = None,
+        use_service_key: bool = False,
+        auth_token: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Call a Postgres function through PostgREST."""
+        return await self._request(
+            "POST", f"/rest/v1/rpc/{function_name}",
+            json=params or {}, headers=self._headers(use_service_key, auth_token), timeout=timeout
+        )
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[List[tuple]] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        with_count: bool = False
+    ) -> Any:
+        start_time = time.perf_counter()
+        self.stats["requests"] += 1
+        try:
+            async with self._get_session().request(
+                method, f"{self.base_url}{path}", params=params, json=json,
+                headers=headers, timeout=self._timeout(timeout)
+            ) as response:
+                status = response.status
+                body = await response.read()
+                content_range = response.headers.get("Content-Range")
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            self.stats["total_time_ms"] += elapsed_ms
+            record_span("db", elapsed_ms)
+
+        if status >= 400:
+            self.stats["errors"] += 1
+            try:
+                error = _json_loads(body)
+            except ValueError:
+                error = {"message": body.decode(errors="replace")}
+            if not isinstance(error, dict):
+                error = {"message": str(error)}
+            error.setdefault("code", str(status))
+            raise APIError(error)
+
+        rows = [] if status == 204 or not body else _json_loads(body)
+        if with_count:
+            return rows, _parse_content_range(content_range)
+        return rows
+
+    # -------------------------------------------------------------------------
+    # Storage
+    # -------------------------------------------------------------------------
+
+    async def storage_upload(
+        self,
+        bucket: str,
+        path: str,
+        content: bytes,
+        content_type: str = "application/octet-stream",
+        upsert: bool = False,
+        timeout: Optional[float] = None,
+        cache_max_age: Optional[int] = None
+    ) -> Dict[str, Any]:
+        headers = dict(self._headers(True, None))
+        headers["Content-Type"] = content_type
+        headers["x-upsert"] = "true" if upsert else "false"
+        if cache_max_age is not None:
+            headers["Cache-Control"] = f"max-age={cache_max_age}"
+        return await self._storage_request(
+            "POST", f"/storage/v1/object/{bucket}/{quote(path)}",
+            content=content, headers=headers, timeout=timeout
+        )
+
+    async def storage_download(self, bucket: str, path: str, timeout: Optional[float] = None) -> bytes:
+        return await self._storage_request(
+            "GET", f"/storage/v1/object/{bucket}/{quote(path)}",
+            headers=self._headers(True, None), timeout=timeout, raw=True
+        )
+
+    async def storage_open(
+        self,
+        bucket: str,
+        path: str,
+        request_headers: Optional[Dict[str, str]] = None,
+        read_timeout: float = 30.0
+    ) -> aiohttp.ClientResponse:
+        """
+        Start a streaming GET of an object and return the open response; the
+        caller reads response.content and must release() it. Range and
+        conditional headers are forwarded, and 206/304/416 are returned
+        rather than raised. Only the time between reads is bounded, so large
+        downloads are not cut off by a total timeout.
+        """
+        self.stats["requests"] += 1
+        headers = {**self._headers(True, None), "Accept-Encoding": "identity", **(request_headers or {})}
+        # Time to response headers; the body is streamed by the caller
+        with span("storage"):
+            response = await self._get_session().get(
+                f"{self.base_url}/storage/v1/object/{bucket}/{quote(path)}",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=None, connect=5.0, sock_read=read_timeout)
+            )
+        if response.status >= 400 and response.status != 416:
+            body = await response.content.read(200)
+            response.release()
+            self.stats["errors"] += 1
+            raise StorageException({
+                "statusCode": response.status,
+                "message": f"Storage GET {bucket}/{path} failed: {body.decode(errors='replace')}"
+            })
+        return response
+
+    async def storage_create_signed_url(
+        self,
+        bucket: str,
+        path: str,
+        expires_in: int,
+        timeout: Optional[float] = None
+    ) -> str:
+        result = await self._storage_request(
+            "POST", f"/storage/v1/object/sign/{bucket}/{quote(path)}",
+            json={"expiresIn": expires_in}, headers=self._headers(True, None), timeout=timeout
+        )
+        return f"{self.base_url}/storage/v1{result.get('signedURL') or result.get('signedUrl')}"
+
+    async def storage_create_signed_urls(
+        self,
+        bucket: str,
+        paths: Sequence[str],
+        expires_in: int,
+        timeout: Optional[float] = None
+    ) -> Dict[str, str]:
+        """Sign many objects of one bucket in a single call. Paths the API rejects are omitted."""
+        result = await self._storage_request(
+            "POST", f"/storage/v1/object/sign/{bucket}",
+            json={"expiresIn": expires_in, "paths": list(paths)},
+            headers=self._headers(True, None), timeout=timeout
+        )
+        signed = {}
+        for item in result or []:
+            url = item.get("signedURL") or item.get("signedUrl")
+            if url and not item.get("error"):
+                signed[item["path"]] = f"{self.base_url}/storage/v1{url}"
+        return signed
+
+    async def _storage_request(
+        self,
+        method: str,
+        path: str,
+        headers: Dict[str, str],
+        json: Any = None,
+        content: Optional[bytes] = None,
+        timeout: Optional[float] = None,
+        raw: bool = False
+    ) -> Any:
+        self.stats["requests"] += 1
+        with span("storage"):
+            async with self._get_session().request(
+                method, f"{self.base_url}{path}", json=json, data=content,
+                headers=headers, timeout=self._timeout(timeout)
+            ) as response:
+                status = response.status
+                body = await response.read()
+
+        if status >= 400:
+            self.stats["errors"] += 1
+            raise StorageException({
+                "statusCode": status,
+                "message": f"Storage {method} {path} failed: {body[:200].decode(errors='replace')}"
+            })
+        return body if raw else _json_loads(body)
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        return {
+            "enabled": self.enabled,
+            "max_connections": self.max_connections,
+            **self.stats,
+            "avg_time_ms": self.stats["total_time_ms"] / requests if requests else 0.0
+        }
+
+
+# Global engine instance
+async_postgrest = AsyncPostgrestEngine()
@@ -0,0 +1,244 @@
+"""
+Shared async Redis access layer.
+One pooled redis.asyncio client per process. Commands issued through it in
+the same event-loop tick are sent as one non-transactional pipeline, so a
+burst of cache reads and rate-limit checks from concurrent requests costs one
+round trip instead of one each, and nothing blocks the event loop.
+
+Replies are raw bytes (decode_responses=False) because pickled cache values
+share the pool with JSON ones; json.loads accepts bytes directly.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from utils.request_timing import detached, span
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+except ImportError:  # pragma: no cover - redis is in requirements.txt
+    aioredis = None
+    RedisConnectionError = RedisTimeoutError = OSError
+
+_Command = Tuple[str, tuple, Dict[str, Any], asyncio.Future]
+
+
+class AsyncRedisUnavailable(Exception):
+    """No Redis is configured or the client could not be created."""
+
+
+class AsyncRedis:
+    """
+    Auto-pipelining async Redis client.
+
+    Every call queues its command and awaits a future; the first call in a
+    tick schedules a flush that sends everything queued so far (up to
+    max_pipeline commands per round trip) as one pipeline. A command that
+    fails raises from its own call only.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or getattr(settings, "redis_url", None)
+        self.enabled = bool(self.redis_url) and aioredis is not None and \
+            os.getenv("ASYNC_REDIS_ENABLED", "true").lower() == "true"
+        self.max_connections = int(os.getenv("ASYNC_REDIS_MAX_CONNECTIONS", "50"))
+        self.max_pipeline = int(os.getenv("ASYNC_REDIS_MAX_PIPELINE", "256"))
+        self.socket_timeout = float(os.getenv("ASYNC_REDIS_TIMEOUT", "2"))
+
+        self._client = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[_Command] = []
+        self._flush_scheduled = False
+
+        self.stats = {
+            "commands": 0,
+            "round_trips": 0,
+            "errors": 0,
+            "max_pipeline_size": 0,
+            "total_time_ms": 0.0
+        }
+
+    # -------------------------------------------------------------------------
+    # Connection management
+    # -------------------------------------------------------------------------
+
+    def client(self):
+        """
+        The underlying redis.asyncio client, for pub/sub, SCAN iteration and
+        explicit MULTI/EXEC pipelines that cannot be auto-batched.
+        """
+        if not self.enabled:
+            raise AsyncRedisUnavailable("Redis is not configured")
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Pooled connections are bound to the loop that opened them
+            self._client = aioredis.from_url(
+                self.redis_url,
+                max_connections=self.max_connections,
+                socket_connect_timeout=self.socket_timeout,
+                socket_timeout=self.socket_timeout,
+                socket_keepalive=True,
+                health_check_interval=30,
+                retry_on_timeout=True
+            )
+            self._client_loop = loop
+            self._pending.clear()
+            self._flush_scheduled = False
+            logger.info(f"🔗 [ASYNC-REDIS] Client created (max_connections={self.max_connections})")
+        return self._client
+
+    async def close(self):
+        client, self._client = self._client, None
+        self._client_loop = None
+        for _, _, _, future in self._pending:
+            if not future.done():
+                future.set_exception(AsyncRedisUnavailable("Redis client closed"))
+        self._pending.clear()
+        if client is not None:
+            await client.close()
+            await client.connection_pool.disconnect()
+
+    # -------------------------------------------------------------------------
+    # Auto-pipelining
+    # -------------------------------------------------------------------------
+
+    async def execute(self, command: str, *args, **kwargs) -> Any:
+        """Queue a redis-py command method (e.g. "get", "setex") for the next pipeline."""
+        self.client()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((command, args, kwargs, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        # Timed per caller: the flush runs in whichever request queued first
+        with span("redis"):
+            return await future
+
+    def _flush(self):
+        self._flush_scheduled = False
+        while self._pending:
+            batch = self._pending[:self.max_pipeline]
+            del self._pending[:self.max_pipeline]
+            asyncio.ensure_future(detached(self._send(batch)))
+
+    async def _send(self, batch: List[_Command]):
+        start_time = time.perf_counter()
+        self.stats["commands"] += len(batch)
+        self.stats["round_trips"] += 1
+        if len(batch) > self.stats["max_pipeline_size"]:
+            self.stats["max_pipeline_size"] = len(batch)
+
+        try:
+            client = self.client()
+            if len(batch) == 1:
+                command, args, kwargs, future = batch[0]
+                try:
+                    results = [await getattr(client, command)(*args, **kwargs)]
+                except (RedisConnectionError, RedisTimeoutError, OSError):
+                    raise
+                except Exception as e:
+                    results = [e]
+            else:
+                pipe = client.pipeline(transaction=False)
+                for command, args, kwargs, _ in batch:
+                    getattr(pipe, command)(*args, **kwargs)
+                results = await pipe.execute(raise_on_error=False)
+        except BaseException as e:
+            self.stats["errors"] += len(batch)
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        finally:
+            self.stats["total_time_ms"] += (time.perf_counter() - start_time) * 1000
+
+        for (_, _, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                self.stats["errors"] += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    # -------------------------------------------------------------------------
+    # Commands
+    # -------------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("get", key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return await self.execute("mget", keys) if keys else []
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> bool:
+        return await self.execute("set", key, value, ex=ex, nx=nx)
+
+    async def setex(self, key: str, ttl: int, value: Any) -> bool:
+        return await self.execute("setex", key, ttl, value)
+
+    async def delete(self, *keys: str) -> int:
+        return await self.execute("delete", *keys) if keys else 0
+
+    async def exists(self, key: str) -> int:
+        return await self.execute("exists", key)
+
+    async def incr(self, key: str) -> int:
+        return await self.execute("incr", key)
+
+    async def expire(self, key: str, ttl: int) -> bool:
+        return await self.execute("expire", key, ttl)
+
+    async def ttl(self, key: str) -> int:
+        return await self.execute("ttl", key)
+
+    async def lpush(self, key: str, *values: Any) -> int:
+        return await self.execute("lpush", key, *values)
+
+    async def ltrim(self, key: str, start: int, end: int) -> bool:
+        return await self.execute("ltrim", key, start, end)
+
+    async def lrange(self, key: str, start: int, end: int) -> List[bytes]:
+        return await self.execute("lrange", key, start, end)
+
+    async def sadd(self, key: str, *members: Any) -> int:
+        return await self.execute("sadd", key, *members)
+
+    async def srem(self, key: str, *members: Any) -> int:
+        return await self.execute("srem", key, *members)
+
+    async def smembers(self, key: str) -> set:
+        return await self.execute("smembers", key)
+
+    async def ping(self) -> bool:
+        return await self.execute("ping")
+
+    async def info(self) -> Dict[str, Any]:
+        return await self.execute("info")
+
+    async def scan_keys(self, match: str, count: int = 500) -> List[bytes]:
+        """All keys matching a pattern, via SCAN rather than the blocking KEYS."""
+        return [key async for key in self.client().scan_iter(match=match, count=count)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        round_trips = self.stats["round_trips"]
+        return {
+            "enabled": self.enabled,
+            "max_connections": self.max_connections,
+            **self.stats,
+            "avg_pipeline_size": self.stats["commands"] / round_trips if round_trips else 0.0,
+            "avg_round_trip_ms": self.stats["total_time_ms"] / round_trips if round_trips else 0.0
+        }
+
+
+# Global client instance
+async_redis = AsyncRedis()
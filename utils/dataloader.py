@@ -0,0 +1,148 @@
+"""
+DataLoader-style request coalescing.
+Loads issued in the same event loop tick are merged into one batch call;
+inside a request scope, results are also memoized for the rest of the request.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+BatchLoadFn = Callable[[List[K]], Awaitable[List[Optional[V]]]]
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Coalesces concurrent loads into batch calls.
+
+    batch_load_fn receives unique keys and must return one value (or None)
+    per key, in the same order. Failed batches are never memoized.
+    """
+
+    def __init__(self, batch_load_fn: BatchLoadFn, max_batch_size: int = 100, cache: bool = True):
+        self.batch_load_fn = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._memo: Dict[K, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+        self.batches_dispatched = 0
+        self.keys_loaded = 0
+
+    async def load(self, key: K) -> Optional[V]:
+        future = self._memo.get(key) if self.cache else None
+        if future is None:
+            future = self._pending.get(key)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                self._pending[key] = future
+                if not self._dispatch_scheduled:
+                    self._dispatch_scheduled = True
+                    loop.call_soon(self._dispatch)
+            if self.cache:
+                self._memo[key] = future
+
+        # Shield so one cancelled caller doesn't fail everyone sharing the batch
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: V):
+        """Seed the memo, e.g. with a record just written."""
+        if self.cache and key not in self._memo:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._memo[key] = future
+
+    def clear(self, key: K):
+        self._memo.pop(key, None)
+
+    def clear_all(self):
+        self._memo.clear()
+
+    def _dispatch(self):
+        self._dispatch_scheduled = False
+        pending = list(self._pending.items())
+        self._pending = {}
+
+        for start in range(0, len(pending), self.max_batch_size):
+            task = asyncio.ensure_future(self._load_batch(pending[start:start + self.max_batch_size]))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _load_batch(self, items: List[tuple]):
+        keys = [key for key, _ in items]
+        self.batches_dispatched += 1
+        self.keys_loaded += len(keys)
+
+        try:
+            values = await self.batch_load_fn(keys)
+            if len(values) != len(keys):
+                raise ValueError(f"DataLoader batch function returned {len(values)} values for {len(keys)} keys")
+        except Exception as e:
+            logger.warning(f"⚠️ [DATALOADER] Batch of {len(keys)} keys failed: {e}")
+            for key, future in items:
+                if self._memo.get(key) is future:
+                    del self._memo[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (key, future), value in zip(items, values):
+            if not future.done():
+                future.set_result(value)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "batches_dispatched": self.batches_dispatched,
+            "keys_loaded": self.keys_loaded,
+            "memoized": len(self._memo)
+        }
+
+
+_request_loaders: ContextVar[Optional[Dict[Any, DataLoader]]] = ContextVar("request_loaders", default=None)
+
+
+@contextmanager
+def dataloader_scope():
+    """Give the enclosed request its own set of memoizing loaders."""
+    token = _request_loaders.set({})
+    try:
+        yield
+    finally:
+        _request_loaders.reset(token)
+
+
+def get_request_loader(owner: Hashable, factory: Callable[[], DataLoader]) -> Optional[DataLoader]:
+    """
+    The current request's loader for owner, created on first use.
+    Returns None outside a dataloader_scope.
+    """
+    loaders = _request_loaders.get()
+    if loaders is None:
+        return None
+    loader = loaders.get(owner)
+    if loader is None:
+        loader = loaders[owner] = factory()
+    return loader
+
+
+def clear_request_loaders(match: Callable[[Hashable], bool]):
+    """Drop memoized results of the current request's loaders whose owner matches, e.g. after a write."""
+    loaders = _request_loaders.get()
+    if not loaders:
+        return
+    for owner, loader in loaders.items():
+        if match(owner):
+            loader.clear_all()
@@ -0,0 +1,95 @@
+"""
+Redis cache of generation inheritance chains for the authorization layer.
+Each cached chain is indexed under every generation in its lineage, so a
+write to any generation drops exactly the chains that include it. The
+repositories and services that write generations call
+invalidate_generation_lineage(); the TTL only bounds staleness from writes
+made outside the app (e.g. permission rows edited in SQL).
+
+Commands go through the shared utils.async_redis client (settings.redis_url).
+Redis failures never fail authorization: a failed read is a cache miss and a
+failed write or invalidation is logged.
+"""
+import json
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from utils.async_redis import async_redis
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationLineageCache:
+    """Inheritance chains keyed by generation, indexed by lineage."""
+
+    CHAIN_CACHE_PREFIX = "inheritance_chain:v2:"
+    LINEAGE_INDEX_PREFIX = "inheritance_lineage:"
+    CHAIN_CACHE_TTL = 600  # Safety net; lineage invalidation is the primary expiry
+
+    def __init__(self, redis_client: Optional[Any] = None):
+        self._redis_client = redis_client
+
+    @property
+    def redis_client(self):
+        """The injected client, else the shared pooled one (raises if Redis is not configured)."""
+        return self._redis_client or async_redis.client()
+
+    async def get(self, generation_id: Any) -> Optional[Dict[str, Any]]:
+        """Cached chain of a generation; None on a miss or when Redis is unavailable."""
+        try:
+            cached = await self.redis_client.get(f"{self.CHAIN_CACHE_PREFIX}{generation_id}")
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"⚠️ [INHERITANCE-CACHE] Chain cache read failed for {generation_id}: {e}")
+            return None
+
+    async def set(self, generation_id: Any, ancestor_ids: Iterable[Any], chain: Dict[str, Any]):
+        """Cache a chain and index it under the generation and each of its ancestors."""
+        try:
+            member = str(generation_id)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(f"{self.CHAIN_CACHE_PREFIX}{member}", self.CHAIN_CACHE_TTL, json.dumps(chain, default=str))
+                for lineage_id in [generation_id, *ancestor_ids]:
+                    index_key = f"{self.LINEAGE_INDEX_PREFIX}{lineage_id}"
+                    pipe.sadd(index_key, member)
+                    pipe.expire(index_key, self.CHAIN_CACHE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ [INHERITANCE-CACHE] Chain cache write failed for {generation_id}: {e}")
+
+    async def invalidate(self, generation_id: Any) -> int:
+        """
+        Drop the cached chain of a generation and of every descendant whose
+        lineage includes it.
+
+        Returns:
+            Number of cached chains invalidated
+        """
+        index_key = f"{self.LINEAGE_INDEX_PREFIX}{generation_id}"
+        try:
+            # The shared client replies with bytes
+            members = {m.decode() if isinstance(m, bytes) else m for m in await self.redis_client.smembers(index_key)}
+            members.add(str(generation_id))
+            removed = await self.redis_client.delete(*[f"{self.CHAIN_CACHE_PREFIX}{member}" for member in members])
+            await self.redis_client.delete(index_key)
+            logger.info(f"🔄 [INHERITANCE-CACHE] Invalidated lineage of {generation_id} ({removed} chains)")
+            return removed
+        except Exception as e:
+            logger.error(f"❌ [INHERITANCE-CACHE] Lineage invalidation failed for {generation_id}: {e}")
+            return 0
+
+
+async def invalidate_generation_lineage(*generation_ids: Optional[Any]) -> int:
+    """
+    Drop cached inheritance chains after a generation write. Pass the
+    generation and, when it changes, its parent (whose child list changed).
+    None entries are ignored, so callers can pass optional parents as-is.
+    """
+    removed = 0
+    for generation_id in dict.fromkeys(str(gid) for gid in generation_ids if gid):
+        removed += await generation_lineage_cache.invalidate(generation_id)
+    return removed
+
+
+# Global lineage cache instance
+generation_lineage_cache = GenerationLineageCache()
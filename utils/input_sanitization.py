@@ -17,7 +17,8 @@ import html
 import urllib.parse
 import base64
 import hashlib
-from typing import Any, Dict, List, Optional, Tuple, Union
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 from uuid import UUID
@@ -33,10 +34,78 @@ class ValidationError(Exception):
         self.attack_type = attack_type
         super().__init__(message)
 
+# Characters that re.IGNORECASE matches against ASCII letters but str.lower()
+# does not fold onto them
+_KEYWORD_CASE_FOLDS = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+_WORD_RE = re.compile(r"\w+")
+
+class PatternPrefilter:
+    """
+    Literal prefilter in front of a set of injection regexes.
+    
+    Every guarded pattern needs at least one trigger to match: one of the
+    trigger characters, one of the sequences (case-insensitive) or one of the
+    keywords as a whole word. A value with no trigger cannot match any of
+    them, so the regexes only run on the rare values that contain one.
+    """
+    
+    def __init__(self, trigger_chars: str, sequences: Iterable[str] = (), keywords: Iterable[str] = ()):
+        self.trigger_re = re.compile(f"[{trigger_chars}]")
+        self.sequences = tuple(sequence.lower() for sequence in sequences)
+        self.keywords: FrozenSet[str] = frozenset(keyword.lower() for keyword in keywords)
+    
+    def may_match(self, value: str) -> bool:
+        """Whether any guarded pattern could match value."""
+        if self.trigger_re.search(value):
+            return True
+        if not self.sequences and not self.keywords:
+            return False
+        folded = value.lower() if value.isascii() else value.translate(_KEYWORD_CASE_FOLDS).lower()
+        if any(sequence in folded for sequence in self.sequences):
+            return True
+        return bool(self.keywords) and not self.keywords.isdisjoint(_WORD_RE.findall(folded))
+
+class SanitizedValueCache:
+    """
+    Bounded LRU of values that already passed validation, keyed by value and
+    field schema, so a field checked by several layers of the same request is
+    only scanned once. Rejected values are never cached and are re-checked
+    (and logged) every time.
+    """
+    
+    def __init__(self, max_entries: int = 4096, max_value_length: int = 10000):
+        self.max_entries = max_entries
+        self.max_value_length = max_value_length
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple) -> Optional[Any]:
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+    
+    def put(self, key: Tuple, value: str, result: Any):
+        if len(value) > self.max_value_length:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
 class InputSanitizer:
     """
     Comprehensive input sanitization system with OWASP compliance.
     Prevents multiple attack vectors through layered validation.
+    
+    The pattern lists are compiled once at import. Each value first goes
+    through a literal prefilter for the enabled layers; only values that
+    contain a trigger run the layered regex checks, and values that passed
+    are cached per field schema.
     """
     
     # SQL injection patterns (comprehensive list)
@@ -66,7 +135,7 @@ class InputSanitizer:
         r";\s*(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER)",
         
         # Hex and unicode bypasses
-        r"(0x[0-9a-fA-F]+)|(\\\u[0-9a-fA-F]{4})",
+        r"(0x[0-9a-fA-F]+)|(\\u[0-9a-fA-F]{4})",
         
         # Function calls that might indicate injection
         r"\b(CONCAT|CHAR|ASCII|ORD|LENGTH|SUBSTRING|MID|LEFT|RIGHT)\s*\(",
@@ -141,6 +210,48 @@ class InputSanitizer:
         r"(<\(|\)\s*>)",
     ]
     
+    # Prefilter triggers per layer: every pattern above (and every character
+    # a layer rewrites) needs one of these to match. Keep them in step.
+    SQL_INJECTION_TRIGGERS = (
+        r";#'(/\\",
+        ['--', '0x'],
+        ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER', 'EXEC', 'EXECUTE',
+         'UNION', 'SCRIPT', 'AND', 'OR', 'NOT', 'XOR', 'LIKE', 'IN', 'EXISTS', 'BETWEEN', 'NULL']
+    )
+    XSS_TRIGGERS = (
+        r"""<>&"'/`=(%""",
+        ['script', 'data', '@import'],
+        []
+    )
+    PATH_TRAVERSAL_TRIGGERS = (
+        r"/\\%",
+        [],
+        []
+    )
+    COMMAND_INJECTION_TRIGGERS = (
+        r";&|`$(){}<>",
+        [],
+        ['cat', 'ls', 'pwd', 'whoami', 'id', 'uname', 'ps', 'kill', 'rm', 'cp', 'mv', 'chmod',
+         'chown', 'su', 'sudo', 'curl', 'wget', 'nc', 'netcat', 'dir', 'type', 'copy', 'del',
+         'ren', 'attrib', 'net', 'ping', 'ipconfig', 'tasklist', 'taskkill']
+    )
+    
+    # Compiled once at import
+    _SQL_INJECTION_RES = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in SQL_INJECTION_PATTERNS]
+    _XSS_RES = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in XSS_PATTERNS]
+    _PATH_TRAVERSAL_RES = [re.compile(p, re.IGNORECASE) for p in PATH_TRAVERSAL_PATTERNS]
+    _COMMAND_INJECTION_RES = [re.compile(p, re.IGNORECASE) for p in COMMAND_INJECTION_PATTERNS]
+    _EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    _URL_RE = re.compile(r'^https?://[a-zA-Z0-9.-]+(?:\.[a-zA-Z]{2,})+(?:/[^\s]*)?$')
+    _ALPHANUMERIC_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+    _BASE64_RE = re.compile(r'^[A-Za-z0-9+/]*={0,2}$')
+    _WHITESPACE_RE = re.compile(r'\s+')
+    _CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b-\x1f]')
+    
+    # Prefilter per (strict_mode, allow_html), built after the class body
+    _PREFILTERS: Dict[Tuple[bool, bool], PatternPrefilter] = {}
+    _clean_cache = SanitizedValueCache()
+    
     # File extension validation
     ALLOWED_FILE_EXTENSIONS = {
         'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp', '.tiff'],
@@ -198,23 +309,31 @@ class InputSanitizer:
                     "length_violation"
                 )
             
+            # Same value and field schema already passed (e.g. in another middleware)
+            cache_key = (value, input_type, allow_html, strict_mode)
+            cached = cls._clean_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Apply sanitization layers
             sanitized_value = value
             
-            # 1. SQL Injection Protection
-            if strict_mode:
-                sanitized_value = cls._prevent_sql_injection(sanitized_value, field_name)
-            
-            # 2. XSS Protection
-            if not allow_html:
-                sanitized_value = cls._prevent_xss(sanitized_value, field_name)
-            
-            # 3. Path Traversal Protection
-            sanitized_value = cls._prevent_path_traversal(sanitized_value, field_name)
-            
-            # 4. Command Injection Protection
-            if strict_mode:
-                sanitized_value = cls._prevent_command_injection(sanitized_value, field_name)
+            # A value without any trigger passes layers 1-4 unchanged
+            if cls._PREFILTERS[(strict_mode, allow_html)].may_match(value):
+                # 1. SQL Injection Protection
+                if strict_mode:
+                    sanitized_value = cls._prevent_sql_injection(sanitized_value, field_name)
+                
+                # 2. XSS Protection
+                if not allow_html:
+                    sanitized_value = cls._prevent_xss(sanitized_value, field_name)
+                
+                # 3. Path Traversal Protection
+                sanitized_value = cls._prevent_path_traversal(sanitized_value, field_name)
+                
+                # 4. Command Injection Protection
+                if strict_mode:
+                    sanitized_value = cls._prevent_command_injection(sanitized_value, field_name)
             
             # 5. Type-specific validation
             sanitized_value = cls._validate_by_type(sanitized_value, input_type, field_name)
@@ -222,6 +341,7 @@ class InputSanitizer:
             # 6. Final cleanup
             sanitized_value = cls._final_cleanup(sanitized_value)
             
+            cls._clean_cache.put(cache_key, value, sanitized_value)
             return sanitized_value
             
         except ValidationError:
@@ -235,8 +355,8 @@ class InputSanitizer:
         """Detect and prevent SQL injection attempts."""
         original_value = value
         
-        for pattern in cls.SQL_INJECTION_PATTERNS:
-            matches = re.finditer(pattern, value, re.IGNORECASE | re.MULTILINE)
+        for pattern in cls._SQL_INJECTION_RES:
+            matches = pattern.finditer(value)
             for match in matches:
                 matched_text = match.group()
                 logger.warning(f"🚨 [SANITIZER] SQL injection attempt in {field_name}: '{matched_text}'")
@@ -275,8 +395,8 @@ class InputSanitizer:
         """Detect and prevent XSS attempts."""
         original_value = value
         
-        for pattern in cls.XSS_PATTERNS:
-            if re.search(pattern, value, re.IGNORECASE | re.DOTALL):
+        for pattern in cls._XSS_RES:
+            if pattern.search(value):
                 logger.warning(f"🚨 [SANITIZER] XSS attempt in {field_name}: {value[:100]}...")
                 raise ValidationError(
                     "Input contains potentially malicious script content",
@@ -306,8 +426,8 @@ class InputSanitizer:
     @classmethod
     def _prevent_path_traversal(cls, value: str, field_name: str) -> str:
         """Detect and prevent path traversal attempts."""
-        for pattern in cls.PATH_TRAVERSAL_PATTERNS:
-            if re.search(pattern, value, re.IGNORECASE):
+        for pattern in cls._PATH_TRAVERSAL_RES:
+            if pattern.search(value):
                 logger.warning(f"🚨 [SANITIZER] Path traversal attempt in {field_name}: {value}")
                 raise ValidationError(
                     "Input contains path traversal characters",
@@ -318,8 +438,8 @@ class InputSanitizer:
         # URL decode to catch encoded attempts
         try:
             decoded = urllib.parse.unquote(value)
-            for pattern in cls.PATH_TRAVERSAL_PATTERNS:
-                if re.search(pattern, decoded, re.IGNORECASE):
+            for pattern in cls._PATH_TRAVERSAL_RES:
+                if pattern.search(decoded):
                     logger.warning(f"🚨 [SANITIZER] Encoded path traversal in {field_name}: {value}")
                     raise ValidationError(
                         "Input contains encoded path traversal",
@@ -334,8 +454,8 @@ class InputSanitizer:
     @classmethod
     def _prevent_command_injection(cls, value: str, field_name: str) -> str:
         """Detect and prevent command injection attempts."""
-        for pattern in cls.COMMAND_INJECTION_PATTERNS:
-            matches = re.finditer(pattern, value, re.IGNORECASE)
+        for pattern in cls._COMMAND_INJECTION_RES:
+            matches = pattern.finditer(value)
             for match in matches:
                 matched_text = match.group()
                 logger.warning(f"🚨 [SANITIZER] Command injection attempt in {field_name}: '{matched_text}'")
@@ -381,8 +501,7 @@ class InputSanitizer:
     def _validate_email(cls, email: str, field_name: str) -> str:
         """Validate email format and security."""
         # Basic format validation
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, email):
+        if not cls._EMAIL_RE.match(email):
             raise ValidationError("Invalid email format", field_name, "email_format_error")
         
         # Length limits per RFC 5321
@@ -411,8 +530,7 @@ class InputSanitizer:
     def _validate_url(cls, url: str, field_name: str) -> str:
         """Validate URL format and security."""
         # Basic URL pattern
-        url_pattern = r'^https?://[a-zA-Z0-9.-]+(?:\.[a-zA-Z]{2,})+(?:/[^\s]*)?$'
-        if not re.match(url_pattern, url):
+        if not cls._URL_RE.match(url):
             raise ValidationError("Invalid URL format", field_name, "url_format_error")
         
         # Security checks
@@ -509,7 +627,7 @@ class InputSanitizer:
     @classmethod
     def _validate_alphanumeric(cls, value: str, field_name: str) -> str:
         """Validate alphanumeric input."""
-        if not re.match(r'^[a-zA-Z0-9_-]+$', value):
+        if not cls._ALPHANUMERIC_RE.match(value):
             raise ValidationError("Only alphanumeric characters, underscores, and hyphens allowed", field_name, "alphanumeric_error")
         return value
     
@@ -518,7 +636,7 @@ class InputSanitizer:
         """Validate base64 format."""
         try:
             # Check base64 pattern
-            if not re.match(r'^[A-Za-z0-9+/]*={0,2}$', value):
+            if not cls._BASE64_RE.match(value):
                 raise ValidationError("Invalid base64 format", field_name, "base64_format_error")
             
             # Try to decode
@@ -534,10 +652,10 @@ class InputSanitizer:
         value = value.replace('\x00', '')
         
         # Normalize whitespace
-        value = re.sub(r'\s+', ' ', value).strip()
+        value = cls._WHITESPACE_RE.sub(' ', value).strip()
         
         # Remove control characters (except newlines and tabs)
-        value = ''.join(char for char in value if ord(char) >= 32 or char in '\n\t')
+        value = cls._CONTROL_CHARS_RE.sub('', value)
         
         return value
     
@@ -556,6 +674,23 @@ class InputSanitizer:
         else:
             return data
 
+def _build_prefilters():
+    """Build the prefilter for each (strict_mode, allow_html) layer combination."""
+    for strict_mode in (True, False):
+        for allow_html in (True, False):
+            layers = [InputSanitizer.PATH_TRAVERSAL_TRIGGERS]
+            if strict_mode:
+                layers += [InputSanitizer.SQL_INJECTION_TRIGGERS, InputSanitizer.COMMAND_INJECTION_TRIGGERS]
+            if not allow_html:
+                layers.append(InputSanitizer.XSS_TRIGGERS)
+            InputSanitizer._PREFILTERS[(strict_mode, allow_html)] = PatternPrefilter(
+                "".join(chars for chars, _, _ in layers),
+                [sequence for _, sequences, _ in layers for sequence in sequences],
+                [keyword for _, _, keywords in layers for keyword in keywords]
+            )
+
+_build_prefilters()
+
 class BusinessLogicValidator:
     """
     Business logic validation for application-specific rules.
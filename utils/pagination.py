@@ -2,12 +2,28 @@
 Pagination utilities for database queries.
 Following CLAUDE.md: Consistent pagination patterns.
 Fixed for Supabase compatibility without SQLAlchemy dependency.
+
+Listings page with a (created_at, id) keyset: the cursor carries the last
+row's sort key, so every page is one indexed range scan of limit + 1 rows
+no matter how deep it is.
 """
-from typing import Tuple, List, Any, TypeVar
+import base64
+import json
+from datetime import datetime
+from typing import Tuple, List, Any, Dict, Optional, TypeVar
 from pydantic import BaseModel, Field
 
+from utils.async_postgrest import quote_filter_value
+
 T = TypeVar('T')
 
+# Prefer: count=<method> values PostgREST accepts
+COUNT_METHODS = ("exact", "planned", "estimated")
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
 
 class PaginationParams(BaseModel):
     """Pagination parameters for API requests."""
@@ -41,33 +57,134 @@ class PaginatedResponse(BaseModel):
     meta: PaginationMeta
 
 
+class KeysetPage(BaseModel):
+    """One page of a keyset-paginated listing."""
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Opaque cursor pointing just past the row with this sort key."""
+    payload = json.dumps([created_at, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Inverse of encode_cursor.
+    
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(payload)
+        if not isinstance(created_at, str) or not isinstance(row_id, str):
+            raise ValueError("cursor fields must be strings")
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {e}") from e
+    return created_at, row_id
+
+
+def keyset_filter(created_at: str, row_id: str, descending: bool = True) -> str:
+    """
+    PostgREST or=(...) tree selecting rows after (created_at, id) in
+    (created_at, id) order.
+    """
+    op = "lt" if descending else "gt"
+    created_at, row_id = quote_filter_value(created_at), quote_filter_value(row_id)
+    return f"(created_at.{op}.{created_at},and(created_at.eq.{created_at},id.{op}.{row_id}))"
+
+
+async def fetch_keyset_page(
+    db,
+    table: str,
+    filters: Optional[Dict[str, Any]] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    count: Optional[str] = None,
+    use_service_key: bool = False,
+    auth_token: Optional[str] = None,
+    descending: bool = True
+) -> KeysetPage:
+    """
+    Fetch one page ordered by (created_at, id), newest first by default.
+    
+    Ordering, the keyset predicate and the limit run in PostgREST; only
+    limit + 1 rows come back (the extra row tells whether a next page
+    exists). offset is honoured only without a cursor, for legacy
+    skip/limit callers.
+    
+    Args:
+        db: SupabaseClient
+        cursor: next_cursor from the previous page
+        count: Optional "exact", "planned" or "estimated" total. With a
+            cursor it counts only the rows from the cursor onward, so ask
+            for it on the first page.
+    
+    Raises:
+        InvalidCursorError: If cursor is malformed
+        ValueError: If count is not a PostgREST count method
+    """
+    if count is not None and count not in COUNT_METHODS:
+        raise ValueError(f"count must be one of {COUNT_METHODS}")
+    
+    direction = ".desc" if descending else ""
+    logic_filter = None
+    if cursor:
+        logic_filter = keyset_filter(*decode_cursor(cursor), descending=descending)
+        offset = 0
+    
+    rows, total = await db.execute_page_async(
+        table,
+        filters=filters,
+        order=[f"created_at{direction}", f"id{direction}"],
+        limit=limit + 1,
+        offset=offset or None,
+        logic_filter=logic_filter,
+        count=count,
+        use_service_key=use_service_key,
+        auth_token=auth_token
+    )
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(str(last["created_at"]), str(last["id"]))
+    
+    return KeysetPage(items=rows, next_cursor=next_cursor, total=total)
+
+
 async def paginate_supabase_query(
     table_query,
     pagination: PaginationParams,
-    count_column: str = "*"
-) -> Tuple[List[Any], int]:
+    count: Optional[str] = "exact"
+) -> Tuple[List[Any], Optional[int]]:
     """
     Paginate a Supabase query and return results with total count.
     
+    The total comes back in the same response as the page (Content-Range),
+    not from a second query. Prefer fetch_keyset_page for deep listings.
+    
     Args:
         table_query: Supabase table query object
         pagination: Pagination parameters
-        count_column: Column to count for total (default: *)
+        count: "exact", "planned", "estimated", or None to skip the total
     
     Returns:
-        Tuple of (paginated results, total count)
+        Tuple of (paginated results, total count or None)
     """
-    # Get total count first
-    count_result = table_query.select(f"count({count_column})", count="exact").execute()
-    total = count_result.count if hasattr(count_result, 'count') else 0
-    
-    # Apply pagination and get data
-    paginated_result = (table_query
-                       .select("*")
-                       .range(pagination.offset, pagination.offset + pagination.limit - 1)
-                       .execute())
+    result = (table_query
+              .select("*", count=count)
+              .range(pagination.offset, pagination.offset + pagination.limit - 1)
+              .execute())
     
-    items = paginated_result.data if hasattr(paginated_result, 'data') else []
+    items = result.data if hasattr(result, 'data') else []
+    total = getattr(result, 'count', None) if count else None
     
     return items, total
 
@@ -0,0 +1,422 @@
+"""
+Authenticated principal caching for the auth middleware.
+Verifies Supabase JWTs locally (HS256 secret or cached JWKS keys), caches
+verified principals until token expiry and user profiles until invalidated,
+and remembers signed-out tokens until they expire.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import jwt
+
+from config import settings
+from utils.connection_pool import get_pool
+from utils.request_timing import detached
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyStore:
+    """
+    Supabase signing keys fetched from the JWKS endpoint.
+    Keys are refreshed in the background; an unknown kid triggers a
+    rate-limited refetch so key rotation is picked up without restarts.
+    """
+
+    REFRESH_INTERVAL = 600.0
+    MIN_REFETCH_INTERVAL = 30.0
+    FETCH_TIMEOUT = 5.0
+
+    def __init__(self, jwks_url: str, api_key: Optional[str] = None):
+        self.jwks_url = jwks_url
+        self.api_key = api_key
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._last_fetch = 0.0
+        self._fetch_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def get_key(self, kid: str) -> Optional[jwt.PyJWK]:
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_fetch >= self.MIN_REFETCH_INTERVAL:
+            await self.refresh()
+            key = self._keys.get(kid)
+        self._ensure_refresher()
+        return key
+
+    async def refresh(self):
+        if self._fetch_lock is None:
+            self._fetch_lock = asyncio.Lock()
+        async with self._fetch_lock:
+            # Another coroutine may have refreshed while we waited
+            if time.monotonic() - self._last_fetch < 1.0:
+                return
+            self._last_fetch = time.monotonic()
+            try:
+                headers = {"apikey": self.api_key} if self.api_key else {}
+                async with get_pool().get_connection() as client:
+                    response = await client.get(self.jwks_url, headers=headers, timeout=self.FETCH_TIMEOUT)
+                    response.raise_for_status()
+                    data = response.json()
+
+                keys = {}
+                for jwk in data.get("keys", []):
+                    try:
+                        key = jwt.PyJWK(jwk)
+                        if key.key_id:
+                            keys[key.key_id] = key
+                    except jwt.PyJWTError as e:
+                        logger.debug(f"Skipping unusable JWKS key: {e}")
+                self._keys = keys
+                logger.info(f"🔑 [PRINCIPAL-CACHE] Loaded {len(keys)} JWKS signing keys")
+            except Exception as e:
+                # Keep serving the keys we already have
+                logger.warning(f"⚠️ [PRINCIPAL-CACHE] JWKS refresh failed: {e}")
+
+    def _ensure_refresher(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(detached(self._refresh_loop()))
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.REFRESH_INTERVAL)
+            await self.refresh()
+
+    async def shutdown(self):
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        self._refresh_task = None
+
+
+class LocalJWTVerifier:
+    """Verifies Supabase access tokens without calling the auth server."""
+
+    AUDIENCE = "authenticated"
+    ALLOWED_ROLES = ("authenticated", "service_role")
+    ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+    def __init__(self):
+        # Supabase's signing secret only; settings.jwt_secret signs the app's own tokens
+        self.jwt_secret = os.getenv("SUPABASE_JWT_SECRET") or os.getenv("JWT_SECRET_KEY") or None
+
+        supabase_url = (getattr(settings, "supabase_url", "") or "").rstrip("/")
+        self.jwks = JWKSKeyStore(
+            f"{supabase_url}/auth/v1/.well-known/jwks.json",
+            getattr(settings, "supabase_anon_key", None)
+        ) if supabase_url else None
+
+    def can_verify(self, token: str) -> bool:
+        """Whether this token's algorithm can be checked locally with the configured keys."""
+        try:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+        except jwt.PyJWTError:
+            return False
+        if algorithm == "HS256":
+            return bool(self.jwt_secret)
+        return algorithm in self.ASYMMETRIC_ALGORITHMS and self.jwks is not None
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify signature, expiry, audience and role.
+
+        Raises:
+            jwt.InvalidTokenError: If the token is not acceptable
+        """
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                raise jwt.InvalidTokenError("JWT secret not configured")
+            key = self.jwt_secret
+        elif algorithm in self.ASYMMETRIC_ALGORITHMS and self.jwks is not None:
+            signing_key = await self.jwks.get_key(header.get("kid") or "")
+            if signing_key is None:
+                raise jwt.InvalidTokenError("Unknown signing key")
+            key = signing_key.key
+        else:
+            raise jwt.InvalidTokenError(f"Unsupported algorithm: {algorithm}")
+
+        payload = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.AUDIENCE,
+            options={"require": ["exp", "sub"]}
+        )
+        if payload.get("role") not in self.ALLOWED_ROLES:
+            raise jwt.InvalidTokenError("Insufficient role")
+        return payload
+
+
+def token_key(token: str) -> str:
+    """Cache key for a token: a hash of the full token, never a claim from it."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenRevocations:
+    """
+    Hashes of signed-out tokens, kept until the token's own exp. A signed-out
+    token is still cryptographically valid, so local verification alone
+    would accept it (and cache it again) until it expires.
+    """
+
+    # Used when a revoked token carries no readable exp
+    DEFAULT_TTL = 86400.0
+    MAX_ENTRIES = 100000
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+
+    def revoke(self, token: str) -> Tuple[str, float]:
+        """Revoke a token; returns its key and expiry for relaying to other nodes."""
+        try:
+            expires_at = float(jwt.decode(token, options={"verify_signature": False})["exp"])
+        except Exception:
+            expires_at = time.time() + self.DEFAULT_TTL
+        key = token_key(token)
+        self.add(key, expires_at)
+        return key, expires_at
+
+    def add(self, key: str, expires_at: float):
+        if expires_at <= time.time():
+            return
+        self._entries[key] = expires_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+    def is_revoked(self, token: str) -> bool:
+        return self.contains(token_key(token))
+
+    def contains(self, key: str) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            # The token has expired on its own; verification rejects it now
+            del self._entries[key]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PrincipalCache:
+    """
+    Verified token claims keyed by a hash of the full token, kept until the
+    token's own exp. Keying on the hash (not the jti claim) means a forged
+    token can never hit an entry created by a genuine one.
+
+    Each auth middleware keeps its own instance: they store differently
+    shaped principals for the same token.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self, name: str, revocations: TokenRevocations):
+        self.name = name
+        self.revocations = revocations
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = token_key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time() or self.revocations.contains(key):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, token: str, principal: Dict[str, Any], expires_at: Optional[float]):
+        if not expires_at or expires_at <= time.time():
+            return
+        key = token_key(token)
+        if self.revocations.contains(key):
+            return
+        self._entries[key] = (principal, float(expires_at))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+    def evict(self, token: str):
+        self._entries.pop(token_key(token), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class ProfileCache:
+    """
+    User profile rows (display name, credits, role) for the auth middleware.
+    Entries are dropped when the profile or credit balance changes; the TTL
+    is only a safety net. Invalidations are relayed to other nodes through
+    Redis pub/sub when Redis is configured.
+    """
+
+    PUBSUB_CHANNEL = "auth:profile_invalidation"
+    TTL = 300.0
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._node_id = os.urandom(8).hex()
+        self.pubsub_enabled = bool(getattr(settings, "redis_url", None)) and \
+            os.getenv("AUTH_PROFILE_PUBSUB", "true").lower() == "true"
+        self._redis = None
+        self._pubsub_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        key = str(user_id)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, user_id: str, profile: Dict[str, Any]):
+        key = str(user_id)
+        self._entries[key] = (profile, time.monotonic() + self.TTL)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+        self._ensure_listener()
+
+    async def get_or_load(
+        self,
+        user_id: str,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        profile = self.get(user_id)
+        if profile is None:
+            profile = await loader()
+            if profile:
+                self.set(user_id, profile)
+        return profile
+
+    def invalidate(self, user_id: str, publish: bool = True):
+        self._entries.pop(str(user_id), None)
+        self.invalidations += 1
+        self._ensure_listener()
+        if publish and self._redis is not None:
+            try:
+                asyncio.get_running_loop().create_task(
+                    self._publish({"user_id": str(user_id)}, f"profile invalidation for {user_id}")
+                )
+            except RuntimeError:
+                pass  # No running loop (sync caller); local entry is already gone
+
+    def publish_revocation(self, key: str, expires_at: float):
+        """Relay a token revocation to the other nodes."""
+        self._ensure_listener()
+        if self._redis is not None:
+            try:
+                asyncio.get_running_loop().create_task(
+                    self._publish({"revoked": key, "expires_at": expires_at}, "token revocation")
+                )
+            except RuntimeError:
+                pass
+
+    async def _publish(self, message: Dict[str, Any], what: str):
+        try:
+            await self._redis.publish(self.PUBSUB_CHANNEL, json.dumps({"origin": self._node_id, **message}))
+        except Exception as e:
+            logger.warning(f"⚠️ [PRINCIPAL-CACHE] Failed to publish {what}: {e}")
+
+    def _ensure_listener(self):
+        if self.pubsub_enabled and self._pubsub_task is None:
+            try:
+                self._pubsub_task = asyncio.get_running_loop().create_task(detached(self._pubsub_listener()))
+            except RuntimeError:
+                pass
+
+    async def _pubsub_listener(self):
+        """Apply profile invalidations and token revocations published by other nodes."""
+        try:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+            pubsub = self._redis.pubsub()
+            await pubsub.subscribe(self.PUBSUB_CHANNEL)
+            logger.info("✅ [PRINCIPAL-CACHE] Subscribed to profile invalidation channel")
+
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                    if data.get("origin") == self._node_id:
+                        continue
+                    if "revoked" in data:
+                        token_revocations.add(data["revoked"], float(data["expires_at"]))
+                    else:
+                        self.invalidate(data["user_id"], publish=False)
+                except Exception as e:
+                    logger.warning(f"⚠️ [PRINCIPAL-CACHE] Ignoring malformed invalidation message: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ [PRINCIPAL-CACHE] Redis pub/sub unavailable, profile invalidation is node-local: {e}")
+            self._redis = None
+
+    async def shutdown(self):
+        if self._pubsub_task and not self._pubsub_task.done():
+            self._pubsub_task.cancel()
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception:
+                pass
+            self._redis = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+
+def revoke_token(token: str):
+    """Reject a token until its exp on every node, e.g. on sign-out."""
+    key, expires_at = token_revocations.revoke(token)
+    profile_cache.publish_revocation(key, expires_at)
+
+
+def invalidate_user_profile(user_id: Any):
+    """Drop a user's cached profile; call after any profile or credit balance change."""
+    profile_cache.invalidate(str(user_id))
+
+
+async def shutdown():
+    if jwt_verifier.jwks is not None:
+        await jwt_verifier.jwks.shutdown()
+    await profile_cache.shutdown()
+
+
+# Global service instances
+jwt_verifier = LocalJWTVerifier()
+token_revocations = TokenRevocations()
+# Principals for middleware.auth_refactored ({"id", "email", "role", **claims})
+principal_cache = PrincipalCache("claims", token_revocations)
+# Principals for middleware.auth ({"user_id", "email", "claims"})
+session_principal_cache = PrincipalCache("session", token_revocations)
+profile_cache = ProfileCache()
@@ -0,0 +1,242 @@
+"""
+Per-request stage timing.
+RequestTrackingMiddleware opens a RequestTimer for each HTTP request in a
+context variable; database, storage, cache, Redis and FAL calls report into
+whichever timer is current, so nothing is threaded through call signatures.
+asyncio tasks inherit a copy of the context they are created in, so work
+that outlives a request (background generation processing, thumbnails,
+pollers) is spawned through detached() and records nothing; a finished timer
+also ignores late spans from any task that was not.
+
+A stage's spans add up, so concurrent calls (gathered queries) can total
+more than the request's wall time. Totals feed the Server-Timing header and
+per-route StreamingHistograms; slow requests can optionally be logged with
+their full span timeline.
+"""
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+from monitoring.streaming_histogram import StreamingHistogram
+
+logger = logging.getLogger(__name__)
+
+perf_counter = time.perf_counter
+
+# Spans kept per request for the slow-request timeline
+MAX_TIMELINE_SPANS = 256
+# Routes tracked separately; later ones share the "other" bucket
+MAX_ROUTES = 200
+
+_current_timer: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+T = TypeVar("T")
+
+
+class RequestTimer:
+    """Stage totals (and optionally a span timeline) for one request."""
+
+    __slots__ = ("started", "stages", "timeline", "closed")
+
+    def __init__(self, keep_timeline: bool = False):
+        self.started = perf_counter()
+        # stage -> [total_ms, calls]
+        self.stages: Dict[str, List[float]] = {}
+        self.timeline: Optional[List[Tuple[str, float, float]]] = [] if keep_timeline else None
+        self.closed = False
+
+    def record(self, stage: str, start: float, end: float):
+        if self.closed:
+            return
+        duration_ms = (end - start) * 1000
+        totals = self.stages.get(stage)
+        if totals is None:
+            self.stages[stage] = [duration_ms, 1]
+        else:
+            totals[0] += duration_ms
+            totals[1] += 1
+        if self.timeline is not None and len(self.timeline) < MAX_TIMELINE_SPANS:
+            self.timeline.append((stage, (start - self.started) * 1000, duration_ms))
+
+    def server_timing(self, extra: Optional[Dict[str, float]] = None) -> str:
+        """Server-Timing header value for the stages recorded so far."""
+        parts = []
+        for stage, (total_ms, calls) in self.stages.items():
+            if calls > 1:
+                parts.append(f'{stage};dur={total_ms:.2f};desc="{int(calls)} calls"')
+            else:
+                parts.append(f"{stage};dur={total_ms:.2f}")
+        for name, duration_ms in (extra or {}).items():
+            parts.append(f"{name};dur={duration_ms:.2f}")
+        return ", ".join(parts)
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current_timer.get()
+
+
+class span:
+    """
+    Time a block as one call of a stage of the current request:
+
+        with span("db"):
+            rows = await async_postgrest.execute(...)
+
+    A no-op outside a request.
+    """
+
+    __slots__ = ("stage", "timer", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.timer = _current_timer.get()
+        if self.timer is not None:
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.timer is not None:
+            self.timer.record(self.stage, self.start, perf_counter())
+        return False
+
+
+def record_span(stage: str, duration_ms: float):
+    """Report a duration measured elsewhere, ending now."""
+    timer = _current_timer.get()
+    if timer is not None:
+        end = perf_counter()
+        timer.record(stage, end - duration_ms / 1000, end)
+
+
+async def detached(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine outside the current request's timer:
+
+        asyncio.create_task(detached(self._process_generation(...)))
+
+    The task's context copy is cleared, so its spans are not charged to the
+    request that happened to spawn it.
+    """
+    _current_timer.set(None)
+    return await coro
+
+
+def route_key(scope: Dict[str, Any]) -> str:
+    """
+    "METHOD /path/{param}" for the matched route, so per-route stats do not
+    fan out per ID. Starlette leaves path_params in the scope after routing.
+    """
+    if "endpoint" not in scope:
+        return f"{scope['method']} unmatched"
+    path = scope["path"]
+    path_params = scope.get("path_params")
+    if path_params:
+        names = {str(value): name for name, value in path_params.items()}
+        path = "/".join(f"{{{names[segment]}}}" if segment in names else segment for segment in path.split("/"))
+    return f"{scope['method']} {path}"
+
+
+class RouteTimingStats:
+    """
+    Per-route latency breakdown: one StreamingHistogram per stage, plus
+    "total", and the slow-request sampler.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("REQUEST_TIMING_ENABLED", "true").lower() == "true"
+        self.slow_request_ms = float(os.getenv("REQUEST_TIMING_SLOW_MS", "1000"))
+        # Share of slow requests whose span timeline is logged (0 = off)
+        self.slow_sample_rate = float(os.getenv("REQUEST_TIMING_SLOW_SAMPLE_RATE", "0"))
+
+        self._routes: Dict[str, Dict[str, StreamingHistogram]] = {}
+        self.started_at = time.time()
+        self.slow_requests = 0
+        self.slow_dumps = 0
+
+    def start(self) -> Tuple[RequestTimer, Any]:
+        """Open a timer for the current context; pass the token to finish()."""
+        timer = RequestTimer(keep_timeline=self.slow_sample_rate > 0)
+        return timer, _current_timer.set(timer)
+
+    def finish(self, token: Any, scope: Dict[str, Any], timer: RequestTimer, status_code: int,
+               request_id: str):
+        """Close the request's timer and fold it into its route's histograms."""
+        _current_timer.reset(token)
+        timer.closed = True
+        total_ms = (perf_counter() - timer.started) * 1000
+        route = route_key(scope)
+
+        histograms = self._routes.get(route)
+        if histograms is None:
+            if len(self._routes) >= MAX_ROUTES:
+                route = "other"
+            histograms = self._routes.setdefault(route, {})
+        for stage, (stage_ms, _) in timer.stages.items():
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histogram = histograms[stage] = StreamingHistogram()
+            histogram.record(stage_ms)
+        histogram = histograms.get("total")
+        if histogram is None:
+            histogram = histograms["total"] = StreamingHistogram()
+        histogram.record(total_ms, success=status_code < 500)
+
+        if total_ms >= self.slow_request_ms:
+            self.slow_requests += 1
+            if timer.timeline is not None and random.random() < self.slow_sample_rate:
+                self.slow_dumps += 1
+                logger.warning(f"🐢 [TIMING] Slow request {request_id} {route} {status_code} "
+                               f"{total_ms:.0f}ms: " + json.dumps({
+                                   "stages": {stage: round(ms, 2) for stage, (ms, _) in timer.stages.items()},
+                                   "timeline": [[stage, round(offset, 2), round(ms, 2)]
+                                                for stage, offset, ms in timer.timeline]
+                               }))
+
+    def get_breakdown(self) -> Dict[str, Any]:
+        """Per-route p50/p95/p99 and mean per stage, slowest p99 first."""
+        routes = {}
+        for route, histograms in self._routes.items():
+            total = histograms.get("total")
+            if total is None or not total.count:
+                continue
+            stages = {}
+            for stage, histogram in histograms.items():
+                p50, p95, p99 = histogram.quantiles([0.50, 0.95, 0.99])
+                stages[stage] = {
+                    # Requests that touched the stage at all
+                    "requests": histogram.count,
+                    "mean_ms": round(histogram.mean, 2),
+                    "p50_ms": round(p50, 2),
+                    "p95_ms": round(p95, 2),
+                    "p99_ms": round(p99, 2),
+                    # Share of all time spent on this route
+                    "time_share_percent": round(histogram.total / total.total * 100, 1) if total.total else 0.0
+                }
+            routes[route] = {
+                "requests": total.count,
+                "errors": total.count - total.successes,
+                "stages": stages
+            }
+        return {
+            "since": self.started_at,
+            "slow_request_ms": self.slow_request_ms,
+            "slow_requests": self.slow_requests,
+            "slow_dumps": self.slow_dumps,
+            "routes": dict(sorted(routes.items(), key=lambda item: -item[1]["stages"]["total"]["p99_ms"]))
+        }
+
+    def reset(self):
+        self._routes.clear()
+        self.started_at = time.time()
+        self.slow_requests = 0
+        self.slow_dumps = 0
+
+
+# Global route timing instance
+route_timing = RouteTimingStats()
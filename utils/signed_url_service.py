@@ -0,0 +1,229 @@
+"""
+Signed URL issuance for Supabase Storage media.
+Signs whole pages of objects with the bulk sign endpoint (one call per bucket)
+instead of one Storage API call per file, caches URLs until shortly before
+they expire, and coalesces concurrent requests for the same object.
+
+Expiry times are rounded up to a window (a quarter of the requested lifetime,
+at least a minute), so every request inside a window maps to the same cache
+entry and receives the same URL, with at least the requested lifetime left.
+With STORAGE_SIGNING_SECRET set, URLs are signed locally as Storage API JWTs
+and no network call is made at all.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import jwt
+
+from config import settings
+from utils.async_postgrest import async_postgrest
+
+logger = logging.getLogger(__name__)
+
+ObjectRef = Tuple[str, str]  # (bucket, path)
+
+
+@dataclass(frozen=True)
+class SignedUrl:
+    """A signed object URL and its absolute expiry (unix seconds)."""
+    url: str
+    expires_at_ts: int
+
+    @property
+    def expires_at(self) -> datetime:
+        return datetime.utcfromtimestamp(self.expires_at_ts)
+
+
+class SignedUrlService:
+    """Batched, cached and coalesced signed URL issuance."""
+
+    MIN_WINDOW_SECONDS = 60
+    REFRESH_MARGIN_SECONDS = 60
+    BULK_CHUNK_SIZE = 500
+    # How long a coalesced request waits on another request's signing call
+    COALESCE_WAIT_SECONDS = 30.0
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.SIGNED_URL_CACHE_SIZE
+        self._cache: "OrderedDict[Tuple[str, str, int], SignedUrl]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "api_calls": 0, "signed_locally": 0, "errors": 0}
+
+    @property
+    def signs_locally(self) -> bool:
+        return bool(settings.STORAGE_SIGNING_SECRET)
+
+    def _expiry_bucket(self, expires_in: int, now: float) -> int:
+        window = max(self.MIN_WINDOW_SECONDS, expires_in // 4)
+        return int(math.ceil((now + expires_in) / window) * window)
+
+    async def sign(self, bucket: str, path: str, expires_in: int = 3600) -> SignedUrl:
+        """Sign one object. Raises if the Storage API refused it."""
+        signed = await self.sign_many([(bucket, path)], expires_in)
+        if (bucket, path) not in signed:
+            raise FileNotFoundError(f"Could not sign {bucket}/{path}")
+        return signed[(bucket, path)]
+
+    async def sign_many(self, objects: Iterable[ObjectRef], expires_in: int = 3600) -> Dict[ObjectRef, SignedUrl]:
+        """
+        Sign many objects, any buckets, in at most one Storage API call per
+        bucket. Objects that could not be signed are missing from the result.
+        """
+        now = time.time()
+        expiry = self._expiry_bucket(expires_in, now)
+        results: Dict[ObjectRef, SignedUrl] = {}
+        waiting: Dict[ObjectRef, asyncio.Future] = {}
+        to_sign: Dict[str, List[str]] = defaultdict(list)
+
+        for bucket, path in dict.fromkeys(objects):
+            key = (bucket, path, expiry)
+            cached = self._cache.get(key)
+            if cached is not None and cached.expires_at_ts - self.REFRESH_MARGIN_SECONDS > now:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                results[(bucket, path)] = cached
+                continue
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                waiting[(bucket, path)] = future
+                continue
+
+            self.stats["misses"] += 1
+            self._in_flight[key] = asyncio.get_running_loop().create_future()
+            to_sign[bucket].append(path)
+
+        if to_sign:
+            try:
+                signed = await self._issue(to_sign, expiry, now)
+            except asyncio.CancelledError:
+                # Waiters must not hang on a call nobody will finish
+                self._settle(to_sign, expiry, {}, cancelled=True)
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                self._settle(to_sign, expiry, {}, error=e)
+                raise
+            self._settle(to_sign, expiry, signed)
+            results.update(signed)
+
+        retry: List[ObjectRef] = []
+        for ref, future in waiting.items():
+            # Errors belong to the request that issued the call; waiters just miss
+            try:
+                signed_url = await asyncio.wait_for(asyncio.shield(future), self.COALESCE_WAIT_SECONDS)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The issuing request was cancelled: sign it here instead
+                retry.append(ref)
+                continue
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ [SIGNED-URL] Timed out waiting for {ref[0]}/{ref[1]} to be signed")
+                signed_url = None
+            except Exception:
+                signed_url = None
+            if signed_url is not None:
+                results[ref] = signed_url
+
+        if retry:
+            results.update(await self.sign_many(retry, expires_in))
+
+        return results
+
+    def _settle(
+        self,
+        to_sign: Dict[str, List[str]],
+        expiry: int,
+        signed: Dict[ObjectRef, SignedUrl],
+        error: Optional[Exception] = None,
+        cancelled: bool = False
+    ):
+        for bucket, paths in to_sign.items():
+            for path in paths:
+                key = (bucket, path, expiry)
+                future = self._in_flight.pop(key, None)
+                signed_url = signed.get((bucket, path))
+                if signed_url is not None:
+                    self._cache[key] = signed_url
+                if future is not None and not future.done():
+                    if cancelled:
+                        future.cancel()
+                    elif error is not None:
+                        future.set_exception(error)
+                        # Mark retrieved: nobody may be waiting on it
+                        future.exception()
+                    else:
+                        future.set_result(signed_url)
+
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _issue(self, to_sign: Dict[str, List[str]], expiry: int, now: float) -> Dict[ObjectRef, SignedUrl]:
+        if self.signs_locally:
+            return self._sign_locally(to_sign, expiry, now)
+
+        expires_in = expiry - int(now)
+        calls = [
+            (bucket, paths[i:i + self.BULK_CHUNK_SIZE])
+            for bucket, paths in to_sign.items()
+            for i in range(0, len(paths), self.BULK_CHUNK_SIZE)
+        ]
+        self.stats["api_calls"] += len(calls)
+        batches = await asyncio.gather(*(self._sign_remote(bucket, chunk, expires_in) for bucket, chunk in calls))
+
+        signed: Dict[ObjectRef, SignedUrl] = {}
+        for (bucket, chunk), urls in zip(calls, batches):
+            for path in chunk:
+                if path in urls:
+                    signed[(bucket, path)] = SignedUrl(url=urls[path], expires_at_ts=expiry)
+                else:
+                    logger.warning(f"⚠️ [SIGNED-URL] Storage refused to sign {bucket}/{path}")
+        return signed
+
+    async def _sign_remote(self, bucket: str, paths: List[str], expires_in: int) -> Dict[str, str]:
+        if async_postgrest.enabled:
+            return await async_postgrest.storage_create_signed_urls(bucket, paths, expires_in)
+
+        from database import get_database
+        db = await get_database()
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: db.storage.from_(bucket).create_signed_urls(paths, expires_in)
+        )
+        return {
+            item["path"]: item.get("signedURL") or item.get("signedUrl")
+            for item in result or []
+            if not item.get("error") and (item.get("signedURL") or item.get("signedUrl"))
+        }
+
+    def _sign_locally(self, to_sign: Dict[str, List[str]], expiry: int, now: float) -> Dict[ObjectRef, SignedUrl]:
+        """Mint the same token the Storage API would: HS256 over {url, iat, exp}."""
+        base_url = settings.SUPABASE_URL.rstrip("/")
+        issued_at = int(now)
+        signed: Dict[ObjectRef, SignedUrl] = {}
+        for bucket, paths in to_sign.items():
+            for path in paths:
+                token = jwt.encode(
+                    {"url": f"{bucket}/{path}", "iat": issued_at, "exp": expiry},
+                    settings.STORAGE_SIGNING_SECRET,
+                    algorithm="HS256"
+                )
+                url = f"{base_url}/storage/v1/object/sign/{quote(bucket)}/{quote(path)}?token={token}"
+                signed[(bucket, path)] = SignedUrl(url=url, expires_at_ts=expiry)
+        self.stats["signed_locally"] += len(signed)
+        return signed
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "cached": len(self._cache), "in_flight": len(self._in_flight)}
+
+
+# Global signed URL service instance
+signed_url_service = SignedUrlService()
@@ -0,0 +1,120 @@
+"""
+Off-loop thumbnail rendering.
+Decoding and resizing a multi-megapixel image takes hundreds of milliseconds
+of CPU, so it runs in a process pool instead of on the event loop. Each image
+is decoded once (JPEG via draft mode, which lets libjpeg decode straight at a
+reduced scale), the largest thumbnail is produced from it with Pillow's
+reduce-then-resample path, and each smaller size is resampled from the
+previous one.
+"""
+import asyncio
+import io
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from PIL import Image
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bounding box edge lengths, rendered largest first
+THUMBNAIL_SIZES = (1024, 512, 256)
+THUMBNAIL_QUALITY = 85
+
+
+@dataclass
+class RenderedThumbnail:
+    """A WebP thumbnail fitted into a size x size box."""
+    size: int
+    width: int
+    height: int
+    data: bytes
+
+
+def render_thumbnails(image_data: bytes, sizes: Sequence[int] = THUMBNAIL_SIZES) -> List[RenderedThumbnail]:
+    """
+    Render WebP thumbnails for every size from one decode of image_data.
+    Runs in pool workers, so it must stay a picklable top-level function.
+    """
+    sizes = sorted(set(sizes), reverse=True)
+    image = Image.open(io.BytesIO(image_data))
+    # Only JPEG honours draft(); the decoded image is still at least this large
+    image.draft("RGB", (sizes[0], sizes[0]))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    thumbnails = []
+    for size in sizes:
+        # thumbnail() resizes in place and never upscales, so each pass starts
+        # from the previous (smaller) result
+        image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        output = io.BytesIO()
+        image.save(output, format="WEBP", quality=THUMBNAIL_QUALITY, optimize=True)
+        thumbnails.append(RenderedThumbnail(size, image.width, image.height, output.getvalue()))
+    return thumbnails
+
+
+class ThumbnailEngine:
+    """Runs render_thumbnails on a lazily started worker pool."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        # 0 workers renders on a single background thread (no extra processes)
+        self.max_workers = settings.THUMBNAIL_WORKERS if max_workers is None else max_workers
+        self._executor: Optional[Executor] = None
+        self.stats = {"images": 0, "errors": 0, "pool_restarts": 0, "total_time_ms": 0.0}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.max_workers > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+            logger.info(f"🖼️ [THUMBNAILS] Render pool started ({self.max_workers or 'thread'} workers)")
+        return self._executor
+
+    async def render(self, image_data: bytes, sizes: Sequence[int] = THUMBNAIL_SIZES) -> List[RenderedThumbnail]:
+        """Render all thumbnail sizes for an image without blocking the event loop."""
+        start_time = time.perf_counter()
+        executor = self._get_executor()
+        try:
+            thumbnails = await asyncio.get_running_loop().run_in_executor(
+                executor, render_thumbnails, image_data, tuple(sizes)
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a decompression bomb); later renders get a fresh pool
+            self.stats["errors"] += 1
+            self.stats["pool_restarts"] += 1
+            if self._executor is executor:
+                self._executor = None
+            executor.shutdown(wait=False)
+            raise
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["total_time_ms"] += (time.perf_counter() - start_time) * 1000
+
+        self.stats["images"] += 1
+        return thumbnails
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        images = self.stats["images"]
+        return {
+            "workers": self.max_workers,
+            **self.stats,
+            "avg_time_ms": self.stats["total_time_ms"] / images if images else 0.0
+        }
+
+
+# Global thumbnail engine instance
+thumbnail_engine = ThumbnailEngine()